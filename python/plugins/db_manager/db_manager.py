@@ -145,6 +145,11 @@ class DBManager(QMainWindow):
             self.preview.loadPreview(item)
 
     def refreshActionSlot(self):
+        # reload the catalog from the database, not from the cache
+        db = self.tree.currentDatabase()
+        if db is not None:
+            db.connector.invalidateCatalogCache()
+
         self.info.setDirty()
         self.table.setDirty()
         self.preview.setDirty()
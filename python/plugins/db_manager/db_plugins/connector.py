@@ -22,9 +22,88 @@ email                : brush.tyler@gmail.com
 from builtins import str
 from builtins import object
 
-from qgis.core import QgsDataSourceUri
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from qgis.core import QgsApplication, QgsDataSourceUri
+
+from .plugin import BaseError, DbError, ConnectionError
+
+
+class CatalogCache(object):
+    """ catalog of the connections (schemas, tables, geometry columns, row
+    estimates) stored in a SQLite database of the settings directory, so
+    databases with many tables are listed without querying them.
+
+    Entries are the JSON encoded results of the connector catalog methods,
+    stored per connection along with a version (e.g. the modification time
+    of a database file) which invalidates them when it changes. """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(QgsApplication.qgisSettingsDirPath(), u"db_manager_catalog_cache.db")
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(u"""CREATE TABLE IF NOT EXISTS catalog (
+                connection TEXT, version TEXT, request TEXT, result TEXT,
+                PRIMARY KEY (connection, request))""")
+            self._connection.commit()
+        return self._connection
+
+    def get(self, connection, version, request):
+        """ return the cached result, None if there is none """
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    u"SELECT version, result FROM catalog WHERE connection = ? AND request = ?",
+                    (connection, request)).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None or row[0] != version:
+            return None
+        return json.loads(row[1])
+
+    def put(self, connection, version, request, result):
+        """ store a result, returns False if it was already cached """
+        result = json.dumps(result, default=str)
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(u"SELECT version, result FROM catalog WHERE connection = ? AND request = ?",
+                                   (connection, request)).fetchone()
+                if row is not None and tuple(row) == (version, result):
+                    return False
+                conn.execute(u"INSERT OR REPLACE INTO catalog VALUES (?, ?, ?, ?)",
+                             (connection, version, request, result))
+                conn.commit()
+        except sqlite3.Error:
+            pass
+        return True
+
+    def invalidate(self, connection):
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(u"DELETE FROM catalog WHERE connection = ?", (connection, ))
+                conn.commit()
+        except sqlite3.Error:
+            pass
 
-from .plugin import DbError, ConnectionError
+
+_catalogCache = None
+
+
+def catalogCache():
+    global _catalogCache
+    if _catalogCache is None:
+        _catalogCache = CatalogCache()
+    return _catalogCache
 
 
 class DBConnector(object):
@@ -67,6 +146,90 @@ class DBConnector(object):
     def hasCreateSpatialViewSupport(self):
         return False
 
+    def hasThreadedExecutionSupport(self):
+        """ whether queries can be executed and fetched from a thread other
+        than the one which opened the connection """
+        return False
+
+    def cancel(self, connection):
+        """ cancel the query running on a connection returned by
+        _streaming_connection(), if any """
+        pass
+
+    def catalogCacheKey(self):
+        """ key of the connection in the catalog cache, None (the default)
+        if its catalog must not be cached """
+        return None
+
+    def catalogVersion(self):
+        """ cached catalogs with a different version are discarded """
+        return u""
+
+    def cachedCatalog(self, method, *args):
+        """ return the result of a catalog method (e.g. getTables), from the
+        catalog cache if the connector opted into it.
+
+        A result read from the cache is returned immediately and validated
+        in background (once per connection and request) when the connector
+        supports threaded execution, catalogUpdatedCallback is called if it
+        has changed. """
+        key = self.catalogCacheKey()
+        if key is None:
+            return getattr(self, method)(*args)
+
+        if not hasattr(self, '_validatedCatalog'):
+            self._validatedCatalog = set()
+            self._catalogWorker = None
+
+        request = json.dumps([method] + list(args))
+        version = self.catalogVersion()
+        result = catalogCache().get(key, version, request)
+        if result is None:
+            result = getattr(self, method)(*args)
+            catalogCache().put(key, version, request, result)
+            self._validatedCatalog.add(request)
+
+        elif request not in self._validatedCatalog and self.hasThreadedExecutionSupport():
+            self._validatedCatalog.add(request)
+            if self._catalogWorker is None:
+                self._catalogWorker = ThreadPoolExecutor(max_workers=1)
+            self._catalogWorker.submit(self._validateCatalog, key, version, request, method, args)
+
+        return result
+
+    def _validateCatalog(self, key, version, request, method, args):
+        try:
+            result = getattr(self, method)(*args)
+        except BaseError:
+            return
+        if not catalogCache().put(key, version, request, result):
+            return
+
+        callback = getattr(self, 'catalogUpdatedCallback', None)
+        if callback is not None:
+            try:
+                callback()
+            except RuntimeError:
+                # the database has been deleted in the meantime
+                pass
+
+    def invalidateCatalogCache(self):
+        key = self.catalogCacheKey()
+        if key is None:
+            return
+        catalogCache().invalidate(key)
+        if hasattr(self, '_validatedCatalog'):
+            self._validatedCatalog.clear()
+
+    def _fileCatalogVersion(self, path):
+        """ catalog version of a database stored in a file, from the
+        modification time of the file and of its write-ahead log """
+        version = []
+        for f in [path, path + u"-wal"]:
+            if os.path.exists(f):
+                version.append(u"%r" % os.path.getmtime(f))
+        return u",".join(version)
+
     def execution_error_types(self):
         raise Exception("DBConnector.execution_error_types() is an abstract method")
 
@@ -96,6 +259,8 @@ class DBConnector(object):
         """ tries to execute and commit some action, on error it rolls back the change """
         self._execute(None, sql)
         self._commit()
+        # most likely a data definition change
+        self.invalidateCatalogCache()
 
     def _get_cursor(self, name=None):
         try:
@@ -117,7 +282,8 @@ class DBConnector(object):
 
     def _close_cursor(self, c):
         try:
-            if c and not c.closed:
+            # sqlite3 cursors have no closed attribute
+            if c and not getattr(c, 'closed', False):
                 c.close()
 
         except self.error_types():
@@ -149,6 +315,38 @@ class DBConnector(object):
             self._rollback()
             raise DbError(e)
 
+    def _fetchmany(self, c, size):
+        try:
+            return c.fetchmany(size)
+
+        except self.connection_error_types() as e:
+            raise ConnectionError(e)
+
+        except self.execution_error_types() as e:
+            # do the rollback to avoid a "current transaction aborted, commands ignored" errors
+            self._rollback()
+            raise DbError(e)
+
+    def _streaming_connection(self):
+        """ return the connection to run a query read in batches on """
+        return self.connection
+
+    def _execute_streaming(self, connection, sql, size):
+        """ execute a query whose results are read in batches, returns the
+        cursor, the column names and the first batch of rows """
+        c = self._execute(None, sql)
+        header = self._get_cursor_columns(c) or []
+        rows = self._fetchmany(c, size) if len(header) > 0 else []
+        return c, header, rows
+
+    def _finish_streaming(self, connection, c, commit):
+        """ end a query run by _execute_streaming(), committing its changes
+        if commit is True """
+        if commit and c is not None:
+            # commit before closing the cursor to make sure that the changes are stored
+            self._commit()
+        self._close_cursor(c)
+
     def _commit(self):
         try:
             self.connection.commit()
@@ -22,11 +22,17 @@ email                : brush.tyler@gmail.com
 from builtins import str
 from builtins import range
 
-from qgis.PyQt.QtCore import Qt, QTime, QRegExp, QAbstractTableModel
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from qgis.PyQt.QtCore import Qt, QTime, QRegExp, QAbstractTableModel, QModelIndex, pyqtSignal
 from qgis.PyQt.QtGui import QFont, QStandardItemModel, QStandardItem
 from qgis.PyQt.QtWidgets import QApplication
+from qgis.core import QgsSettings
 
-from .plugin import DbError
+from .plugin import BaseError, DbError, ConnectionError
 
 
 class BaseTableModel(QAbstractTableModel):
@@ -139,6 +145,175 @@ class TableDataModel(BaseTableModel):
         return self.table.rowCount if self.table.rowCount is not None and self.columnCount(index) > 0 else 0
 
 
+class PagedTableDataModel(TableDataModel):
+    """ table model fetching rows by pages of fixed size.
+
+    Pages are fetched by a background worker when the view asks for rows
+    which are not loaded yet, their cells are empty until the page arrives.
+    The pages around the visible one are prefetched and only the most
+    recently used ones are kept in memory.
+
+    The pages are read on a connection of their own, returned by the
+    connector's _streaming_connection(), so fetching them doesn't block or
+    interrupt the queries run on the connector.
+
+    Subclasses implement fetchPage(). When keyset is True the rows returned
+    by fetchPage() end with a key column (not displayed) which is used to
+    fetch the adjacent pages with a range condition on the key instead of an
+    offset. """
+
+    pageFetched = pyqtSignal(int, int, object)
+
+    def __init__(self, table, parent=None):
+        TableDataModel.__init__(self, table, parent)
+
+        settings = QgsSettings()
+        self.pageSize = max(1, settings.value("/DB_Manager/tableViewer/pageSize", 256, type=int))
+        self.maxPages = max(3, settings.value("/DB_Manager/tableViewer/cachedPages", 32, type=int))
+        self.keyset = False
+
+        self._pages = OrderedDict()
+        self._pageKeys = {}
+        self._pending = set()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._connection = None
+        self._worker = ThreadPoolExecutor(max_workers=1)
+
+        self.pageFetched.connect(self._pageFetched)
+        self.table.aboutToChange.connect(self.clearPages)
+
+    def __del__(self):
+        # skip exception on RuntimeError, the table may be already deleted
+        try:
+            self.table.aboutToChange.disconnect(self.clearPages)
+        except RuntimeError:
+            pass
+        if self._connection is not None:
+            # closed by the worker, after the fetches still queued
+            self._worker.submit(self._closeConnection, self.db, self._connection)
+        self._worker.shutdown(wait=False)
+
+    @staticmethod
+    def _closeConnection(db, connection):
+        try:
+            db._finish_streaming(connection, None, False)
+        except BaseError:
+            pass
+
+    def fetchPage(self, connection, page, after=None, before=None):
+        """ return the rows of a page, read on connection. If keyset is
+        enabled, after (or before) is the key of the last row of the previous
+        page (or of the first row of the next page) when it is known. This is
+        usually called from the worker thread. """
+        return []
+
+    def clearPages(self):
+        """ drop the fetched pages, results of pending fetches are ignored """
+        self._generation += 1
+        self._pages.clear()
+        self._pageKeys.clear()
+        self._pending.clear()
+
+    def getData(self, row, col):
+        page = row // self.pageSize
+        rows = self._pages.get(page)
+        if rows is None:
+            # needed now (e.g. to copy rows), fetch it synchronously
+            rows = self._storePage(page, self._fetch(page, *self._pageBounds(page)))
+        else:
+            self._pages.move_to_end(page)
+
+        row -= page * self.pageSize
+        if row >= len(rows):
+            # the table shrank since the row count was read
+            return None
+        return rows[row][col]
+
+    def data(self, index, role):
+        if role not in [Qt.DisplayRole,
+                        Qt.EditRole,
+                        Qt.FontRole]:
+            return None
+
+        page = index.row() // self.pageSize
+        self._requestPage(page)
+        if page not in self._pages:
+            return None
+
+        self._requestPage(page + 1)
+        self._requestPage(page - 1)
+        return TableDataModel.data(self, index, role)
+
+    def _pageBounds(self, page):
+        if not self.keyset:
+            return None, None
+        if page - 1 in self._pageKeys:
+            return self._pageKeys[page - 1][1], None
+        if page + 1 in self._pageKeys:
+            return None, self._pageKeys[page + 1][0]
+        return None, None
+
+    def _fetch(self, page, after, before):
+        with self._lock:
+            if self._connection is None:
+                self._connection = self.db._streaming_connection()
+            try:
+                return self.fetchPage(self._connection, page, after, before)
+            except ConnectionError:
+                # open a new connection for the next page
+                self._closeConnection(self.db, self._connection)
+                self._connection = None
+                raise
+
+    def _requestPage(self, page):
+        if page < 0 or page * self.pageSize >= self.rowCount():
+            return
+        if page in self._pages or page in self._pending:
+            return
+
+        self._pending.add(page)
+        after, before = self._pageBounds(page)
+        self._worker.submit(self._fetchInBackground, page, self._generation, after, before)
+
+    def _fetchInBackground(self, page, generation, after, before):
+        try:
+            rows = self._fetch(page, after, before)
+        except (DbError, ConnectionError):
+            rows = None
+        try:
+            self.pageFetched.emit(page, generation, rows)
+        except RuntimeError:
+            # the model has been deleted in the meantime
+            pass
+
+    def _pageFetched(self, page, generation, rows):
+        if generation != self._generation:
+            return
+        self._pending.discard(page)
+        if rows is None:
+            return
+
+        self._storePage(page, rows)
+        first = page * self.pageSize
+        last = min(first + self.pageSize, self.rowCount()) - 1
+        if last >= first:
+            self.dataChanged.emit(self.index(first, 0), self.index(last, self.columnCount() - 1))
+
+    def _storePage(self, page, rows):
+        if self.keyset:
+            if rows:
+                self._pageKeys[page] = (rows[0][-1], rows[-1][-1])
+            rows = [r[:-1] for r in rows]
+
+        self._pages[page] = rows
+        self._pages.move_to_end(page)
+        while len(self._pages) > self.maxPages:
+            evicted, evictedRows = self._pages.popitem(last=False)
+            self._pageKeys.pop(evicted, None)
+        return rows
+
+
 class SqlResultModel(BaseTableModel):
 
     def __init__(self, db, sql, parent=None):
@@ -179,6 +354,188 @@ class SqlResultModel(BaseTableModel):
         return self._affectedRows
 
 
+class SqlResultModelAsync(BaseTableModel):
+    """ result of a query, fetched in batches.
+
+    The query runs when execute() is called, in a background thread if the
+    connector supports it. Rows are appended to the model as they arrive,
+    up to rowLimit rows, then the following ones are fetched on demand
+    (e.g. when the view is scrolled to the bottom) by fetchMore(). The
+    running query can be interrupted by cancel(). """
+
+    executed = pyqtSignal()
+    fetchFinished = pyqtSignal()
+
+    _executed = pyqtSignal(object, int, float)
+    _rowsFetched = pyqtSignal(object)
+    _stopped = pyqtSignal(object, bool)
+
+    def __init__(self, db, sql, parent=None):
+        BaseTableModel.__init__(self, None, None, parent)
+        self.database = db
+        self.db = db.connector
+        self.sql = str(sql)
+
+        settings = QgsSettings()
+        self.rowLimit = max(1, settings.value("/DB_Manager/sqlWindow/rowLimit", 1000, type=int))
+        self.batchSize = max(1, settings.value("/DB_Manager/sqlWindow/batchSize", 100, type=int))
+
+        self._connection = None
+        self._cursor = None
+        self._running = False
+        self._exhausted = False
+        self._cancelled = False
+        self._error = None
+        self._affectedRows = -1
+        self._firstRowSecs = 0.0
+        self._secs = 0.0
+        self._roundStart = None
+        self._worker = ThreadPoolExecutor(max_workers=1) if self.db.hasThreadedExecutionSupport() else None
+
+        self._executed.connect(self._queryExecuted)
+        self._rowsFetched.connect(self._appendRows)
+        self._stopped.connect(self._fetchStopped)
+
+    def execute(self):
+        self._running = True
+        self._roundStart = time.time()
+        self._submit(self._runQuery)
+
+    def cancel(self):
+        if self._running:
+            self._cancelled = True
+            if self._connection is not None:
+                self.db.cancel(self._connection)
+        else:
+            self._closeCursor()
+
+    def canFetchMore(self, parent=None):
+        return not self._running and not self._exhausted and not self._cancelled and self._cursor is not None
+
+    def fetchMore(self, parent=None):
+        if not self.canFetchMore():
+            return
+        self._running = True
+        self._roundStart = time.time()
+        self._submit(self._fetchRows, self.rowLimit)
+
+    def isRunning(self):
+        return self._running
+
+    def wasCancelled(self):
+        return self._cancelled
+
+    def error(self):
+        return self._error
+
+    def secs(self):
+        """ time spent executing the query and fetching the rows """
+        return self._secs
+
+    def firstRowSecs(self):
+        """ time until the first batch of rows was available """
+        return self._firstRowSecs
+
+    def affectedRows(self):
+        if len(self._header) > 0 or self._affectedRows < 0:
+            return len(self.resdata)
+        return self._affectedRows
+
+    def _executeQuery(self):
+        """ run the query, returns the cursor (None if there is nothing left
+        to fetch), the column names and the first batch of rows """
+        self._connection = self.db._streaming_connection()
+        if self._cancelled:
+            return None, [], []
+        return self.db._execute_streaming(self._connection, self.sql, self.batchSize)
+
+    def _submit(self, func, *args):
+        if self._worker is not None:
+            self._worker.submit(func, *args)
+        else:
+            func(*args)
+
+    def _emit(self, signal, *args):
+        try:
+            signal.emit(*args)
+        except RuntimeError:
+            # the model has been deleted in the meantime
+            pass
+
+    def _runQuery(self):
+        try:
+            self._cursor, header, rows = self._executeQuery()
+        except BaseError as e:
+            self._closeCursor()
+            self._emit(self._stopped, e, True)
+            return
+
+        rowcount = getattr(self._cursor, 'rowcount', -1)
+        self._emit(self._executed, header, rowcount if rowcount is not None else -1, time.time() - self._roundStart)
+        if len(rows) > 0:
+            self._emit(self._rowsFetched, rows)
+
+        if self._cursor is None or len(header) == 0 or len(rows) < self.batchSize:
+            self._finishQuery(None)
+        else:
+            self._fetchRows(self.rowLimit - len(rows))
+
+    def _fetchRows(self, count):
+        try:
+            while count > 0 and not self._cancelled:
+                size = min(self.batchSize, count)
+                rows = self.db._fetchmany(self._cursor, size)
+                if len(rows) > 0:
+                    self._emit(self._rowsFetched, rows)
+                    count -= len(rows)
+                if len(rows) < size:
+                    self._finishQuery(None)
+                    return
+        except BaseError as e:
+            self._finishQuery(e)
+            return
+
+        if self._cancelled:
+            self._closeCursor()
+        self._emit(self._stopped, None, False)
+
+    def _finishQuery(self, error):
+        try:
+            self._closeCursor(error is None)
+        except BaseError as e:
+            error = e
+        self._emit(self._stopped, error, True)
+
+    def _closeCursor(self, commit=False):
+        cursor, connection = self._cursor, self._connection
+        self._cursor = self._connection = None
+        if cursor is not None or connection is not None:
+            self.db._finish_streaming(connection, cursor, commit)
+
+    def _queryExecuted(self, header, affectedRows, secs):
+        self.beginResetModel()
+        self._header = header
+        self.resdata = []
+        self.endResetModel()
+        self._affectedRows = affectedRows
+        self._firstRowSecs = secs
+        self.executed.emit()
+
+    def _appendRows(self, rows):
+        first = len(self.resdata)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self.resdata.extend(rows)
+        self.endInsertRows()
+
+    def _fetchStopped(self, error, exhausted):
+        self._running = False
+        self._exhausted = exhausted
+        self._secs += time.time() - self._roundStart
+        if not self._cancelled:
+            self._error = error
+        self.fetchFinished.emit()
+
+
 class SimpleTableModel(QStandardItemModel):
 
     def __init__(self, header, editable=False, parent=None):
@@ -212,11 +212,18 @@ class DbItemObject(QObject):
 
 
 class Database(DbItemObject):
+    catalogUpdated = pyqtSignal()
 
     def __init__(self, dbplugin, uri):
         DbItemObject.__init__(self, dbplugin)
         self.connector = self.connectorsFactory(uri)
 
+        # the catalog cache is validated in background, reload the items
+        # when it was outdated
+        if self.connector is not None:
+            self.connector.catalogUpdatedCallback = self.catalogUpdated.emit
+        self.catalogUpdated.connect(self.refresh)
+
     def connectorsFactory(self, uri):
         return None
 
@@ -256,6 +263,11 @@ class Database(DbItemObject):
 
         return SqlResultModel(self, sql, parent)
 
+    def sqlResultModelAsync(self, sql, parent):
+        from .data_model import SqlResultModelAsync
+
+        return SqlResultModelAsync(self, sql, parent)
+
     def columnUniqueValuesModel(self, col, table, limit=10):
         l = ""
         if limit is not None:
@@ -400,7 +412,7 @@ class Database(DbItemObject):
         return None
 
     def schemas(self):
-        schemas = self.connector.getSchemas()
+        schemas = self.connector.cachedCatalog('getSchemas')
         if schemas is not None:
             schemas = [self.schemasFactory(x, self) for x in schemas]
         return schemas
@@ -510,7 +522,7 @@ class Database(DbItemObject):
         return None
 
     def tables(self, schema=None, sys_tables=False):
-        tables = self.connector.getTables(schema.name if schema else None, sys_tables)
+        tables = self.connector.cachedCatalog('getTables', schema.name if schema else None, sys_tables)
         if tables is not None:
             tables = [self.tablesFactory(x, self, schema) for x in tables]
         return tables
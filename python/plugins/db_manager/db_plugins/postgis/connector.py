@@ -33,12 +33,18 @@ from ..connector import DBConnector
 from ..plugin import ConnectionError, DbError, Table
 
 import os
+import re
 import psycopg2
 import psycopg2.extensions
 # use unicode!
 psycopg2.extensions.register_type(psycopg2.extensions.UNICODE)
 psycopg2.extensions.register_type(psycopg2.extensions.UNICODEARRAY)
 
+try:
+    from processing.tools.postgis import connectionPool, pool_key
+except ImportError:
+    connectionPool = None
+
 
 def classFactory():
     return PostGisDBConnector
@@ -62,70 +68,57 @@ class PostGisDBConnector(DBConnector):
             self.dbname = uri.database() or os.environ.get('PGDATABASE') or username
             uri.setDatabase(self.dbname)
 
-        expandedConnInfo = self._connectionInfo()
-        try:
-            self.connection = psycopg2.connect(expandedConnInfo)
-        except self.connection_error_types() as e:
-            err = str(e)
-            uri = self.uri()
-            conninfo = uri.connectionInfo(False)
-
-            for i in range(3):
-                (ok, username, password) = QgsCredentials.instance().get(conninfo, username, password, err)
-                if not ok:
-                    raise ConnectionError(e)
-
-                if username:
-                    uri.setUsername(username)
-
-                if password:
-                    uri.setPassword(password)
-
-                newExpandedConnInfo = uri.connectionInfo(True)
-                try:
-                    self.connection = psycopg2.connect(newExpandedConnInfo)
-                    QgsCredentials.instance().put(conninfo, username, password)
-                except self.connection_error_types() as e:
-                    if i == 2:
+        # credentials entered by the user, used again by the connections
+        # opened for the queries of the SQL window
+        self._credentials = None
+
+        # reuse an idle connection of the pool shared with the processing
+        # PostgreSQL tools if there is one
+        self._poolKey = None
+        if connectionPool is not None:
+            self._poolKey = pool_key(self.uri())
+            self.connection = connectionPool().acquire(self._poolKey)
+            if self.connection is not None:
+                self._credentials = self.connection.credentials
+
+        if self.connection is None:
+            expandedConnInfo = self._connectionInfo()
+            try:
+                self.connection = self._connect(expandedConnInfo)
+            except self.connection_error_types() as e:
+                err = str(e)
+                uri = self.uri()
+                conninfo = uri.connectionInfo(False)
+
+                for i in range(3):
+                    (ok, username, password) = QgsCredentials.instance().get(conninfo, username, password, err)
+                    if not ok:
                         raise ConnectionError(e)
 
-                    err = str(e)
-                finally:
-                    # remove certs (if any) of the expanded connectionInfo
-                    expandedUri = QgsDataSourceUri(newExpandedConnInfo)
-
-                    sslCertFile = expandedUri.param("sslcert")
-                    if sslCertFile:
-                        sslCertFile = sslCertFile.replace("'", "")
-                        os.remove(sslCertFile)
-
-                    sslKeyFile = expandedUri.param("sslkey")
-                    if sslKeyFile:
-                        sslKeyFile = sslKeyFile.replace("'", "")
-                        os.remove(sslKeyFile)
-
-                    sslCAFile = expandedUri.param("sslrootcert")
-                    if sslCAFile:
-                        sslCAFile = sslCAFile.replace("'", "")
-                        os.remove(sslCAFile)
-        finally:
-            # remove certs (if any) of the expanded connectionInfo
-            expandedUri = QgsDataSourceUri(expandedConnInfo)
-
-            sslCertFile = expandedUri.param("sslcert")
-            if sslCertFile:
-                sslCertFile = sslCertFile.replace("'", "")
-                os.remove(sslCertFile)
-
-            sslKeyFile = expandedUri.param("sslkey")
-            if sslKeyFile:
-                sslKeyFile = sslKeyFile.replace("'", "")
-                os.remove(sslKeyFile)
-
-            sslCAFile = expandedUri.param("sslrootcert")
-            if sslCAFile:
-                sslCAFile = sslCAFile.replace("'", "")
-                os.remove(sslCAFile)
+                    if username:
+                        uri.setUsername(username)
+
+                    if password:
+                        uri.setPassword(password)
+
+                    newExpandedConnInfo = uri.connectionInfo(True)
+                    try:
+                        self.connection = self._connect(newExpandedConnInfo)
+                        self._credentials = (username, password)
+                        if connectionPool is not None:
+                            self.connection.credentials = self._credentials
+                        QgsCredentials.instance().put(conninfo, username, password)
+                    except self.connection_error_types() as e:
+                        if i == 2:
+                            raise ConnectionError(e)
+
+                        err = str(e)
+                    finally:
+                        # remove certs (if any) of the expanded connectionInfo
+                        self._removeCertFiles(newExpandedConnInfo)
+            finally:
+                # remove certs (if any) of the expanded connectionInfo
+                self._removeCertFiles(expandedConnInfo)
 
         self.connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
 
@@ -138,9 +131,40 @@ class PostGisDBConnector(DBConnector):
         self._checkGeometryColumnsTable()
         self._checkRasterColumnsTable()
 
+    def _connect(self, conninfo):
+        if connectionPool is not None:
+            return connectionPool().connect(conninfo)
+        return psycopg2.connect(conninfo)
+
+    def __del__(self):
+        # give the connection back to the shared pool instead of closing it
+        if self.connection is not None and connectionPool is not None:
+            connectionPool().release(self._poolKey, self.connection)
+            self.connection = None
+        DBConnector.__del__(self)
+
     def _connectionInfo(self):
         return str(self.uri().connectionInfo(True))
 
+    def _removeCertFiles(self, expandedConnInfo):
+        """ remove certs (if any) of the expanded connectionInfo """
+        expandedUri = QgsDataSourceUri(expandedConnInfo)
+
+        sslCertFile = expandedUri.param("sslcert")
+        if sslCertFile:
+            sslCertFile = sslCertFile.replace("'", "")
+            os.remove(sslCertFile)
+
+        sslKeyFile = expandedUri.param("sslkey")
+        if sslKeyFile:
+            sslKeyFile = sslKeyFile.replace("'", "")
+            os.remove(sslKeyFile)
+
+        sslCAFile = expandedUri.param("sslrootcert")
+        if sslCAFile:
+            sslCAFile = sslCAFile.replace("'", "")
+            os.remove(sslCAFile)
+
     def _checkSpatial(self):
         """ check whether postgis_version is present in catalog """
         c = self._execute(None, u"SELECT COUNT(*) FROM pg_proc WHERE proname = 'postgis_version'")
@@ -227,6 +251,16 @@ class PostGisDBConnector(DBConnector):
     def hasCreateSpatialViewSupport(self):
         return True
 
+    def hasThreadedExecutionSupport(self):
+        # psycopg2 connections can be shared between threads
+        return True
+
+    def cancel(self, connection):
+        connection.cancel()
+
+    def catalogCacheKey(self):
+        return u"postgres:%s" % self.publicUri().connectionInfo(False)
+
     def fieldTypes(self):
         return [
             "integer", "bigint", "smallint",  # integers
@@ -999,6 +1033,86 @@ class PostGisDBConnector(DBConnector):
     # def _fetchone(self, c):
     #       pass
 
+    def _streaming_connection(self):
+        # the query gets its own connection, so canceling it doesn't
+        # interrupt the queries of the connector, and its rows can be read
+        # through a cursor inside a transaction
+        uri = self.uri()
+        if self._credentials is not None:
+            username, password = self._credentials
+            if username:
+                uri.setUsername(username)
+            if password:
+                uri.setPassword(password)
+        expandedConnInfo = str(uri.connectionInfo(True))
+        try:
+            return psycopg2.connect(expandedConnInfo)
+        except self.connection_error_types() as e:
+            raise ConnectionError(e)
+        finally:
+            self._removeCertFiles(expandedConnInfo)
+
+    def _execute_streaming(self, connection, sql, size):
+        # a client side cursor would transfer the whole result set on execute,
+        # read queries returning rows through a server side cursor instead
+        if re.match(r'\s*(SELECT|WITH|VALUES|TABLE)\b', sql, re.IGNORECASE):
+            self._last_cursor_named_id = getattr(self, '_last_cursor_named_id', -1) + 1
+            try:
+                c = connection.cursor("db_manager_query_%d" % self._last_cursor_named_id)
+                c.itersize = size
+                c.execute(str(sql))
+                # the result is described on the first fetch only
+                rows = c.fetchmany(size)
+                return c, self._get_cursor_columns(c) or [], rows
+            except self.connection_error_types() as e:
+                raise ConnectionError(e)
+            except self.execution_error_types():
+                # e.g. data modifying statements in WITH, which cannot be
+                # used in a cursor: run the query again with a plain one
+                connection.rollback()
+
+        try:
+            c = connection.cursor()
+            c.execute(str(sql))
+            # the rows are already on the client, store the changes right
+            # away as in the autocommit mode of the connector
+            connection.commit()
+            header = self._get_cursor_columns(c) or []
+            rows = c.fetchmany(size) if len(header) > 0 else []
+            return c, header, rows
+        except self.connection_error_types() as e:
+            raise ConnectionError(e)
+        except self.execution_error_types() as e:
+            connection.rollback()
+            raise DbError(e, sql)
+
+    def _fetchmany(self, c, size):
+        if c.connection is self.connection:
+            return DBConnector._fetchmany(self, c, size)
+        try:
+            return c.fetchmany(size)
+        except self.connection_error_types() as e:
+            raise ConnectionError(e)
+        except self.execution_error_types() as e:
+            raise DbError(e)
+
+    def _finish_streaming(self, connection, c, commit):
+        try:
+            self._close_cursor(c)
+            if commit:
+                connection.commit()
+            else:
+                connection.rollback()
+        except self.connection_error_types() as e:
+            raise ConnectionError(e)
+        except self.execution_error_types() as e:
+            raise DbError(e)
+        finally:
+            try:
+                connection.close()
+            except self.error_types():
+                pass
+
     # moved into the parent class: DbConnector._commit()
     # def _commit(self):
     #       pass
@@ -21,30 +21,23 @@ email                : brush.tyler@gmail.com
 """
 
 
-from ..data_model import TableDataModel, SqlResultModel
+from ..data_model import PagedTableDataModel, SqlResultModel
+from ..plugin import ConnectionError, DbError
 
 
-class PGTableDataModel(TableDataModel):
+class PGTableDataModel(PagedTableDataModel):
 
     def __init__(self, table, parent=None):
-        self.cursor = None
-        TableDataModel.__init__(self, table, parent)
+        PagedTableDataModel.__init__(self, table, parent)
+
+        # page by ranges of the primary key when there is a single column one,
+        # by offset otherwise
+        pkFields = [fld for fld in table.fields() if fld.primaryKey]
+        self.keyColumn = self.db.quoteId(pkFields[0].name) if len(pkFields) == 1 else None
+        self.keyset = self.keyColumn is not None
 
         if self.table.rowCount is None:
             self.table.refreshRowCount()
-            if self.table.rowCount is None:
-                return
-
-        self.table.aboutToChange.connect(self._deleteCursor)
-        self._createCursor()
-
-    def _createCursor(self):
-        fields_txt = u", ".join(self.fields)
-        table_txt = self.db.quoteId((self.table.schemaName(), self.table.name))
-
-        self.cursor = self.db._get_cursor()
-        sql = u"SELECT %s FROM %s" % (fields_txt, table_txt)
-        self.db._execute(self.cursor, sql)
 
     def _sanitizeTableField(self, field):
         # get fields, ignore geometry columns
@@ -56,27 +49,47 @@ class PGTableDataModel(TableDataModel):
                 'fld': self.db.quoteId(field.name)}
         return u"%s::text" % self.db.quoteId(field.name)
 
-    def _deleteCursor(self):
-        self.db._close_cursor(self.cursor)
-        self.cursor = None
-
-    def __del__(self):
-        self.table.aboutToChange.disconnect(self._deleteCursor)
-        self._deleteCursor()
-        pass  # print "PGTableModel.__del__"
-
-    def fetchMoreData(self, row_start):
-        if not self.cursor:
-            self._createCursor()
+    def fetchPage(self, connection, page, after=None, before=None):
+        fields = list(self.fields)
+        if self.keyset:
+            fields.append(self.keyColumn)
+        table_txt = self.db.quoteId((self.table.schemaName(), self.table.name))
+        sql = u"SELECT %s FROM %s" % (u", ".join(fields), table_txt)
+
+        if not self.keyset:
+            # without an order the pages could overlap or miss rows, the
+            # physical location is the only order available (views have none)
+            if self.table._relationType != 'v':
+                sql += u" ORDER BY ctid"
+            sql += u" LIMIT %d OFFSET %d" % (self.pageSize, page * self.pageSize)
+        elif after is not None:
+            sql += u" WHERE %s > %s ORDER BY %s LIMIT %d" % (
+                self.keyColumn, self.db.quoteString(str(after)), self.keyColumn, self.pageSize)
+        elif before is not None:
+            sql += u" WHERE %s < %s ORDER BY %s DESC LIMIT %d" % (
+                self.keyColumn, self.db.quoteString(str(before)), self.keyColumn, self.pageSize)
+        else:
+            # no adjacent page known (e.g. after a jump with the scrollbar)
+            sql += u" ORDER BY %s LIMIT %d OFFSET %d" % (self.keyColumn, self.pageSize, page * self.pageSize)
 
         try:
-            self.cursor.scroll(row_start, mode='absolute')
-        except self.db.error_types():
-            self._deleteCursor()
-            return self.fetchMoreData(row_start)
-
-        self.resdata = self.cursor.fetchmany(self.fetchedCount)
-        self.fetchedFrom = row_start
+            c = connection.cursor()
+            try:
+                c.execute(str(sql))
+                rows = c.fetchall()
+            finally:
+                self.db._close_cursor(c)
+                # don't stay idle in a transaction, it would keep a lock on
+                # the table
+                connection.rollback()
+        except self.db.connection_error_types() as e:
+            raise ConnectionError(e)
+        except self.db.execution_error_types() as e:
+            raise DbError(e, sql)
+
+        if before is not None:
+            rows.reverse()
+        return rows
 
 
 class PGSqlResultModel(SqlResultModel):
@@ -48,7 +48,8 @@ class SpatiaLiteDBConnector(DBConnector):
             raise ConnectionError(QApplication.translate("DBManagerPlugin", '"{0}" not found').format(self.dbname))
 
         try:
-            self.connection = spatialite_connect(self._connectionInfo())
+            # queries of the SQL window run in a worker thread
+            self.connection = spatialite_connect(self._connectionInfo(), check_same_thread=False)
 
         except self.connection_error_types() as e:
             raise ConnectionError(e)
@@ -149,6 +150,66 @@ class SpatiaLiteDBConnector(DBConnector):
     def hasCreateSpatialViewSupport(self):
         return True
 
+    def hasThreadedExecutionSupport(self):
+        return True
+
+    def cancel(self, connection):
+        connection.interrupt()
+
+    def _streaming_connection(self):
+        # the query gets its own connection, so interrupting it doesn't
+        # interrupt the queries of the connector
+        try:
+            return spatialite_connect(self._connectionInfo(), check_same_thread=False)
+        except self.connection_error_types() as e:
+            raise ConnectionError(e)
+
+    def _execute_streaming(self, connection, sql, size):
+        try:
+            c = connection.cursor()
+            c.execute(str(sql))
+            header = self._get_cursor_columns(c) or []
+            rows = c.fetchmany(size) if len(header) > 0 else []
+            return c, header, rows
+        except self.connection_error_types() as e:
+            raise ConnectionError(e)
+        except self.execution_error_types() as e:
+            connection.rollback()
+            raise DbError(e, sql)
+
+    def _fetchmany(self, c, size):
+        if c.connection is self.connection:
+            return DBConnector._fetchmany(self, c, size)
+        try:
+            return c.fetchmany(size)
+        except self.connection_error_types() as e:
+            raise ConnectionError(e)
+        except self.execution_error_types() as e:
+            raise DbError(e)
+
+    def _finish_streaming(self, connection, c, commit):
+        try:
+            self._close_cursor(c)
+            if commit:
+                connection.commit()
+            else:
+                connection.rollback()
+        except self.connection_error_types() as e:
+            raise ConnectionError(e)
+        except self.execution_error_types() as e:
+            raise DbError(e)
+        finally:
+            try:
+                connection.close()
+            except self.error_types():
+                pass
+
+    def catalogCacheKey(self):
+        return u"spatialite:%s" % self.dbname
+
+    def catalogVersion(self):
+        return self._fileCatalogVersion(self.dbname)
+
     def fieldTypes(self):
         return [
             "integer", "bigint", "smallint",  # integers
@@ -19,7 +19,7 @@ email                : hugo dot mercier at oslandia dot com
  ***************************************************************************/
 """
 
-from ..data_model import TableDataModel, BaseTableModel
+from ..data_model import TableDataModel, BaseTableModel, SqlResultModelAsync
 
 from .connector import VLayerRegistry, getQueryGeometryName
 from .plugin import LVectorTable
@@ -115,3 +115,11 @@ class LSqlResultModel(BaseTableModel):
 
     def affectedRows(self):
         return self._affectedRows
+
+
+class LSqlResultModelAsync(SqlResultModelAsync):
+
+    def _executeQuery(self):
+        # virtual layers are created and read on the main thread in one go
+        model = LSqlResultModel(self.database, self.sql)
+        return None, model.columnNames(), model.resdata
@@ -84,6 +84,7 @@ class DlgSqlWindow(QWidget, Ui_Dialog):
         copyAction.triggered.connect(self.copySelectedResults)
 
         self.btnExecute.clicked.connect(self.executeSql)
+        self.btnCancel.clicked.connect(self.cancelSql)
         self.btnSetFilter.clicked.connect(self.setFilter)
         self.btnClear.clicked.connect(self.clearSql)
 
@@ -182,37 +183,65 @@ class DlgSqlWindow(QWidget, Ui_Dialog):
         if sql == "":
             return
 
-        QApplication.setOverrideCursor(QCursor(Qt.WaitCursor))
-
         # delete the old model
         old_model = self.viewResult.model()
         self.viewResult.setModel(None)
         if old_model:
+            old_model.cancel()
             old_model.deleteLater()
 
-        cols = []
-        quotedCols = []
+        self.uniqueModel.clear()
+        self.geomCombo.clear()
 
-        try:
-            # set the new model
-            model = self.db.sqlResultModel(sql, self)
-            self.viewResult.setModel(model)
-            self.lblResult.setText(self.tr("{0} rows, {1:.1f} seconds").format(model.affectedRows(), model.secs()))
-            cols = self.viewResult.model().columnNames()
-            for col in cols:
-                quotedCols.append(self.db.connector.quoteId(col))
+        # set the new model, the query runs in background and the rows are
+        # added to the view as they arrive
+        model = self.db.sqlResultModelAsync(sql, self)
+        model.executed.connect(self.sqlExecuted)
+        model.fetchFinished.connect(self.sqlFetchFinished)
+        self.viewResult.setModel(model)
 
-        except BaseError as e:
-            QApplication.restoreOverrideCursor()
-            DlgDbError.showError(e, self)
-            self.uniqueModel.clear()
-            self.geomCombo.clear()
+        self.btnExecute.setEnabled(False)
+        self.btnCancel.setEnabled(True)
+        self.lblResult.setText(self.tr("Running..."))
+        model.execute()
+
+    def cancelSql(self):
+        model = self.viewResult.model()
+        if model:
+            model.cancel()
+
+    def sqlExecuted(self):
+        model = self.sender()
+        if model is not self.viewResult.model():
             return
 
+        cols = model.columnNames()
+        quotedCols = [self.db.connector.quoteId(col) for col in cols]
         self.setColumnCombos(cols, quotedCols)
 
+    def sqlFetchFinished(self):
+        model = self.sender()
+        if model is not self.viewResult.model():
+            return
+
+        self.btnExecute.setEnabled(True)
+        self.btnCancel.setEnabled(False)
+
+        if model.error() is not None:
+            self.lblResult.clear()
+            self.uniqueModel.clear()
+            self.geomCombo.clear()
+            DlgDbError.showError(model.error(), self)
+            return
+
+        text = self.tr("{0} rows, {1:.1f} seconds (first rows after {2:.1f} seconds)").format(
+            model.affectedRows(), model.secs(), model.firstRowSecs())
+        if model.wasCancelled():
+            text += self.tr(", canceled")
+        elif model.canFetchMore():
+            text += self.tr(", more rows available")
+        self.lblResult.setText(text)
         self.update()
-        QApplication.restoreOverrideCursor()
 
     def _getSqlLayer(self, _filter):
         hasUniqueField = self.uniqueColumnCheck.checkState() == Qt.Checked
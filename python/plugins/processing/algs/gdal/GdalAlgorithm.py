@@ -65,10 +65,15 @@ class GdalAlgorithm(GeoAlgorithm):
         commands = self.getConsoleCommands(parameters)
         layers = QgsProcessingUtils.compatibleVectorLayers(QgsProject.instance())
         supported = QgsVectorFileWriter.supportedFormatExtensions()
+        exports = {}
         for i, c in enumerate(commands):
             for layer in layers:
                 if layer.source() in c:
-                    exported = dataobjects.exportVectorLayer(layer, supported)
+                    # plain files are passed as they are, the other layers and
+                    # the filtered ones are exported once per execution
+                    if layer.id() not in exports:
+                        exports[layer.id()] = dataobjects.exportVectorLayer(layer, supported)
+                    exported = exports[layer.id()]
                     exportedFileName = os.path.splitext(os.path.split(exported)[1])[0]
                     c = c.replace(layer.source(), exported)
                     if os.path.isfile(layer.source()):
@@ -110,6 +110,10 @@ class GdalAlgorithmProvider(QgsProcessingProvider):
             GdalUtils.GDAL_HELP_PATH,
             self.tr('Location of GDAL docs'),
             GdalUtils.gdalHelpPath()))
+        ProcessingConfig.addSetting(Setting(
+            self.name(),
+            GdalUtils.GDAL_IN_PROCESS,
+            self.tr('Run the GDAL utilities in process when possible'), False))
         ProcessingConfig.readSettings()
         self.refreshAlgorithms()
         return True
@@ -117,6 +121,7 @@ class GdalAlgorithmProvider(QgsProcessingProvider):
     def unload(self):
         ProcessingConfig.removeSetting('ACTIVATE_GDAL')
         ProcessingConfig.removeSetting(GdalUtils.GDAL_HELP_PATH)
+        ProcessingConfig.removeSetting(GdalUtils.GDAL_IN_PROCESS)
 
     def isActive(self):
         return ProcessingConfig.getSetting('ACTIVATE_GDAL')
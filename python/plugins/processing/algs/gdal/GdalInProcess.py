@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    GdalInProcess.py
+    ---------------------
+    Date                 : October 2026
+    Copyright            : (C) 2026 by QGIS Development Team
+    Email                : qgis-developer at lists dot osgeo dot org
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'QGIS Development Team'
+__date__ = 'October 2026'
+__copyright__ = '(C) 2026, QGIS Development Team'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+import os
+
+from osgeo import gdal, ogr, osr
+
+from qgis.PyQt.QtCore import QCoreApplication
+from qgis.core import (QgsMessageLog,
+                       QgsProcessingException)
+
+# Number of values taken by each option of the utilities which can be run in
+# process. Commands using other options are run by the command line tools.
+OPTION_VALUES = {
+    # common options
+    '-of': 1, '-ot': 1, '-co': 1, '-b': 1, '-q': 0,
+    '-a_srs': 1, '-s_srs': 1, '-t_srs': 1, '-a_nodata': 1,
+    '-tr': 2, '-te': 4, '-te_srs': 1, '-ts': 2, '-tap': 0,
+    # gdal_translate
+    '-outsize': 2, '-projwin': 4, '-expand': 1, '-sds': 0,
+    # gdalwarp
+    '-r': 1, '-srcnodata': 1, '-dstnodata': 1, '-dstalpha': 0, '-multi': 0,
+    '-cutline': 1, '-cwhere': 1, '-cl': 1, '-crop_to_cutline': 0, '-wo': 1, '-wm': 1, '-overwrite': 0,
+    # gdalbuildvrt
+    '-resolution': 1, '-separate': 0, '-allow_projection_difference': 0,
+    '-input_file_list': 1, '-vrtnodata': 1, '-addalpha': 0,
+    # gdal_contour
+    '-a': 1, '-i': 1, '-f': 1,
+    # gdal_rasterize
+    '-l': 1, '-burn': 1, '-init': 1, '-at': 0, '-3d': 0, '-where': 1, '-sql': 1,
+    # gdal_proximity.py
+    '-srcband': 1, '-dstband': 1, '-distunits': 1, '-values': 1, '-maxdist': 1,
+    '-nodata': 1, '-fixed-buf-val': 1,
+    # gdaldem
+    '-z': 1, '-s': 1, '-az': 1, '-alt': 1, '-alg': 1, '-p': 0, '-compute_edges': 0,
+    '-trigonometric': 0, '-zero_for_flat': 0, '-combined': 0, '-multidirectional': 0,
+    '-exact_color_entry': 0, '-nearest_color_entry': 0, '-alpha': 0,
+    # ogr2ogr
+    '-dsco': 1, '-lco': 1, '-nln': 1, '-nlt': 1, '-append': 0, '-update': 0,
+    '-select': 1, '-dialect': 1, '-spat': 4, '-skipfailures': 0, '-preserve_fid': 0,
+    '-explodecollections': 0, '-gt': 1, '-progress': 0,
+}
+
+# characters which the shell would interpret outside of double quotes
+SHELL_CHARACTERS = set('\'`$|&;<>*?')
+
+# error numbers of the utilities when they are given an option they do not
+# support in process
+UNSUPPORTED_ERRORS = (gdal.CPLE_IllegalArg, gdal.CPLE_NotSupported)
+
+
+class UnsupportedCommand(Exception):
+    """Raised when a command cannot be run in process."""
+    pass
+
+
+def splitArguments(text):
+    """Splits a command line joined by GdalUtils.escapeAndJoin in its
+    arguments, as the shell would do.
+    """
+
+    arguments = []
+    current = None
+    quoted = False
+    i = 0
+    while i < len(text):
+        c = text[i]
+        if quoted:
+            if c == '\\' and i + 1 < len(text) and text[i + 1] in '\\"':
+                current += text[i + 1]
+                i += 1
+            elif c == '"':
+                quoted = False
+            else:
+                current += c
+        elif c == '"':
+            quoted = True
+            current = current or ''
+        elif c.isspace():
+            if current is not None:
+                arguments.append(current)
+                current = None
+        elif c in SHELL_CHARACTERS:
+            raise UnsupportedCommand(tr('Shell syntax in command: {0}').format(c))
+        else:
+            current = (current or '') + c
+        i += 1
+    if quoted:
+        raise UnsupportedCommand(tr('Unbalanced quotes in command'))
+    if current is not None:
+        arguments.append(current)
+    return arguments
+
+
+def parseCommand(commands):
+    """Returns the name of the utility, its options, its positional arguments
+    and the configuration options of a command list returned by
+    getConsoleCommands().
+    """
+
+    commands = [str(c).strip() for c in commands]
+    # Windows commands are run through cmd.exe
+    while commands and commands[0].lower() in ('cmd.exe', '/c'):
+        commands = commands[1:]
+    if not commands:
+        raise UnsupportedCommand(tr('Empty command'))
+
+    program = os.path.basename(commands[0])
+    for ext in ('.exe', '.bat', '.py'):
+        if program.lower().endswith(ext):
+            program = program[:-len(ext)]
+    arguments = splitArguments(' '.join(commands[1:]))
+
+    options = []
+    positionals = []
+    config = {}
+    i = 0
+    while i < len(arguments):
+        arg = arguments[i]
+        if arg == '--config' and i + 2 < len(arguments):
+            config[arguments[i + 1]] = arguments[i + 2]
+            i += 3
+        elif arg.startswith('-'):
+            if arg not in OPTION_VALUES or i + OPTION_VALUES[arg] >= len(arguments):
+                raise UnsupportedCommand(tr('Unsupported option: {0}').format(arg))
+            options.extend(arguments[i:i + OPTION_VALUES[arg] + 1])
+            i += OPTION_VALUES[arg] + 1
+        else:
+            positionals.append(arg)
+            i += 1
+    return program, options, positionals, config
+
+
+def optionValue(options, name, default=None):
+    """Returns the value of an option in an option list and removes it."""
+
+    if name not in options:
+        return default
+    i = options.index(name)
+    value = options[i + 1]
+    del options[i:i + 2]
+    return value
+
+
+def _translate(options, positionals, callback):
+    src, dst = positionals
+    return gdal.Translate(dst, src, options=options, callback=callback)
+
+
+def _warp(options, positionals, callback):
+    return gdal.Warp(positionals[-1], positionals[:-1], options=options, callback=callback)
+
+
+def _buildvrt(options, positionals, callback):
+    sources = positionals[1:]
+    listFile = optionValue(options, '-input_file_list')
+    if listFile is not None:
+        with open(listFile) as f:
+            sources.extend(line.strip() for line in f if line.strip())
+    return gdal.BuildVRT(positionals[0], sources, options=options, callback=callback)
+
+
+def _rasterize(options, positionals, callback):
+    src, dst = positionals
+    return gdal.Rasterize(dst, src, options=options, callback=callback)
+
+
+def _dem(options, positionals, callback):
+    if positionals[0].lower() == 'color-relief':
+        mode, src, colors, dst = positionals
+    else:
+        (mode, src, dst), colors = positionals, None
+    return gdal.DEMProcessing(dst, src, mode, colorFilename=colors, options=options, callback=callback)
+
+
+def _ogr2ogr(options, positionals, callback):
+    dst, src = positionals[:2]
+    # the remaining positional arguments are layer names
+    return gdal.VectorTranslate(dst, src, options=options + positionals[2:], callback=callback)
+
+
+def _contour(options, positionals, callback):
+    src, dst = positionals
+    attribute = optionValue(options, '-a')
+    interval = float(optionValue(options, '-i', 0))
+    driverName = optionValue(options, '-f', 'ESRI Shapefile')
+    band = int(optionValue(options, '-b', 1))
+    if options:
+        raise UnsupportedCommand(tr('Unsupported options: {0}').format(' '.join(options)))
+
+    srcDs = gdal.Open(src)
+    if srcDs is None:
+        return None
+    srcBand = srcDs.GetRasterBand(band)
+    srs = None
+    if srcDs.GetProjectionRef():
+        srs = osr.SpatialReference(srcDs.GetProjectionRef())
+
+    driver = ogr.GetDriverByName(driverName)
+    if driver is None:
+        return None
+    if os.path.exists(dst):
+        driver.DeleteDataSource(dst)
+    dstDs = driver.CreateDataSource(dst)
+    if dstDs is None:
+        return None
+    layer = dstDs.CreateLayer('contour', srs, ogr.wkbLineString)
+    layer.CreateField(ogr.FieldDefn('ID', ogr.OFTInteger))
+    elevField = -1
+    if attribute:
+        layer.CreateField(ogr.FieldDefn(attribute, ogr.OFTReal))
+        elevField = 1
+    noData = srcBand.GetNoDataValue()
+    result = gdal.ContourGenerate(srcBand, interval, 0, [], noData is not None, noData or 0,
+                                  layer, 0, elevField, callback=callback)
+    # the dataset is written when released
+    dstDs = None
+    return True if result == gdal.CE_None else None
+
+
+def _proximity(options, positionals, callback):
+    src, dst = positionals
+    driverName = optionValue(options, '-of', 'GTiff')
+    dataType = gdal.GetDataTypeByName(optionValue(options, '-ot', 'Float32'))
+    srcBand = int(optionValue(options, '-srcband', 1))
+    dstBand = int(optionValue(options, '-dstband', 1))
+    creationOptions = []
+    while '-co' in options:
+        creationOptions.append(optionValue(options, '-co'))
+    proximityOptions = []
+    for name, option in (('-values', 'VALUES'), ('-distunits', 'DISTUNITS'), ('-maxdist', 'MAXDIST'),
+                         ('-nodata', 'NODATA'), ('-fixed-buf-val', 'FIXED_BUF_VAL')):
+        value = optionValue(options, name)
+        if value is not None:
+            proximityOptions.append('{}={}'.format(option, value))
+    optionValue(options, '-q')
+    if options:
+        raise UnsupportedCommand(tr('Unsupported options: {0}').format(' '.join(options)))
+
+    srcDs = gdal.Open(src)
+    if srcDs is None:
+        return None
+    driver = gdal.GetDriverByName(driverName)
+    if driver is None:
+        return None
+    dstDs = driver.Create(dst, srcDs.RasterXSize, srcDs.RasterYSize, dstBand, dataType, creationOptions)
+    if dstDs is None:
+        return None
+    dstDs.SetGeoTransform(srcDs.GetGeoTransform())
+    dstDs.SetProjection(srcDs.GetProjectionRef())
+    result = gdal.ComputeProximity(srcDs.GetRasterBand(srcBand), dstDs.GetRasterBand(dstBand),
+                                   proximityOptions, callback=callback)
+    # the dataset is written when released
+    dstDs = None
+    return True if result == gdal.CE_None else None
+
+
+# functions running each utility, with the number of positional arguments
+# they accept
+UTILITIES = {
+    'gdal_translate': (_translate, (2, 2)),
+    'gdalwarp': (_warp, (2, None)),
+    'gdalbuildvrt': (_buildvrt, (1, None)),
+    'gdal_rasterize': (_rasterize, (2, 2)),
+    'gdaldem': (_dem, (3, 4)),
+    'ogr2ogr': (_ogr2ogr, (2, None)),
+    'gdal_contour': (_contour, (2, 2)),
+    'gdal_proximity': (_proximity, (2, 2)),
+}
+
+
+def canRunInProcess(commands):
+    """Returns True if a command list can be run by runInProcess()."""
+
+    if not hasattr(gdal, 'VectorTranslate') or not hasattr(gdal, 'SetThreadLocalConfigOption'):
+        # the utilities are available as functions since GDAL 2.1, and the
+        # configuration options of the command can only be set safely for
+        # the current thread
+        return False
+    try:
+        program, options, positionals, config = parseCommand(commands)
+    except UnsupportedCommand:
+        return False
+    if program not in UTILITIES:
+        return False
+    least, most = UTILITIES[program][1]
+    return len(positionals) >= least and (most is None or len(positionals) <= most)
+
+
+def runInProcess(commands, feedback):
+    """Runs a command list returned by getConsoleCommands() with the GDAL
+    library instead of the command line tools, reporting the progress to the
+    feedback and stopping when it is canceled.
+
+    Returns False if the command must be run by the command line tools,
+    either because it uses features not available in process or because
+    GDAL rejected its options before starting. Raises a
+    QgsProcessingException if the execution failed.
+    """
+
+    if not canRunInProcess(commands):
+        return False
+    program, options, positionals, config = parseCommand(commands)
+    run = UTILITIES[program][0]
+
+    state = {'started': False, 'errors': []}
+
+    def progress(complete, message, data):
+        if complete > 0:
+            state['started'] = True
+        feedback.setProgress(100 * complete)
+        return 0 if feedback.isCanceled() else 1
+
+    def handler(errorClass, errorNumber, message):
+        if errorClass >= gdal.CE_Failure:
+            state['errors'].append((errorNumber, message))
+        feedback.pushConsoleInfo(message)
+
+    # the options are only set for this thread, other algorithms may be
+    # running GDAL at the same time
+    previousConfig = {key: gdal.GetThreadLocalConfigOption(key, None) for key in config}
+    for key, value in config.items():
+        gdal.SetThreadLocalConfigOption(key, value)
+    gdal.PushErrorHandler(handler)
+    try:
+        result = run(options, positionals, progress)
+    except (UnsupportedCommand, ValueError, RuntimeError) as e:
+        # RuntimeError is raised instead of returning None when the GDAL
+        # exceptions are enabled
+        if feedback.isCanceled():
+            return True
+        QgsMessageLog.logMessage(tr('{0} could not be run in process ({1}), running the command line tool').format(
+            program, e), 'Processing', QgsMessageLog.INFO)
+        return False
+    finally:
+        gdal.PopErrorHandler()
+        for key, value in previousConfig.items():
+            gdal.SetThreadLocalConfigOption(key, value)
+
+    # datasets are closed, and written, when released
+    ok = result is not None
+    result = None
+    if ok or feedback.isCanceled():
+        return True
+    if not state['started'] and all(number in UNSUPPORTED_ERRORS for number, _ in state['errors']):
+        QgsMessageLog.logMessage(tr('{0} could not be run in process, running the command line tool').format(program),
+                                 'Processing', QgsMessageLog.INFO)
+        return False
+    raise QgsProcessingException(tr('{0} failed: {1}').format(
+        program, '\n'.join(message for _, message in state['errors'])))
+
+
+def tr(string, context=''):
+    if context == '':
+        context = 'GdalInProcess'
+    return QCoreApplication.translate(context, string)
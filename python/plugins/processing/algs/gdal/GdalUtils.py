@@ -53,6 +53,7 @@ except:
 class GdalUtils(object):
 
     GDAL_HELP_PATH = 'GDAL_HELP_PATH'
+    GDAL_IN_PROCESS = 'GDAL_IN_PROCESS'
 
     supportedRasters = None
 
@@ -60,6 +61,9 @@ class GdalUtils(object):
     def runGdal(commands, feedback=None):
         if feedback is None:
             feedback = QgsProcessingFeedback()
+        if ProcessingConfig.getSetting(GdalUtils.GDAL_IN_PROCESS) and GdalUtils.runGdalInProcess(commands, feedback):
+            return
+
         envval = os.getenv('PATH')
         # We need to give some extra hints to get things picked up on OS X
         isDarwin = False
@@ -111,6 +115,25 @@ class GdalUtils(object):
             QgsMessageLog.logMessage('\n'.join(loglines), 'Processing', QgsMessageLog.INFO)
             GdalUtils.consoleOutput = loglines
 
+    @staticmethod
+    def runGdalInProcess(commands, feedback):
+        """Runs the commands with the GDAL library, without starting a
+        process. Returns False if they must be run by the command line tools.
+        """
+        from processing.algs.gdal import GdalInProcess
+
+        if not GdalInProcess.canRunInProcess(commands):
+            return False
+        fused_command = ' '.join([str(c) for c in commands])
+        QgsMessageLog.logMessage(fused_command, 'Processing', QgsMessageLog.INFO)
+        feedback.pushInfo('GDAL command (in process):')
+        feedback.pushCommandInfo(fused_command)
+        feedback.pushInfo('GDAL command output:')
+        if not GdalInProcess.runInProcess(commands, feedback):
+            return False
+        GdalUtils.consoleOutput = []
+        return True
+
     @staticmethod
     def getConsoleOutput():
         return GdalUtils.consoleOutput
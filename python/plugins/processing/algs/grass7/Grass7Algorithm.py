@@ -81,6 +81,10 @@ class Grass7Algorithm(GeoAlgorithm):
 
     OUTPUT_TYPES = ['auto', 'point', 'line', 'area']
 
+    # v.in.ogr options used when the algorithm doesn't set them
+    DEFAULT_MIN_AREA = 0.0001
+    DEFAULT_SNAP_TOLERANCE = -1.0
+
     def __init__(self, descriptionfile):
         GeoAlgorithm.__init__(self)
         self._name = ''
@@ -203,11 +207,11 @@ class Grass7Algorithm(GeoAlgorithm):
         if hasVectorInput:
             param = ParameterNumber(self.GRASS_SNAP_TOLERANCE_PARAMETER,
                                     'v.in.ogr snap tolerance (-1 = no snap)',
-                                    -1, None, -1.0)
+                                    -1, None, self.DEFAULT_SNAP_TOLERANCE)
             param.setFlags(param.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
             self.addParameter(param)
             param = ParameterNumber(self.GRASS_MIN_AREA_PARAMETER,
-                                    'v.in.ogr min area', 0, None, 0.0001)
+                                    'v.in.ogr min area', 0, None, self.DEFAULT_MIN_AREA)
             param.setFlags(param.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
             self.addParameter(param)
         if vectorOutputs == 1:
@@ -254,20 +258,80 @@ class Grass7Algorithm(GeoAlgorithm):
                     self.tr('GRASS GIS 7 folder is not configured. Please '
                             'configure it before running GRASS GIS 7 algorithms.'))
 
+        # GRASS algorithms share the session and the batch job file
+        with Grass7Utils.sessionLock:
+            self.runInSession(parameters, context, feedback)
+
+    def runInSession(self, parameters, context, feedback):
         # Create brand new commands lists
         self.commands = []
         self.outputCommands = []
         self.exportedLayers = {}
+        self.nativeOutputs = {}
+
+        # The session of a previous algorithm is kept alive if set so, its
+        # location can only be reused if it has the projection of the inputs
+        Grass7Utils.stopSessionTimer()
+        proj4 = self.inputsProj4(parameters, context)
+        if Grass7Utils.sessionPersistent and Grass7Utils.projectionSet and \
+                proj4 is not None and proj4 != Grass7Utils.sessionProj4:
+            Grass7Utils.endGrass7Session()
 
-        # If GRASS session has been created outside of this algorithm then
-        # get the list of layers loaded in GRASS otherwise start a new
-        # session
+        # If GRASS session has been created outside of this algorithm or by
+        # a previous one then get the layers already loaded in GRASS,
+        # otherwise start a new session
         existingSession = Grass7Utils.sessionRunning
         if existingSession:
-            self.exportedLayers = Grass7Utils.getSessionLayers()
+            fingerprints = self.inputFingerprints(parameters)
+            sessionLayers = Grass7Utils.getSessionLayers()
+            for value, fingerprint in fingerprints.items():
+                if fingerprint in sessionLayers:
+                    self.exportedLayers[value] = sessionLayers[fingerprint]
         else:
             Grass7Utils.startGrass7Session()
+            Grass7Utils.sessionPersistent = Grass7Utils.sessionTimeout() > 0
+
+        try:
+            self.executeInSession(parameters, context, feedback)
+        except Exception:
+            # The failed commands may have left anything in the mapset, as
+            # a MASK or a partial output, so the session can't be reused
+            Grass7Utils.endGrass7Session()
+            raise
+
+        for out in self.outputs:
+            if isinstance(out, OutputHTML):
+                with open(self.getOutputFromName("rawoutput").value) as f:
+                    rawOutput = "".join(f.readlines())
+                with open(out.value, "w") as f:
+                    f.write("<pre>%s</pre>" % rawOutput)
+
+        # If the session has been created outside of this algorithm or is
+        # kept alive, add the new GRASS GIS 7 layers to it, so following
+        # algorithms use them instead of importing their inputs again,
+        # otherwise finish the session
+        if existingSession or Grass7Utils.sessionPersistent:
+            sessionLayers = {}
+            for value, fingerprint in self.inputFingerprints(parameters).items():
+                if value in self.exportedLayers:
+                    sessionLayers[fingerprint] = self.exportedLayers[value]
+            # Following algorithms look up the outputs with the options they
+            # import them with, which are the default ones unless set
+            rasterOutputs = [out.value for out in self.outputs if isinstance(out, OutputRaster)]
+            for filename, name in self.nativeOutputs.items():
+                isRaster = filename in rasterOutputs
+                options = self.importOptions(isRaster, self.DEFAULT_MIN_AREA, self.DEFAULT_SNAP_TOLERANCE)
+                fingerprint = Grass7Utils.layerFingerprint(filename, options) if os.path.exists(filename) else None
+                if fingerprint is not None:
+                    sessionLayers[fingerprint] = name
+            Grass7Utils.addSessionLayers(sessionLayers)
+            if Grass7Utils.sessionPersistent:
+                Grass7Utils.keepGrass7Session()
+        else:
+            Grass7Utils.endGrass7Session()
 
+    def executeInSession(self, parameters, context, feedback):
+        """Prepares the GRASS commands and runs them in the session."""
         # Handle ext functions for inputs/command/outputs
         if self.module:
             if hasattr(self.module, 'processInputs'):
@@ -303,19 +367,64 @@ class Grass7Algorithm(GeoAlgorithm):
 
         Grass7Utils.executeGrass7(self.commands, feedback, self.outputCommands)
 
-        for out in self.outputs:
-            if isinstance(out, OutputHTML):
-                with open(self.getOutputFromName("rawoutput").value) as f:
-                    rawOutput = "".join(f.readlines())
-                with open(out.value, "w") as f:
-                    f.write("<pre>%s</pre>" % rawOutput)
+    def inputLayers(self, parameters):
+        """Returns the raster and vector inputs of the algorithm, as a list
+        of (value, isRaster) tuples.
+        """
+        layers = []
+        for param in self.parameterDefinitions():
+            value = parameters.get(param.name())
+            if not value:
+                continue
+            if isinstance(param, ParameterRaster):
+                layers.append((value, True))
+            elif isinstance(param, ParameterVector):
+                layers.append((value, False))
+            elif isinstance(param, ParameterMultipleInput):
+                if param.datatype == dataobjects.TYPE_RASTER:
+                    layers.extend((layer, True) for layer in value.split(';'))
+                elif param.datatype in [dataobjects.TYPE_VECTOR_ANY,
+                                        dataobjects.TYPE_VECTOR_LINE,
+                                        dataobjects.TYPE_VECTOR_POLYGON,
+                                        dataobjects.TYPE_VECTOR_POINT]:
+                    layers.extend((layer, False) for layer in value.split(';'))
+        return layers
 
-        # If the session has been created outside of this algorithm, add
-        # the new GRASS GIS 7 layers to it otherwise finish the session
-        if existingSession:
-            Grass7Utils.addSessionLayers(self.exportedLayers)
-        else:
-            Grass7Utils.endGrass7Session()
+    def inputFingerprints(self, parameters):
+        """Returns the fingerprints of the inputs which can be reused from
+        the session, by input value.
+        """
+        fingerprints = {}
+        for value, isRaster in self.inputLayers(parameters):
+            fingerprint = Grass7Utils.layerFingerprint(value, self.importOptions(isRaster))
+            if fingerprint is not None:
+                fingerprints[value] = fingerprint
+        return fingerprints
+
+    def importOptions(self, isRaster, minArea=None, snap=None):
+        """Returns the options a layer is imported in GRASS with, as used
+        in its fingerprint. The v.in.ogr options are the ones of the
+        algorithm if not given.
+        """
+        if isRaster:
+            return 'band=1'
+        if minArea is None:
+            minArea = self.getParameterValue(self.GRASS_MIN_AREA_PARAMETER)
+        if snap is None:
+            snap = self.getParameterValue(self.GRASS_SNAP_TOLERANCE_PARAMETER)
+        return 'min_area={} snap={}'.format(
+            float(self.DEFAULT_MIN_AREA if minArea is None else minArea),
+            float(self.DEFAULT_SNAP_TOLERANCE if snap is None else snap))
+
+    def inputsProj4(self, parameters, context):
+        """Returns the projection of the first input, which is used for the
+        location, or None.
+        """
+        for value, _ in self.inputLayers(parameters):
+            layer = QgsProcessingUtils.mapLayerFromString(value, context)
+            if layer:
+                return str(layer.crs().toProj4())
+        return None
 
     def processInputs(self, parameters, context):
         """Prepare the GRASS import commands"""
@@ -486,6 +595,7 @@ class Grass7Algorithm(GeoAlgorithm):
                     command += ' output="' + filename + '"'
                     self.commands.append(command)
                     self.outputCommands.append(command)
+                    self.nativeOutputs[filename] = out.name + self.uniqueSuffix
 
             if isinstance(out, OutputVector):
                 filename = out.value
@@ -511,6 +621,7 @@ class Grass7Algorithm(GeoAlgorithm):
                 command += ' --overwrite'
                 self.commands.append(command)
                 self.outputCommands.append(command)
+                self.nativeOutputs[filename] = out.name + self.uniqueSuffix
 
     def exportVectorLayer(self, orgFilename):
         context = dataobjects.createContext()
@@ -555,6 +666,7 @@ class Grass7Algorithm(GeoAlgorithm):
             command += ' proj4="' + proj4 + '"'
             self.commands.append(command)
             Grass7Utils.projectionSet = True
+            Grass7Utils.sessionProj4 = proj4
 
     def setSessionProjectionFromLayer(self, layer, commands):
         context = dataobjects.createContext()
@@ -567,6 +679,7 @@ class Grass7Algorithm(GeoAlgorithm):
                 command += ' proj4="' + proj4 + '"'
                 self.commands.append(command)
                 Grass7Utils.projectionSet = True
+                Grass7Utils.sessionProj4 = proj4
 
     def exportRasterLayer(self, layer):
         destFilename = 'a' + os.path.basename(self.getTempFilename())
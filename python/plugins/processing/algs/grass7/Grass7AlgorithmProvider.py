@@ -70,6 +70,10 @@ class Grass7AlgorithmProvider(QgsProcessingProvider):
             Grass7Utils.GRASS_HELP_PATH,
             self.tr('Location of GRASS docs'),
             Grass7Utils.grassHelpPath()))
+        ProcessingConfig.addSetting(Setting(
+            self.name(),
+            Grass7Utils.GRASS_SESSION_TIMEOUT,
+            self.tr('Keep the GRASS session between algorithms for (seconds, 0 to disable)'), 300))
         ProcessingConfig.readSettings()
         self.refreshAlgorithms()
         return True
@@ -81,6 +85,7 @@ class Grass7AlgorithmProvider(QgsProcessingProvider):
         ProcessingConfig.removeSetting(Grass7Utils.GRASS_LOG_COMMANDS)
         ProcessingConfig.removeSetting(Grass7Utils.GRASS_LOG_CONSOLE)
         ProcessingConfig.removeSetting(Grass7Utils.GRASS_HELP_PATH)
+        ProcessingConfig.removeSetting(Grass7Utils.GRASS_SESSION_TIMEOUT)
 
     def isActive(self):
         return ProcessingConfig.getSetting('ACTIVATE_GRASS7')
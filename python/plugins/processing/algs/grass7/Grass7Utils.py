@@ -31,13 +31,17 @@ import stat
 import shutil
 import subprocess
 import os
+import time
+import threading
 
 from qgis.core import (QgsApplication,
+                       QgsMapLayer,
                        QgsProcessingUtils,
                        QgsMessageLog)
 from qgis.PyQt.QtCore import QCoreApplication
 from processing.core.ProcessingConfig import ProcessingConfig
 from processing.tools.system import userFolder, isWindows, isMac, mkdir
+from processing.tools import dataobjects, exportcache
 from processing.tests.TestData import points
 
 
@@ -52,10 +56,18 @@ class Grass7Utils(object):
     GRASS_LOG_COMMANDS = 'GRASS7_LOG_COMMANDS'
     GRASS_LOG_CONSOLE = 'GRASS7_LOG_CONSOLE'
     GRASS_HELP_PATH = 'GRASS_HELP_PATH'
+    GRASS_SESSION_TIMEOUT = 'GRASS7_SESSION_TIMEOUT'
 
     sessionRunning = False
     sessionLayers = {}
     projectionSet = False
+    sessionProj4 = None
+    # True if the session was started by an algorithm and is kept alive
+    # between algorithms, until it has been idle for the session timeout
+    sessionPersistent = False
+    sessionLastUsed = 0
+    sessionTimer = None
+    sessionLock = threading.RLock()
 
     isGrass7Installed = False
 
@@ -353,11 +365,18 @@ class Grass7Utils(object):
     # the layers.
     @staticmethod
     def endGrass7Session():
-        shutil.rmtree(Grass7Utils.grassMapsetFolder(), True)
-        Grass7Utils.sessionRunning = False
-        Grass7Utils.sessionLayers = {}
-        Grass7Utils.projectionSet = False
-
+        with Grass7Utils.sessionLock:
+            Grass7Utils.stopSessionTimer()
+            shutil.rmtree(Grass7Utils.grassMapsetFolder(), True)
+            Grass7Utils.sessionRunning = False
+            Grass7Utils.sessionLayers = {}
+            Grass7Utils.projectionSet = False
+            Grass7Utils.sessionProj4 = None
+            Grass7Utils.sessionPersistent = False
+
+    # The layers of the session are indexed by a fingerprint of their data
+    # (see layerFingerprint), so a layer is only imported once even if it is
+    # referenced in different ways, and it is imported again if it changes
     @staticmethod
     def getSessionLayers():
         return Grass7Utils.sessionLayers
@@ -368,6 +387,65 @@ class Grass7Utils(object):
             list(Grass7Utils.sessionLayers.items()) +
             list(exportedLayers.items()))
 
+    @staticmethod
+    def sessionTimeout():
+        """Seconds a session is kept alive without algorithms using it, 0
+        if sessions are not kept between algorithms.
+        """
+        try:
+            return float(ProcessingConfig.getSetting(Grass7Utils.GRASS_SESSION_TIMEOUT) or 0)
+        except ValueError:
+            return 0
+
+    @staticmethod
+    def keepGrass7Session():
+        """Marks a persistent session as idle, it is ended if no algorithm
+        uses it before the session timeout.
+        """
+        with Grass7Utils.sessionLock:
+            Grass7Utils.stopSessionTimer()
+            Grass7Utils.sessionLastUsed = time.time()
+            timeout = Grass7Utils.sessionTimeout()
+            if timeout <= 0:
+                Grass7Utils.endGrass7Session()
+                return
+            Grass7Utils.sessionTimer = threading.Timer(timeout, Grass7Utils.expireGrass7Session)
+            Grass7Utils.sessionTimer.daemon = True
+            Grass7Utils.sessionTimer.start()
+
+    @staticmethod
+    def expireGrass7Session():
+        with Grass7Utils.sessionLock:
+            if Grass7Utils.sessionPersistent and Grass7Utils.sessionRunning and \
+                    time.time() - Grass7Utils.sessionLastUsed >= Grass7Utils.sessionTimeout():
+                Grass7Utils.endGrass7Session()
+
+    @staticmethod
+    def stopSessionTimer():
+        if Grass7Utils.sessionTimer is not None:
+            Grass7Utils.sessionTimer.cancel()
+            Grass7Utils.sessionTimer = None
+
+    @staticmethod
+    def layerFingerprint(value, options=''):
+        """Returns a string identifying the data of a layer, given as a file
+        name or as a layer of the project, as imported in GRASS with the
+        given import options. Returns None if the data can change without
+        notice, so it must be imported each time.
+        """
+        if os.path.isfile(value):
+            return 'file:{}:{}:{}:{}'.format(os.path.abspath(value), os.path.getmtime(value),
+                                             os.path.getsize(value), options)
+        layer = QgsProcessingUtils.mapLayerFromString(value, dataobjects.createContext(), False)
+        if layer is None:
+            return None
+        if layer.type() != QgsMapLayer.VectorLayer:
+            if os.path.isfile(layer.source()):
+                return Grass7Utils.layerFingerprint(layer.source(), options)
+            return None
+        key = exportcache.cacheKey(layer, 'grass:' + options)
+        return 'layer:' + key if key is not None else None
+
     @staticmethod
     def checkGrass7IsInstalled(ignorePreviousState=False):
         if isWindows():
@@ -31,8 +31,7 @@ import codecs
 from qgis.PyQt.QtCore import QVariant
 from qgis.PyQt.QtGui import QIcon
 
-from qgis.core import (QgsStatisticalSummary,
-                       QgsStringStatisticalSummary,
+from qgis.core import (QgsStringStatisticalSummary,
                        QgsDateTimeStatisticalSummary,
                        QgsFeatureRequest,
                        QgsProcessingParameterFeatureSource,
@@ -42,6 +41,8 @@ from qgis.core import (QgsStatisticalSummary,
                        QgsProcessingOutputNumber)
 
 from processing.algs.qgis.QgisAlgorithm import QgisAlgorithm
+from processing.core.ProcessingConfig import ProcessingConfig
+from processing.tools import aggregation
 
 pluginPath = os.path.split(os.path.split(os.path.dirname(__file__))[0])[0]
 
@@ -140,7 +141,7 @@ class BasicStatisticsForField(QgisAlgorithm):
         results = {}
 
         if field.isNumeric():
-            d, results = self.calcNumericStats(features, feedback, field, count)
+            d, results = self.calcNumericStats(source, feedback, field, count)
             data.extend(d)
         elif field.type() in (QVariant.Date, QVariant.Time, QVariant.DateTime):
             d, results = self.calcDateTimeStats(features, feedback, field, count)
@@ -155,15 +156,12 @@ class BasicStatisticsForField(QgisAlgorithm):
 
         return results
 
-    def calcNumericStats(self, features, feedback, field, count):
-        total = 100.0 / count if count else 0
-        stat = QgsStatisticalSummary()
-        for current, ft in enumerate(features):
-            if feedback.isCanceled():
-                break
-            stat.addVariant(ft[field.name()])
-            feedback.setProgress(int(current * total))
-        stat.finalize()
+    def calcNumericStats(self, source, feedback, field, count):
+        index = source.fields().lookupField(field.name())
+        threads = int(ProcessingConfig.getSetting(ProcessingConfig.MAX_THREADS) or 1)
+        stats = aggregation.aggregate(source, [index], keepValues=True, countValues=True,
+                                      threads=threads, feedback=feedback)
+        stat = stats.get(index, aggregation.NumericAggregate(True, True))
 
         cv = stat.stDev() / stat.mean() if stat.mean() != 0 else 0
 
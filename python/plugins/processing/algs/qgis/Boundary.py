@@ -46,6 +46,8 @@ class Boundary(QgisAlgorithm):
     INPUT_LAYER = 'INPUT_LAYER'
     OUTPUT_LAYER = 'OUTPUT_LAYER'
 
+    threadSafe = True
+
     def __init__(self):
         super().__init__()
 
@@ -16,7 +16,6 @@
 *                                                                         *
 ***************************************************************************
 """
-from builtins import range
 
 __author__ = 'Piotr Pociask'
 __date__ = 'May 2014'
@@ -26,9 +25,8 @@ __copyright__ = '(C) 2014, Piotr Pociask'
 
 __revision__ = '$Format:%H$'
 
-from math import sqrt
-
 from qgis.core import (QgsFeature,
+                       QgsGeometry,
                        QgsFeatureSink,
                        QgsWkbTypes,
                        QgsProcessing,
@@ -37,8 +35,11 @@ from qgis.core import (QgsFeature,
                        QgsProcessingParameterNumber,
                        QgsProcessingParameterBoolean,
                        QgsProcessingParameterFeatureSink)
-import processing
 from processing.algs.qgis.QgisAlgorithm import QgisAlgorithm
+from processing.algs.qgis.triangulation import (PointSet,
+                                                delaunayTriangles,
+                                                triangleGeometry,
+                                                longestEdge)
 
 
 class ConcaveHull(QgisAlgorithm):
@@ -82,64 +83,41 @@ class ConcaveHull(QgisAlgorithm):
 
         # Delaunay triangulation from input point layer
         feedback.setProgressText(self.tr('Creating Delaunay triangles...'))
-        delaunay_layer = processing.run("qgis:delaunaytriangulation", {'INPUT': parameters[ConcaveHull.INPUT], 'OUTPUT': 'memory:'}, feedback=feedback, context=context)['OUTPUT']
+        points = PointSet.fromSource(layer)
+        triangles = delaunayTriangles(points) if len(points) >= 3 else []
+        if not triangles:
+            raise QgsProcessingException(self.tr('No Delaunay triangles created.'))
 
         # Get max edge length from Delaunay triangles
         feedback.setProgressText(self.tr('Computing edges max length...'))
+        edges = [longestEdge(points, triangle) for triangle in triangles]
+        max_length = max(edges)
 
-        features = delaunay_layer.getFeatures()
-        count = delaunay_layer.featureCount()
-        if count == 0:
-            raise QgsProcessingException(self.tr('No Delaunay triangles created.'))
-
-        counter = 50. / count
-        lengths = []
-        edges = {}
-        for feat in features:
-            if feedback.isCanceled():
-                break
-
-            line = feat.geometry().asPolygon()[0]
-            for i in range(len(line) - 1):
-                lengths.append(sqrt(line[i].sqrDist(line[i + 1])))
-            edges[feat.id()] = max(lengths[-3:])
-            feedback.setProgress(feat.id() * counter)
-        max_length = max(lengths)
-
-        # Get features with longest edge longer than alpha*max_length
+        # Keep the triangles whose longest edge is not longer than
+        # alpha*max_length
         feedback.setProgressText(self.tr('Removing features...'))
-        counter = 50. / len(edges)
-        i = 0
-        ids = []
-        for id, max_len in list(edges.items()):
+        counter = 50. / len(triangles)
+        kept = []
+        for i, (triangle, max_len) in enumerate(zip(triangles, edges)):
             if feedback.isCanceled():
                 break
 
-            if max_len > alpha * max_length:
-                ids.append(id)
-            feedback.setProgress(50 + i * counter)
-            i += 1
-
-        # Remove features
-        delaunay_layer.dataProvider().deleteFeatures(ids)
+            if max_len <= alpha * max_length:
+                kept.append(triangleGeometry(points, triangle))
+            feedback.setProgress(i * counter)
 
         # Dissolve all Delaunay triangles
         feedback.setProgressText(self.tr('Dissolving Delaunay triangles...'))
-        dissolved_layer = processing.run("native:dissolve", {'INPUT': delaunay_layer, 'OUTPUT': 'memory:'}, feedback=feedback, context=context)['OUTPUT']
+        geom = QgsGeometry.unaryUnion(kept)
+        feedback.setProgress(100)
 
         # Save result
         feedback.setProgressText(self.tr('Saving data...'))
         feat = QgsFeature()
-        dissolved_layer.getFeatures().nextFeature(feat)
-
-        # Not needed anymore, free up some resources
-        del delaunay_layer
-        del dissolved_layer
 
         (sink, dest_id) = self.parameterAsSink(parameters, self.OUTPUT, context,
                                                layer.fields(), QgsWkbTypes.Polygon, layer.sourceCrs())
 
-        geom = feat.geometry()
         if no_multigeom and geom.isMultipart():
             # Only singlepart geometries are allowed
             geom_list = geom.asGeometryCollection()
@@ -158,7 +136,7 @@ class ConcaveHull(QgisAlgorithm):
             if not holes:
                 # Delete holes
                 geom = geom.removeInteriorRings()
-                feat.setGeometry(geom)
+            feat.setGeometry(geom)
             sink.addFeature(feat, QgsFeatureSink.FastInsert)
 
         return {self.OUTPUT: dest_id}
@@ -86,5 +86,5 @@ class CreateConstantRaster(QgisAlgorithm):
                          layer.crs(),
                          geoTransform
                          )
-        w.matrix.fill(value)
+        w.fill(value)
         w.close()
@@ -16,7 +16,6 @@
 *                                                                         *
 ***************************************************************************
 """
-from builtins import next
 
 __author__ = 'Victor Olaya'
 __date__ = 'August 2012'
@@ -32,11 +31,8 @@ from qgis.PyQt.QtGui import QIcon
 from qgis.PyQt.QtCore import QVariant
 
 from qgis.core import (QgsField,
-                       QgsFeatureRequest,
                        QgsFeatureSink,
                        QgsFeature,
-                       QgsGeometry,
-                       QgsPointXY,
                        QgsWkbTypes,
                        QgsProcessing,
                        QgsFields,
@@ -45,8 +41,7 @@ from qgis.core import (QgsField,
                        QgsProcessingParameterFeatureSink)
 
 from processing.algs.qgis.QgisAlgorithm import QgisAlgorithm
-
-from . import voronoi
+from processing.algs.qgis.triangulation import PointSet, delaunayTriangles, triangleGeometry
 
 pluginPath = os.path.split(os.path.split(os.path.dirname(__file__))[0])[0]
 
@@ -86,42 +81,16 @@ class Delaunay(QgisAlgorithm):
         (sink, dest_id) = self.parameterAsSink(parameters, self.OUTPUT, context,
                                                fields, QgsWkbTypes.Polygon, source.sourceCrs())
 
-        pts = []
-        ptDict = {}
-        ptNdx = -1
-        c = voronoi.Context()
-        features = source.getFeatures()
-        total = 100.0 / source.featureCount() if source.featureCount() else 0
-        for current, inFeat in enumerate(features):
-            if feedback.isCanceled():
-                break
-
-            geom = QgsGeometry(inFeat.geometry())
-            if geom.isNull():
-                continue
-            if geom.isMultipart():
-                points = geom.asMultiPoint()
-            else:
-                points = [geom.asPoint()]
-            for n, point in enumerate(points):
-                x = point.x()
-                y = point.y()
-                pts.append((x, y))
-                ptNdx += 1
-                ptDict[ptNdx] = (inFeat.id(), n)
-            feedback.setProgress(int(current * total))
+        points = PointSet.fromSource(source, feedback)
+        if feedback.isCanceled():
+            return {self.OUTPUT: dest_id}
 
-        if len(pts) < 3:
+        if len(points) < 3:
             raise QgsProcessingException(
                 self.tr('Input file should contain at least 3 points. Choose '
                         'another file and try again.'))
 
-        uniqueSet = set(item for item in pts)
-        ids = [pts.index(item) for item in uniqueSet]
-        sl = voronoi.SiteList([voronoi.Site(*i) for i in uniqueSet])
-        c.triangulate = True
-        voronoi.voronoi(sl, c)
-        triangles = c.triangles
+        triangles = delaunayTriangles(points)
         feat = QgsFeature()
 
         total = 100.0 / len(triangles) if triangles else 1
@@ -129,27 +98,9 @@ class Delaunay(QgisAlgorithm):
             if feedback.isCanceled():
                 break
 
-            indices = list(triangle)
-            indices.append(indices[0])
-            polygon = []
-            attrs = []
-            step = 0
-            for index in indices:
-                fid, n = ptDict[ids[index]]
-                request = QgsFeatureRequest().setFilterFid(fid)
-                inFeat = next(source.getFeatures(request))
-                geom = QgsGeometry(inFeat.geometry())
-                if geom.isMultipart():
-                    point = QgsPointXY(geom.asMultiPoint()[n])
-                else:
-                    point = QgsPointXY(geom.asPoint())
-                polygon.append(point)
-                if step <= 3:
-                    attrs.append(ids[index])
-                step += 1
-            feat.setAttributes(attrs)
-            geometry = QgsGeometry().fromPolygon([polygon])
-            feat.setGeometry(geometry)
+            # the points are identified by their position in the input
+            feat.setAttributes([points.positions[i] for i in triangle])
+            feat.setGeometry(triangleGeometry(points, triangle))
             sink.addFeature(feat, QgsFeatureSink.FastInsert)
             feedback.setProgress(int(current * total))
 
@@ -25,20 +25,30 @@ __copyright__ = '(C) 2010, Michael Minn'
 
 __revision__ = '$Format:%H$'
 
+import hashlib
+from collections import OrderedDict
+
 from qgis.core import (QgsFeatureRequest,
                        QgsApplication,
                        QgsFeatureSink,
                        QgsProcessingUtils)
 from processing.algs.qgis.QgisAlgorithm import QgisAlgorithm
 from processing.core.parameters import ParameterVector
+from processing.core.parameters import ParameterNumber
 from processing.core.outputs import OutputVector
+from processing.tools import vector
 
 
 class DeleteDuplicateGeometries(QgisAlgorithm):
 
     INPUT = 'INPUT'
+    PRECISION = 'PRECISION'
     OUTPUT = 'OUTPUT'
 
+    # number of already written geometries kept in memory to resolve
+    # candidates sharing a bounding box
+    GEOMETRY_CACHE_SIZE = 1000
+
     def group(self):
         return self.tr('Vector general tools')
 
@@ -48,6 +58,9 @@ class DeleteDuplicateGeometries(QgisAlgorithm):
     def initAlgorithm(self, config=None):
         self.addParameter(ParameterVector(self.INPUT,
                                           self.tr('Input layer')))
+        self.addParameter(ParameterNumber(self.PRECISION,
+                                          self.tr('Precision'),
+                                          0.0, None, 0.0, optional=True))
         self.addOutput(OutputVector(self.OUTPUT, self.tr('Cleaned')))
 
     def name(self):
@@ -58,32 +71,76 @@ class DeleteDuplicateGeometries(QgisAlgorithm):
 
     def processAlgorithm(self, parameters, context, feedback):
         layer = QgsProcessingUtils.mapLayerFromString(self.getParameterValue(self.INPUT), context)
+        precision = self.getParameterValue(self.PRECISION) or 0.0
 
         fields = layer.fields()
 
         writer = self.getOutputFromName(self.OUTPUT).getVectorWriter(fields, layer.wkbType(), layer.crs(), context)
 
-        features = QgsProcessingUtils.getFeatures(layer, context)
+        self.precision = precision
+        self.layer = layer
+        self.cache = OrderedDict()
 
+        # Equal geometries always have the same bounding box, so kept
+        # features are bucketed by it and only the WKB digest and id of each
+        # one are stored. Exact GEOS equality is only needed for candidates
+        # sharing a bounding box but with a different WKB (e.g. rings with a
+        # different starting vertex).
+        buckets = dict()
+
+        features = QgsProcessingUtils.getFeatures(layer, context)
         total = 100.0 / layer.featureCount() if layer.featureCount() else 0
-        geoms = dict()
         for current, f in enumerate(features):
-            geoms[f.id()] = f.geometry()
+            if feedback.isCanceled():
+                break
             feedback.setProgress(int(current * total))
 
-        cleaned = dict(geoms)
-
-        for i, g in list(geoms.items()):
-            for j in list(cleaned.keys()):
-                if i == j or i not in cleaned:
-                    continue
-                if g.isGeosEqual(cleaned[j]):
-                    del cleaned[j]
-
-        total = 100.0 / len(cleaned) if cleaned else 1
-        request = QgsFeatureRequest().setFilterFids(list(cleaned.keys()))
-        for current, f in enumerate(layer.getFeatures(request)):
+            geom = f.geometry()
+            if geom.isNull() or geom.isEmpty():
+                writer.addFeature(f, QgsFeatureSink.FastInsert)
+                continue
+            if precision:
+                geom = vector.snapToPrecision(geom, precision)
+
+            bbox = geom.boundingBox()
+            key = (bbox.xMinimum(), bbox.yMinimum(), bbox.xMaximum(), bbox.yMaximum())
+            digest = hashlib.md5(bytes(geom.exportToWkb())).digest()
+
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = [(digest, f.id())]
+            elif self.isDuplicate(geom, digest, bucket):
+                continue
+            else:
+                bucket.append((digest, f.id()))
+
+            self.cacheGeometry(f.id(), geom)
             writer.addFeature(f, QgsFeatureSink.FastInsert)
-            feedback.setProgress(int(current * total))
 
         del writer
+
+    def isDuplicate(self, geom, digest, bucket):
+        if any(d == digest for d, fid in bucket):
+            return True
+        for d, fid in bucket:
+            if geom.isGeosEqual(self.keptGeometry(fid)):
+                return True
+        return False
+
+    def cacheGeometry(self, fid, geom):
+        self.cache[fid] = geom
+        if len(self.cache) > self.GEOMETRY_CACHE_SIZE:
+            self.cache.popitem(last=False)
+
+    def keptGeometry(self, fid):
+        geom = self.cache.get(fid)
+        if geom is not None:
+            # least recently used geometries are dropped first
+            self.cache.move_to_end(fid)
+            return geom
+        request = QgsFeatureRequest().setFilterFid(fid).setSubsetOfAttributes([])
+        geom = next(self.layer.getFeatures(request)).geometry()
+        if self.precision:
+            geom = vector.snapToPrecision(geom, self.precision)
+        self.cacheGeometry(fid, geom)
+        return geom
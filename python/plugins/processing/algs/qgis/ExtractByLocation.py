@@ -25,16 +25,16 @@ __copyright__ = '(C) 2012, Victor Olaya'
 
 __revision__ = '$Format:%H$'
 
-from qgis.core import (QgsFeatureRequest,
-                       QgsFeatureSink,
+from qgis.core import (QgsFeatureSink,
                        QgsApplication,
                        QgsProcessingUtils)
 from processing.algs.qgis.QgisAlgorithm import QgisAlgorithm
+from processing.core.ProcessingConfig import ProcessingConfig
 from processing.core.parameters import ParameterVector
 from processing.core.parameters import ParameterSelection
 from processing.core.parameters import ParameterNumber
 from processing.core.outputs import OutputVector
-from processing.tools import vector
+from processing.tools import spatialjoin
 
 
 class ExtractByLocation(QgisAlgorithm):
@@ -92,45 +92,12 @@ class ExtractByLocation(QgisAlgorithm):
         predicates = self.getParameterValue(self.PREDICATE)
         precision = self.getParameterValue(self.PRECISION)
 
-        index = QgsProcessingUtils.createSpatialIndex(layer, context)
-
         output = self.getOutputFromName(self.OUTPUT)
         writer = output.getVectorWriter(layer.fields(), layer.wkbType(), layer.crs(), context)
 
-        if 'disjoint' in predicates:
-            disjoinSet = []
-            for feat in QgsProcessingUtils.getFeatures(layer, context):
-                disjoinSet.append(feat.id())
-
-        selectedSet = []
-        features = QgsProcessingUtils.getFeatures(selectLayer, context)
-        total = 100.0 / selectLayer.featureCount() if selectLayer.featureCount() else 0
-        for current, f in enumerate(features):
-            geom = vector.snapToPrecision(f.geometry(), precision)
-            bbox = geom.boundingBox()
-            bbox.grow(0.51 * precision)
-            intersects = index.intersects(bbox)
-            request = QgsFeatureRequest().setFilterFids(intersects).setSubsetOfAttributes([])
-            for feat in layer.getFeatures(request):
-                tmpGeom = vector.snapToPrecision(feat.geometry(), precision)
-                res = False
-                for predicate in predicates:
-                    if predicate == 'disjoint':
-                        if tmpGeom.intersects(geom):
-                            try:
-                                disjoinSet.remove(feat.id())
-                            except:
-                                pass  # already removed
-                    else:
-                        res = getattr(tmpGeom, predicate)(geom)
-                        if res:
-                            selectedSet.append(feat.id())
-                            break
-
-            feedback.setProgress(int(current * total))
-
-        if 'disjoint' in predicates:
-            selectedSet = selectedSet + disjoinSet
+        threads = int(ProcessingConfig.getSetting(ProcessingConfig.MAX_THREADS) or 1)
+        engine = spatialjoin.SpatialJoinEngine(layer, selectLayer, precision, threads=threads)
+        selectedSet = engine.sourceIds(predicates, feedback)
 
         features = QgsProcessingUtils.getFeatures(layer, context)
         total = 100.0 / layer.featureCount() if layer.featureCount() else 0
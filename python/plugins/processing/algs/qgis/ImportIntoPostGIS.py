@@ -25,14 +25,17 @@ __copyright__ = '(C) 2012, Victor Olaya'
 
 __revision__ = '$Format:%H$'
 
+import time
+
 from qgis.core import (QgsVectorLayerExporter,
                        QgsSettings,
-                       QgsFeatureSink,
                        QgsProcessingException,
+                       QgsProcessingParameterDefinition,
                        QgsProcessingParameterFeatureSource,
                        QgsProcessingParameterString,
                        QgsProcessingParameterField,
                        QgsProcessingParameterBoolean,
+                       QgsProcessingParameterNumber,
                        QgsWkbTypes)
 
 from processing.algs.qgis.QgisAlgorithm import QgisAlgorithm
@@ -53,6 +56,8 @@ class ImportIntoPostGIS(QgisAlgorithm):
     FORCE_SINGLEPART = 'FORCE_SINGLEPART'
     PRIMARY_KEY = 'PRIMARY_KEY'
     ENCODING = 'ENCODING'
+    UNLOGGED = 'UNLOGGED'
+    BATCH_SIZE = 'BATCH_SIZE'
 
     def group(self):
         return self.tr('Database')
@@ -107,6 +112,15 @@ class ImportIntoPostGIS(QgisAlgorithm):
                                                         self.tr('Drop length constraints on character fields'), False))
         self.addParameter(QgsProcessingParameterBoolean(self.FORCE_SINGLEPART,
                                                         self.tr('Create single-part geometries instead of multi-part'), False))
+        self.addParameter(QgsProcessingParameterBoolean(self.UNLOGGED,
+                                                        self.tr('Create as unlogged table (faster, content is not crash safe)'), False))
+
+        batch_param = QgsProcessingParameterNumber(self.BATCH_SIZE,
+                                                   self.tr('Number of rows per COPY batch'),
+                                                   QgsProcessingParameterNumber.Integer,
+                                                   postgis.COPY_BATCH_SIZE, False, 1)
+        batch_param.setFlags(batch_param.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+        self.addParameter(batch_param)
 
     def name(self):
         return 'importintopostgis'
@@ -126,6 +140,8 @@ class ImportIntoPostGIS(QgisAlgorithm):
         forceSinglePart = self.parameterAsBool(parameters, self.FORCE_SINGLEPART, context)
         primaryKeyField = self.parameterAsString(parameters, self.PRIMARY_KEY, context) or 'id'
         encoding = self.parameterAsString(parameters, self.ENCODING, context)
+        unlogged = self.parameterAsBool(parameters, self.UNLOGGED, context)
+        batchSize = self.parameterAsInt(parameters, self.BATCH_SIZE, context) or postgis.COPY_BATCH_SIZE
 
         source = self.parameterAsSource(parameters, self.INPUT, context)
 
@@ -163,33 +179,87 @@ class ImportIntoPostGIS(QgisAlgorithm):
         if encoding:
             options['fileEncoding'] = encoding
 
+        # the exporter is only used to create the table, features are then
+        # streamed with COPY which is much faster than individual inserts
         exporter = QgsVectorLayerExporter(uri.uri(), providerName, source.fields(),
                                           source.wkbType(), source.sourceCrs(), overwrite, options)
 
         if exporter.errorCode() != QgsVectorLayerExporter.NoError:
             raise QgsProcessingException(
                 self.tr('Error importing to PostGIS\n{0}').format(exporter.errorMessage()))
+        del exporter
+
+        if unlogged:
+            db.set_table_logged(table, False, schema)
+
+        # match the source fields with the columns of the created table
+        tableColumns = set(f.name for f in db.get_table_fields(table, schema))
+        fieldIndexes = []
+        columns = []
+        for i, field in enumerate(source.fields()):
+            name = field.name().lower() if convertLowerCase else field.name()
+            if name in tableColumns:
+                fieldIndexes.append(i)
+                columns.append(name)
+
+        srid = None
+        toMulti = False
+        toSingle = False
+        if geomColumn:
+            columns.append(geomColumn)
+            info = db.get_geometry_column_info(table, geomColumn, schema)
+            if info is not None:
+                srid, columnType = info
+                columnType = columnType.upper()
+                toMulti = columnType.startswith('MULTI')
+                toSingle = not toMulti and columnType not in ('GEOMETRY', 'GEOMETRYCOLLECTION')
+
+        def rows():
+            for f in source.getFeatures():
+                if feedback.isCanceled():
+                    break
+                attrs = f.attributes()
+                row = [attrs[i] for i in fieldIndexes]
+                if geomColumn:
+                    if f.hasGeometry():
+                        geom = f.geometry()
+                        isMulti = QgsWkbTypes.isMultiType(geom.wkbType())
+                        if toMulti and not isMulti:
+                            geom.convertToMultiType()
+                        elif toSingle and isMulti:
+                            geom.convertToSingleType()
+                        row.append(postgis.ewkb_hex(geom.exportToWkb(), srid))
+                    else:
+                        row.append(None)
+                yield row
 
-        features = source.getFeatures()
         total = 100.0 / source.featureCount() if source.featureCount() else 0
-        for current, f in enumerate(features):
-            if feedback.isCanceled():
-                break
 
-            if not exporter.addFeature(f, QgsFeatureSink.FastInsert):
-                feedback.reportError(exporter.errorMessage())
+        def loaded(count):
+            feedback.setProgress(int(count * total))
+            return not feedback.isCanceled()
 
-            feedback.setProgress(int(current * total))
+        def failed(row, error):
+            # rejected rows are reported and skipped, like the features
+            # the exporter could not add
+            feedback.reportError(self.tr('Row {0} could not be imported: {1}').format(row, error.message))
 
-        exporter.flushBuffer()
-        if exporter.errorCode() != QgsVectorLayerExporter.NoError:
+        start = time.time()
+        try:
+            count = db.copy_rows(table, columns, rows(), schema, batchSize, loaded, failed)
+        except postgis.DbError as e:
             raise QgsProcessingException(
-                self.tr('Error importing to PostGIS\n{0}').format(exporter.errorMessage()))
+                self.tr('Error importing to PostGIS\n{0}').format(e.message))
+        elapsed = time.time() - start
+        feedback.pushInfo(self.tr('{0} rows loaded ({1:.0f} rows/s)').format(
+            count, count / elapsed if elapsed > 0 else count))
 
+        # indexes and statistics are only built once all rows are loaded
         if geomColumn and createIndex:
             db.create_spatial_index(table, schema, geomColumn)
 
         db.vacuum_analyze(table, schema)
+        db.close()
 
         return {}
 
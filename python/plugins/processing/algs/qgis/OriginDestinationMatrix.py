@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    OriginDestinationMatrix.py
+    ---------------------
+    Date                 : October 2026
+    Copyright            : (C) 2026 by QGIS Development Team
+    Email                : qgis-developer at lists dot osgeo dot org
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'QGIS Development Team'
+__date__ = 'October 2026'
+__copyright__ = '(C) 2026, QGIS Development Team'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+import os
+from collections import OrderedDict
+
+from qgis.PyQt.QtGui import QIcon
+
+from qgis.core import (QgsUnitTypes,
+                       QgsFeatureRequest,
+                       QgsMessageLog,
+                       QgsProcessingParameterDefinition,
+                       QgsProcessingUtils)
+from qgis.analysis import QgsVectorLayerDirector
+from qgis.utils import iface
+
+from processing.algs.qgis.QgisAlgorithm import QgisAlgorithm
+from processing.algs.qgis.network import (networkGraph,
+                                          matrixTargets,
+                                          originCosts,
+                                          mapOnWorkers,
+                                          LENGTH,
+                                          TIME)
+from processing.core.GeoAlgorithmExecutionException import GeoAlgorithmExecutionException
+from processing.core.parameters import (ParameterVector,
+                                        ParameterNumber,
+                                        ParameterString,
+                                        ParameterTableField,
+                                        ParameterSelection
+                                        )
+from processing.core.outputs import OutputTable
+from processing.tools import dataobjects
+
+pluginPath = os.path.split(os.path.split(os.path.dirname(__file__))[0])[0]
+
+
+class OriginDestinationMatrix(QgisAlgorithm):
+
+    INPUT_VECTOR = 'INPUT_VECTOR'
+    ORIGINS = 'ORIGINS'
+    ORIGIN_FIELD = 'ORIGIN_FIELD'
+    DESTINATIONS = 'DESTINATIONS'
+    DESTINATION_FIELD = 'DESTINATION_FIELD'
+    STRATEGY = 'STRATEGY'
+    MAX_COST = 'MAX_COST'
+    NEAREST = 'NEAREST'
+    DIRECTION_FIELD = 'DIRECTION_FIELD'
+    VALUE_FORWARD = 'VALUE_FORWARD'
+    VALUE_BACKWARD = 'VALUE_BACKWARD'
+    VALUE_BOTH = 'VALUE_BOTH'
+    DEFAULT_DIRECTION = 'DEFAULT_DIRECTION'
+    SPEED_FIELD = 'SPEED_FIELD'
+    DEFAULT_SPEED = 'DEFAULT_SPEED'
+    TOLERANCE = 'TOLERANCE'
+    OUTPUT = 'OUTPUT'
+
+    def icon(self):
+        return QIcon(os.path.join(pluginPath, 'images', 'networkanalysis.svg'))
+
+    def group(self):
+        return self.tr('Network analysis')
+
+    def __init__(self):
+        super().__init__()
+
+    def initAlgorithm(self, config=None):
+        self.DIRECTIONS = OrderedDict([
+            (self.tr('Forward direction'), QgsVectorLayerDirector.DirectionForward),
+            (self.tr('Backward direction'), QgsVectorLayerDirector.DirectionForward),
+            (self.tr('Both directions'), QgsVectorLayerDirector.DirectionForward)])
+
+        self.STRATEGIES = [self.tr('Shortest'),
+                           self.tr('Fastest')
+                           ]
+
+        self.addParameter(ParameterVector(self.INPUT_VECTOR,
+                                          self.tr('Vector layer representing network'),
+                                          [dataobjects.TYPE_VECTOR_LINE]))
+        self.addParameter(ParameterVector(self.ORIGINS,
+                                          self.tr('Vector layer with origins'),
+                                          [dataobjects.TYPE_VECTOR_POINT]))
+        self.addParameter(ParameterTableField(self.ORIGIN_FIELD,
+                                              self.tr('Origin ID field'),
+                                              self.ORIGINS,
+                                              optional=True))
+        self.addParameter(ParameterVector(self.DESTINATIONS,
+                                          self.tr('Vector layer with destinations'),
+                                          [dataobjects.TYPE_VECTOR_POINT]))
+        self.addParameter(ParameterTableField(self.DESTINATION_FIELD,
+                                              self.tr('Destination ID field'),
+                                              self.DESTINATIONS,
+                                              optional=True))
+        self.addParameter(ParameterSelection(self.STRATEGY,
+                                             self.tr('Path type to calculate'),
+                                             self.STRATEGIES,
+                                             default=0))
+        self.addParameter(ParameterNumber(self.MAX_COST,
+                                          self.tr('Maximum cost (0 for no limit)'),
+                                          0.0, 99999999.999999, 0.0))
+        self.addParameter(ParameterNumber(self.NEAREST,
+                                          self.tr('Only the nearest (k) destinations (0 for all)'),
+                                          0, 99999999, 0))
+
+        params = []
+        params.append(ParameterTableField(self.DIRECTION_FIELD,
+                                          self.tr('Direction field'),
+                                          self.INPUT_VECTOR,
+                                          optional=True))
+        params.append(ParameterString(self.VALUE_FORWARD,
+                                      self.tr('Value for forward direction'),
+                                      '',
+                                      optional=True))
+        params.append(ParameterString(self.VALUE_BACKWARD,
+                                      self.tr('Value for backward direction'),
+                                      '',
+                                      optional=True))
+        params.append(ParameterString(self.VALUE_BOTH,
+                                      self.tr('Value for both directions'),
+                                      '',
+                                      optional=True))
+        params.append(ParameterSelection(self.DEFAULT_DIRECTION,
+                                         self.tr('Default direction'),
+                                         list(self.DIRECTIONS.keys()),
+                                         default=2))
+        params.append(ParameterTableField(self.SPEED_FIELD,
+                                          self.tr('Speed field'),
+                                          self.INPUT_VECTOR,
+                                          optional=True))
+        params.append(ParameterNumber(self.DEFAULT_SPEED,
+                                      self.tr('Default speed (km/h)'),
+                                      0.0, 99999999.999999, 5.0))
+        params.append(ParameterNumber(self.TOLERANCE,
+                                      self.tr('Topology tolerance'),
+                                      0.0, 99999999.999999, 0.0))
+
+        for p in params:
+            p.setFlags(p.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+            self.addParameter(p)
+
+        self.addOutput(OutputTable(self.OUTPUT,
+                                   self.tr('Origin-destination matrix')))
+
+    def name(self):
+        return 'origindestinationmatrix'
+
+    def displayName(self):
+        return self.tr('Origin-destination cost matrix')
+
+    def processAlgorithm(self, parameters, context, feedback):
+        layer = QgsProcessingUtils.mapLayerFromString(self.getParameterValue(self.INPUT_VECTOR), context)
+        origins = QgsProcessingUtils.mapLayerFromString(self.getParameterValue(self.ORIGINS), context)
+        originFieldName = self.getParameterValue(self.ORIGIN_FIELD)
+        destinations = QgsProcessingUtils.mapLayerFromString(self.getParameterValue(self.DESTINATIONS), context)
+        destinationFieldName = self.getParameterValue(self.DESTINATION_FIELD)
+        strategy = self.getParameterValue(self.STRATEGY)
+        maxCost = self.getParameterValue(self.MAX_COST)
+        nearest = int(self.getParameterValue(self.NEAREST) or 0)
+
+        directionFieldName = self.getParameterValue(self.DIRECTION_FIELD)
+        forwardValue = self.getParameterValue(self.VALUE_FORWARD)
+        backwardValue = self.getParameterValue(self.VALUE_BACKWARD)
+        bothValue = self.getParameterValue(self.VALUE_BOTH)
+        defaultDirection = self.getParameterValue(self.DEFAULT_DIRECTION)
+        speedFieldName = self.getParameterValue(self.SPEED_FIELD)
+        defaultSpeed = self.getParameterValue(self.DEFAULT_SPEED)
+        tolerance = self.getParameterValue(self.TOLERANCE)
+
+        directionField = -1
+        if directionFieldName is not None:
+            directionField = layer.fields().lookupField(directionFieldName)
+        speedField = -1
+        if speedFieldName is not None:
+            speedField = layer.fields().lookupField(speedFieldName)
+
+        distUnit = iface.mapCanvas().mapSettings().destinationCrs().mapUnits()
+        multiplier = QgsUnitTypes.fromUnitToUnitFactor(distUnit, QgsUnitTypes.DistanceMeters)
+        if strategy == 0:
+            criterion = LENGTH
+            defaultSpeed = None
+        else:
+            criterion = TIME
+        graph = networkGraph(layer,
+                             iface.mapCanvas().mapSettings().destinationCrs(),
+                             tolerance,
+                             directionField,
+                             forwardValue,
+                             backwardValue,
+                             bothValue,
+                             defaultDirection,
+                             speedField,
+                             defaultSpeed,
+                             multiplier * 1000.0 / 3600.0,
+                             feedback)
+
+        feedback.pushInfo(self.tr('Snapping origins and destinations to the network...'))
+        originIds, originLocations = self.snapPoints(graph, origins, originFieldName, context)
+        destinationIds, destinationLocations = self.snapPoints(graph, destinations, destinationFieldName, context)
+        if not originLocations or not destinationLocations:
+            raise GeoAlgorithmExecutionException(
+                self.tr('No origin or destination could be snapped to the network.'))
+        targets = matrixTargets(graph, destinationLocations, criterion)
+
+        writer = self.getOutputFromName(self.OUTPUT).getTableWriter(
+            ['origin_id', 'destination_id', 'cost', 'length'])
+
+        feedback.pushInfo(self.tr('Calculating costs...'))
+        # one search per origin, bounded by the maximum cost and stopped
+        # once the nearest destinations are known; rows are written as the
+        # searches end, the matrix is never held in memory. Like in the
+        # service area algorithms, costs are the travel costs of the graph
+        # and lengths are measured on the ellipsoid, in meters
+        cutoff = maxCost if maxCost else None
+        total = 100.0 / len(originLocations)
+        results = mapOnWorkers(graph, originCosts, originLocations, (targets, criterion, cutoff, nearest), feedback)
+        for i, (originId, costs) in enumerate(zip(originIds, results)):
+            writer.addRecords([[originId, destinationIds[destination], cost, length]
+                               for destination, cost, length in costs])
+            feedback.setProgress(int(i * total))
+
+        del writer
+
+    def snapPoints(self, graph, layer, fieldName, context):
+        """Returns the ids of the points of layer which could be snapped to
+        the graph and their GraphLocations.
+        """
+
+        request = QgsFeatureRequest()
+        fieldIndex = -1
+        if fieldName is not None:
+            fieldIndex = layer.fields().lookupField(fieldName)
+        request.setSubsetOfAttributes([fieldIndex] if fieldIndex >= 0 else [])
+        ids = []
+        locations = []
+        for f in QgsProcessingUtils.getFeatures(layer, context, request):
+            point = f.geometry().asPoint()
+            location = graph.snap(point)
+            if location is None:
+                msg = self.tr('Point ({}) could not be snapped to the network.'.format(point.toString()))
+                QgsMessageLog.logMessage(msg, self.tr('Processing'), QgsMessageLog.WARNING)
+                continue
+            ids.append(f.attributes()[fieldIndex] if fieldIndex >= 0 else f.id())
+            locations.append(location)
+        return ids, locations
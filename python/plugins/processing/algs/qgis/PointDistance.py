@@ -29,7 +29,8 @@ __copyright__ = '(C) 2012, Victor Olaya'
 __revision__ = '$Format:%H$'
 
 import os
-import math
+
+import numpy
 
 from qgis.PyQt.QtGui import QIcon
 from qgis.PyQt.QtCore import QVariant
@@ -40,7 +41,7 @@ from qgis.core import (QgsFeatureRequest,
                        QgsProject,
                        QgsFeature,
                        QgsGeometry,
-                       QgsDistanceArea,
+                       QgsPointXY,
                        QgsFeatureSink,
                        QgsProcessingParameterFeatureSource,
                        QgsProcessing,
@@ -48,10 +49,10 @@ from qgis.core import (QgsFeatureRequest,
                        QgsProcessingParameterField,
                        QgsProcessingParameterNumber,
                        QgsProcessingParameterFeatureSink,
-                       QgsSpatialIndex,
                        QgsWkbTypes)
 
 from processing.algs.qgis.QgisAlgorithm import QgisAlgorithm
+from processing.tools import distance
 
 pluginPath = os.path.split(os.path.split(os.path.dirname(__file__))[0])[0]
 
@@ -65,6 +66,11 @@ class PointDistance(QgisAlgorithm):
     NEAREST_POINTS = 'NEAREST_POINTS'
     OUTPUT = 'OUTPUT'
 
+    # number of input points whose neighbours are looked up together, and
+    # maximum number of neighbours looked up together
+    CHUNK_SIZE = 10000
+    MAX_CHUNK_NEIGHBOURS = 1000000
+
     def icon(self):
         return QIcon(os.path.join(pluginPath, 'images', 'ftools', 'matrix.png'))
 
@@ -154,102 +160,105 @@ class PointDistance(QgisAlgorithm):
         (sink, dest_id) = self.parameterAsSink(parameters, self.OUTPUT, context,
                                                fields, out_wkb, source.sourceCrs())
 
-        index = QgsSpatialIndex(target_source.getFeatures(QgsFeatureRequest().setSubsetOfAttributes([]).setDestinationCrs(source.sourceCrs())), feedback)
+        target_ids, target_xy = distance.readPoints(target_source, outIdx, source.sourceCrs(), feedback)
+        neighbors = distance.NearestNeighbors(target_xy)
+        calculator = distance.DistanceCalculator(source.sourceCrs(), QgsProject.instance().ellipsoid())
+        target_measure_xy = calculator.prepare(target_xy)
 
-        distArea = QgsDistanceArea()
-        distArea.setSourceCrs(source.sourceCrs())
-        distArea.setEllipsoid(QgsProject.instance().ellipsoid())
-
-        features = source.getFeatures(QgsFeatureRequest().setSubsetOfAttributes([inIdx]))
-        total = 100.0 / source.featureCount() if source.featureCount() else 0
-        for current, inFeat in enumerate(features):
-            if feedback.isCanceled():
-                break
-
-            inGeom = inFeat.geometry()
-            inID = str(inFeat.attributes()[inIdx])
-            featList = index.nearestNeighbor(inGeom.asPoint(), nPoints)
-            distList = []
-            vari = 0.0
-            request = QgsFeatureRequest().setFilterFids(featList).setSubsetOfAttributes([outIdx]).setDestinationCrs(source.sourceCrs())
-            for outFeat in target_source.getFeatures(request):
-                if feedback.isCanceled():
-                    break
-
-                outID = outFeat.attributes()[outIdx]
-                outGeom = outFeat.geometry()
-                dist = distArea.measureLine(inGeom.asPoint(),
-                                            outGeom.asPoint())
+        for features, in_xy, rows in self.nearestChunks(source, inIdx, neighbors, nPoints, feedback):
+            in_measure_xy = calculator.prepare(in_xy)
+            for inFeat, in_point, in_measure_point, featRows in zip(features, in_xy, in_measure_xy, rows):
+                inID = str(inFeat.attributes()[inIdx])
+                if len(featRows) == 0:
+                    continue
+                dists = calculator.distances(in_measure_point, target_measure_xy[featRows])
 
                 if matType == 0:
+                    for row, dist in zip(featRows.tolist(), dists.tolist()):
+                        out_feature = QgsFeature()
+                        out_feature.setGeometry(self.pairGeometry(in_point, target_xy[row]))
+                        out_feature.setAttributes([inID, target_ids[row], dist])
+                        sink.addFeature(out_feature, QgsFeatureSink.FastInsert)
+                else:
                     out_feature = QgsFeature()
-                    out_geom = QgsGeometry.unaryUnion([inFeat.geometry(), outFeat.geometry()])
-                    out_feature.setGeometry(out_geom)
-                    out_feature.setAttributes([inID, outID, dist])
+                    out_feature.setGeometry(inFeat.geometry())
+                    out_feature.setAttributes([inID, float(dists.mean()), float(dists.std()),
+                                               float(dists.min()), float(dists.max())])
                     sink.addFeature(out_feature, QgsFeatureSink.FastInsert)
-                else:
-                    distList.append(float(dist))
-
-            if matType != 0:
-                mean = sum(distList) / len(distList)
-                for i in distList:
-                    vari += (i - mean) * (i - mean)
-                vari = math.sqrt(vari / len(distList))
-
-                out_feature = QgsFeature()
-                out_feature.setGeometry(inFeat.geometry())
-                out_feature.setAttributes([inID, mean, vari, min(distList), max(distList)])
-                sink.addFeature(out_feature, QgsFeatureSink.FastInsert)
-
-            feedback.setProgress(int(current * total))
 
         return {self.OUTPUT: dest_id}
 
     def regularMatrix(self, parameters, context, source, inField, target_source, targetField,
                       nPoints, feedback):
-
-        index = QgsSpatialIndex(target_source.getFeatures(QgsFeatureRequest().setSubsetOfAttributes([]).setDestinationCrs(source.sourceCrs())), feedback)
         inIdx = source.fields().lookupField(inField)
 
-        distArea = QgsDistanceArea()
-        distArea.setSourceCrs(source.sourceCrs())
-        distArea.setEllipsoid(QgsProject.instance().ellipsoid())
+        target_ids, target_xy = distance.readPoints(target_source, None, source.sourceCrs(), feedback)
+        neighbors = distance.NearestNeighbors(target_xy)
+        calculator = distance.DistanceCalculator(source.sourceCrs(), QgsProject.instance().ellipsoid())
+        target_measure_xy = calculator.prepare(target_xy)
+
+        fields = QgsFields()
+        input_id_field = source.fields()[inIdx]
+        input_id_field.setName('ID')
+        fields.append(input_id_field)
+        for i in range(min(nPoints, len(target_ids))):
+            fields.append(QgsField('DIST_{0}'.format(i + 1), QVariant.Double))
+        (sink, dest_id) = self.parameterAsSink(parameters, self.OUTPUT, context,
+                                               fields, source.wkbType(), source.sourceCrs())
+
+        for features, in_xy, rows in self.nearestChunks(source, inIdx, neighbors, nPoints, feedback):
+            in_measure_xy = calculator.prepare(in_xy)
+            for inFeat, in_measure_point, featRows in zip(features, in_measure_xy, rows):
+                data = [str(inFeat.attributes()[inIdx])]
+                data.extend(calculator.distances(in_measure_point, target_measure_xy[featRows]).tolist())
+                out_feature = QgsFeature()
+                out_feature.setGeometry(inFeat.geometry())
+                out_feature.setAttributes(data)
+                sink.addFeature(out_feature, QgsFeatureSink.FastInsert)
 
-        first = True
-        sink = None
-        dest_id = None
+        return {self.OUTPUT: dest_id}
+
+    def nearestChunks(self, source, inIdx, neighbors, nPoints, feedback):
+        """Reads input features in chunks and looks up the nearest targets
+        for the whole chunk at once. Yields (features, input coordinates,
+        rows of nearest targets) tuples, rows being sorted so that columns
+        follow the order of the target layer.
+        """
         features = source.getFeatures(QgsFeatureRequest().setSubsetOfAttributes([inIdx]))
         total = 100.0 / source.featureCount() if source.featureCount() else 0
-        for current, inFeat in enumerate(features):
+        chunk = []
+        done = 0
+        # all the targets are neighbours of every point, their rows are
+        # already sorted and shared by the points
+        allTargets = nPoints >= len(neighbors.xy)
+        # otherwise the neighbour arrays of a chunk hold chunk size * nPoints rows
+        chunkSize = self.CHUNK_SIZE
+        if not allTargets:
+            chunkSize = max(1, min(chunkSize, self.MAX_CHUNK_NEIGHBOURS // nPoints))
+
+        def flush(chunk):
+            in_xy = numpy.array([(f.geometry().asPoint().x(), f.geometry().asPoint().y()) for f in chunk],
+                                dtype=numpy.float64).reshape((len(chunk), 2))
+            rows = neighbors.query(in_xy, nPoints)
+            if not allTargets:
+                rows = [numpy.sort(r) for r in rows]
+            return chunk, in_xy, rows
+
+        for inFeat in features:
             if feedback.isCanceled():
-                break
-
-            inGeom = inFeat.geometry()
-            inID = str(inFeat.attributes()[inIdx])
-            featList = index.nearestNeighbor(inGeom.asPoint(), nPoints)
-            if first:
-                first = False
-                fields = QgsFields()
-                input_id_field = source.fields()[inIdx]
-                input_id_field.setName('ID')
-                fields.append(input_id_field)
-                for i in range(len(featList)):
-                    fields.append(QgsField('DIST_{0}'.format(i + 1), QVariant.Double))
-                (sink, dest_id) = self.parameterAsSink(parameters, self.OUTPUT, context,
-                                                       fields, source.wkbType(), source.sourceCrs())
-
-            data = [inID]
-            for target in target_source.getFeatures(QgsFeatureRequest().setSubsetOfAttributes([]).setFilterFids(featList).setDestinationCrs(source.sourceCrs())):
-                if feedback.isCanceled():
-                    break
-                outGeom = target.geometry()
-                dist = distArea.measureLine(inGeom.asPoint(),
-                                            outGeom.asPoint())
-                data.append(float(dist))
-            out_feature = QgsFeature()
-            out_feature.setGeometry(inGeom)
-            out_feature.setAttributes(data)
-            sink.addFeature(out_feature, QgsFeatureSink.FastInsert)
-            feedback.setProgress(int(current * total))
-
-        return {self.OUTPUT: dest_id}
+                return
+            chunk.append(inFeat)
+            if len(chunk) == chunkSize:
+                yield flush(chunk)
+                done += len(chunk)
+                feedback.setProgress(int(done * total))
+                chunk = []
+        if chunk:
+            yield flush(chunk)
+
+    def pairGeometry(self, p1, p2):
+        p1 = QgsPointXY(p1[0], p1[1])
+        p2 = QgsPointXY(p2[0], p2[1])
+        if p1 == p2:
+            return QgsGeometry.fromPoint(p1)
+        return QgsGeometry.fromMultiPoint([p1, p2])
@@ -68,4 +68,6 @@ class PostGISExecuteSQL(QgisAlgorithm):
         except postgis.DbError as e:
             raise QgsProcessingException(
                 self.tr('Error executing SQL:\n{0}').format(str(e)))
+        finally:
+            db.close()
         return {}
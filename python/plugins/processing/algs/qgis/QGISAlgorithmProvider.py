@@ -26,6 +26,8 @@ __copyright__ = '(C) 2012, Victor Olaya'
 __revision__ = '$Format:%H$'
 
 import os
+import glob
+import importlib
 
 try:
     import plotly  # NOQA
@@ -33,72 +35,79 @@ try:
 except:
     hasPlotly = False
 
+from qgis.PyQt.QtCore import QCoreApplication
+
 from qgis.core import (QgsApplication,
+                       QgsMessageLog,
                        QgsProcessingProvider)
 
-from processing.script.ScriptUtils import ScriptUtils
+from processing.core.AlgorithmManifest import AlgorithmManifest
+from processing.script.ScriptAlgorithm import ScriptAlgorithm
 
 from .QgisAlgorithm import QgisAlgorithm
 
-from .AddTableField import AddTableField
-from .Aspect import Aspect
-from .AutoincrementalField import AutoincrementalField
-from .BasicStatistics import BasicStatisticsForField
-from .Boundary import Boundary
-from .BoundingBox import BoundingBox
-from .CheckValidity import CheckValidity
-from .ConcaveHull import ConcaveHull
-from .CreateAttributeIndex import CreateAttributeIndex
-from .Delaunay import Delaunay
-from .DeleteColumn import DeleteColumn
-from .DeleteHoles import DeleteHoles
-from .DensifyGeometries import DensifyGeometries
-from .DensifyGeometriesInterval import DensifyGeometriesInterval
-from .Difference import Difference
-from .DropGeometry import DropGeometry
-from .ExtentFromLayer import ExtentFromLayer
-from .ExtractNodes import ExtractNodes
-from .FixGeometry import FixGeometry
-from .GridPolygon import GridPolygon
-from .Heatmap import Heatmap
-from .Hillshade import Hillshade
-from .ImportIntoPostGIS import ImportIntoPostGIS
-from .ImportIntoSpatialite import ImportIntoSpatialite
-from .Intersection import Intersection
-from .LinesIntersection import LinesIntersection
-from .LinesToPolygons import LinesToPolygons
-from .MeanCoords import MeanCoords
-from .Merge import Merge
-from .NearestNeighbourAnalysis import NearestNeighbourAnalysis
-from .OffsetLine import OffsetLine
-from .Orthogonalize import Orthogonalize
-from .PointDistance import PointDistance
-from .PointOnSurface import PointOnSurface
-from .PointsInPolygon import PointsInPolygon
-from .PointsLayerFromTable import PointsLayerFromTable
-from .PoleOfInaccessibility import PoleOfInaccessibility
-from .PolygonsToLines import PolygonsToLines
-from .PostGISExecuteSQL import PostGISExecuteSQL
-from .RandomExtract import RandomExtract
-from .RandomExtractWithinSubsets import RandomExtractWithinSubsets
-from .RegularPoints import RegularPoints
-from .ReverseLineDirection import ReverseLineDirection
-from .Ruggedness import Ruggedness
-from .SaveSelectedFeatures import SaveSelectedFeatures
-from .SelectByAttribute import SelectByAttribute
-from .SelectByExpression import SelectByExpression
-from .SimplifyGeometries import SimplifyGeometries
-from .Slope import Slope
-from .Smooth import Smooth
-from .SnapGeometries import SnapGeometriesToLayer
-from .SpatialiteExecuteSQL import SpatialiteExecuteSQL
-from .SumLines import SumLines
-from .SymmetricalDifference import SymmetricalDifference
-from .Union import Union
-from .UniqueValues import UniqueValues
-from .VectorSplit import VectorSplit
-from .VoronoiPolygons import VoronoiPolygons
-from .ZonalStatistics import ZonalStatistics
+# Algorithms of the provider, as (module, class) pairs. The modules are only
+# imported when the algorithm manifest must be built, or when the
+# algorithms are run
+ALGORITHMS = [('AddTableField', 'AddTableField'),
+              ('Aspect', 'Aspect'),
+              ('AutoincrementalField', 'AutoincrementalField'),
+              ('BasicStatistics', 'BasicStatisticsForField'),
+              ('Boundary', 'Boundary'),
+              ('BoundingBox', 'BoundingBox'),
+              ('CheckValidity', 'CheckValidity'),
+              ('ConcaveHull', 'ConcaveHull'),
+              ('CreateAttributeIndex', 'CreateAttributeIndex'),
+              ('Delaunay', 'Delaunay'),
+              ('DeleteColumn', 'DeleteColumn'),
+              ('DeleteHoles', 'DeleteHoles'),
+              ('DensifyGeometries', 'DensifyGeometries'),
+              ('DensifyGeometriesInterval', 'DensifyGeometriesInterval'),
+              ('Difference', 'Difference'),
+              ('DropGeometry', 'DropGeometry'),
+              ('ExtentFromLayer', 'ExtentFromLayer'),
+              ('ExtractNodes', 'ExtractNodes'),
+              ('FixGeometry', 'FixGeometry'),
+              ('GridPolygon', 'GridPolygon'),
+              ('Heatmap', 'Heatmap'),
+              ('Hillshade', 'Hillshade'),
+              ('ImportIntoPostGIS', 'ImportIntoPostGIS'),
+              ('ImportIntoSpatialite', 'ImportIntoSpatialite'),
+              ('Intersection', 'Intersection'),
+              ('LinesIntersection', 'LinesIntersection'),
+              ('LinesToPolygons', 'LinesToPolygons'),
+              ('MeanCoords', 'MeanCoords'),
+              ('Merge', 'Merge'),
+              ('NearestNeighbourAnalysis', 'NearestNeighbourAnalysis'),
+              ('OffsetLine', 'OffsetLine'),
+              ('Orthogonalize', 'Orthogonalize'),
+              ('PointDistance', 'PointDistance'),
+              ('PointOnSurface', 'PointOnSurface'),
+              ('PointsInPolygon', 'PointsInPolygon'),
+              ('PointsLayerFromTable', 'PointsLayerFromTable'),
+              ('PoleOfInaccessibility', 'PoleOfInaccessibility'),
+              ('PolygonsToLines', 'PolygonsToLines'),
+              ('PostGISExecuteSQL', 'PostGISExecuteSQL'),
+              ('RandomExtract', 'RandomExtract'),
+              ('RandomExtractWithinSubsets', 'RandomExtractWithinSubsets'),
+              ('RegularPoints', 'RegularPoints'),
+              ('ReverseLineDirection', 'ReverseLineDirection'),
+              ('Ruggedness', 'Ruggedness'),
+              ('SaveSelectedFeatures', 'SaveSelectedFeatures'),
+              ('SelectByAttribute', 'SelectByAttribute'),
+              ('SelectByExpression', 'SelectByExpression'),
+              ('SimplifyGeometries', 'SimplifyGeometries'),
+              ('Slope', 'Slope'),
+              ('Smooth', 'Smooth'),
+              ('SnapGeometries', 'SnapGeometriesToLayer'),
+              ('SpatialiteExecuteSQL', 'SpatialiteExecuteSQL'),
+              ('SumLines', 'SumLines'),
+              ('SymmetricalDifference', 'SymmetricalDifference'),
+              ('Union', 'Union'),
+              ('UniqueValues', 'UniqueValues'),
+              ('VectorSplit', 'VectorSplit'),
+              ('VoronoiPolygons', 'VoronoiPolygons'),
+              ('ZonalStatistics', 'ZonalStatistics')]
 
 # from .ExtractByLocation import ExtractByLocation
 # from .ExportGeometryInfo import ExportGeometryInfo
@@ -163,6 +172,7 @@ from .ZonalStatistics import ZonalStatistics
 # from .ShortestPathLayerToPoint import ShortestPathLayerToPoint
 # from .ServiceAreaFromPoint import ServiceAreaFromPoint
 # from .ServiceAreaFromLayer import ServiceAreaFromLayer
+# from .OriginDestinationMatrix import OriginDestinationMatrix
 # from .TruncateTable import TruncateTable
 # from .Polygonize import Polygonize
 # from .ExecuteSQL import ExecuteSQL
@@ -223,82 +233,24 @@ class QGISAlgorithmProvider(QgsProcessingProvider):
         #         RasterCalculator(),
         #         ShortestPathPointToPoint(), ShortestPathPointToLayer(),
         #         ShortestPathLayerToPoint(), ServiceAreaFromPoint(),
-        #         ServiceAreaFromLayer(), TruncateTable(), Polygonize(),
+        #         ServiceAreaFromLayer(), OriginDestinationMatrix(),
+        #         TruncateTable(), Polygonize(),
         #          ExecuteSQL(), FindProjection(),
         #         TopoColor(), EliminateSelection()
         #         ]
-        algs = [AddTableField(),
-                Aspect(),
-                AutoincrementalField(),
-                BasicStatisticsForField(),
-                Boundary(),
-                BoundingBox(),
-                CheckValidity(),
-                ConcaveHull(),
-                CreateAttributeIndex(),
-                Delaunay(),
-                DeleteColumn(),
-                DeleteHoles(),
-                DensifyGeometries(),
-                DensifyGeometriesInterval(),
-                Difference(),
-                DropGeometry(),
-                ExtentFromLayer(),
-                ExtractNodes(),
-                FixGeometry(),
-                GridPolygon(),
-                Heatmap(),
-                Hillshade(),
-                ImportIntoPostGIS(),
-                ImportIntoSpatialite(),
-                Intersection(),
-                LinesIntersection(),
-                LinesToPolygons(),
-                MeanCoords(),
-                Merge(),
-                NearestNeighbourAnalysis(),
-                OffsetLine(),
-                Orthogonalize(),
-                PointDistance(),
-                PointOnSurface(),
-                PointsInPolygon(),
-                PointsLayerFromTable(),
-                PoleOfInaccessibility(),
-                PolygonsToLines(),
-                PostGISExecuteSQL(),
-                RandomExtract(),
-                RandomExtractWithinSubsets(),
-                RegularPoints(),
-                ReverseLineDirection(),
-                Ruggedness(),
-                SaveSelectedFeatures(),
-                SelectByAttribute(),
-                SelectByExpression(),
-                SimplifyGeometries(),
-                Slope(),
-                Smooth(),
-                SnapGeometriesToLayer(),
-                SpatialiteExecuteSQL(),
-                SumLines(),
-                SymmetricalDifference(),
-                Union(),
-                UniqueValues(),
-                VectorSplit(),
-                VoronoiPolygons(),
-                ZonalStatistics()
-                ]
+        sources = [('{}:{}'.format(module, className), os.path.join(os.path.dirname(__file__), module + '.py'))
+                   for module, className in ALGORITHMS]
 
         if hasPlotly:
             #     from .VectorLayerHistogram import VectorLayerHistogram
             #     from .RasterLayerHistogram import RasterLayerHistogram
             #     from .VectorLayerScatterplot import VectorLayerScatterplot
             #     from .MeanAndStdDevPlot import MeanAndStdDevPlot
-            from .BarPlot import BarPlot
-        #     from .PolarPlot import PolarPlot
-        #     from .BoxPlot import BoxPlot
-        #     from .VectorLayerScatterplot3D import VectorLayerScatterplot3D
-        #
-            algs.extend([BarPlot()])
+            #     from .PolarPlot import PolarPlot
+            #     from .BoxPlot import BoxPlot
+            #     from .VectorLayerScatterplot3D import VectorLayerScatterplot3D
+            #
+            sources.append(('BarPlot:BarPlot', os.path.join(os.path.dirname(__file__), 'BarPlot.py')))
             #[VectorLayerHistogram(), RasterLayerHistogram(),
         #                  VectorLayerScatterplot(), MeanAndStdDevPlot(),
         #                  BarPlot(), PolarPlot(), BoxPlot(),
@@ -306,12 +258,32 @@ class QGISAlgorithmProvider(QgsProcessingProvider):
 
         # to store algs added by 3rd party plugins as scripts
         folder = os.path.join(os.path.dirname(__file__), 'scripts')
-        scripts = ScriptUtils.loadFromFolder(folder)
-        for script in scripts:
-            script.allowEdit = False
-        algs.extend(scripts)
+        for path in sorted(glob.glob(os.path.join(folder, '*.py'))):
+            sources.append(('script:' + os.path.basename(path), path))
+
+        # the manifest is built again when the provider, the base class of
+        # its algorithms or their help change
+        dependencies = [os.path.abspath(__file__), os.path.join(os.path.dirname(__file__), 'QgisAlgorithm.py')]
+        dependencies.extend(sorted(glob.glob(os.path.join(pluginPath, 'algs', 'help', '*.yaml'))))
+        manifest = AlgorithmManifest(self.id(), sources, self.createAlgorithm, dependencies)
+        return manifest.algorithms()
 
-        return algs
+    def createAlgorithm(self, key):
+        """Returns a new instance of the algorithm with the given manifest
+        key, or None if it can not be loaded.
+        """
+
+        try:
+            if key.startswith('script:'):
+                script = ScriptAlgorithm(os.path.join(os.path.dirname(__file__), 'scripts', key[len('script:'):]))
+                script.allowEdit = False
+                return script if script.name().strip() != '' else None
+            module, className = key.split(':')
+            return getattr(importlib.import_module('.' + module, __package__), className)()
+        except Exception as e:
+            QgsMessageLog.logMessage(self.tr('Could not load algorithm {0}: {1}').format(key, str(e)),
+                                     self.tr('Processing'), QgsMessageLog.CRITICAL)
+            return None
 
     def id(self):
         return 'qgis'
@@ -334,3 +306,8 @@ class QGISAlgorithmProvider(QgsProcessingProvider):
 
     def supportsNonFileBasedOutput(self):
         return True
+
+    def tr(self, string, context=''):
+        if context == '':
+            context = 'QGISAlgorithmProvider'
+        return QCoreApplication.translate(context, string)
@@ -32,6 +32,10 @@ from processing.algs.help import shortHelp
 
 class QgisAlgorithm(QgsProcessingAlgorithm):
 
+    # set to True by the algorithms whose batch rows can run concurrently
+    # in worker threads (see processing.core.BatchExecutor.canRunInThreads)
+    threadSafe = False
+
     def __init__(self):
         super().__init__()
 
@@ -16,7 +16,6 @@
 *                                                                         *
 ***************************************************************************
 """
-from builtins import next
 
 __author__ = 'Alexander Bruy'
 __date__ = 'April 2014'
@@ -26,29 +25,27 @@ __copyright__ = '(C) 2014, Alexander Bruy'
 
 __revision__ = '$Format:%H$'
 
-import random
-
 from qgis.PyQt.QtCore import QVariant
 from qgis.core import (QgsApplication,
                        QgsFeatureSink,
                        QgsFields,
                        QgsField,
                        QgsGeometry,
-                       QgsSpatialIndex,
                        QgsWkbTypes,
-                       QgsDistanceArea,
                        QgsFeatureRequest,
                        QgsFeature,
                        QgsPointXY,
-                       QgsMessageLog,
+                       QgsDistanceArea,
                        QgsProject,
+                       QgsMessageLog,
                        QgsProcessingUtils)
 
 from processing.algs.qgis.QgisAlgorithm import QgisAlgorithm
 from processing.core.parameters import ParameterVector
 from processing.core.parameters import ParameterNumber
 from processing.core.outputs import OutputVector
-from processing.tools import dataobjects, vector
+from processing.tools import dataobjects
+from processing.tools.sampling import LineSampler, samplePoints
 
 
 class RandomPointsAlongLines(QgisAlgorithm):
@@ -81,74 +78,35 @@ class RandomPointsAlongLines(QgisAlgorithm):
 
     def processAlgorithm(self, parameters, context, feedback):
         layer = QgsProcessingUtils.mapLayerFromString(self.getParameterValue(self.VECTOR), context)
-        pointCount = float(self.getParameterValue(self.POINT_NUMBER))
+        pointCount = int(self.getParameterValue(self.POINT_NUMBER))
         minDistance = float(self.getParameterValue(self.MIN_DISTANCE))
 
         fields = QgsFields()
         fields.append(QgsField('id', QVariant.Int, '', 10, 0))
         writer = self.getOutputFromName(self.OUTPUT).getVectorWriter(fields, QgsWkbTypes.Point, layer.crs(), context)
 
-        nPoints = 0
-        nIterations = 0
-        maxIterations = pointCount * 200
-        featureCount = layer.featureCount()
-        total = 100.0 / pointCount if pointCount else 1
-
-        index = QgsSpatialIndex()
-        points = dict()
-
         da = QgsDistanceArea()
         da.setSourceCrs(layer.sourceCrs())
         da.setEllipsoid(QgsProject.instance().ellipsoid())
 
-        request = QgsFeatureRequest()
-
-        random.seed()
-
-        while nIterations < maxIterations and nPoints < pointCount:
-            # pick random feature
-            fid = random.randint(0, featureCount - 1)
-            f = next(layer.getFeatures(request.setFilterFid(fid).setSubsetOfAttributes([])))
-            fGeom = f.geometry()
-
-            if fGeom.isMultipart():
-                lines = fGeom.asMultiPolyline()
-                # pick random line
-                lineId = random.randint(0, len(lines) - 1)
-                vertices = lines[lineId]
-            else:
-                vertices = fGeom.asPolyline()
-
-            # pick random segment
-            if len(vertices) == 2:
-                vid = 0
-            else:
-                vid = random.randint(0, len(vertices) - 2)
-            startPoint = vertices[vid]
-            endPoint = vertices[vid + 1]
-            length = da.measureLine(startPoint, endPoint)
-            dist = length * random.random()
-
-            if dist > minDistance:
-                d = dist / (length - dist)
-                rx = (startPoint.x() + d * endPoint.x()) / (1 + d)
-                ry = (startPoint.y() + d * endPoint.y()) / (1 + d)
-
-                # generate random point
-                pnt = QgsPointXY(rx, ry)
-                geom = QgsGeometry.fromPoint(pnt)
-                if vector.checkMinDistance(pnt, index, minDistance, points):
-                    f = QgsFeature(nPoints)
-                    f.initAttributes(1)
-                    f.setFields(fields)
-                    f.setAttribute('id', nPoints)
-                    f.setGeometry(geom)
-                    writer.addFeature(f, QgsFeatureSink.FastInsert)
-                    index.insertFeature(f)
-                    points[nPoints] = pnt
-                    nPoints += 1
-                    feedback.setProgress(int(nPoints * total))
-            nIterations += 1
+        # points are drawn along the segments of all the lines, each one
+        # with a probability proportional to its ellipsoidal length
+        request = QgsFeatureRequest().setSubsetOfAttributes([])
+        sampler = LineSampler((f.geometry() for f in QgsProcessingUtils.getFeatures(layer, context, request)),
+                              distanceArea=da)
+
+        nPoints = 0
+        total = 100.0 / pointCount if pointCount else 1
+
+        for x, y in samplePoints(sampler, pointCount, minDistance):
+            f = QgsFeature(nPoints)
+            f.initAttributes(1)
+            f.setFields(fields)
+            f.setAttribute('id', nPoints)
+            f.setGeometry(QgsGeometry.fromPoint(QgsPointXY(x, y)))
+            writer.addFeature(f, QgsFeatureSink.FastInsert)
+            nPoints += 1
+            feedback.setProgress(int(nPoints * total))
 
         if nPoints < pointCount:
             QgsMessageLog.logMessage(self.tr('Can not generate requested number of random points. '
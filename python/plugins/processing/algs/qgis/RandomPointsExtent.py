@@ -27,12 +27,11 @@ __copyright__ = '(C) 2014, Alexander Bruy'
 __revision__ = '$Format:%H$'
 
 import os
-import random
 
 from qgis.PyQt.QtGui import QIcon
 from qgis.PyQt.QtCore import QVariant
 from qgis.core import (QgsGeometry, QgsFeatureSink, QgsRectangle, QgsFeature, QgsFields, QgsWkbTypes,
-                       QgsField, QgsSpatialIndex, QgsPointXY,
+                       QgsField, QgsPointXY,
                        QgsCoordinateReferenceSystem,
                        QgsMessageLog,
                        QgsProcessingUtils)
@@ -42,7 +41,8 @@ from processing.core.parameters import ParameterExtent
 from processing.core.parameters import ParameterNumber
 from processing.core.parameters import ParameterCrs
 from processing.core.outputs import OutputVector
-from processing.tools import vector, dataobjects
+from processing.tools import dataobjects
+from processing.tools.sampling import ExtentSampler, samplePoints
 
 pluginPath = os.path.split(os.path.split(os.path.dirname(__file__))[0])[0]
 
@@ -94,42 +94,24 @@ class RandomPointsExtent(QgisAlgorithm):
         xMax = float(extent[1])
         yMin = float(extent[2])
         yMax = float(extent[3])
-        extent = QgsGeometry().fromRect(
-            QgsRectangle(xMin, yMin, xMax, yMax))
-
         fields = QgsFields()
         fields.append(QgsField('id', QVariant.Int, '', 10, 0))
         writer = self.getOutputFromName(self.OUTPUT).getVectorWriter(fields, QgsWkbTypes.Point, crs, context)
 
+        sampler = ExtentSampler(QgsRectangle(xMin, yMin, xMax, yMax))
+
         nPoints = 0
-        nIterations = 0
-        maxIterations = pointCount * 200
         total = 100.0 / pointCount if pointCount else 1
 
-        index = QgsSpatialIndex()
-        points = dict()
-
-        random.seed()
-
-        while nIterations < maxIterations and nPoints < pointCount:
-            rx = xMin + (xMax - xMin) * random.random()
-            ry = yMin + (yMax - yMin) * random.random()
-
-            pnt = QgsPointXY(rx, ry)
-            geom = QgsGeometry.fromPoint(pnt)
-            if geom.within(extent) and \
-                    vector.checkMinDistance(pnt, index, minDistance, points):
-                f = QgsFeature(nPoints)
-                f.initAttributes(1)
-                f.setFields(fields)
-                f.setAttribute('id', nPoints)
-                f.setGeometry(geom)
-                writer.addFeature(f, QgsFeatureSink.FastInsert)
-                index.insertFeature(f)
-                points[nPoints] = pnt
-                nPoints += 1
-                feedback.setProgress(int(nPoints * total))
-            nIterations += 1
+        for x, y in samplePoints(sampler, pointCount, minDistance):
+            f = QgsFeature(nPoints)
+            f.initAttributes(1)
+            f.setFields(fields)
+            f.setAttribute('id', nPoints)
+            f.setGeometry(QgsGeometry.fromPoint(QgsPointXY(x, y)))
+            writer.addFeature(f, QgsFeatureSink.FastInsert)
+            nPoints += 1
+            feedback.setProgress(int(nPoints * total))
 
         if nPoints < pointCount:
             QgsMessageLog.logMessage(self.tr('Can not generate requested number of random points. '
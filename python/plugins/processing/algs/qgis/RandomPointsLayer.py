@@ -26,11 +26,10 @@ __copyright__ = '(C) 2014, Alexander Bruy'
 __revision__ = '$Format:%H$'
 
 import os
-import random
 
 from qgis.PyQt.QtGui import QIcon
 from qgis.PyQt.QtCore import QVariant
-from qgis.core import (QgsGeometry, QgsFeatureSink, QgsFields, QgsField, QgsSpatialIndex, QgsWkbTypes,
+from qgis.core import (QgsGeometry, QgsFeatureSink, QgsFields, QgsField, QgsWkbTypes,
                        QgsPointXY, QgsFeature, QgsFeatureRequest,
                        QgsMessageLog,
                        QgsProcessingUtils)
@@ -39,7 +38,8 @@ from processing.algs.qgis.QgisAlgorithm import QgisAlgorithm
 from processing.core.parameters import ParameterVector
 from processing.core.parameters import ParameterNumber
 from processing.core.outputs import OutputVector
-from processing.tools import dataobjects, vector
+from processing.tools import dataobjects
+from processing.tools.sampling import PolygonSampler, samplePoints
 
 pluginPath = os.path.split(os.path.split(os.path.dirname(__file__))[0])[0]
 
@@ -80,47 +80,26 @@ class RandomPointsLayer(QgisAlgorithm):
         pointCount = int(self.getParameterValue(self.POINT_NUMBER))
         minDistance = float(self.getParameterValue(self.MIN_DISTANCE))
 
-        bbox = layer.extent()
-        idxLayer = QgsProcessingUtils.createSpatialIndex(layer, context)
-
         fields = QgsFields()
         fields.append(QgsField('id', QVariant.Int, '', 10, 0))
         writer = self.getOutputFromName(self.OUTPUT).getVectorWriter(fields, QgsWkbTypes.Point, layer.crs(), context)
 
+        # points are drawn inside the polygons of the layer only
+        request = QgsFeatureRequest().setSubsetOfAttributes([])
+        sampler = PolygonSampler(f.geometry() for f in QgsProcessingUtils.getFeatures(layer, context, request))
+
         nPoints = 0
-        nIterations = 0
-        maxIterations = pointCount * 200
         total = 100.0 / pointCount if pointCount else 1
 
-        index = QgsSpatialIndex()
-        points = dict()
-
-        random.seed()
-
-        while nIterations < maxIterations and nPoints < pointCount:
-            rx = bbox.xMinimum() + bbox.width() * random.random()
-            ry = bbox.yMinimum() + bbox.height() * random.random()
-
-            pnt = QgsPointXY(rx, ry)
-            geom = QgsGeometry.fromPoint(pnt)
-            ids = idxLayer.intersects(geom.buffer(5, 5).boundingBox())
-            if len(ids) > 0 and \
-                    vector.checkMinDistance(pnt, index, minDistance, points):
-                request = QgsFeatureRequest().setFilterFids(ids).setSubsetOfAttributes([])
-                for f in layer.getFeatures(request):
-                    tmpGeom = f.geometry()
-                    if geom.within(tmpGeom):
-                        f = QgsFeature(nPoints)
-                        f.initAttributes(1)
-                        f.setFields(fields)
-                        f.setAttribute('id', nPoints)
-                        f.setGeometry(geom)
-                        writer.addFeature(f, QgsFeatureSink.FastInsert)
-                        index.insertFeature(f)
-                        points[nPoints] = pnt
-                        nPoints += 1
-                        feedback.setProgress(int(nPoints * total))
-            nIterations += 1
+        for x, y in samplePoints(sampler, pointCount, minDistance):
+            f = QgsFeature(nPoints)
+            f.initAttributes(1)
+            f.setFields(fields)
+            f.setAttribute('id', nPoints)
+            f.setGeometry(QgsGeometry.fromPoint(QgsPointXY(x, y)))
+            writer.addFeature(f, QgsFeatureSink.FastInsert)
+            nPoints += 1
+            feedback.setProgress(int(nPoints * total))
 
         if nPoints < pointCount:
             QgsMessageLog.logMessage(self.tr('Can not generate requested number of random points. '
@@ -26,12 +26,11 @@ __copyright__ = '(C) 2014, Alexander Bruy'
 __revision__ = '$Format:%H$'
 
 import os
-import random
 
 from qgis.PyQt.QtGui import QIcon
 from qgis.PyQt.QtCore import QVariant
 from qgis.core import (QgsFields, QgsFeatureSink, QgsField, QgsFeature, QgsPointXY, QgsWkbTypes,
-                       QgsGeometry, QgsSpatialIndex, QgsDistanceArea,
+                       QgsGeometry, QgsDistanceArea,
                        QgsMessageLog,
                        QgsProject,
                        QgsProcessingUtils)
@@ -42,7 +41,8 @@ from processing.core.parameters import ParameterTableField
 from processing.core.parameters import ParameterNumber
 from processing.core.parameters import ParameterSelection
 from processing.core.outputs import OutputVector
-from processing.tools import dataobjects, vector
+from processing.tools import dataobjects
+from processing.tools.sampling import randomGenerator, PolygonSampler, samplePoints
 
 pluginPath = os.path.split(os.path.split(os.path.dirname(__file__))[0])[0]
 
@@ -99,10 +99,11 @@ class RandomPointsPolygonsVariable(QgisAlgorithm):
         da.setSourceCrs(layer.sourceCrs())
         da.setEllipsoid(QgsProject.instance().ellipsoid())
 
+        generator = randomGenerator()
+
         features = QgsProcessingUtils.getFeatures(layer, context)
         for current, f in enumerate(features):
             fGeom = f.geometry()
-            bbox = fGeom.boundingBox()
             if strategy == 0:
                 pointCount = int(f[fieldName])
             else:
@@ -112,35 +113,20 @@ class RandomPointsPolygonsVariable(QgisAlgorithm):
                 feedback.pushInfo("Skip feature {} as number of points for it is 0.")
                 continue
 
-            index = QgsSpatialIndex()
-            points = dict()
+            sampler = PolygonSampler([fGeom], generator)
 
             nPoints = 0
-            nIterations = 0
-            maxIterations = pointCount * 200
             total = 100.0 / pointCount if pointCount else 1
 
-            random.seed()
-
-            while nIterations < maxIterations and nPoints < pointCount:
-                rx = bbox.xMinimum() + bbox.width() * random.random()
-                ry = bbox.yMinimum() + bbox.height() * random.random()
-
-                pnt = QgsPointXY(rx, ry)
-                geom = QgsGeometry.fromPoint(pnt)
-                if geom.within(fGeom) and \
-                   vector.checkMinDistance(pnt, index, minDistance, points):
-                    f = QgsFeature(nPoints)
-                    f.initAttributes(1)
-                    f.setFields(fields)
-                    f.setAttribute('id', nPoints)
-                    f.setGeometry(geom)
-                    writer.addFeature(f, QgsFeatureSink.FastInsert)
-                    index.insertFeature(f)
-                    points[nPoints] = pnt
-                    nPoints += 1
-                    feedback.setProgress(int(nPoints * total))
-                nIterations += 1
+            for x, y in samplePoints(sampler, pointCount, minDistance):
+                f = QgsFeature(nPoints)
+                f.initAttributes(1)
+                f.setFields(fields)
+                f.setAttribute('id', nPoints)
+                f.setGeometry(QgsGeometry.fromPoint(QgsPointXY(x, y)))
+                writer.addFeature(f, QgsFeatureSink.FastInsert)
+                nPoints += 1
+                feedback.setProgress(int(nPoints * total))
 
             if nPoints < pointCount:
                 QgsMessageLog.logMessage(self.tr('Can not generate requested number of random '
@@ -25,6 +25,7 @@ __copyright__ = '(C) 2013, Victor Olaya'
 
 __revision__ = '$Format:%H$'
 
+import numpy
 import plotly as plt
 import plotly.graph_objs as go
 
@@ -69,14 +70,39 @@ class RasterLayerHistogram(QgisAlgorithm):
 
         output = self.getOutputValue(self.PLOT)
 
-        # ALERT: this is potentially blocking if the layer is too big
-        values = raster.scanraster(layer, feedback)
-
-        valueslist = []
-        for v in values:
-            if v is not None:
-                valueslist.append(v)
-
-        data = [go.Histogram(x=valueslist,
-                             nbinsx=nbins)]
+        # first pass finds the value range, second one accumulates the
+        # counts so that values never need to be held in memory at once
+        minvalue = None
+        maxvalue = None
+        for xoff, yoff, blocks in raster.scanblocks(layer, None, [1]):
+            values = blocks[0].compressed()
+            if values.size == 0:
+                continue
+            if minvalue is None:
+                minvalue = values.min()
+                maxvalue = values.max()
+            else:
+                minvalue = min(minvalue, values.min())
+                maxvalue = max(maxvalue, values.max())
+
+        if minvalue is None:
+            counts = numpy.zeros(nbins, dtype=numpy.int64)
+            edges = numpy.linspace(0, 1, nbins + 1)
+        else:
+            minvalue = float(minvalue)
+            maxvalue = float(maxvalue)
+            if minvalue == maxvalue:
+                minvalue -= 0.5
+                maxvalue += 0.5
+            edges = numpy.linspace(minvalue, maxvalue, nbins + 1)
+            counts = numpy.zeros(nbins, dtype=numpy.int64)
+            for xoff, yoff, blocks in raster.scanblocks(layer, feedback, [1]):
+                values = blocks[0].compressed()
+                if values.size:
+                    counts += numpy.histogram(values, bins=edges)[0]
+
+        centers = (edges[:-1] + edges[1:]) / 2.0
+        data = [go.Bar(x=centers.tolist(),
+                       y=counts.tolist(),
+                       width=numpy.diff(edges).tolist())]
         plt.offline.plot(data, filename=output, auto_open=False)
@@ -29,6 +29,8 @@ __revision__ = '$Format:%H$'
 import math
 import codecs
 
+import numpy
+
 from qgis.core import (QgsApplication,
                        QgsProcessingUtils)
 from processing.algs.qgis.QgisAlgorithm import QgisAlgorithm
@@ -79,7 +81,6 @@ class RasterLayerStatistics(QgisAlgorithm):
         outputFile = self.getOutputValue(self.OUTPUT_HTML_FILE)
         uri = self.getParameterValue(self.INPUT)
         layer = QgsProcessingUtils.mapLayerFromString(uri, context)
-        values = raster.scanraster(layer, feedback)
 
         n = 0
         nodata = 0
@@ -89,25 +90,43 @@ class RasterLayerStatistics(QgisAlgorithm):
         minvalue = None
         maxvalue = None
 
-        for v in values:
-            if v is not None:
-                sum += v
-                n = n + 1
-                delta = v - mean
-                mean = mean + delta / n
-                M2 = M2 + delta * (v - mean)
-                if minvalue is None:
-                    minvalue = v
-                    maxvalue = v
-                else:
-                    minvalue = min(v, minvalue)
-                    maxvalue = max(v, maxvalue)
+        # per-block moments are merged with Chan's parallel update, which
+        # is as numerically stable as the per-value Welford algorithm
+        for xoff, yoff, blocks in raster.scanblocks(layer, feedback, [1]):
+            block = blocks[0]
+            values = block.compressed().astype(numpy.float64)
+            nodata += block.size - values.size
+            if values.size == 0:
+                continue
+
+            blockN = values.size
+            blockMean = values.mean()
+            blockM2 = ((values - blockMean) ** 2).sum()
+            delta = blockMean - mean
+            total = n + blockN
+            mean = mean + delta * blockN / total
+            M2 = M2 + blockM2 + delta * delta * n * blockN / total
+            n = total
+            sum += values.sum()
+
+            blockMin = values.min()
+            blockMax = values.max()
+            if minvalue is None:
+                minvalue = blockMin
+                maxvalue = blockMax
             else:
-                nodata += 1
+                minvalue = min(blockMin, minvalue)
+                maxvalue = max(blockMax, maxvalue)
 
-        variance = M2 / (n - 1)
+        variance = M2 / (n - 1) if n > 1 else 0
         stddev = math.sqrt(variance)
 
+        if minvalue is not None:
+            minvalue = float(minvalue)
+            maxvalue = float(maxvalue)
+        sum = float(sum)
+        mean = float(mean)
+
         data = []
         data.append('Valid cells: ' + str(n))
         data.append('No-data cells: ' + str(nodata))
@@ -29,14 +29,15 @@ import os
 
 from qgis.PyQt.QtGui import QIcon
 
-from qgis.core import QgsGeometry, QgsFeatureRequest, QgsProcessingUtils
+from qgis.core import QgsProcessingUtils
 
 from processing.algs.qgis.QgisAlgorithm import QgisAlgorithm
+from processing.core.ProcessingConfig import ProcessingConfig
 from processing.core.parameters import ParameterSelection
 from processing.core.parameters import ParameterVector
 from processing.core.parameters import ParameterNumber
 from processing.core.outputs import OutputVector
-from processing.tools import vector
+from processing.tools import spatialjoin
 
 pluginPath = os.path.split(os.path.split(os.path.dirname(__file__))[0])[0]
 
@@ -107,45 +108,9 @@ class SelectByLocation(QgisAlgorithm):
 
         oldSelection = set(inputLayer.selectedFeatureIds())
         inputLayer.removeSelection()
-        index = QgsProcessingUtils.createSpatialIndex(inputLayer, context)
-
-        if 'disjoint' in predicates:
-            disjoinSet = []
-            for feat in QgsProcessingUtils.getFeatures(inputLayer, context):
-                disjoinSet.append(feat.id())
-
-        geom = QgsGeometry()
-        selectedSet = []
-        features = QgsProcessingUtils.getFeatures(selectLayer, context)
-        total = 100.0 / selectLayer.featureCount() if selectLayer.featureCount() else 0
-        for current, f in enumerate(features):
-            geom = vector.snapToPrecision(f.geometry(), precision)
-            bbox = geom.boundingBox()
-            bbox.grow(0.51 * precision)
-            intersects = index.intersects(bbox)
-
-            request = QgsFeatureRequest().setFilterFids(intersects).setSubsetOfAttributes([])
-            for feat in inputLayer.getFeatures(request):
-                tmpGeom = vector.snapToPrecision(feat.geometry(), precision)
-
-                res = False
-                for predicate in predicates:
-                    if predicate == 'disjoint':
-                        if tmpGeom.intersects(geom):
-                            try:
-                                disjoinSet.remove(feat.id())
-                            except:
-                                pass  # already removed
-                    else:
-                        res = getattr(tmpGeom, predicate)(geom)
-                        if res:
-                            selectedSet.append(feat.id())
-                            break
-
-            feedback.setProgress(int(current * total))
-
-        if 'disjoint' in predicates:
-            selectedSet = selectedSet + disjoinSet
+        threads = int(ProcessingConfig.getSetting(ProcessingConfig.MAX_THREADS) or 1)
+        engine = spatialjoin.SpatialJoinEngine(inputLayer, selectLayer, precision, threads=threads)
+        selectedSet = engine.sourceIds(predicates, feedback)
 
         if method == 1:
             selectedSet = list(oldSelection.union(selectedSet))
@@ -36,21 +36,26 @@ from qgis.core import (QgsWkbTypes,
                        QgsFeature,
                        QgsFeatureSink,
                        QgsGeometry,
+                       QgsPointXY,
                        QgsField,
                        QgsFields,
                        QgsFeatureRequest,
                        QgsProcessingUtils,
                        QgsProcessingParameterDefinition)
-from qgis.analysis import (QgsVectorLayerDirector,
-                           QgsNetworkDistanceStrategy,
-                           QgsNetworkSpeedStrategy,
-                           QgsGraphBuilder,
-                           QgsGraphAnalyzer
-                           )
+from qgis.analysis import QgsVectorLayerDirector
 from qgis.utils import iface
 
 from processing.algs.qgis.QgisAlgorithm import QgisAlgorithm
+from processing.algs.qgis.network import (networkGraph,
+                                          serviceArea,
+                                          nearestServiceAreas,
+                                          mapOnWorkers,
+                                          isoArea,
+                                          LENGTH,
+                                          TIME)
+from processing.core.GeoAlgorithmExecutionException import GeoAlgorithmExecutionException
 from processing.core.parameters import (ParameterVector,
+                                        ParameterBoolean,
                                         ParameterNumber,
                                         ParameterString,
                                         ParameterTableField,
@@ -76,6 +81,7 @@ class ServiceAreaFromLayer(QgisAlgorithm):
     SPEED_FIELD = 'SPEED_FIELD'
     DEFAULT_SPEED = 'DEFAULT_SPEED'
     TOLERANCE = 'TOLERANCE'
+    NEAREST = 'NEAREST'
     OUTPUT_POINTS = 'OUTPUT_POINTS'
     OUTPUT_POLYGON = 'OUTPUT_POLYGON'
 
@@ -143,6 +149,9 @@ class ServiceAreaFromLayer(QgisAlgorithm):
         params.append(ParameterNumber(self.TOLERANCE,
                                       self.tr('Topology tolerance'),
                                       0.0, 99999999.999999, 0.0))
+        params.append(ParameterBoolean(self.NEAREST,
+                                       self.tr('Share the network between start points (each part goes to the closest one)'),
+                                       False))
 
         for p in params:
             p.setFlags(p.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
@@ -152,7 +161,7 @@ class ServiceAreaFromLayer(QgisAlgorithm):
                                     self.tr('Service area (boundary nodes)'),
                                     datatype=[dataobjects.TYPE_VECTOR_POINT]))
         self.addOutput(OutputVector(self.OUTPUT_POLYGON,
-                                    self.tr('Service area (convex hull)'),
+                                    self.tr('Service area (polygon)'),
                                     datatype=[dataobjects.TYPE_VECTOR_POLYGON]))
 
     def name(self):
@@ -177,6 +186,7 @@ class ServiceAreaFromLayer(QgisAlgorithm):
         speedFieldName = self.getParameterValue(self.SPEED_FIELD)
         defaultSpeed = self.getParameterValue(self.DEFAULT_SPEED)
         tolerance = self.getParameterValue(self.TOLERANCE)
+        nearest = self.getParameterValue(self.NEAREST)
 
         fields = QgsFields()
         fields.append(QgsField('type', QVariant.String, '', 254, 0))
@@ -189,7 +199,7 @@ class ServiceAreaFromLayer(QgisAlgorithm):
             self.OUTPUT_POINTS).getVectorWriter(fields, QgsWkbTypes.MultiPoint, layer.crs(), context)
 
         writerPolygons = self.getOutputFromName(
-            self.OUTPUT_POLYGON).getVectorWriter(fields, QgsWkbTypes.Polygon, layer.crs(), context)
+            self.OUTPUT_POLYGON).getVectorWriter(fields, QgsWkbTypes.MultiPolygon, layer.crs(), context)
 
         directionField = -1
         if directionFieldName is not None:
@@ -198,62 +208,54 @@ class ServiceAreaFromLayer(QgisAlgorithm):
         if speedFieldName is not None:
             speedField = layer.fields().lookupField(speedFieldName)
 
-        director = QgsVectorLayerDirector(layer,
-                                          directionField,
-                                          forwardValue,
-                                          backwardValue,
-                                          bothValue,
-                                          defaultDirection)
-
         distUnit = iface.mapCanvas().mapSettings().destinationCrs().mapUnits()
         multiplier = QgsUnitTypes.fromUnitToUnitFactor(distUnit, QgsUnitTypes.DistanceMeters)
         if strategy == 0:
-            strategy = QgsNetworkDistanceStrategy()
+            criterion = LENGTH
+            defaultSpeed = None
         else:
-            strategy = QgsNetworkSpeedStrategy(speedField,
-                                               defaultSpeed,
-                                               multiplier * 1000.0 / 3600.0)
-
-        director.addStrategy(strategy)
-        builder = QgsGraphBuilder(iface.mapCanvas().mapSettings().destinationCrs(),
-                                  True,
-                                  tolerance)
+            criterion = TIME
+        graph = networkGraph(layer,
+                             iface.mapCanvas().mapSettings().destinationCrs(),
+                             tolerance,
+                             directionField,
+                             forwardValue,
+                             backwardValue,
+                             bothValue,
+                             defaultDirection,
+                             speedField,
+                             defaultSpeed,
+                             multiplier * 1000.0 / 3600.0,
+                             feedback)
 
         feedback.pushInfo(self.tr('Loading start points...'))
         request = QgsFeatureRequest()
         request.setFlags(request.flags() ^ QgsFeatureRequest.SubsetOfAttributes)
         features = QgsProcessingUtils.getFeatures(startPoints, context, request)
         points = []
+        origins = []
         for f in features:
-            points.append(f.geometry().asPoint())
-
-        feedback.pushInfo(self.tr('Building graph...'))
-        snappedPoints = director.makeGraph(builder, points)
+            point = f.geometry().asPoint()
+            origin = graph.snap(point)
+            if origin is None:
+                raise GeoAlgorithmExecutionException(
+                    self.tr('The network layer has no lines.'))
+            points.append(point)
+            origins.append(origin)
 
         feedback.pushInfo(self.tr('Calculating service areas...'))
-        graph = builder.graph()
-
-        vertices = []
-        upperBoundary = []
-        lowerBoundary = []
-        total = 100.0 / len(snappedPoints) if snappedPoints else 1
-        for i, p in enumerate(snappedPoints):
-            idxStart = graph.findVertex(snappedPoints[i])
-            origPoint = points[i].toString()
-
-            tree, cost = QgsGraphAnalyzer.dijkstra(graph, idxStart, 0)
-            for j, v in enumerate(cost):
-                if v > travelCost and tree[j] != -1:
-                    vertexId = graph.edge(tree[j]).outVertex()
-                    if cost[vertexId] <= travelCost:
-                        vertices.append(j)
+        if nearest:
+            areas = nearestServiceAreas(graph, origins, criterion, travelCost)
+        else:
+            # searches are bounded by the travel cost, and run in parallel
+            areas = mapOnWorkers(graph, serviceArea, origins, (criterion, travelCost), feedback)
 
-            for j in vertices:
-                upperBoundary.append(graph.vertex(graph.edge(tree[j]).inVertex()).point())
-                lowerBoundary.append(graph.vertex(graph.edge(tree[j]).outVertex()).point())
+        total = 100.0 / len(points) if points else 1
+        for i, (upperBoundary, lowerBoundary, segments) in enumerate(areas):
+            origPoint = points[i].toString()
 
-            geomUpper = QgsGeometry.fromMultiPoint(upperBoundary)
-            geomLower = QgsGeometry.fromMultiPoint(lowerBoundary)
+            geomUpper = QgsGeometry.fromMultiPoint([QgsPointXY(*p) for p in upperBoundary])
+            geomLower = QgsGeometry.fromMultiPoint([QgsPointXY(*p) for p in lowerBoundary])
 
             feat.setGeometry(geomUpper)
             feat['type'] = 'upper'
@@ -265,27 +267,11 @@ class ServiceAreaFromLayer(QgisAlgorithm):
             feat['start'] = origPoint
             writerPoints.addFeature(feat, QgsFeatureSink.FastInsert)
 
-            upperBoundary.append(origPoint)
-            lowerBoundary.append(origPoint)
-            geomUpper = QgsGeometry.fromMultiPoint(upperBoundary)
-            geomLower = QgsGeometry.fromMultiPoint(lowerBoundary)
-
-            geom = geomUpper.convexHull()
-            feat.setGeometry(geom)
-            feat['type'] = 'upper'
+            feat.setGeometry(isoArea(segments))
+            feat['type'] = 'area'
             feat['start'] = origPoint
             writerPolygons.addFeature(feat, QgsFeatureSink.FastInsert)
 
-            geom = geomLower.convexHull()
-            feat.setGeometry(geom)
-            feat['type'] = 'lower'
-            feat['start'] = origPoint
-            writerPolygons.addFeature(feat, QgsFeatureSink.FastInsert)
-
-            vertices[:] = []
-            upperBoundary[:] = []
-            lowerBoundary[:] = []
-
             feedback.setProgress(int(i * total))
 
         del writerPoints
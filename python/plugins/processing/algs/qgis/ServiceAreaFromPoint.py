@@ -41,15 +41,12 @@ from qgis.core import (QgsWkbTypes,
                        QgsFields,
                        QgsProcessingParameterDefinition,
                        QgsProcessingUtils)
-from qgis.analysis import (QgsVectorLayerDirector,
-                           QgsNetworkDistanceStrategy,
-                           QgsNetworkSpeedStrategy,
-                           QgsGraphBuilder,
-                           QgsGraphAnalyzer
-                           )
+from qgis.analysis import QgsVectorLayerDirector
 from qgis.utils import iface
 
 from processing.algs.qgis.QgisAlgorithm import QgisAlgorithm
+from processing.algs.qgis.network import networkGraph, serviceArea, isoArea, LENGTH, TIME
+from processing.core.GeoAlgorithmExecutionException import GeoAlgorithmExecutionException
 from processing.core.parameters import (ParameterVector,
                                         ParameterPoint,
                                         ParameterNumber,
@@ -152,7 +149,7 @@ class ServiceAreaFromPoint(QgisAlgorithm):
                                     self.tr('Service area (boundary nodes)'),
                                     datatype=[dataobjects.TYPE_VECTOR_POINT]))
         self.addOutput(OutputVector(self.OUTPUT_POLYGON,
-                                    self.tr('Service area (convex hull)'),
+                                    self.tr('Service area (polygon)'),
                                     datatype=[dataobjects.TYPE_VECTOR_POLYGON]))
 
     def name(self):
@@ -188,46 +185,34 @@ class ServiceAreaFromPoint(QgisAlgorithm):
         if speedFieldName is not None:
             speedField = layer.fields().lookupField(speedFieldName)
 
-        director = QgsVectorLayerDirector(layer,
-                                          directionField,
-                                          forwardValue,
-                                          backwardValue,
-                                          bothValue,
-                                          defaultDirection)
-
         distUnit = iface.mapCanvas().mapSettings().destinationCrs().mapUnits()
         multiplier = QgsUnitTypes.fromUnitToUnitFactor(distUnit, QgsUnitTypes.DistanceMeters)
         if strategy == 0:
-            strategy = QgsNetworkDistanceStrategy()
+            criterion = LENGTH
+            defaultSpeed = None
         else:
-            strategy = QgsNetworkSpeedStrategy(speedField,
-                                               defaultSpeed,
-                                               multiplier * 1000.0 / 3600.0)
-
-        director.addStrategy(strategy)
-        builder = QgsGraphBuilder(iface.mapCanvas().mapSettings().destinationCrs(),
-                                  True,
-                                  tolerance)
-        feedback.pushInfo(self.tr('Building graph...'))
-        snappedPoints = director.makeGraph(builder, [startPoint])
+            criterion = TIME
+        graph = networkGraph(layer,
+                             iface.mapCanvas().mapSettings().destinationCrs(),
+                             tolerance,
+                             directionField,
+                             forwardValue,
+                             backwardValue,
+                             bothValue,
+                             defaultDirection,
+                             speedField,
+                             defaultSpeed,
+                             multiplier * 1000.0 / 3600.0,
+                             feedback)
 
         feedback.pushInfo(self.tr('Calculating service area...'))
-        graph = builder.graph()
-        idxStart = graph.findVertex(snappedPoints[0])
-
-        tree, cost = QgsGraphAnalyzer.dijkstra(graph, idxStart, 0)
-        vertices = []
-        for i, v in enumerate(cost):
-            if v > travelCost and tree[i] != -1:
-                vertexId = graph.edge(tree[i]).outVertex()
-                if cost[vertexId] <= travelCost:
-                    vertices.append(i)
-
-        upperBoundary = []
-        lowerBoundary = []
-        for i in vertices:
-            upperBoundary.append(graph.vertex(graph.edge(tree[i]).inVertex()).point())
-            lowerBoundary.append(graph.vertex(graph.edge(tree[i]).outVertex()).point())
+        origin = graph.snap(startPoint)
+        if origin is None:
+            raise GeoAlgorithmExecutionException(
+                self.tr('The network layer has no lines.'))
+        upperBoundary, lowerBoundary, segments = serviceArea(graph, origin, criterion, travelCost)
+        upperBoundary = [QgsPointXY(*p) for p in upperBoundary]
+        lowerBoundary = [QgsPointXY(*p) for p in lowerBoundary]
 
         feedback.pushInfo(self.tr('Writing results...'))
 
@@ -256,23 +241,11 @@ class ServiceAreaFromPoint(QgisAlgorithm):
 
         del writer
 
-        upperBoundary.append(startPoint)
-        lowerBoundary.append(startPoint)
-        geomUpper = QgsGeometry.fromMultiPoint(upperBoundary)
-        geomLower = QgsGeometry.fromMultiPoint(lowerBoundary)
-
         writer = self.getOutputFromName(
-            self.OUTPUT_POLYGON).getVectorWriter(fields, QgsWkbTypes.Polygon, layer.crs(), context)
+            self.OUTPUT_POLYGON).getVectorWriter(fields, QgsWkbTypes.MultiPolygon, layer.crs(), context)
 
-        geom = geomUpper.convexHull()
-        feat.setGeometry(geom)
-        feat['type'] = 'upper'
-        feat['start'] = startPoint.toString()
-        writer.addFeature(feat, QgsFeatureSink.FastInsert)
-
-        geom = geomLower.convexHull()
-        feat.setGeometry(geom)
-        feat['type'] = 'lower'
+        feat.setGeometry(isoArea(segments))
+        feat['type'] = 'area'
         feat['start'] = startPoint.toString()
         writer.addFeature(feat, QgsFeatureSink.FastInsert)
         del writer
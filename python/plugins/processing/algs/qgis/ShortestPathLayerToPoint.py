@@ -43,15 +43,12 @@ from qgis.core import (QgsWkbTypes,
                        QgsMessageLog,
                        QgsProcessingParameterDefinition,
                        QgsProcessingUtils)
-from qgis.analysis import (QgsVectorLayerDirector,
-                           QgsNetworkDistanceStrategy,
-                           QgsNetworkSpeedStrategy,
-                           QgsGraphBuilder,
-                           QgsGraphAnalyzer
-                           )
+from qgis.analysis import QgsVectorLayerDirector
 from qgis.utils import iface
 
 from processing.algs.qgis.QgisAlgorithm import QgisAlgorithm
+from processing.algs.qgis.network import networkGraph, LENGTH, TIME
+from processing.core.GeoAlgorithmExecutionException import GeoAlgorithmExecutionException
 from processing.core.parameters import (ParameterVector,
                                         ParameterPoint,
                                         ParameterNumber,
@@ -197,77 +194,60 @@ class ShortestPathLayerToPoint(QgisAlgorithm):
         if speedFieldName is not None:
             speedField = layer.fields().lookupField(speedFieldName)
 
-        director = QgsVectorLayerDirector(layer,
-                                          directionField,
-                                          forwardValue,
-                                          backwardValue,
-                                          bothValue,
-                                          defaultDirection)
-
         distUnit = iface.mapCanvas().mapSettings().destinationCrs().mapUnits()
         multiplier = QgsUnitTypes.fromUnitToUnitFactor(distUnit, QgsUnitTypes.DistanceMeters)
         if strategy == 0:
-            strategy = QgsNetworkDistanceStrategy()
+            criterion = LENGTH
+            defaultSpeed = None
         else:
-            strategy = QgsNetworkSpeedStrategy(speedField,
-                                               defaultSpeed,
-                                               multiplier * 1000.0 / 3600.0)
+            criterion = TIME
+        graph = networkGraph(layer,
+                             iface.mapCanvas().mapSettings().destinationCrs(),
+                             tolerance,
+                             directionField,
+                             forwardValue,
+                             backwardValue,
+                             bothValue,
+                             defaultDirection,
+                             speedField,
+                             defaultSpeed,
+                             multiplier * 1000.0 / 3600.0,
+                             feedback)
+        if strategy != 0:
             multiplier = 3600
 
-        director.addStrategy(strategy)
-        builder = QgsGraphBuilder(iface.mapCanvas().mapSettings().destinationCrs(),
-                                  True,
-                                  tolerance)
+        feedback.pushInfo(self.tr('Calculating shortest paths...'))
+        destination = graph.snap(endPoint)
+        if destination is None:
+            raise GeoAlgorithmExecutionException(
+                self.tr('There is no route from start point to end point.'))
+        # a single reverse search from the end point gives the routes from
+        # all the start points
+        costs, tree = graph.shortestPaths(destination.targets(graph, criterion), criterion, reverse=True)
 
-        feedback.pushInfo(self.tr('Loading start points...'))
         request = QgsFeatureRequest()
         request.setFlags(request.flags() ^ QgsFeatureRequest.SubsetOfAttributes)
         features = QgsProcessingUtils.getFeatures(startPoints, context, request)
         count = QgsProcessingUtils.featureCount(startPoints, context)
 
-        points = [endPoint]
-        for f in features:
-            points.append(f.geometry().asPoint())
-
-        feedback.pushInfo(self.tr('Building graph...'))
-        snappedPoints = director.makeGraph(builder, points)
-
-        feedback.pushInfo(self.tr('Calculating shortest paths...'))
-        graph = builder.graph()
-
-        idxEnd = graph.findVertex(snappedPoints[0])
-        route = []
-
         total = 100.0 / count if count else 1
-        for i in range(1, count + 1):
-            idxStart = graph.findVertex(snappedPoints[i])
-            tree, cost = QgsGraphAnalyzer.dijkstra(graph, idxStart, 0)
+        for i, f in enumerate(features):
+            startPoint = f.geometry().asPoint()
+            cost, route = graph.searchRoute(costs, tree, graph.snap(startPoint), destination, criterion, reverse=True)
 
-            if tree[idxEnd] == -1:
-                msg = self.tr('There is no route from start point ({}) to end point ({}).'.format(points[i].toString(), endPoint.toString()))
+            if route is None:
+                msg = self.tr('There is no route from start point ({}) to end point ({}).'.format(startPoint.toString(), endPoint.toString()))
                 feedback.setProgressText(msg)
                 QgsMessageLog.logMessage(msg, self.tr('Processing'), QgsMessageLog.WARNING)
                 continue
 
-            cost = 0.0
-            current = idxEnd
-            while current != idxStart:
-                cost += graph.edge(tree[current]).cost(0)
-                route.append(graph.vertex(graph.edge(tree[current]).inVertex()).point())
-                current = graph.edge(tree[current]).outVertex()
-
-            route.append(snappedPoints[i])
-            route.reverse()
-
             geom = QgsGeometry.fromPolyline(route)
             feat.setGeometry(geom)
-            feat['start'] = points[i].toString()
+            feat['start'] = startPoint.toString()
             feat['end'] = endPoint.toString()
             feat['cost'] = cost / multiplier
             writer.addFeature(feat, QgsFeatureSink.FastInsert)
 
-            route[:] = []
-
             feedback.setProgress(int(i * total))
 
         del writer
@@ -35,15 +35,12 @@ from qgis.core import (QgsWkbTypes, QgsUnitTypes, QgsFeatureSink, QgsFeature, Qg
                        QgsMessageLog,
                        QgsProcessingParameterDefinition,
                        QgsProcessingUtils)
-from qgis.analysis import (QgsVectorLayerDirector,
-                           QgsNetworkDistanceStrategy,
-                           QgsNetworkSpeedStrategy,
-                           QgsGraphBuilder,
-                           QgsGraphAnalyzer
-                           )
+from qgis.analysis import QgsVectorLayerDirector
 from qgis.utils import iface
 
 from processing.algs.qgis.QgisAlgorithm import QgisAlgorithm
+from processing.algs.qgis.network import networkGraph, LENGTH, TIME
+from processing.core.GeoAlgorithmExecutionException import GeoAlgorithmExecutionException
 from processing.core.parameters import (ParameterVector,
                                         ParameterPoint,
                                         ParameterNumber,
@@ -189,77 +186,60 @@ class ShortestPathPointToLayer(QgisAlgorithm):
         if speedFieldName is not None:
             speedField = layer.fields().lookupField(speedFieldName)
 
-        director = QgsVectorLayerDirector(layer,
-                                          directionField,
-                                          forwardValue,
-                                          backwardValue,
-                                          bothValue,
-                                          defaultDirection)
-
         distUnit = iface.mapCanvas().mapSettings().destinationCrs().mapUnits()
         multiplier = QgsUnitTypes.fromUnitToUnitFactor(distUnit, QgsUnitTypes.DistanceMeters)
         if strategy == 0:
-            strategy = QgsNetworkDistanceStrategy()
+            criterion = LENGTH
+            defaultSpeed = None
         else:
-            strategy = QgsNetworkSpeedStrategy(speedField,
-                                               defaultSpeed,
-                                               multiplier * 1000.0 / 3600.0)
+            criterion = TIME
+        graph = networkGraph(layer,
+                             iface.mapCanvas().mapSettings().destinationCrs(),
+                             tolerance,
+                             directionField,
+                             forwardValue,
+                             backwardValue,
+                             bothValue,
+                             defaultDirection,
+                             speedField,
+                             defaultSpeed,
+                             multiplier * 1000.0 / 3600.0,
+                             feedback)
+        if strategy != 0:
             multiplier = 3600
 
-        director.addStrategy(strategy)
-        builder = QgsGraphBuilder(iface.mapCanvas().mapSettings().destinationCrs(),
-                                  True,
-                                  tolerance)
+        feedback.pushInfo(self.tr('Calculating shortest paths...'))
+        origin = graph.snap(startPoint)
+        if origin is None:
+            raise GeoAlgorithmExecutionException(
+                self.tr('There is no route from start point to end point.'))
+        # a single search from the start point gives the routes to all the
+        # end points
+        costs, tree = graph.shortestPaths(origin.sources(graph, criterion), criterion)
 
-        feedback.pushInfo(self.tr('Loading end points...'))
         request = QgsFeatureRequest()
         request.setFlags(request.flags() ^ QgsFeatureRequest.SubsetOfAttributes)
         features = QgsProcessingUtils.getFeatures(endPoints, context, request)
         count = QgsProcessingUtils.featureCount(endPoints, context)
 
-        points = [startPoint]
-        for f in features:
-            points.append(f.geometry().asPoint())
-
-        feedback.pushInfo(self.tr('Building graph...'))
-        snappedPoints = director.makeGraph(builder, points)
-
-        feedback.pushInfo(self.tr('Calculating shortest paths...'))
-        graph = builder.graph()
-
-        idxStart = graph.findVertex(snappedPoints[0])
-        tree, cost = QgsGraphAnalyzer.dijkstra(graph, idxStart, 0)
-        route = []
-
         total = 100.0 / count if count else 1
-        for i in range(1, count + 1):
-            idxEnd = graph.findVertex(snappedPoints[i])
+        for i, f in enumerate(features):
+            endPoint = f.geometry().asPoint()
+            cost, route = graph.searchRoute(costs, tree, origin, graph.snap(endPoint), criterion)
 
-            if tree[idxEnd] == -1:
-                msg = self.tr('There is no route from start point ({}) to end point ({}).'.format(startPoint.toString(), points[i].toString()))
+            if route is None:
+                msg = self.tr('There is no route from start point ({}) to end point ({}).'.format(startPoint.toString(), endPoint.toString()))
                 feedback.setProgressText(msg)
                 QgsMessageLog.logMessage(msg, self.tr('Processing'), QgsMessageLog.WARNING)
                 continue
 
-            cost = 0.0
-            current = idxEnd
-            while current != idxStart:
-                cost += graph.edge(tree[current]).cost(0)
-                route.append(graph.vertex(graph.edge(tree[current]).inVertex()).point())
-                current = graph.edge(tree[current]).outVertex()
-
-            route.append(snappedPoints[0])
-            route.reverse()
-
             geom = QgsGeometry.fromPolyline(route)
             feat.setGeometry(geom)
             feat['start'] = startPoint.toString()
-            feat['end'] = points[i].toString()
+            feat['end'] = endPoint.toString()
             feat['cost'] = cost / multiplier
             writer.addFeature(feat, QgsFeatureSink.FastInsert)
 
-            route[:] = []
-
             feedback.setProgress(int(i * total))
 
         del writer
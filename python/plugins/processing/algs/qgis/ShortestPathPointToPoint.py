@@ -41,15 +41,11 @@ from qgis.core import (QgsWkbTypes,
                        QgsField,
                        QgsProcessingParameterDefinition,
                        QgsProcessingUtils)
-from qgis.analysis import (QgsVectorLayerDirector,
-                           QgsNetworkDistanceStrategy,
-                           QgsNetworkSpeedStrategy,
-                           QgsGraphBuilder,
-                           QgsGraphAnalyzer
-                           )
+from qgis.analysis import QgsVectorLayerDirector
 from qgis.utils import iface
 
 from processing.algs.qgis.QgisAlgorithm import QgisAlgorithm
+from processing.algs.qgis.network import networkGraph, LENGTH, TIME
 from processing.core.GeoAlgorithmExecutionException import GeoAlgorithmExecutionException
 from processing.core.parameters import (ParameterVector,
                                         ParameterPoint,
@@ -199,51 +195,38 @@ class ShortestPathPointToPoint(QgisAlgorithm):
         if speedFieldName is not None:
             speedField = layer.fields().lookupField(speedFieldName)
 
-        director = QgsVectorLayerDirector(layer,
-                                          directionField,
-                                          forwardValue,
-                                          backwardValue,
-                                          bothValue,
-                                          defaultDirection)
-
         distUnit = iface.mapCanvas().mapSettings().destinationCrs().mapUnits()
         multiplier = QgsUnitTypes.fromUnitToUnitFactor(distUnit, QgsUnitTypes.DistanceMeters)
         if strategy == 0:
-            strategy = QgsNetworkDistanceStrategy()
+            criterion = LENGTH
+            defaultSpeed = None
         else:
-            strategy = QgsNetworkSpeedStrategy(speedField,
-                                               defaultSpeed,
-                                               multiplier * 1000.0 / 3600.0)
+            criterion = TIME
+        graph = networkGraph(layer,
+                             iface.mapCanvas().mapSettings().destinationCrs(),
+                             tolerance,
+                             directionField,
+                             forwardValue,
+                             backwardValue,
+                             bothValue,
+                             defaultDirection,
+                             speedField,
+                             defaultSpeed,
+                             multiplier * 1000.0 / 3600.0,
+                             feedback)
+        if strategy != 0:
             multiplier = 3600
 
-        director.addStrategy(strategy)
-        builder = QgsGraphBuilder(iface.mapCanvas().mapSettings().destinationCrs(),
-                                  True,
-                                  tolerance)
-        feedback.pushInfo(self.tr('Building graph...'))
-        snappedPoints = director.makeGraph(builder, [startPoint, endPoint])
-
         feedback.pushInfo(self.tr('Calculating shortest path...'))
-        graph = builder.graph()
-        idxStart = graph.findVertex(snappedPoints[0])
-        idxEnd = graph.findVertex(snappedPoints[1])
-
-        tree, cost = QgsGraphAnalyzer.dijkstra(graph, idxStart, 0)
-        if tree[idxEnd] == -1:
+        origin = graph.snap(startPoint)
+        destination = graph.snap(endPoint)
+        route = None
+        if origin is not None and destination is not None:
+            cost, route = graph.route(origin, destination, criterion)
+        if route is None:
             raise GeoAlgorithmExecutionException(
                 self.tr('There is no route from start point to end point.'))
 
-        route = []
-        cost = 0.0
-        current = idxEnd
-        while current != idxStart:
-            cost += graph.edge(tree[current]).cost(0)
-            route.append(graph.vertex(graph.edge(tree[current]).inVertex()).point())
-            current = graph.edge(tree[current]).outVertex()
-
-        route.append(snappedPoints[0])
-        route.reverse()
-
         self.setOutputValue(self.TRAVEL_COST, cost / multiplier)
 
         feedback.pushInfo(self.tr('Writing results...'))
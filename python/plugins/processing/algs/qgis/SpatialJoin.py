@@ -33,15 +33,17 @@ import os
 from qgis.PyQt.QtGui import QIcon
 from qgis.PyQt.QtCore import QVariant
 
-from qgis.core import QgsFields, QgsField, QgsFeatureSink, QgsFeature, QgsGeometry, NULL, QgsWkbTypes, QgsProcessingUtils
+from qgis.core import QgsFields, QgsField, QgsFeatureSink, QgsFeature, QgsFeatureRequest, NULL, QgsProcessingUtils
 
 from processing.algs.qgis.QgisAlgorithm import QgisAlgorithm
+from processing.core.ProcessingConfig import ProcessingConfig
 from processing.core.parameters import ParameterVector
 from processing.core.parameters import ParameterNumber
 from processing.core.parameters import ParameterSelection
 from processing.core.parameters import ParameterString
 from processing.core.outputs import OutputVector
 from processing.tools import vector
+from processing.tools import spatialjoin
 
 pluginPath = os.path.split(os.path.split(os.path.dirname(__file__))[0])[0]
 
@@ -154,57 +156,45 @@ class SpatialJoin(QgisAlgorithm):
         writer = self.getOutputFromName(self.OUTPUT).getVectorWriter(fields, target.wkbType(), target.crs(), context)
 
         outFeat = QgsFeature()
-        inFeatB = QgsFeature()
-        inGeom = QgsGeometry()
 
-        index = QgsProcessingUtils.createSpatialIndex(join, context)
+        threads = int(ProcessingConfig.getSetting(ProcessingConfig.MAX_THREADS) or 1)
+        engine = spatialjoin.SpatialJoinEngine(target, join, precision, threads=threads)
+        matches = engine.matches(predicates, feedback)
 
-        mapP2 = dict()
-        features = QgsProcessingUtils.getFeatures(join, context)
-        for f in features:
-            mapP2[f.id()] = QgsFeature(f)
+        # only the attributes of join features actually matched are kept
+        joinIds = set()
+        for ids in matches.values():
+            if summary:
+                joinIds.update(ids)
+            else:
+                joinIds.add(ids[0])
+        joinAttributes = dict()
+        if joinIds:
+            request = QgsFeatureRequest().setFilterFids(list(joinIds)).setFlags(QgsFeatureRequest.NoGeometry)
+            for f in join.getFeatures(request):
+                joinAttributes[f.id()] = f.attributes()
 
         features = QgsProcessingUtils.getFeatures(target, context)
         total = 100.0 / target.featureCount() if target.featureCount() else 0
         for c, f in enumerate(features):
+            if feedback.isCanceled():
+                break
+
             atMap1 = f.attributes()
             outFeat.setGeometry(f.geometry())
-            inGeom = vector.snapToPrecision(f.geometry(), precision)
-            none = True
-            joinList = []
-            if inGeom.type() == QgsWkbTypes.PointGeometry:
-                bbox = inGeom.buffer(10, 2).boundingBox()
-            else:
-                bbox = inGeom.boundingBox()
-            bbox.grow(0.51 * precision)
-            joinList = index.intersects(bbox)
-            if len(joinList) > 0:
-                count = 0
-                for i in joinList:
-                    inFeatB = mapP2[i]
-                    inGeomB = vector.snapToPrecision(inFeatB.geometry(), precision)
-
-                    res = False
-                    for predicate in predicates:
-                        res = getattr(inGeom, predicate)(inGeomB)
-                        if res:
-                            break
-
-                    if res:
-                        count = count + 1
-                        none = False
-                        atMap2 = inFeatB.attributes()
-                        if not summary:
-                            atMap = atMap1
-                            atMap2 = atMap2
-                            atMap.extend(atMap2)
-                            atMap = dict(list(zip(seq, atMap)))
-                            break
-                        else:
-                            for j in list(numFields.keys()):
-                                numFields[j].append(atMap2[j])
-
-                if summary and not none:
+            joinList = matches.get(f.id(), [])
+            none = len(joinList) == 0
+            if not none:
+                if not summary:
+                    atMap = atMap1
+                    atMap.extend(joinAttributes[joinList[0]])
+                    atMap = dict(list(zip(seq, atMap)))
+                else:
+                    for i in joinList:
+                        atMap2 = joinAttributes[i]
+                        for j in list(numFields.keys()):
+                            numFields[j].append(atMap2[j])
+
                     atMap = atMap1
                     for j in list(numFields.keys()):
                         for k in sumList:
@@ -230,7 +220,7 @@ class SpatialJoin(QgisAlgorithm):
                                     atMap.append(NULL)
 
                         numFields[j] = []
-                    atMap.append(count)
+                    atMap.append(len(joinList))
                     atMap = dict(list(zip(seq, atMap)))
             if none:
                 outFeat.setAttributes(atMap1)
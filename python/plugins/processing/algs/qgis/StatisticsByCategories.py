@@ -16,7 +16,6 @@
 *                                                                         *
 ***************************************************************************
 """
-from builtins import str
 
 __author__ = 'Victor Olaya'
 __date__ = 'September 2012'
@@ -28,12 +27,13 @@ __revision__ = '$Format:%H$'
 
 from qgis.core import (QgsApplication,
                        QgsFeatureSink,
-                       QgsStatisticalSummary,
                        QgsProcessingUtils)
 from processing.core.outputs import OutputTable
+from processing.core.ProcessingConfig import ProcessingConfig
 from processing.algs.qgis.QgisAlgorithm import QgisAlgorithm
 from processing.core.parameters import ParameterVector
 from processing.core.parameters import ParameterTableField
+from processing.tools import aggregation
 
 
 class StatisticsByCategories(QgisAlgorithm):
@@ -76,28 +76,15 @@ class StatisticsByCategories(QgisAlgorithm):
         valuesField = layer.fields().lookupField(valuesFieldName)
         categoriesField = layer.fields().lookupField(categoriesFieldName)
 
-        features = QgsProcessingUtils.getFeatures(layer, context)
-        total = 100.0 / layer.featureCount() if layer.featureCount() else 0
-        values = {}
-        for current, feat in enumerate(features):
-            feedback.setProgress(int(current * total))
-            attrs = feat.attributes()
-            try:
-                value = float(attrs[valuesField])
-                cat = str(attrs[categoriesField])
-                if cat not in values:
-                    values[cat] = []
-                values[cat].append(value)
-            except:
-                pass
+        threads = int(ProcessingConfig.getSetting(ProcessingConfig.MAX_THREADS) or 1)
+        stats = aggregation.aggregate(layer, [valuesField], groupBy=categoriesField,
+                                      threads=threads, feedback=feedback)
 
         fields = ['category', 'min', 'max', 'mean', 'stddev', 'sum', 'count']
         writer = output.getTableWriter(fields)
-        stat = QgsStatisticalSummary(QgsStatisticalSummary.Min | QgsStatisticalSummary.Max |
-                                     QgsStatisticalSummary.Mean | QgsStatisticalSummary.StDevSample |
-                                     QgsStatisticalSummary.Sum | QgsStatisticalSummary.Count)
-
-        for (cat, v) in list(values.items()):
-            stat.calculate(v)
+        for (cat, v) in list(stats.items()):
+            stat = v[valuesField]
+            if stat.count() == 0:
+                continue
             record = [cat, stat.min(), stat.max(), stat.mean(), stat.sampleStDev(), stat.sum(), stat.count()]
             writer.addRecord(record)
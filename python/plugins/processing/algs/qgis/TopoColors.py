@@ -26,28 +26,26 @@ __copyright__ = '(C) 2017, Nyall Dawson'
 __revision__ = '$Format:%H$'
 
 import os
-import operator
 import sys
 
-from collections import defaultdict
+import numpy
 
-from qgis.core import (QgsApplication,
-                       QgsField,
+from qgis.core import (QgsField,
+                       QgsFeatureRequest,
                        QgsFeatureSink,
-                       QgsGeometry,
-                       QgsSpatialIndex,
-                       QgsPointXY,
                        NULL,
                        QgsProcessingUtils)
 
 from qgis.PyQt.QtCore import (QVariant)
 
 from processing.algs.qgis.QgisAlgorithm import QgisAlgorithm
+from processing.core.ProcessingConfig import ProcessingConfig
 from processing.core.parameters import (ParameterVector,
                                         ParameterSelection,
                                         ParameterNumber)
 from processing.core.outputs import OutputVector
 from processing.tools import dataobjects
+from processing.tools.adjacency import buildAdjacencyGraph
 
 pluginPath = os.path.split(os.path.split(os.path.dirname(__file__))[0])[0]
 
@@ -103,182 +101,137 @@ class TopoColor(QgisAlgorithm):
         writer = self.getOutputFromName(
             self.OUTPUT_LAYER).getVectorWriter(fields, layer.wkbType(), layer.crs(), context)
 
-        features = {f.id(): f for f in QgsProcessingUtils.getFeatures(layer, context)}
+        threads = int(ProcessingConfig.getSetting(ProcessingConfig.MAX_THREADS) or 1)
+        graph = buildAdjacencyGraph(layer, min_distance, threads=threads, feedback=feedback)
 
-        topology, id_graph = self.compute_graph(features, feedback, min_distance=min_distance)
-        feature_colors = ColoringAlgorithm.balanced(features,
+        areas = None
+        centroids = None
+        if balance_by in (1, 2):
+            areas, centroids = self.measure(layer, graph)
+
+        feature_colors = ColoringAlgorithm.balanced(graph,
                                                     balance=balance_by,
-                                                    graph=topology,
                                                     feedback=feedback,
-                                                    min_colors=min_colors)
+                                                    min_colors=min_colors,
+                                                    areas=areas,
+                                                    centroids=centroids)
 
-        max_colors = max(feature_colors.values())
+        max_colors = int(feature_colors.max()) if len(feature_colors) else 0
         feedback.pushInfo(self.tr('{} colors required').format(max_colors))
 
-        total = 20.0 / len(features)
-        current = 0
-        for feature_id, input_feature in features.items():
+        features = QgsProcessingUtils.getFeatures(layer, context)
+        total = 100.0 / layer.featureCount() if layer.featureCount() else 0
+        for current, input_feature in enumerate(features):
             output_feature = input_feature
             attributes = input_feature.attributes()
-            if feature_id in feature_colors:
-                attributes.append(feature_colors[feature_id])
+            node = graph.node(input_feature.id())
+            if node >= 0:
+                attributes.append(int(feature_colors[node]))
             else:
                 attributes.append(NULL)
             output_feature.setAttributes(attributes)
 
             writer.addFeature(output_feature, QgsFeatureSink.FastInsert)
-            current += 1
-            feedback.setProgress(80 + int(current * total))
+            feedback.setProgress(int(current * total))
 
         del writer
 
     @staticmethod
-    def compute_graph(features, feedback, create_id_graph=False, min_distance=0):
-        """ compute topology from a layer/field """
-        s = Graph(sort_graph=False)
-        id_graph = None
-        if create_id_graph:
-            id_graph = Graph(sort_graph=True)
-
-        # skip features without geometry
-        features_with_geometry = {f_id: f for (f_id, f) in features.items() if f.hasGeometry()}
-
-        total = 70.0 / len(features_with_geometry)
-        index = QgsSpatialIndex()
-
-        i = 0
-        for feature_id, f in features_with_geometry.items():
-            g = f.geometry()
-            if min_distance > 0:
-                g = g.buffer(min_distance, 5)
-
-            engine = QgsGeometry.createGeometryEngine(g.geometry())
-            engine.prepareGeometry()
-
-            feature_bounds = g.boundingBox()
-            # grow bounds a little so we get touching features
-            feature_bounds.grow(feature_bounds.width() * 0.01)
-            intersections = index.intersects(feature_bounds)
-            for l2 in intersections:
-                f2 = features_with_geometry[l2]
-                if engine.intersects(f2.geometry().geometry()):
-                    s.add_edge(f.id(), f2.id())
-                    s.add_edge(f2.id(), f.id())
-                    if id_graph:
-                        id_graph.add_edge(f.id(), f2.id())
-
-            index.insertFeature(f)
-            i += 1
-            feedback.setProgress(int(i * total))
+    def measure(layer, graph):
+        """ area and centroid coordinates of each node of the graph """
+        areas = numpy.zeros(graph.nodeCount())
+        centroids = numpy.zeros((graph.nodeCount(), 2))
+        for f in layer.getFeatures(QgsFeatureRequest().setSubsetOfAttributes([])):
+            node = graph.node(f.id())
+            if node < 0:
+                continue
+            areas[node] = f.geometry().area()
+            centroid = f.geometry().centroid().asPoint()
+            centroids[node] = (centroid.x(), centroid.y())
+        return areas, centroids
 
-        for feature_id, f in features_with_geometry.items():
-            if feature_id not in s.node_edge:
-                s.add_edge(feature_id, None)
 
-        return s, id_graph
+class ColoringAlgorithm:
 
+    @staticmethod
+    def balanced(graph, feedback, balance=0, min_colors=4, areas=None, centroids=None):
+        """ returns an array with the color assigned to each node of the graph """
+        # handle the features with more neighbours first
+        order = ColoringAlgorithm.sorted_by_count(graph)
+
+        while True:
+            feature_colors = ColoringAlgorithm.assign(graph, order, feedback, balance, min_colors, areas, centroids)
+            if feature_colors is not None:
+                return feature_colors
+            # no existing colors available for a feature, so add new color to pool and repeat
+            min_colors += 1
 
-class ColoringAlgorithm:
+    @staticmethod
+    def sorted_by_count(graph):
+        """ returns the nodes sorted by decreasing count of neighbours.
+
+        Isolated features count as having one neighbour, and ties keep the
+        order in which the nodes are first found when the adjacencies are
+        listed feature by feature, with the previous features they touch,
+        followed by the isolated features. """
+        seen = numpy.zeros(graph.nodeCount(), dtype=bool)
+        found = []
+        for node in range(graph.nodeCount()):
+            for neighbour in graph.nodeNeighbours(node).tolist():
+                if neighbour > node:
+                    break
+                for n in (node, neighbour):
+                    if not seen[n]:
+                        seen[n] = True
+                        found.append(n)
+        found.extend(numpy.flatnonzero(~seen).tolist())
+
+        neighbour_count = numpy.maximum(graph.degrees(), 1)
+        return sorted(found, key=lambda n: -neighbour_count[n])
 
     @staticmethod
-    def balanced(features, graph, feedback, balance=0, min_colors=4):
-        feature_colors = {}
-        # start with minimum number of colors in pool
-        color_pool = set(range(1, min_colors + 1))
-
-        # calculate count of neighbours
-        neighbour_count = defaultdict(int)
-        for feature_id, neighbours in graph.node_edge.items():
-            neighbour_count[feature_id] += len(neighbours)
-
-        # sort features by neighbour count - we want to handle those with more neighbours first
-        sorted_by_count = [feature_id for feature_id in sorted(neighbour_count.items(),
-                                                               key=operator.itemgetter(1),
-                                                               reverse=True)]
-        # counts for each color already assigned
-        color_counts = defaultdict(int)
-        color_areas = defaultdict(float)
-        for c in color_pool:
-            color_counts[c] = 0
-            color_areas[c] = 0
+    def assign(graph, order, feedback, balance, min_colors, areas, centroids):
+        feature_colors = numpy.zeros(graph.nodeCount(), dtype=numpy.int32)
+        color_pool = list(range(1, min_colors + 1))
 
-        total = 10.0 / len(sorted_by_count)
-        i = 0
+        # counts for each color already assigned
+        color_counts = [0] * (min_colors + 1)
+        color_areas = [0.0] * (min_colors + 1)
 
-        for (feature_id, n) in sorted_by_count:
+        total = 100.0 / len(order) if order else 0
+        for i, node in enumerate(order):
             # first work out which already assigned colors are adjacent to this feature
-            adjacent_colors = set()
-            for neighbour in graph.node_edge[feature_id]:
-                if neighbour in feature_colors:
-                    adjacent_colors.add(feature_colors[neighbour])
+            adjacent_colors = set(feature_colors[graph.nodeNeighbours(node)].tolist())
 
             # from the existing colors, work out which are available (ie non-adjacent)
-            available_colors = color_pool.difference(adjacent_colors)
-
-            feature_color = -1
+            available_colors = [c for c in color_pool if c not in adjacent_colors]
             if len(available_colors) == 0:
-                # no existing colors available for this feature, so add new color to pool and repeat
-                min_colors += 1
-                return ColoringAlgorithm.balanced(features, graph, feedback, balance, min_colors)
+                return None
+
+            if balance == 0:
+                # choose least used available color
+                feature_color = min(available_colors, key=color_counts.__getitem__)
+                color_counts[feature_color] += 1
+            elif balance == 1:
+                feature_color = min(available_colors, key=color_areas.__getitem__)
+                color_areas[feature_color] += areas[node]
             else:
-                if balance == 0:
-                    # choose least used available color
-                    counts = [(c, v) for c, v in color_counts.items() if c in available_colors]
-                    feature_color = sorted(counts, key=operator.itemgetter(1))[0][0]
-                    color_counts[feature_color] += 1
-                elif balance == 1:
-                    areas = [(c, v) for c, v in color_areas.items() if c in available_colors]
-                    feature_color = sorted(areas, key=operator.itemgetter(1))[0][0]
-                    color_areas[feature_color] += features[feature_id].geometry().area()
-                elif balance == 2:
-                    min_distances = {c: sys.float_info.max for c in available_colors}
-                    this_feature_centroid = QgsPointXY(features[feature_id].geometry().centroid().geometry())
-
-                    # find features for all available colors
-                    other_features = {f_id: c for (f_id, c) in feature_colors.items() if c in available_colors}
-
-                    # loop through these, and calculate the minimum distance from this feature to the nearest
-                    # feature with each assigned color
-                    for other_feature_id, c in other_features.items():
-                        other_geometry = features[other_feature_id].geometry()
-                        other_centroid = QgsPointXY(other_geometry.centroid().geometry())
-
-                        distance = this_feature_centroid.distanceSquared(other_centroid)
-                        if distance < min_distances[c]:
-                            min_distances[c] = distance
-
-                    # choose color such that minimum distance is maximised! ie we want MAXIMAL separation between
-                    # features with the same color
-                    feature_color = sorted(min_distances, key=min_distances.__getitem__, reverse=True)[0]
-
-            feature_colors[feature_id] = feature_color
-
-            i += 1
-            feedback.setProgress(70 + int(i * total))
-
-        return feature_colors
+                # calculate the minimum distance from this feature to the nearest
+                # feature with each available color
+                min_distances = {}
+                for c in available_colors:
+                    others = centroids[feature_colors == c]
+                    if len(others):
+                        min_distances[c] = float(((others - centroids[node]) ** 2).sum(axis=1).min())
+                    else:
+                        min_distances[c] = sys.float_info.max
+
+                # choose color such that minimum distance is maximised! ie we want MAXIMAL separation between
+                # features with the same color
+                feature_color = max(available_colors, key=min_distances.__getitem__)
+
+            feature_colors[node] = feature_color
 
+            feedback.setProgress(int(i * total))
 
-class Graph:
-
-    def __init__(self, sort_graph=True):
-        self.sort_graph = sort_graph
-        self.node_edge = {}
-
-    def add_edge(self, i, j):
-        ij = [i, j]
-        if self.sort_graph:
-            ij.sort()
-        (i, j) = ij
-        if i in self.node_edge:
-            self.node_edge[i].add(j)
-        else:
-            self.node_edge[i] = {j}
-
-    def make_full(self):
-        g = Graph(sort_graph=False)
-        for k in self.node_edge.keys():
-            for v in self.node_edge[k]:
-                g.add_edge(v, k)
-                g.add_edge(k, v)
-        return g
+        return feature_colors
@@ -0,0 +1,857 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    network.py
+    ---------------------
+    Date                 : October 2026
+    Copyright            : (C) 2026 by QGIS Development Team
+    Email                : qgis-developer at lists dot osgeo dot org
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'QGIS Development Team'
+__date__ = 'October 2026'
+__copyright__ = '(C) 2026, QGIS Development Team'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+import os
+import sys
+import json
+import struct
+import hashlib
+import threading
+import multiprocessing
+from array import array
+from collections import OrderedDict
+from functools import partial
+from heapq import heappush, heappop, nsmallest
+
+from qgis.PyQt.QtCore import QCoreApplication
+
+from qgis.core import (QgsGeometry,
+                       QgsPointXY,
+                       QgsRectangle,
+                       QgsSpatialIndex)
+from qgis.analysis import (QgsVectorLayerDirector,
+                           QgsNetworkDistanceStrategy,
+                           QgsNetworkSpeedStrategy,
+                           QgsGraphBuilder)
+
+from processing.core.ProcessingConfig import ProcessingConfig
+from processing.tools.exportcache import cacheKey, modificationTime
+from processing.tools.system import userFolder, getTempFilename
+
+# Criteria of the graphs, the length of the edges is always available
+LENGTH = 0
+TIME = 1
+
+# Number of graphs kept in memory between runs
+MAX_CACHED_GRAPHS = 3
+
+# Work is only sent to worker processes when there are at least this number
+# of items per worker
+MIN_ITEMS_PER_WORKER = 8
+
+GRAPH_MAGIC = b'QGSGRAPH'
+GRAPH_VERSION = 1
+
+INFINITY = float('inf')
+
+
+def tr(string, context='network'):
+    return QCoreApplication.translate(context, string)
+
+
+class GraphLocation(object):
+    """A point snapped to the nearest segment of a graph.
+
+    edges lists the edges running along that segment, as (edge, t) pairs
+    where t is the position of the snapped point along the edge, from 0 at
+    its start vertex to 1 at its end vertex.
+    """
+
+    def __init__(self, point, snappedPoint, edges):
+        self.point = point
+        self.snappedPoint = snappedPoint
+        self.edges = edges
+
+    def __getstate__(self):
+        # locations are sent to worker processes, which can not receive
+        # QGIS objects
+        return ((self.point.x(), self.point.y()), (self.snappedPoint.x(), self.snappedPoint.y()), self.edges)
+
+    def __setstate__(self, state):
+        point, snappedPoint, self.edges = state
+        self.point = QgsPointXY(*point)
+        self.snappedPoint = QgsPointXY(*snappedPoint)
+
+    def sources(self, graph, criterion):
+        """Returns the (vertex, cost) pairs to start a search from the
+        location.
+        """
+
+        costs = graph.costs[criterion]
+        sources = [(graph.inVertices[e], (1 - t) * costs[e]) for e, t in self.edges]
+        # a location on a vertex also leaves it by its other edges
+        sources.extend((graph.outVertices[e], 0.0) for e, t in self.edges if t == 0)
+        return sources
+
+    def targets(self, graph, criterion):
+        """Returns the (vertex, cost) pairs from which the location is
+        reached, to start a reverse search from it.
+        """
+
+        costs = graph.costs[criterion]
+        targets = [(graph.outVertices[e], t * costs[e]) for e, t in self.edges]
+        targets.extend((graph.inVertices[e], 0.0) for e, t in self.edges if t == 1)
+        return targets
+
+    def reachedEdges(self, graph, criterion, cutoff):
+        """Returns the parts of the edges of the location reached within
+        cutoff, as (edge, start, end) triples, see
+        NetworkGraph.reachedEdges().
+        """
+
+        costs = graph.costs[criterion]
+        return [(e, t, 1.0 if costs[e] <= 0 else min(1.0, t + cutoff / costs[e])) for e, t in self.edges]
+
+    def directCost(self, destination, graph, criterion):
+        """Returns the cost to reach destination without leaving the edge of
+        the location, or infinity.
+        """
+
+        costs = graph.costs[criterion]
+        best = INFINITY
+        destinationEdges = dict(destination.edges)
+        for e, t in self.edges:
+            if e in destinationEdges and destinationEdges[e] >= t:
+                best = min(best, (destinationEdges[e] - t) * costs[e])
+        return best
+
+
+class NetworkGraph(object):
+    """Compact, read only copy of a network graph.
+
+    Vertices are stored as coordinate arrays and edges as arrays of their
+    start and end vertices and of their costs, one array per criterion.
+    The edges leaving and reaching each vertex are indexed in compressed
+    arrays (offsets and edge ids), so the graph can be searched, written
+    and read again without creating a Python object per vertex or edge.
+    """
+
+    def __init__(self, xs, ys, outVertices, inVertices, costs, outIndex=None, inIndex=None):
+        self.xs = xs
+        self.ys = ys
+        self.outVertices = outVertices
+        self.inVertices = inVertices
+        self.costs = costs
+        self.outOffsets, self.outEdges = outIndex or self._index(outVertices)
+        self.inOffsets, self.inEdges = inIndex or self._index(inVertices)
+        # file the graph was read from or written to
+        self.filename = None
+        self._spatialIndex = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fromGraph(graph, criteria):
+        """Copies a QgsGraph whose edges have the given number of
+        criteria.
+        """
+
+        xs = array('d')
+        ys = array('d')
+        for i in range(graph.vertexCount()):
+            point = graph.vertex(i).point()
+            xs.append(point.x())
+            ys.append(point.y())
+        outVertices = array('i')
+        inVertices = array('i')
+        costs = [array('d') for _ in range(criteria)]
+        for i in range(graph.edgeCount()):
+            edge = graph.edge(i)
+            outVertices.append(edge.outVertex())
+            inVertices.append(edge.inVertex())
+            for criterion in range(criteria):
+                costs[criterion].append(float(edge.cost(criterion)))
+        return NetworkGraph(xs, ys, outVertices, inVertices, costs)
+
+    def _index(self, vertices):
+        # counting sort of the edges by vertex
+        offsets = array('i', [0]) * (len(self.xs) + 1)
+        for v in vertices:
+            offsets[v + 1] += 1
+        for i in range(len(self.xs)):
+            offsets[i + 1] += offsets[i]
+        edges = array('i', [0]) * len(vertices)
+        positions = array('i', offsets)
+        for e, v in enumerate(vertices):
+            edges[positions[v]] = e
+            positions[v] += 1
+        return offsets, edges
+
+    def vertexCount(self):
+        return len(self.xs)
+
+    def edgeCount(self):
+        return len(self.outVertices)
+
+    def point(self, vertex):
+        return QgsPointXY(self.xs[vertex], self.ys[vertex])
+
+    def _arrays(self):
+        return ([self.xs, self.ys, self.outVertices, self.inVertices] + self.costs +
+                [self.outOffsets, self.outEdges, self.inOffsets, self.inEdges])
+
+    def write(self, filename):
+        """Writes the graph to filename, see read()."""
+
+        header = json.dumps({'vertices': self.vertexCount(),
+                             'edges': self.edgeCount(),
+                             'criteria': len(self.costs),
+                             'byteorder': sys.byteorder,
+                             'itemsizes': [array('i').itemsize, array('d').itemsize]}).encode('utf-8')
+        tmp = '{}.{}.tmp'.format(filename, os.getpid())
+        with open(tmp, 'wb') as f:
+            f.write(GRAPH_MAGIC)
+            f.write(struct.pack('<II', GRAPH_VERSION, len(header)))
+            f.write(header)
+            for a in self._arrays():
+                a.tofile(f)
+        os.replace(tmp, filename)
+        self.filename = filename
+
+    @staticmethod
+    def read(filename):
+        """Reads a graph written by write(), or returns None if the file
+        can not be used.
+        """
+
+        try:
+            with open(filename, 'rb') as f:
+                if f.read(len(GRAPH_MAGIC)) != GRAPH_MAGIC:
+                    return None
+                version, length = struct.unpack('<II', f.read(8))
+                header = json.loads(f.read(length).decode('utf-8'))
+                if (version != GRAPH_VERSION or header['byteorder'] != sys.byteorder or
+                        header['itemsizes'] != [array('i').itemsize, array('d').itemsize]):
+                    return None
+
+                def load(typecode, count):
+                    a = array(typecode)
+                    a.fromfile(f, count)
+                    return a
+
+                vertices = header['vertices']
+                edges = header['edges']
+                xs = load('d', vertices)
+                ys = load('d', vertices)
+                outVertices = load('i', edges)
+                inVertices = load('i', edges)
+                costs = [load('d', edges) for _ in range(header['criteria'])]
+                outIndex = (load('i', vertices + 1), load('i', edges))
+                inIndex = (load('i', vertices + 1), load('i', edges))
+        except (OSError, EOFError, ValueError, KeyError, struct.error):
+            return None
+        graph = NetworkGraph(xs, ys, outVertices, inVertices, costs, outIndex, inIndex)
+        graph.filename = filename
+        return graph
+
+    def _segmentIndex(self):
+        # one entry per segment of the network, the edges of both directions
+        # of a segment being found from the vertices of the indexed edge
+        with self._lock:
+            if self._spatialIndex is None:
+                index = QgsSpatialIndex()
+                xs, ys = self.xs, self.ys
+                for e in range(self.edgeCount()):
+                    a = self.outVertices[e]
+                    b = self.inVertices[e]
+                    if a > b and self.edgesBetween(b, a):
+                        continue
+                    index.insertFeature(e, QgsRectangle(min(xs[a], xs[b]), min(ys[a], ys[b]),
+                                                        max(xs[a], xs[b]), max(ys[a], ys[b])))
+                self._spatialIndex = index
+            return self._spatialIndex
+
+    def edgesBetween(self, a, b):
+        """Returns the edges from vertex a to vertex b."""
+
+        return [e for e in self.outEdges[self.outOffsets[a]:self.outOffsets[a + 1]] if self.inVertices[e] == b]
+
+    def _project(self, point, edge):
+        # returns the squared distance from point to edge, and the position
+        # of the closest point along the edge
+        xa, ya = self.xs[self.outVertices[edge]], self.ys[self.outVertices[edge]]
+        xb, yb = self.xs[self.inVertices[edge]], self.ys[self.inVertices[edge]]
+        dx, dy = xb - xa, yb - ya
+        length = dx * dx + dy * dy
+        t = 0.0 if length == 0 else max(0.0, min(1.0, ((point.x() - xa) * dx + (point.y() - ya) * dy) / length))
+        x, y = xa + t * dx, ya + t * dy
+        return (point.x() - x) ** 2 + (point.y() - y) ** 2, t
+
+    def snap(self, point):
+        """Returns the GraphLocation of the point of the graph closest to
+        point, or None if the graph has no edge.
+        """
+
+        index = self._segmentIndex()
+        nearest = index.nearestNeighbor(point, 1)
+        if not nearest:
+            return None
+        # the nearest bounding box is not always the one of the nearest
+        # segment, but no segment is closer than the distance to it
+        distance = self._project(point, nearest[0])[0] ** 0.5
+        rect = QgsRectangle(point.x() - distance, point.y() - distance,
+                            point.x() + distance, point.y() + distance)
+        best, edge, t = INFINITY, None, None
+        for candidate in index.intersects(rect) or nearest:
+            d, position = self._project(point, candidate)
+            if d < best:
+                best, edge, t = d, candidate, position
+        a, b = self.outVertices[edge], self.inVertices[edge]
+        edges = [(e, t) for e in self.edgesBetween(a, b)] + [(e, 1 - t) for e in self.edgesBetween(b, a)]
+        snapped = QgsPointXY(self.xs[a] + t * (self.xs[b] - self.xs[a]),
+                             self.ys[a] + t * (self.ys[b] - self.ys[a]))
+        return GraphLocation(point, snapped, edges)
+
+    def shortestPaths(self, sources, criterion, reverse=False, cutoff=None):
+        """Runs Dijkstra's algorithm from sources, a list of (vertex, cost)
+        pairs.
+
+        Returns the costs of the reached vertices and the tree of the
+        paths, as dicts with vertex keys, the tree giving the edge through
+        which each vertex is reached (-1 for sources). With reverse, the
+        edges are followed backwards, giving the costs to reach the sources.
+        With cutoff, the search stops at the vertices costing more than
+        cutoff, and only the part of the graph within it is returned.
+        """
+
+        costs, tree, _ = self._search([(v, c, None) for v, c in sources], criterion, reverse, cutoff)
+        return costs, tree
+
+    def nearestSources(self, sources, criterion, cutoff=None):
+        """Runs a single search from all sources, (vertex, cost, label)
+        triples, as shortestPaths() does.
+
+        Returns the costs, the tree and the labels of the reached vertices,
+        each vertex having the label of the source closest to it.
+        """
+
+        return self._search(sources, criterion, False, cutoff)
+
+    def _search(self, sources, criterion, reverse, cutoff):
+        if reverse:
+            offsets, edges, nextVertices = self.inOffsets, self.inEdges, self.outVertices
+        else:
+            offsets, edges, nextVertices = self.outOffsets, self.outEdges, self.inVertices
+        if cutoff is None:
+            cutoff = INFINITY
+        edgeCosts = self.costs[criterion]
+        costs = {}
+        tree = {}
+        labels = {}
+        heap = []
+        for vertex, cost, label in sources:
+            if cost <= cutoff and cost < costs.get(vertex, INFINITY):
+                costs[vertex] = cost
+                tree[vertex] = -1
+                labels[vertex] = label
+                heappush(heap, (cost, vertex))
+        while heap:
+            cost, vertex = heappop(heap)
+            if cost > costs[vertex]:
+                continue
+            label = labels[vertex]
+            for i in range(offsets[vertex], offsets[vertex + 1]):
+                edge = edges[i]
+                nextVertex = nextVertices[edge]
+                nextCost = cost + edgeCosts[edge]
+                if nextCost <= cutoff and nextCost < costs.get(nextVertex, INFINITY):
+                    costs[nextVertex] = nextCost
+                    tree[nextVertex] = edge
+                    labels[nextVertex] = label
+                    heappush(heap, (nextCost, nextVertex))
+        return costs, tree, labels
+
+    def reachedEdges(self, costs, criterion, cutoff, labels=None):
+        """Returns the parts of the edges reached by a search bounded by
+        cutoff, as (edge, start, end) triples, start and end being positions
+        along the edge, from 0 at its start vertex to 1 at its end vertex.
+
+        With the labels of a nearestSources() search, an edge between
+        vertices of different labels is shared at the point where the
+        costs from both sides are equal, and (label, edge, start, end)
+        tuples are returned.
+        """
+
+        edgeCosts = self.costs[criterion]
+        reached = []
+        for vertex, cost in costs.items():
+            for i in range(self.outOffsets[vertex], self.outOffsets[vertex + 1]):
+                edge = self.outEdges[i]
+                edgeCost = edgeCosts[edge]
+                end = 1.0 if edgeCost <= 0 else min(1.0, (cutoff - cost) / edgeCost)
+                if labels is None:
+                    if end > 0:
+                        reached.append((edge, 0.0, end))
+                    continue
+                other = self.inVertices[edge]
+                if other in labels and labels[other] != labels[vertex] and edgeCost > 0:
+                    end = min(end, max(0.0, (edgeCost + costs[other] - cost) / (2 * edgeCost)))
+                if end > 0:
+                    reached.append((labels[vertex], edge, 0.0, end))
+        return reached
+
+    def boundaryEdges(self, costs, criterion):
+        """Returns the edges leaving the part of the graph reached by a
+        bounded search, one per unreached vertex: the one through which it
+        is closest.
+        """
+
+        edgeCosts = self.costs[criterion]
+        boundary = {}
+        for vertex, cost in costs.items():
+            for i in range(self.outOffsets[vertex], self.outOffsets[vertex + 1]):
+                edge = self.outEdges[i]
+                other = self.inVertices[edge]
+                if other in costs:
+                    continue
+                if other not in boundary or cost + edgeCosts[edge] < boundary[other][0]:
+                    boundary[other] = (cost + edgeCosts[edge], edge)
+        return [edge for _, edge in boundary.values()]
+
+    def segment(self, edge, start=0.0, end=1.0):
+        """Returns the coordinates of the part of edge between two
+        positions, as ((x, y), (x, y)).
+        """
+
+        a, b = self.outVertices[edge], self.inVertices[edge]
+        dx, dy = self.xs[b] - self.xs[a], self.ys[b] - self.ys[a]
+        return ((self.xs[a] + start * dx, self.ys[a] + start * dy),
+                (self.xs[a] + end * dx, self.ys[a] + end * dy))
+
+    def locationCost(self, costs, ends):
+        """Returns the lowest cost to reach one of ends, (vertex, cost)
+        pairs, with the costs of a search, and the vertex it goes through.
+        """
+
+        best, bestVertex = INFINITY, None
+        for vertex, cost in ends:
+            if vertex in costs and costs[vertex] + cost < best:
+                best, bestVertex = costs[vertex] + cost, vertex
+        return best, bestVertex
+
+    def path(self, tree, vertex, reverse=False):
+        """Returns the vertices of the path from the sources of a search to
+        vertex, or from vertex to the sources of a reverse search.
+        """
+
+        vertices = [vertex]
+        nextVertices = self.inVertices if reverse else self.outVertices
+        while tree[vertex] != -1:
+            vertex = nextVertices[tree[vertex]]
+            vertices.append(vertex)
+        if not reverse:
+            vertices.reverse()
+        return vertices
+
+    def route(self, origin, destination, criterion):
+        """Returns the cost and the points of the shortest route between two
+        GraphLocations, or (infinity, None) if there is none.
+        """
+
+        costs, tree = self.shortestPaths(origin.sources(self, criterion), criterion)
+        return self.searchRoute(costs, tree, origin, destination, criterion)
+
+    def searchRoute(self, costs, tree, origin, destination, criterion, reverse=False):
+        """Returns the cost and the points of the shortest route between two
+        GraphLocations, from the result of a search from origin, or with
+        reverse of a reverse search from destination. Searches are reused
+        this way when routing from or to many locations.
+        """
+
+        if reverse:
+            cost, vertex = self.locationCost(costs, origin.sources(self, criterion))
+        else:
+            cost, vertex = self.locationCost(costs, destination.targets(self, criterion))
+        direct = origin.directCost(destination, self, criterion)
+        if direct < INFINITY and direct <= cost:
+            return direct, [origin.snappedPoint, destination.snappedPoint]
+        if vertex is None:
+            return INFINITY, None
+        points = [self.point(v) for v in self.path(tree, vertex, reverse)]
+        return cost, [origin.snappedPoint] + points + [destination.snappedPoint]
+
+
+def serviceArea(graph, origin, criterion, travelCost):
+    """Returns the service area of the GraphLocation origin.
+
+    The area is returned as coordinates, so it can be computed in a worker
+    process: the boundary, as the points of the edges crossing its limit
+    (the first points beyond travelCost, then the last ones within it),
+    and the segments of the edges reached within travelCost.
+    """
+
+    costs, tree = graph.shortestPaths(origin.sources(graph, criterion), criterion, cutoff=travelCost)
+    edgeCosts = graph.costs[criterion]
+    upperBoundary = []
+    lowerBoundary = []
+    for edge in graph.boundaryEdges(costs, criterion):
+        upperBoundary.append(graph.segment(edge)[1])
+        lowerBoundary.append(graph.segment(edge)[0])
+    # vertices beyond travelCost from the origin itself
+    for edge, t in origin.edges:
+        if (1 - t) * edgeCosts[edge] > travelCost and graph.inVertices[edge] not in costs:
+            upperBoundary.append(graph.segment(edge)[1])
+            lowerBoundary.append((origin.snappedPoint.x(), origin.snappedPoint.y()))
+    segments = [graph.segment(*reached) for reached in graph.reachedEdges(costs, criterion, travelCost)]
+    segments.extend(graph.segment(*reached) for reached in origin.reachedEdges(graph, criterion, travelCost))
+    return upperBoundary, lowerBoundary, segments
+
+
+def nearestServiceAreas(graph, origins, criterion, travelCost):
+    """Returns the service areas of origins, a list of GraphLocations, as
+    serviceArea() does, with a single search: each part of the network
+    goes to the service area of the closest origin only.
+    """
+
+    sources = []
+    for i, origin in enumerate(origins):
+        sources.extend((vertex, cost, i) for vertex, cost in origin.sources(graph, criterion))
+    costs, tree, labels = graph.nearestSources(sources, criterion, travelCost)
+    areas = [([], [], []) for _ in origins]
+    for edge in graph.boundaryEdges(costs, criterion):
+        upperBoundary, lowerBoundary, _ = areas[labels[graph.outVertices[edge]]]
+        upperBoundary.append(graph.segment(edge)[1])
+        lowerBoundary.append(graph.segment(edge)[0])
+    for label, edge, start, end in graph.reachedEdges(costs, criterion, travelCost, labels):
+        areas[label][2].append(graph.segment(edge, start, end))
+    for i, origin in enumerate(origins):
+        areas[i][2].extend(graph.segment(*reached) for reached in origin.reachedEdges(graph, criterion, travelCost))
+    return areas
+
+
+def isoArea(segments):
+    """Returns the multipolygon of a service area from the segments of its
+    reached edges: the faces of the network they enclose, or their convex
+    hull if they enclose none.
+    """
+
+    lines = QgsGeometry.fromMultiPolyline([[QgsPointXY(*a), QgsPointXY(*b)] for a, b in segments])
+    faces = QgsGeometry.polygonize([QgsGeometry.unaryUnion([lines])])
+    if faces.isEmpty():
+        area = lines.convexHull()
+    else:
+        area = QgsGeometry.unaryUnion(faces.asGeometryCollection())
+    area.convertToMultiType()
+    return area
+
+
+def matrixTargets(graph, destinations, criterion):
+    """Indexes destinations, a list of GraphLocations (None for the ones
+    which could not be snapped), for originCosts().
+
+    Returns the (destination, cost, length) triples to reach them from
+    each vertex, and the (destination, t) positions of them along each
+    edge, as dicts of lists, destinations being given by their index.
+    """
+
+    byVertex = {}
+    byEdge = {}
+    for i, destination in enumerate(destinations):
+        if destination is None:
+            continue
+        # both lists have the same order, one item per edge of the location
+        for (vertex, cost), (_, length) in zip(destination.targets(graph, criterion),
+                                               destination.targets(graph, LENGTH)):
+            byVertex.setdefault(vertex, []).append((i, cost, length))
+        for edge, t in destination.edges:
+            byEdge.setdefault(edge, []).append((i, t))
+    return byVertex, byEdge
+
+
+def originCosts(graph, origin, targets, criterion, cutoff=None, nearest=0):
+    """Returns the costs from the GraphLocation origin to the destinations
+    indexed by matrixTargets(), as (destination, cost, length) triples
+    ordered by cost.
+
+    Only the destinations within cutoff are returned, and with nearest
+    the given number of closest ones. The search stops as soon as these
+    are known, and the length of the routes is summed along with their
+    cost, so no route is built.
+    """
+
+    byVertex, byEdge = targets
+    if cutoff is None:
+        cutoff = INFINITY
+    edgeCosts = graph.costs[criterion]
+    edgeLengths = graph.costs[LENGTH]
+    found = {}
+
+    def reach(destination, cost, length):
+        if cost <= cutoff and cost < found.get(destination, (INFINITY, ))[0]:
+            found[destination] = (cost, length)
+
+    # destinations further along the edges of the origin
+    for edge, t in origin.edges:
+        for destination, position in byEdge.get(edge, ()):
+            if position >= t:
+                reach(destination, (position - t) * edgeCosts[edge], (position - t) * edgeLengths[edge])
+
+    costs = {}
+    lengths = {}
+    heap = []
+    for (vertex, cost), (_, length) in zip(origin.sources(graph, criterion), origin.sources(graph, LENGTH)):
+        if cost <= cutoff and cost < costs.get(vertex, INFINITY):
+            costs[vertex] = cost
+            lengths[vertex] = length
+            heappush(heap, (cost, vertex))
+    # cost of the nearest-th closest destination found so far
+    limit = INFINITY
+    if nearest and len(found) >= nearest:
+        limit = nsmallest(nearest, (c for c, _ in found.values()))[-1]
+    while heap:
+        cost, vertex = heappop(heap)
+        if cost > costs[vertex]:
+            continue
+        if cost >= limit:
+            # the destinations reached from now on cost more
+            break
+        length = lengths[vertex]
+        if vertex in byVertex:
+            for destination, targetCost, targetLength in byVertex[vertex]:
+                reach(destination, cost + targetCost, length + targetLength)
+            if nearest and len(found) >= nearest:
+                limit = nsmallest(nearest, (c for c, _ in found.values()))[-1]
+        for i in range(graph.outOffsets[vertex], graph.outOffsets[vertex + 1]):
+            edge = graph.outEdges[i]
+            nextVertex = graph.inVertices[edge]
+            nextCost = cost + edgeCosts[edge]
+            if nextCost <= cutoff and nextCost < costs.get(nextVertex, INFINITY):
+                costs[nextVertex] = nextCost
+                lengths[nextVertex] = length + edgeLengths[edge]
+                heappush(heap, (nextCost, nextVertex))
+
+    rows = sorted((cost, destination, length) for destination, (cost, length) in found.items())
+    if nearest:
+        rows = rows[:nearest]
+    return [(destination, cost, length) for cost, destination, length in rows]
+
+
+def mapOnWorkers(graph, function, items, args=(), feedback=None):
+    """Yields function(graph, item, *args) for each of items, computed in
+    worker processes if there are enough of them.
+
+    function must be a module level function, and items and args plain
+    values (GraphLocations are), as they are sent to the workers. The
+    results are yielded in the order of items.
+    """
+
+    workers = int(ProcessingConfig.getSetting(ProcessingConfig.MAX_THREADS) or 1)
+    if workers <= 1 or len(items) < MIN_ITEMS_PER_WORKER * workers:
+        for item in items:
+            if feedback is not None and feedback.isCanceled():
+                return
+            yield function(graph, item, *args)
+        return
+
+    # workers read the graph from its file rather than receiving it
+    if graph.filename is None or not os.path.exists(graph.filename):
+        graph.filename = getTempFilename('graph')
+        graph.write(graph.filename)
+    from processing.core.BatchExecutor import pythonExecutable
+    ctx = multiprocessing.get_context('spawn')
+    ctx.set_executable(pythonExecutable())
+    pool = ctx.Pool(workers, initializer=initializeWorker, initargs=(graph.filename, sys.path))
+    try:
+        chunks = max(1, len(items) // (workers * 4))
+        for result in pool.imap(partial(runInWorker, function, args), items, chunks):
+            if feedback is not None and feedback.isCanceled():
+                pool.terminate()
+                return
+            yield result
+    finally:
+        pool.close()
+        pool.join()
+
+
+_workerGraph = None
+
+
+def initializeWorker(filename, path):
+    """Reads the graph of a worker process."""
+
+    global _workerGraph
+    sys.path = path
+    _workerGraph = NetworkGraph.read(filename)
+
+
+def runInWorker(function, args, item):
+    return function(_workerGraph, item, *args)
+
+
+class NetworkGraphCache(object):
+    """Graphs built from network layers, kept in memory between runs and,
+    if enabled in the settings, on disk between sessions.
+
+    Graphs are looked up by a key describing the layer (see
+    processing.tools.exportcache.cacheKey, so they are built again when
+    the layer changes) and all the options of the graph. Only graphs of
+    layers with a modification time are written to disk, the least
+    recently used files being removed when the size set in the settings
+    is exceeded.
+    """
+
+    def __init__(self):
+        self._graphs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, persistent=False):
+        with self._lock:
+            graph = self._graphs.get(key)
+            if graph is not None:
+                self._graphs.move_to_end(key)
+                return graph
+        filename = self.filename(key) if persistent else None
+        if filename is not None and os.path.exists(filename):
+            graph = NetworkGraph.read(filename)
+            if graph is not None:
+                self._add(key, graph)
+                try:
+                    # the modification time orders the files by last use
+                    os.utime(filename)
+                except OSError:
+                    pass
+            return graph
+        return None
+
+    def add(self, key, graph, persistent=False):
+        """Adds the graph built with key, and writes it to disk if
+        persistent, which it must only be if the key changes when the
+        data of the layer does in another session.
+        """
+        self._add(key, graph)
+        filename = self.filename(key) if persistent else None
+        if filename is not None:
+            try:
+                graph.write(filename)
+                self._removeOldFiles(filename)
+            except OSError:
+                pass
+
+    def _add(self, key, graph):
+        with self._lock:
+            self._graphs[key] = graph
+            self._graphs.move_to_end(key)
+            while len(self._graphs) > MAX_CACHED_GRAPHS:
+                self._graphs.popitem(last=False)
+
+    def filename(self, key):
+        if self.diskSize() <= 0:
+            return None
+        folder = os.path.join(userFolder(), 'networks')
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(folder, '{}.graph'.format(key))
+
+    def diskSize(self):
+        """Maximum size of the files of the cache in bytes."""
+
+        try:
+            return float(ProcessingConfig.getSetting(ProcessingConfig.NETWORK_GRAPH_CACHE_SIZE) or 0) * 1024 * 1024
+        except ValueError:
+            return 0
+
+    def _removeOldFiles(self, keep):
+        folder = os.path.dirname(keep)
+        files = []
+        for name in os.listdir(folder):
+            if name.endswith('.graph'):
+                path = os.path.join(folder, name)
+                try:
+                    files.append((os.path.getmtime(path), os.path.getsize(path), path))
+                except OSError:
+                    pass
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        maxSize = self.diskSize()
+        # the file just written is kept, as it is about to be used
+        for _, size, path in files:
+            if total <= maxSize:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._graphs.clear()
+
+
+_cache = NetworkGraphCache()
+
+
+def graphCache():
+    """Returns the network graph cache of the session."""
+
+    return _cache
+
+
+def networkGraph(layer, crs, tolerance=0, directionField=-1, forwardValue='', backwardValue='', bothValue='',
+                 defaultDirection=QgsVectorLayerDirector.DirectionBoth, speedField=-1, defaultSpeed=None,
+                 speedFactor=1.0, feedback=None):
+    """Returns the NetworkGraph of the lines of layer, in crs.
+
+    The LENGTH criterion of the edges is their length, measured on the
+    ellipsoid by the QgsDistanceArea of the graph builder, and if defaultSpeed
+    is given the TIME criterion is their travel time, as computed by
+    QgsNetworkSpeedStrategy(speedField, defaultSpeed, speedFactor). The
+    graph is taken from the cache when it was already built with the same
+    options and the layer was not changed since.
+    """
+
+    if defaultSpeed is None:
+        speedField, speedFactor = -1, 1.0
+    layerKey = cacheKey(layer, 'graph')
+    persistent = modificationTime(layer) is not None
+    key = None
+    if layerKey is not None:
+        digest = hashlib.sha1()
+        for value in (layerKey, crs.authid() or crs.toWkt(), tolerance, directionField, forwardValue, backwardValue,
+                      bothValue, int(defaultDirection), speedField, defaultSpeed, speedFactor):
+            digest.update(str(value).encode('utf-8'))
+            digest.update(b'\0')
+        key = digest.hexdigest()
+        graph = graphCache().get(key, persistent)
+        if graph is not None:
+            return graph
+
+    if feedback is not None:
+        feedback.pushInfo(tr('Building graph...'))
+    director = QgsVectorLayerDirector(layer, directionField, forwardValue, backwardValue, bothValue,
+                                      defaultDirection)
+    director.addStrategy(QgsNetworkDistanceStrategy())
+    criteria = 1
+    if defaultSpeed is not None:
+        director.addStrategy(QgsNetworkSpeedStrategy(speedField, defaultSpeed, speedFactor))
+        criteria = 2
+    builder = QgsGraphBuilder(crs, True, tolerance)
+    director.makeGraph(builder, [])
+    graph = NetworkGraph.fromGraph(builder.graph(), criteria)
+    if key is not None:
+        graphCache().add(key, graph, persistent)
+    return graph
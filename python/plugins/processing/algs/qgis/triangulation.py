@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    triangulation.py
+    ---------------------
+    Date                 : October 2026
+    Copyright            : (C) 2026 by QGIS Development Team
+    Email                : qgis-developer at lists dot osgeo dot org
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'QGIS Development Team'
+__date__ = 'October 2026'
+__copyright__ = '(C) 2026, QGIS Development Team'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+from math import sqrt
+
+from qgis.core import (QgsFeature,
+                       QgsFeatureRequest,
+                       QgsGeometry,
+                       QgsPointXY,
+                       QgsRectangle,
+                       QgsSpatialIndex)
+
+
+class PointSet(object):
+    """Distinct points read from a point source.
+
+    Each point is stored once, with the position of its first occurrence
+    among all the points read (the parts of multipoints being counted one
+    by one), and optionally the attributes of the feature it comes from.
+    """
+
+    def __init__(self):
+        self.points = []
+        self.positions = []
+        self.attributes = []
+        self.count = 0
+        self._index = {}
+
+    @staticmethod
+    def fromSource(source, feedback=None, attributes=False):
+        """Reads the points of source in a single pass."""
+
+        points = PointSet()
+        request = QgsFeatureRequest()
+        if not attributes:
+            request.setSubsetOfAttributes([])
+        total = 100.0 / source.featureCount() if source.featureCount() else 0
+        for current, f in enumerate(source.getFeatures(request)):
+            if feedback is not None:
+                if feedback.isCanceled():
+                    break
+                feedback.setProgress(int(current * total))
+            if not f.hasGeometry():
+                continue
+            geom = f.geometry()
+            parts = geom.asMultiPoint() if geom.isMultipart() else [geom.asPoint()]
+            for point in parts:
+                points.add(point.x(), point.y(), f.attributes() if attributes else None)
+        return points
+
+    def add(self, x, y, attributes=None):
+        """Adds a point, unless it was already added, and returns its
+        index.
+        """
+
+        position = self.count
+        self.count += 1
+        index = self._index.get((x, y))
+        if index is None:
+            index = len(self.points)
+            self._index[(x, y)] = index
+            self.points.append((x, y))
+            self.positions.append(position)
+            self.attributes.append(attributes)
+        return index
+
+    def indexOf(self, x, y):
+        return self._index.get((x, y))
+
+    def __len__(self):
+        return len(self.points)
+
+    def geometry(self):
+        return QgsGeometry.fromMultiPoint([QgsPointXY(x, y) for x, y in self.points])
+
+    def extent(self):
+        xs = [x for x, _ in self.points]
+        ys = [y for _, y in self.points]
+        return QgsRectangle(min(xs), min(ys), max(xs), max(ys))
+
+
+def delaunayTriangles(points):
+    """Returns the Delaunay triangles of a PointSet as triples of point
+    indices.
+
+    The vertices of each triangle are given clockwise from the one with
+    the lowest index, and the triangles are sorted, so the result does not
+    depend on the order in which GEOS builds them.
+    """
+
+    triangulation = points.geometry().delaunayTriangulation()
+    triangles = []
+    for triangle in triangulation.asGeometryCollection():
+        ring = triangle.asPolygon()[0][:3]
+        indices = [points.indexOf(p.x(), p.y()) for p in ring]
+        if None in indices:
+            continue
+        (ax, ay), (bx, by), (cx, cy) = [points.points[i] for i in indices]
+        if (bx - ax) * (cy - ay) - (by - ay) * (cx - ax) > 0:
+            # counterclockwise
+            indices.reverse()
+        first = indices.index(min(indices))
+        triangles.append(tuple(indices[first:] + indices[:first]))
+    triangles.sort()
+    return triangles
+
+
+def triangleGeometry(points, triangle):
+    ring = [QgsPointXY(*points.points[i]) for i in triangle]
+    ring.append(ring[0])
+    return QgsGeometry.fromPolygon([ring])
+
+
+def longestEdge(points, triangle):
+    vertices = [points.points[i] for i in triangle]
+    return max(sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2)
+               for (x1, y1), (x2, y2) in zip(vertices, vertices[1:] + vertices[:1]))
+
+
+def voronoiCells(points, extent):
+    """Yields the Voronoi cells of a PointSet, clipped to the QgsRectangle
+    extent, as (point index, cell geometry) pairs in the order of the
+    points.
+    """
+
+    clip = QgsGeometry.fromRect(extent)
+    diagram = points.geometry().voronoiDiagram(clip)
+
+    # the cells of the diagram are not in the order of the points, each
+    # one is matched to the point it contains
+    index = QgsSpatialIndex()
+    for i, (x, y) in enumerate(points.points):
+        f = QgsFeature(i)
+        f.setGeometry(QgsGeometry.fromPoint(QgsPointXY(x, y)))
+        index.insertFeature(f)
+
+    engine = QgsGeometry.createGeometryEngine(clip.geometry())
+    engine.prepareGeometry()
+    cells = {}
+    for cell in diagram.asGeometryCollection():
+        site = None
+        for i in index.intersects(cell.boundingBox()):
+            if cell.contains(QgsPointXY(*points.points[i])):
+                site = i
+                break
+        if site is None:
+            continue
+        if not engine.contains(cell.geometry()):
+            cell = QgsGeometry(engine.intersection(cell.geometry()))
+        cells[site] = cell
+    for i in sorted(cells):
+        yield i, cells[i]
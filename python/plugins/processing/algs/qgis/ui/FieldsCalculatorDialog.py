@@ -28,6 +28,7 @@ __revision__ = '$Format:%H$'
 
 import os
 import re
+import time
 
 from qgis.PyQt import uic
 from qgis.PyQt.QtCore import Qt
@@ -225,9 +226,17 @@ class FieldsCalculatorDialog(BASE, WIDGET):
             if parameters:
                 QApplication.setOverrideCursor(QCursor(Qt.WaitCursor))
                 context = dataobjects.createContext()
-                ProcessingLog.addToLog(self.alg.asPythonCommand(parameters, context))
+                logEntry = ProcessingLog.addToLog(self.alg.asPythonCommand(parameters, context),
+                                                  self.alg.id(), parameters)
+                startTime = time.time()
+                startCpuTime = time.process_time()
+                startPeak = ProcessingLog.peakResidentSize()
 
                 self.executed, results = execute(self.alg, parameters, context, self.feedback)
+                peak = ProcessingLog.peakResidentSize()
+                ProcessingLog.finishLogEntry(logEntry, self.executed, time.time() - startTime,
+                                             time.process_time() - startCpuTime,
+                                             peakMemory=peak - startPeak if peak is not None else None)
                 if self.executed:
                     handleAlgorithmResults(self.alg,
                                            context,
@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    AlgorithmManifest.py
+    ---------------------
+    Date                 : October 2026
+    Copyright            : (C) 2026 by QGIS Development Team
+    Email                : qgis-developer at lists dot osgeo dot org
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'QGIS Development Team'
+__date__ = 'October 2026'
+__copyright__ = '(C) 2026, QGIS Development Team'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+import os
+import json
+import hashlib
+
+from qgis.PyQt.QtCore import QCoreApplication, QLocale, QSize, QVariant
+from qgis.PyQt.QtGui import QGuiApplication, QIcon
+
+from qgis.core import (Qgis,
+                       QgsMessageLog,
+                       QgsProcessingAlgorithm,
+                       QgsProcessingException,
+                       QgsProcessingParameters,
+                       QgsProcessingOutputVectorLayer,
+                       QgsProcessingOutputRasterLayer,
+                       QgsProcessingOutputHtml,
+                       QgsProcessingOutputNumber,
+                       QgsProcessingOutputString,
+                       QgsProcessingOutputFolder)
+
+from processing.tools.system import userFolder
+
+# Increase when the format of the entries changes
+MANIFEST_VERSION = 1
+
+ICON_SIZE = QSize(32, 32)
+
+OUTPUT_CLASSES = {cls.typeName(): cls for cls in (QgsProcessingOutputVectorLayer,
+                                                  QgsProcessingOutputRasterLayer,
+                                                  QgsProcessingOutputHtml,
+                                                  QgsProcessingOutputNumber,
+                                                  QgsProcessingOutputString,
+                                                  QgsProcessingOutputFolder)}
+
+
+def tr(string, context='AlgorithmManifest'):
+    return QCoreApplication.translate(context, string)
+
+
+class LazyAlgorithm(QgsProcessingAlgorithm):
+    """Algorithm registered from its manifest entry.
+
+    It describes the algorithm (name, group, parameters...) without
+    importing its module. The module is only imported by createInstance(),
+    so when the algorithm is run or its dialog opened, as both go through
+    QgsProcessingRegistry.createAlgorithmById().
+    """
+
+    def __init__(self, entry, factory):
+        super().__init__()
+        self.entry = entry
+        self.factory = factory
+        self.algorithm = None
+
+    def createInstance(self):
+        alg = self.factory(self.entry['key'])
+        if alg is None:
+            raise QgsProcessingException(
+                tr('Could not load algorithm {0}').format(self.entry['name']))
+        return alg
+
+    def initAlgorithm(self, config=None):
+        for definition in self.entry['parameters']:
+            self.addParameter(QgsProcessingParameters.parameterFromVariantMap(definition))
+        for definition in self.entry['outputs']:
+            # outputs of destination parameters are already created
+            if self.outputDefinition(definition['name']) is None:
+                self.addOutput(createOutput(definition))
+
+    def name(self):
+        return self.entry['name']
+
+    def displayName(self):
+        return self.entry['displayName']
+
+    def group(self):
+        return self.entry['group']
+
+    def tags(self):
+        return self.entry['tags']
+
+    def flags(self):
+        return QgsProcessingAlgorithm.Flags(self.entry['flags'])
+
+    def shortHelpString(self):
+        return self.entry['shortHelp']
+
+    def helpUrl(self):
+        return self.entry['helpUrl']
+
+    def svgIconPath(self):
+        return self.entry['svgIconPath']
+
+    def icon(self):
+        if self.entry['icon'] and os.path.exists(self.entry['icon']):
+            return QIcon(self.entry['icon'])
+        return super().icon()
+
+    def prepareAlgorithm(self, parameters, context, feedback):
+        # instances created from the registry are the real algorithms, this
+        # is only used when the registry entry itself is run
+        self.algorithm = self.create()
+        return self.algorithm.prepareAlgorithm(parameters, context, feedback)
+
+    def processAlgorithm(self, parameters, context, feedback):
+        return self.algorithm.processAlgorithm(parameters, context, feedback)
+
+    def postProcessAlgorithm(self, context, feedback):
+        return self.algorithm.postProcessAlgorithm(context, feedback)
+
+
+def createOutput(definition):
+    cls = OUTPUT_CLASSES[definition['type']]
+    if cls is QgsProcessingOutputVectorLayer:
+        return cls(definition['name'], definition['description'], definition['dataType'])
+    return cls(definition['name'], definition['description'])
+
+
+def _plainValue(value):
+    # null QVariants are the only non JSON values expected in the
+    # definitions of the parameters
+    if isinstance(value, QVariant) and value.isNull():
+        return None
+    raise TypeError('{} can not be stored in the manifest'.format(repr(value)))
+
+
+def modificationTime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+class AlgorithmManifest(object):
+    """Cached description of the algorithms of a provider.
+
+    The algorithms are given as (key, source file) pairs, and factory is a
+    function returning a new algorithm from its key. The first time, each
+    algorithm is created and described in a JSON file in the user folder;
+    later the entries of the file are used to register LazyAlgorithm
+    instances instead. An entry is built again when its source file
+    changes, and all of them when one of the dependencies (files such as
+    the help of the algorithms), the QGIS version or the locale change.
+
+    Algorithms which can not be described, for instance because they use
+    parameters defined in Python, are always loaded.
+    """
+
+    def __init__(self, providerId, sources, factory, dependencies=None):
+        self.providerId = providerId
+        self.sources = sources
+        self.factory = factory
+        self.dependencies = [os.path.abspath(__file__)] + (dependencies or [])
+        self.folder = os.path.join(userFolder(), 'manifests')
+        self.filename = os.path.join(self.folder, '{}.json'.format(providerId))
+
+    def header(self):
+        return {'version': MANIFEST_VERSION,
+                'qgisVersion': Qgis.QGIS_VERSION,
+                'locale': QLocale().name(),
+                'icons': self.saveIcons(),
+                'dependencies': {f: modificationTime(f) for f in self.dependencies}}
+
+    def saveIcons(self):
+        # icons can only be drawn with a GUI, a manifest written without one
+        # is built again when the GUI starts
+        return isinstance(QCoreApplication.instance(), QGuiApplication)
+
+    def read(self):
+        """Returns the entries of the manifest, by key, if they are still
+        valid.
+        """
+
+        try:
+            with open(self.filename) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        header = self.header()
+        if any(manifest.get(k) != header[k] for k in ('version', 'qgisVersion', 'locale', 'dependencies')):
+            return {}
+        if header['icons'] and not manifest.get('icons'):
+            return {}
+        return {entry['key']: entry for entry in manifest.get('algorithms', [])}
+
+    def write(self, entries):
+        manifest = self.header()
+        manifest['algorithms'] = entries
+        os.makedirs(self.folder, exist_ok=True)
+        # several processes may start at the same time, the file is
+        # replaced at once so none reads a partial manifest
+        tmp = '{}.{}.tmp'.format(self.filename, os.getpid())
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(manifest, f)
+            os.replace(tmp, self.filename)
+        except OSError as e:
+            QgsMessageLog.logMessage(tr('Could not write the algorithm manifest {0}: {1}').format(self.filename, str(e)),
+                                     tr('Processing'), QgsMessageLog.WARNING)
+
+    def algorithms(self):
+        """Returns the algorithms to register, LazyAlgorithm instances for
+        the ones described in the manifest.
+        """
+
+        cached = self.read()
+        entries = []
+        algs = []
+        changed = len(cached) != len(self.sources)
+        for key, path in self.sources:
+            mtime = modificationTime(path)
+            entry = cached.get(key)
+            alg = None
+            if entry is None or entry['mtime'] != mtime:
+                changed = True
+                alg = self.factory(key)
+                if alg is None:
+                    continue
+                entry = self.describe(key, mtime, alg)
+            entries.append(entry)
+            if entry['lazy']:
+                algs.append(LazyAlgorithm(entry, self.factory))
+            else:
+                algs.append(alg or self.factory(key))
+        if changed:
+            self.write(entries)
+        return [alg for alg in algs if alg is not None]
+
+    def describe(self, key, mtime, alg):
+        """Returns the manifest entry of alg."""
+
+        entry = {'key': key, 'mtime': mtime, 'lazy': False}
+        try:
+            alg.initAlgorithm()
+            parameters = []
+            for param in alg.parameterDefinitions():
+                definition = param.toVariantMap()
+                # parameters defined in Python can not be created again
+                copy = QgsProcessingParameters.parameterFromVariantMap(definition)
+                if copy is None or copy.type() != param.type():
+                    return entry
+                parameters.append(definition)
+            outputs = []
+            for output in alg.outputDefinitions():
+                if output.type() not in OUTPUT_CLASSES:
+                    return entry
+                definition = {'type': output.type(), 'name': output.name(), 'description': output.description()}
+                if isinstance(output, QgsProcessingOutputVectorLayer):
+                    definition['dataType'] = int(output.dataType())
+                outputs.append(definition)
+            description = {'name': alg.name(),
+                           'displayName': alg.displayName(),
+                           'group': alg.group(),
+                           'tags': list(alg.tags()),
+                           'flags': int(alg.flags()),
+                           'shortHelp': alg.shortHelpString(),
+                           'helpUrl': alg.helpUrl(),
+                           'svgIconPath': alg.svgIconPath(),
+                           'icon': self.saveIcon(alg),
+                           'parameters': parameters,
+                           'outputs': outputs}
+            # check the entry can be written before using it
+            description = json.loads(json.dumps(description, default=_plainValue))
+        except Exception:
+            return entry
+        entry.update(description)
+        entry['lazy'] = True
+        return entry
+
+    def saveIcon(self, alg):
+        if not self.saveIcons():
+            return None
+        # algorithms without their own icon use the one of the algorithm
+        # class, which the LazyAlgorithm instance draws as well
+        if type(alg).icon is QgsProcessingAlgorithm.icon:
+            return None
+        pixmap = alg.icon().pixmap(ICON_SIZE)
+        if pixmap.isNull():
+            return None
+        folder = os.path.join(self.folder, 'icons')
+        os.makedirs(folder, exist_ok=True)
+        name = hashlib.sha1('{}:{}'.format(self.providerId, alg.name()).encode('utf-8')).hexdigest()
+        filename = os.path.join(folder, '{}.png'.format(name))
+        if not pixmap.save(filename):
+            return None
+        return filename
@@ -0,0 +1,480 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    BatchExecutor.py
+    ---------------------
+    Date                 : October 2026
+    Copyright            : (C) 2026 by QGIS Development Team
+    Email                : qgis-developer at lists dot osgeo dot org
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'QGIS Development Team'
+__date__ = 'October 2026'
+__copyright__ = '(C) 2026, QGIS Development Team'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+import os
+import sys
+import time
+import multiprocessing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from qgis.PyQt.QtCore import QCoreApplication
+from qgis.core import (QgsApplication,
+                       QgsProject,
+                       QgsMapLayer,
+                       QgsProcessingContext,
+                       QgsProcessingFeedback,
+                       QgsProcessingException,
+                       QgsProcessingParameterDefinition,
+                       QgsProcessingOutputLayerDefinition)
+
+from processing.core.ProcessingConfig import ProcessingConfig
+from processing.gui.AlgorithmExecutor import execute
+from processing.tools import dataobjects
+
+# interval in seconds at which running rows are polled
+POLL_INTERVAL = 0.05
+
+
+class BatchRow(object):
+    """Parameters and outcome of a row of a batch execution."""
+
+    def __init__(self, index, parameters):
+        self.index = index
+        self.parameters = parameters
+        self.ok = None
+        self.results = {}
+        self.error = None
+        self.attempts = 0
+        self.elapsed = 0.0
+        self.progress = 0.0
+
+
+class RowQueue(object):
+    """Rows waiting to be run.
+
+    Rows are created from the parameter maps only when they are about to
+    run, so parameterList can be a generator building the inputs of each
+    row on demand. Rows to retry are run before new ones.
+    """
+
+    def __init__(self, parameterList, count=None):
+        self.rows = []
+        self.count = count
+        self._parameters = iter(parameterList)
+        self._retries = deque()
+        self._next = None
+
+    def __bool__(self):
+        if self._retries or self._next is not None:
+            return True
+        try:
+            self._next = BatchRow(len(self.rows), next(self._parameters))
+        except StopIteration:
+            return False
+        self.rows.append(self._next)
+        return True
+
+    def popleft(self):
+        if self._retries:
+            return self._retries.popleft()
+        if not self:
+            raise IndexError('pop from an empty queue')
+        row, self._next = self._next, None
+        return row
+
+    def append(self, row):
+        self._retries.append(row)
+
+    def clear(self):
+        self._retries.clear()
+        self._parameters = iter(())
+        if self._next is not None:
+            self.rows.remove(self._next)
+            self._next = None
+
+    def total(self):
+        """Number of rows, if known, or of rows created so far."""
+        return max(self.count or 0, len(self.rows))
+
+
+class RowFeedback(QgsProcessingFeedback):
+    """Feedback of a row running in a worker thread.
+
+    Messages are queued and replayed on the batch feedback from the main
+    thread, once the row has finished.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.messages = deque()
+        self.lastError = None
+        self.progressChanged.connect(self._setProgress)
+        self.progress = 0.0
+
+    def _setProgress(self, progress):
+        self.progress = progress
+
+    def setProgressText(self, text):
+        self.messages.append(('setProgressText', text))
+
+    def reportError(self, error):
+        self.lastError = error
+        self.messages.append(('reportError', error))
+
+    def pushInfo(self, info):
+        self.messages.append(('pushInfo', info))
+
+    def pushCommandInfo(self, info):
+        self.messages.append(('pushCommandInfo', info))
+
+    def pushDebugInfo(self, info):
+        self.messages.append(('pushDebugInfo', info))
+
+    def pushConsoleInfo(self, info):
+        self.messages.append(('pushConsoleInfo', info))
+
+    def replay(self, feedback):
+        while self.messages:
+            method, text = self.messages.popleft()
+            getattr(feedback, method)(text)
+
+
+class BatchExecutor(object):
+    """Runs an algorithm over a list of parameter sets.
+
+    Rows are run one after the other in the main thread, or concurrently
+    by a pool of threads or of processes. The thread mode is only used for
+    algorithms flagged as thread safe (see canRunInThreads), the others
+    are run one row after the other. In the process mode each worker runs
+    a headless QGIS application, so all the inputs and outputs of the rows
+    must be files or database sources, not layers of the project nor
+    memory or temporary outputs. Failed rows are run again up to retries
+    times, then the execution stops if stopOnError is True.
+    """
+
+    SEQUENTIAL = 0
+    THREADS = 1
+    PROCESSES = 2
+
+    def __init__(self, alg, context, feedback, workers=1, mode=THREADS, retries=0, stopOnError=True):
+        self.alg = alg
+        self.context = context
+        self.feedback = feedback
+        self.workers = max(1, workers)
+        self.mode = mode if self.workers > 1 else self.SEQUENTIAL
+        self.retries = max(0, retries)
+        self.stopOnError = stopOnError
+
+    @staticmethod
+    def fromSettings(alg, context, feedback):
+        """Creates an executor using the batch settings of Processing."""
+
+        return BatchExecutor(alg, context, feedback,
+                             int(ProcessingConfig.getSetting(ProcessingConfig.MAX_THREADS) or 1),
+                             ProcessingConfig.getSetting(ProcessingConfig.BATCH_EXECUTION_MODE) or 0,
+                             int(ProcessingConfig.getSetting(ProcessingConfig.BATCH_RETRIES) or 0),
+                             bool(ProcessingConfig.getSetting(ProcessingConfig.BATCH_STOP_ON_ERROR)))
+
+    def execute(self, parameterList, rowStarted=None, rowFinished=None, count=None):
+        """Runs all the rows and returns the list of BatchRow.
+
+        parameterList can be any iterable of parameter maps, it is consumed
+        as the rows are started. count is the number of rows, used to report
+        the progress when parameterList has no length.
+
+        rowStarted and rowFinished, if given, are called in the main thread
+        with the BatchRow when each attempt of a row starts and finishes.
+        """
+
+        if count is None and hasattr(parameterList, '__len__'):
+            count = len(parameterList)
+        queue = RowQueue(parameterList, count)
+        if self.mode == self.THREADS and canRunInThreads(self.alg):
+            self._executeInThreads(queue, rowStarted, rowFinished)
+        elif self.mode == self.PROCESSES:
+            self._executeInProcesses(queue, rowStarted, rowFinished)
+        else:
+            self._executeSequentially(queue, rowStarted, rowFinished)
+        return queue.rows
+
+    def _executeSequentially(self, queue, rowStarted, rowFinished):
+        while queue and not self.feedback.isCanceled():
+            row = queue.popleft()
+            row.attempts += 1
+            if rowStarted is not None:
+                rowStarted(row)
+            start = time.time()
+            row.ok, row.results = execute(self.alg, row.parameters, self.context, self.feedback)
+            row.elapsed = time.time() - start
+            if not row.ok:
+                row.error = tr('Execution failed')
+            self._rowFinished(row, queue, rowFinished)
+
+    def _executeInThreads(self, queue, rowStarted, rowFinished):
+        running = {}
+
+        def run(row, alg, context, feedback):
+            try:
+                return True, alg.runPrepared(row.parameters, context, feedback)
+            except QgsProcessingException as e:
+                feedback.reportError(e.msg)
+            except Exception as e:
+                feedback.reportError(str(e))
+            return False, {}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while queue or running:
+                if self.feedback.isCanceled():
+                    for _, _, feedback, _, _ in running.values():
+                        feedback.cancel()
+                    queue.clear()
+
+                # algorithms must be prepared in the main thread
+                while queue and len(running) < self.workers:
+                    row = queue.popleft()
+                    row.attempts += 1
+                    if rowStarted is not None:
+                        rowStarted(row)
+                    feedback = RowFeedback()
+                    context = dataobjects.createContext(feedback)
+                    alg = self.alg.create()
+                    start = time.time()
+                    if not alg.prepare(row.parameters, context, feedback):
+                        feedback.replay(self.feedback)
+                        row.ok, row.results, row.elapsed = False, {}, time.time() - start
+                        row.error = feedback.lastError or tr('Invalid parameters')
+                        self._rowFinished(row, queue, rowFinished)
+                        continue
+                    running[pool.submit(run, row, alg, context, feedback)] = (row, alg, feedback, context, start)
+
+                for future in [f for f in running if f.done()]:
+                    row, alg, feedback, context, start = running.pop(future)
+                    row.ok, row.results = future.result()
+                    if row.ok and not feedback.isCanceled():
+                        row.results = alg.postProcess(context, feedback) or row.results
+                    else:
+                        row.ok = False
+                        row.error = feedback.lastError or tr('Execution failed')
+                    self.context.takeResultsFrom(context)
+                    row.elapsed = time.time() - start
+                    feedback.replay(self.feedback)
+                    self._rowFinished(row, queue, rowFinished)
+
+                for row, _, feedback, _, _ in running.values():
+                    row.progress = feedback.progress
+                self._setProgress(queue)
+                if running:
+                    QCoreApplication.processEvents()
+                    time.sleep(POLL_INTERVAL)
+
+    def _executeInProcesses(self, queue, rowStarted, rowFinished):
+        running = {}
+
+        ctx = multiprocessing.get_context('spawn')
+        ctx.set_executable(pythonExecutable())
+        pool = ctx.Pool(self.workers, initializer=initializeWorker,
+                        initargs=(QgsApplication.prefixPath(), sys.path))
+        try:
+            while queue or running:
+                if self.feedback.isCanceled():
+                    pool.terminate()
+                    return
+
+                while queue and len(running) < self.workers:
+                    row = queue.popleft()
+                    row.attempts += 1
+                    if rowStarted is not None:
+                        rowStarted(row)
+                    # the layers written in memory or in the temporary folder
+                    # of a worker would be lost with it
+                    if hasTemporaryOutputs(self.alg, row.parameters):
+                        row.ok, row.results = False, {}
+                        row.error = tr('Memory and temporary outputs can not be used when running rows '
+                                       'in parallel processes')
+                        self.feedback.reportError(row.error)
+                        self._rowFinished(row, queue, rowFinished, False)
+                        continue
+                    # algorithms run in separate processes do not have access
+                    # to the project, so references to its layers are
+                    # replaced by their sources
+                    if not hasattr(row, 'command'):
+                        row.command = self.alg.asPythonCommand(portableParameters(row.parameters), self.context)
+                    running[row.index] = (row, pool.apply_async(runInWorker, (row.command, )), time.time())
+
+                for index in [i for i, (_, result, _) in running.items() if result.ready()]:
+                    row, result, start = running.pop(index)
+                    row.ok, row.results, messages = result.get()
+                    for method, text in messages:
+                        getattr(self.feedback, method)(text)
+                        if method == 'reportError':
+                            row.error = text
+                    if row.ok:
+                        self._loadOnCompletion(row)
+                    row.elapsed = time.time() - start
+                    row.progress = 100.0
+                    self._rowFinished(row, queue, rowFinished)
+
+                self._setProgress(queue)
+                if running:
+                    QCoreApplication.processEvents()
+                    time.sleep(POLL_INTERVAL)
+        finally:
+            pool.close()
+            pool.join()
+
+    def _loadOnCompletion(self, row):
+        """Loads the file outputs of a row run in another process, as it
+        would have been done if it had been run in this one.
+        """
+
+        layers = self.context.layersToLoadOnCompletion()
+        for out in self.alg.destinationParameterDefinitions():
+            value = row.parameters.get(out.name())
+            result = row.results.get(out.name())
+            if isinstance(value, QgsProcessingOutputLayerDefinition) and value.destinationProject and result:
+                layers[result] = QgsProcessingContext.LayerDetails(out.description(), value.destinationProject)
+        self.context.setLayersToLoadOnCompletion(layers)
+
+    def _rowFinished(self, row, queue, rowFinished, retry=True):
+        if row.ok:
+            row.progress = 100.0
+            row.error = None
+        elif retry and row.attempts <= self.retries and not self.feedback.isCanceled():
+            row.progress = 0.0
+            queue.append(row)
+        elif self.stopOnError:
+            # the rows which are running are completed, no other one starts
+            queue.clear()
+        if rowFinished is not None:
+            rowFinished(row)
+
+    def _setProgress(self, queue):
+        if queue.total():
+            self.feedback.setProgress(sum(row.progress for row in queue.rows) / queue.total())
+
+
+def canRunInThreads(alg):
+    """Returns True if rows of alg can run concurrently in worker threads.
+
+    Algorithms declare it with a threadSafe attribute set to True, when
+    they only use their parameters, context and feedback, and neither the
+    project, the interface nor any global state.
+    """
+
+    return bool(getattr(alg, 'threadSafe', False))
+
+
+def hasTemporaryOutputs(alg, parameters):
+    """Returns True if some outputs of alg are written to memory layers or
+    to temporary files in parameters.
+    """
+
+    for out in alg.destinationParameterDefinitions():
+        value = parameters.get(out.name())
+        if isinstance(value, QgsProcessingOutputLayerDefinition):
+            value = value.sink.staticValue()
+        if value is None and out.flags() & QgsProcessingParameterDefinition.FlagOptional:
+            # the output is skipped
+            continue
+        if not value or str(value).startswith('memory:'):
+            return True
+    return False
+
+
+def portableParameters(parameters):
+    """Replaces the layers of the project in a parameter map by their
+    sources, so it can be used in another process.
+    """
+
+    project = QgsProject.instance()
+    portable = {}
+    for name, value in parameters.items():
+        if isinstance(value, QgsMapLayer):
+            value = value.source()
+        elif isinstance(value, str) and project.mapLayer(value) is not None:
+            value = project.mapLayer(value).source()
+        portable[name] = value
+    return portable
+
+
+def pythonExecutable():
+    """Returns the Python interpreter to start the worker processes with,
+    which is not sys.executable when Python is embedded in QGIS.
+    """
+
+    if os.path.basename(sys.executable).lower().startswith('python'):
+        return sys.executable
+    if sys.platform == 'win32':
+        return os.path.join(sys.exec_prefix, 'python.exe')
+    return os.path.join(sys.exec_prefix, 'bin', 'python{}'.format(sys.version_info[0]))
+
+
+_app = None
+
+
+def initializeWorker(prefixPath, path):
+    """Starts a headless QGIS application in a worker process."""
+
+    global _app
+    sys.path = path
+    QgsApplication.setPrefixPath(prefixPath, True)
+    _app = QgsApplication([], False)
+    _app.initQgis()
+    from processing.core.Processing import Processing
+    Processing.initialize()
+
+
+def runInWorker(command):
+    """Runs a processing.run() command in a worker process, returns the
+    success, the results and the messages pushed to the feedback.
+    """
+
+    feedback = RowFeedback()
+    context = dataobjects.createContext(feedback)
+    results = {}
+
+    def run(algOrName, parameters, *args, **kwargs):
+        from processing.core.Processing import Processing
+        results.update(Processing.runAlgorithm(algOrName, parameters, lambda *a: None, feedback, context))
+        return results
+
+    namespace = {}
+    exec('from qgis.core import QgsProcessingOutputLayerDefinition, QgsProcessingFeatureSourceDefinition', namespace)
+    namespace['processing'] = type('processing', (object, ), {'run': staticmethod(run)})
+    ok = True
+    try:
+        exec(command, namespace)
+    except Exception as e:
+        feedback.reportError(str(e))
+        ok = False
+
+    # only plain values can be sent back to the main process
+    plain = {}
+    for name, value in results.items():
+        if isinstance(value, QgsMapLayer):
+            value = value.source()
+        elif not isinstance(value, (str, int, float, bool, type(None))):
+            value = str(value)
+        plain[name] = value
+    return ok, plain, list(feedback.messages)
+
+
+def tr(string, context=''):
+    if context == '':
+        context = 'BatchExecutor'
+    return QCoreApplication.translate(context, string)
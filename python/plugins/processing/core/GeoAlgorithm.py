@@ -46,6 +46,7 @@ from qgis.core import (QgsProcessingFeedback,
 from qgis.gui import QgsHelp
 
 from processing.core.ProcessingConfig import ProcessingConfig
+from processing.core import ProcessingProfiler
 from processing.core.parameters import ParameterRaster, ParameterVector, ParameterMultipleInput, ParameterTable, Parameter
 from processing.core.outputs import OutputVector, OutputRaster, OutputTable, OutputHTML, Output
 from processing.algs.gdal.GdalUtils import GdalUtils
@@ -116,14 +117,24 @@ class GeoAlgorithm(QgsProcessingAlgorithm):
             context = dataobjects.createContext(feedback)
 
         self.model = model
+        # when run from AlgorithmExecutor.execute the execution is already
+        # being profiled, and its phases include this one
+        profile = None
+        if ProcessingProfiler.runningProfile(context) is None:
+            profile = ProcessingProfiler.startProfile(self, parameters, context)
+        if profile is not None:
+            profile.start()
         try:
-            self.setOutputCRS()
-            self.resolveOutputs()
-            self.runPreExecutionScript(feedback)
-            self.processAlgorithm(parameters, context, feedback)
+            with ProcessingProfiler.phase(profile, 'prepare'):
+                self.setOutputCRS()
+                self.resolveOutputs()
+                self.runPreExecutionScript(feedback)
+            with ProcessingProfiler.phase(profile, 'processAlgorithm'):
+                self.processAlgorithm(parameters, context, feedback)
             feedback.setProgress(100)
-            self.convertUnsupportedFormats(context, feedback)
-            self.runPostExecutionScript(feedback)
+            with ProcessingProfiler.phase(profile, 'writeOutputs'):
+                self.convertUnsupportedFormats(context, feedback)
+                self.runPostExecutionScript(feedback)
         except QgsProcessingException as gaee:
             lines = [self.tr('Error while executing algorithm')]
             lines.append(traceback.format_exc())
@@ -136,6 +147,9 @@ class GeoAlgorithm(QgsProcessingAlgorithm):
             lines.append(traceback.format_exc())
             QgsMessageLog.logMessage('\n'.join(lines), self.tr('Processing'), QgsMessageLog.CRITICAL)
             raise QgsProcessingException(str(e) + self.tr('\nSee log for more details'), lines, e)
+        finally:
+            if profile is not None:
+                profile.finish(feedback)
 
     def runPostExecutionScript(self, feedback):
         scriptFile = ProcessingConfig.getSetting(
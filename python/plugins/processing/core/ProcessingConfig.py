@@ -67,6 +67,20 @@ class ProcessingConfig(object):
     DEFAULT_OUTPUT_VECTOR_LAYER_EXT = 'DEFAULT_OUTPUT_VECTOR_LAYER_EXT'
     SHOW_PROVIDERS_TOOLTIP = 'SHOW_PROVIDERS_TOOLTIP'
     MODELS_SCRIPTS_REPO = 'MODELS_SCRIPTS_REPO'
+    MAX_THREADS = 'MAX_THREADS'
+    HISTORY_MAX_ENTRIES = 'HISTORY_MAX_ENTRIES'
+    HISTORY_MAX_AGE = 'HISTORY_MAX_AGE'
+    PROFILE_ALGORITHMS = 'PROFILE_ALGORITHMS'
+    PROFILE_PYTHON_CALLS = 'PROFILE_PYTHON_CALLS'
+    PROFILE_MEMORY = 'PROFILE_MEMORY'
+    PROFILES_FOLDER = 'PROFILES_FOLDER'
+    BATCH_EXECUTION_MODE = 'BATCH_EXECUTION_MODE'
+    BATCH_RETRIES = 'BATCH_RETRIES'
+    BATCH_STOP_ON_ERROR = 'BATCH_STOP_ON_ERROR'
+    MERGE_ITERATION_OUTPUTS = 'MERGE_ITERATION_OUTPUTS'
+    EXPORT_CACHE_SIZE = 'EXPORT_CACHE_SIZE'
+    EXPORT_FORMAT = 'EXPORT_FORMAT'
+    NETWORK_GRAPH_CACHE_SIZE = 'NETWORK_GRAPH_CACHE_SIZE'
 
     settings = {}
     settingIcons = {}
@@ -151,6 +165,75 @@ class ProcessingConfig(object):
             ProcessingConfig.MODELS_SCRIPTS_REPO,
             ProcessingConfig.tr('Scripts and models repository'),
             'https://raw.githubusercontent.com/qgis/QGIS-Processing/master'))
+        ProcessingConfig.addSetting(Setting(
+            ProcessingConfig.tr('General'),
+            ProcessingConfig.MAX_THREADS,
+            ProcessingConfig.tr('Max number of threads for algorithms supporting parallel execution'), 1))
+        ProcessingConfig.addSetting(Setting(
+            ProcessingConfig.tr('General'),
+            ProcessingConfig.HISTORY_MAX_ENTRIES,
+            ProcessingConfig.tr('Max number of entries kept in the history (0 = no limit)'), 10000))
+        ProcessingConfig.addSetting(Setting(
+            ProcessingConfig.tr('General'),
+            ProcessingConfig.HISTORY_MAX_AGE,
+            ProcessingConfig.tr('Max age in days of the entries kept in the history (0 = no limit)'), 0))
+        ProcessingConfig.addSetting(Setting(
+            ProcessingConfig.tr('General'),
+            ProcessingConfig.PROFILE_ALGORITHMS,
+            ProcessingConfig.tr('Profile algorithm executions'), False))
+        ProcessingConfig.addSetting(Setting(
+            ProcessingConfig.tr('General'),
+            ProcessingConfig.PROFILE_PYTHON_CALLS,
+            ProcessingConfig.tr('Include Python function calls in profiles (slow)'), False))
+        ProcessingConfig.addSetting(Setting(
+            ProcessingConfig.tr('General'),
+            ProcessingConfig.PROFILE_MEMORY,
+            ProcessingConfig.tr('Include Python memory allocations in profiles (slow)'), False))
+        ProcessingConfig.addSetting(Setting(
+            ProcessingConfig.tr('General'),
+            ProcessingConfig.PROFILES_FOLDER,
+            ProcessingConfig.tr('Profiles folder (leave blank to use the user folder)'), '',
+            valuetype=Setting.FOLDER))
+
+        batchModeOptions = [ProcessingConfig.tr('Run rows one after the other'),
+                            ProcessingConfig.tr('Run rows in parallel threads'),
+                            ProcessingConfig.tr('Run rows in parallel processes (file inputs and outputs only)')]
+        ProcessingConfig.addSetting(Setting(
+            ProcessingConfig.tr('General'),
+            ProcessingConfig.BATCH_EXECUTION_MODE,
+            ProcessingConfig.tr('Batch execution (parallel modes use the max number of threads)'),
+            batchModeOptions[1],
+            valuetype=Setting.SELECTION,
+            options=batchModeOptions))
+        ProcessingConfig.addSetting(Setting(
+            ProcessingConfig.tr('General'),
+            ProcessingConfig.BATCH_RETRIES,
+            ProcessingConfig.tr('Number of retries of failed batch rows'), 0))
+        ProcessingConfig.addSetting(Setting(
+            ProcessingConfig.tr('General'),
+            ProcessingConfig.BATCH_STOP_ON_ERROR,
+            ProcessingConfig.tr('Stop batch execution when a row fails'), True))
+        ProcessingConfig.addSetting(Setting(
+            ProcessingConfig.tr('General'),
+            ProcessingConfig.MERGE_ITERATION_OUTPUTS,
+            ProcessingConfig.tr('Merge the vector outputs of iterations over features into a single layer'), False))
+        ProcessingConfig.addSetting(Setting(
+            ProcessingConfig.tr('General'),
+            ProcessingConfig.EXPORT_CACHE_SIZE,
+            ProcessingConfig.tr('Size of the cache of layers exported for external tools (MB, 0 to disable)'), 512))
+        exportFormatOptions = [ProcessingConfig.tr('ESRI Shapefile'),
+                               ProcessingConfig.tr('GeoPackage (if supported by the tool)')]
+        ProcessingConfig.addSetting(Setting(
+            ProcessingConfig.tr('General'),
+            ProcessingConfig.EXPORT_FORMAT,
+            ProcessingConfig.tr('Format of the layers exported for external tools'),
+            exportFormatOptions[0],
+            valuetype=Setting.SELECTION,
+            options=exportFormatOptions))
+        ProcessingConfig.addSetting(Setting(
+            ProcessingConfig.tr('General'),
+            ProcessingConfig.NETWORK_GRAPH_CACHE_SIZE,
+            ProcessingConfig.tr('Size of the disk cache of network analysis graphs (MB, 0 to disable)'), 0))
 
         invalidFeaturesOptions = [ProcessingConfig.tr('Do not filter (better performance)'),
                                   ProcessingConfig.tr('Ignore features with invalid geometries'),
@@ -16,7 +16,6 @@
 *                                                                         *
 ***************************************************************************
 """
-from builtins import range
 from builtins import object
 
 __author__ = 'Victor Olaya'
@@ -28,88 +27,217 @@ __copyright__ = '(C) 2012, Victor Olaya'
 __revision__ = '$Format:%H$'
 
 import os
+import sys
 import codecs
 import datetime
+import json
+import sqlite3
+import threading
+import time
+try:
+    import resource
+except ImportError:
+    resource = None
+
 from processing.tools.system import userFolder
 from processing.core.ProcessingConfig import ProcessingConfig
 from qgis.PyQt.QtCore import QCoreApplication
 
 
 class ProcessingLog(object):
+    """Execution history, stored in an SQLite database in the user folder.
+
+    Entries are only ever appended, and later completed with the status and
+    statistics of the execution. Old entries are removed according to the
+    HISTORY_MAX_ENTRIES and HISTORY_MAX_AGE settings.
+    """
 
     DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
-    recentAlgs = []
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+    # retention is applied every PRUNE_INTERVAL new entries
+    PRUNE_INTERVAL = 100
+
+    _connection = None
+    _lock = threading.Lock()
+    _added = 0
 
     @staticmethod
     def logFilename():
-        logFilename = userFolder() + os.sep + 'processing.log'
-        if not os.path.isfile(logFilename):
-            with codecs.open(logFilename, 'w', encoding='utf-8') as logfile:
-                logfile.write('Started logging at ' +
-                              datetime.datetime.now().strftime(ProcessingLog.DATE_FORMAT) + '\n')
+        return userFolder() + os.sep + 'processing_history.db'
+
+    @staticmethod
+    def _db():
+        if ProcessingLog._connection is None:
+            con = sqlite3.connect(ProcessingLog.logFilename(), check_same_thread=False)
+            con.execute('PRAGMA journal_mode=WAL')
+            new = con.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'history'").fetchone()[0] == 0
+            con.execute('''CREATE TABLE IF NOT EXISTS history (
+                               id INTEGER PRIMARY KEY AUTOINCREMENT,
+                               timestamp REAL NOT NULL,
+                               algorithm TEXT,
+                               command TEXT NOT NULL,
+                               parameters TEXT,
+                               status TEXT,
+                               wall_time REAL,
+                               cpu_time REAL,
+                               peak_memory INTEGER,
+                               feature_count INTEGER)''')
+            con.execute('CREATE INDEX IF NOT EXISTS history_timestamp ON history (timestamp)')
+            con.execute('CREATE INDEX IF NOT EXISTS history_algorithm ON history (algorithm, timestamp)')
+            if new:
+                ProcessingLog._importTextLog(con)
+            con.commit()
+            ProcessingLog._connection = con
+            ProcessingLog._prune()
+        return ProcessingLog._connection
+
+    @staticmethod
+    def _importTextLog(con):
+        """Imports the entries of the text log used by previous versions."""
 
-        return logFilename
+        filename = userFolder() + os.sep + 'processing.log'
+        if not os.path.isfile(filename):
+            return
+        rows = []
+        with codecs.open(filename, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                tokens = line.strip().split('|', 2)
+                if len(tokens) < 3 or tokens[0] != 'ALGORITHM':
+                    continue
+                try:
+                    timestamp = time.mktime(time.strptime(tokens[1], ProcessingLog.DATE_FORMAT))
+                except ValueError:
+                    continue
+                rows.append((timestamp, ProcessingLog._algorithmId(tokens[2]), tokens[2]))
+        con.executemany('INSERT INTO history (timestamp, algorithm, command) VALUES (?, ?, ?)', rows)
 
     @staticmethod
-    def addToLog(msg):
+    def _algorithmId(command):
+        try:
+            algname = command[len('processing.run("'):]
+            return algname[:algname.index('"')]
+        except ValueError:
+            return None
+
+    @staticmethod
+    def addToLog(msg, algorithm=None, parameters=None):
+        """Adds an execution to the history and returns the id of the new
+        entry, which can be completed with finishLogEntry().
+        """
+
         try:
             # It seems that this fails sometimes depending on the msg
             # added. To avoid it stopping the normal functioning of the
             # algorithm, we catch all errors, assuming that is better
             # to miss some log info than breaking the algorithm.
-            line = 'ALGORITHM|' + datetime.datetime.now().strftime(
-                ProcessingLog.DATE_FORMAT) + '|' \
-                + msg + '\n'
-            with codecs.open(ProcessingLog.logFilename(), 'a',
-                             encoding='utf-8') as logfile:
-                logfile.write(line)
-            algname = msg[len('processing.run("'):]
-            algname = algname[:algname.index('"')]
-            if algname not in ProcessingLog.recentAlgs:
-                ProcessingLog.recentAlgs.append(algname)
-                recentAlgsString = ';'.join(ProcessingLog.recentAlgs[-6:])
-                ProcessingConfig.setSettingValue(
-                    ProcessingConfig.RECENT_ALGORITHMS,
-                    recentAlgsString)
+            if algorithm is None:
+                algorithm = ProcessingLog._algorithmId(msg)
+            if parameters is not None:
+                parameters = json.dumps(parameters, default=str)
+            with ProcessingLog._lock:
+                con = ProcessingLog._db()
+                c = con.execute('INSERT INTO history (timestamp, algorithm, command, parameters, status) '
+                                'VALUES (?, ?, ?, ?, ?)',
+                                (time.time(), algorithm, msg, parameters, ProcessingLog.RUNNING))
+                con.commit()
+                ProcessingLog._added += 1
+                if ProcessingLog._added % ProcessingLog.PRUNE_INTERVAL == 0:
+                    ProcessingLog._prune()
+                return c.lastrowid
+        except:
+            return None
+
+    @staticmethod
+    def finishLogEntry(entryId, ok, wallTime=None, cpuTime=None, featureCount=None, peakMemory=None):
+        """Stores the status and statistics of an execution added with
+        addToLog(). The peak memory is how much the execution raised the
+        peak resident size of the process, in kB, as measured with
+        peakResidentSize() before and after it.
+        """
+
+        if entryId is None:
+            return
+        try:
+            with ProcessingLog._lock:
+                con = ProcessingLog._db()
+                con.execute('UPDATE history SET status = ?, wall_time = ?, cpu_time = ?, '
+                            'peak_memory = ?, feature_count = ? WHERE id = ?',
+                            (ProcessingLog.SUCCEEDED if ok else ProcessingLog.FAILED,
+                             wallTime, cpuTime, peakMemory, featureCount, entryId))
+                con.commit()
         except:
             pass
 
     @staticmethod
-    def getLogEntries():
-        entries = []
-
-        with open(ProcessingLog.logFilename()) as f:
-            lines = f.readlines()
-        for line in lines:
-            line = line.strip('\n').strip()
-            tokens = line.split('|')
-            text = ''
-            for i in range(2, len(tokens)):
-                text += tokens[i] + '|'
-            if line.startswith('ALGORITHM'):
-                entries.append(LogEntry(tokens[1], tokens[2]))
-
-        return entries
+    def peakResidentSize():
+        """Returns the peak resident size of the process so far, in kB, or
+        None if it is not available on this platform.
+        """
+
+        if resource is None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == 'darwin':
+            # reported in bytes instead of kB
+            peak //= 1024
+        return peak
+
+    @staticmethod
+    def _prune():
+        con = ProcessingLog._connection
+        maxEntries = int(ProcessingConfig.getSetting(ProcessingConfig.HISTORY_MAX_ENTRIES) or 0)
+        maxAge = int(ProcessingConfig.getSetting(ProcessingConfig.HISTORY_MAX_AGE) or 0)
+        if maxAge > 0:
+            con.execute('DELETE FROM history WHERE timestamp < ?', (time.time() - maxAge * 86400, ))
+        if maxEntries > 0:
+            con.execute('DELETE FROM history WHERE id <= '
+                        '(SELECT id FROM history ORDER BY id DESC LIMIT 1 OFFSET ?)', (maxEntries, ))
+        con.commit()
+
+    @staticmethod
+    def countLogEntries():
+        with ProcessingLog._lock:
+            return ProcessingLog._db().execute('SELECT COUNT(*) FROM history').fetchone()[0]
+
+    @staticmethod
+    def getLogEntries(limit=-1, offset=0):
+        """Returns the entries of the history, most recent first."""
+
+        with ProcessingLog._lock:
+            rows = ProcessingLog._db().execute(
+                'SELECT id, timestamp, algorithm, command, status, wall_time, cpu_time, '
+                'peak_memory, feature_count FROM history ORDER BY timestamp DESC, id DESC '
+                'LIMIT ? OFFSET ?', (limit, offset)).fetchall()
+        return [LogEntry(datetime.datetime.fromtimestamp(row[1]).strftime(ProcessingLog.DATE_FORMAT),
+                         row[3], row[0], *row[4:], algorithm=row[2])
+                for row in rows]
 
     @staticmethod
     def getRecentAlgorithms():
-        recentAlgsSetting = ProcessingConfig.getSetting(
-            ProcessingConfig.RECENT_ALGORITHMS)
         try:
-            ProcessingLog.recentAlgs = recentAlgsSetting.split(';')
-        except:
-            pass
-        return ProcessingLog.recentAlgs
+            with ProcessingLog._lock:
+                rows = ProcessingLog._db().execute(
+                    'SELECT algorithm FROM history WHERE algorithm IS NOT NULL '
+                    'GROUP BY algorithm ORDER BY MAX(timestamp) DESC LIMIT 6').fetchall()
+        except sqlite3.Error:
+            return []
+        return [row[0] for row in rows]
 
     @staticmethod
     def clearLog():
-        os.unlink(ProcessingLog.logFilename())
+        with ProcessingLog._lock:
+            con = ProcessingLog._db()
+            con.execute('DELETE FROM history')
+            con.commit()
 
     @staticmethod
     def saveLog(fileName):
         entries = ProcessingLog.getLogEntries()
         with codecs.open(fileName, 'w', encoding='utf-8') as f:
-            for entry in entries:
+            for entry in reversed(entries):
                 f.write('ALGORITHM|%s|%s\n' % (entry.date, entry.text))
 
     @staticmethod
@@ -121,6 +249,14 @@ class ProcessingLog(object):
 
 class LogEntry(object):
 
-    def __init__(self, date, text):
+    def __init__(self, date, text, id=None, status=None, wallTime=None,
+                 cpuTime=None, peakMemory=None, featureCount=None, algorithm=None):
         self.date = date
         self.text = text
+        self.id = id
+        self.status = status
+        self.wallTime = wallTime
+        self.cpuTime = cpuTime
+        self.peakMemory = peakMemory
+        self.featureCount = featureCount
+        self.algorithm = algorithm
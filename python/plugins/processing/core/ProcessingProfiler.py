@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    ProcessingProfiler.py
+    ---------------------
+    Date                 : October 2026
+    Copyright            : (C) 2026 by QGIS Development Team
+    Email                : qgis-developer at lists dot osgeo dot org
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'QGIS Development Team'
+__date__ = 'October 2026'
+__copyright__ = '(C) 2026, QGIS Development Team'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+import os
+import re
+import json
+import time
+import cProfile
+import pstats
+import threading
+import tracemalloc
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from qgis.PyQt.QtCore import QCoreApplication
+from qgis.core import (QgsProcessingUtils,
+                       QgsProcessingParameterFeatureSource,
+                       QgsProcessingOutputVectorLayer)
+
+from processing.core.ProcessingConfig import ProcessingConfig
+from processing.tools.system import userFolder, mkdir
+
+# number of functions and allocation sites kept in the reports
+TOP_ENTRIES = 30
+
+# last profile of each context, released together with the context
+_profiles = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+class AlgorithmProfile(object):
+    """Timings and counters of an algorithm execution.
+
+    The execution is split in named phases, each one records its wall and
+    CPU time. Python calls and memory allocations are also recorded between
+    start() and finish() if enabled in the settings.
+    """
+
+    def __init__(self, alg, parameters):
+        self.algorithm = alg.id()
+        self.parameters = parameters
+        self.started = time.time()
+        self.phases = OrderedDict()
+        self.featuresRead = None
+        self.featuresWritten = None
+        self.pythonCalls = None
+        self.memory = None
+        self.reportPath = None
+        self._profiler = None
+        self._tracing = False
+        self.finished = False
+
+    def start(self):
+        if ProcessingConfig.getSetting(ProcessingConfig.PROFILE_PYTHON_CALLS):
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        if ProcessingConfig.getSetting(ProcessingConfig.PROFILE_MEMORY) and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+
+    @contextmanager
+    def phase(self, name):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            self.addPhase(name, time.perf_counter() - wall, time.process_time() - cpu)
+
+    def addPhase(self, name, wallTime, cpuTime=None):
+        self.phases[name] = {'wall_time': wallTime, 'cpu_time': cpuTime}
+
+    def countFeatures(self, alg, parameters, results, context):
+        """Counts the features of the input sources and of the vector
+        outputs of the algorithm.
+        """
+
+        for param in alg.parameterDefinitions():
+            if isinstance(param, QgsProcessingParameterFeatureSource) and parameters.get(param.name()) is not None:
+                source = alg.parameterAsSource(parameters, param.name(), context)
+                if source is not None and source.featureCount() >= 0:
+                    self.featuresRead = (self.featuresRead or 0) + source.featureCount()
+        for out in alg.outputDefinitions():
+            if isinstance(out, QgsProcessingOutputVectorLayer) and results.get(out.name()):
+                layer = QgsProcessingUtils.mapLayerFromString(results[out.name()], context)
+                if layer is not None:
+                    self.featuresWritten = (self.featuresWritten or 0) + layer.featureCount()
+
+    def finish(self, feedback=None):
+        """Stops the recording, writes the report and pushes a summary to
+        the feedback.
+        """
+
+        self.finished = True
+        if self._profiler is not None:
+            self._profiler.disable()
+            stats = pstats.Stats(self._profiler)
+            self.pythonCalls = []
+            for (filename, line, function), (_, calls, tottime, cumtime, _) in \
+                    sorted(stats.stats.items(), key=lambda s: s[1][3], reverse=True)[:TOP_ENTRIES]:
+                self.pythonCalls.append({'function': '{}:{}({})'.format(filename, line, function),
+                                         'calls': calls, 'total_time': tottime, 'cumulative_time': cumtime})
+            self._profiler = None
+
+        if self._tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            self.memory = {'current': current, 'peak': peak,
+                           'allocations': [{'location': str(stat.traceback), 'size': stat.size, 'count': stat.count}
+                                           for stat in snapshot.statistics('lineno')[:TOP_ENTRIES]]}
+            tracemalloc.stop()
+            self._tracing = False
+
+        self.writeReport()
+        if feedback is not None:
+            for line in self.summary():
+                feedback.pushInfo(line)
+
+    def throughput(self):
+        """Features processed per second of processAlgorithm, or None."""
+
+        features = max(self.featuresRead or 0, self.featuresWritten or 0)
+        phase = self.phases.get('processAlgorithm') or self.phases.get('run')
+        if not features or not phase or phase['wall_time'] <= 0:
+            return None
+        return features / phase['wall_time']
+
+    def report(self):
+        return OrderedDict([('algorithm', self.algorithm),
+                            ('started', time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started))),
+                            ('parameters', self.parameters),
+                            ('phases', self.phases),
+                            ('total_time', sum(p['wall_time'] for p in self.phases.values())),
+                            ('features_read', self.featuresRead),
+                            ('features_written', self.featuresWritten),
+                            ('features_per_second', self.throughput()),
+                            ('python_calls', self.pythonCalls),
+                            ('memory', self.memory)])
+
+    def writeReport(self):
+        if self.reportPath is None:
+            folder = ProcessingConfig.getSetting(ProcessingConfig.PROFILES_FOLDER) or \
+                os.path.join(userFolder(), 'profiles')
+            mkdir(folder)
+            name = '{}_{}_{}.json'.format(re.sub(r'\W', '_', self.algorithm),
+                                          time.strftime('%Y%m%d%H%M%S', time.localtime(self.started)),
+                                          id(self))
+            self.reportPath = os.path.join(folder, name)
+        with open(self.reportPath, 'w') as f:
+            json.dump(self.report(), f, indent=2, default=str)
+
+    def summary(self):
+        lines = [tr('Profile of {0}:').format(self.algorithm)]
+        for name, phase in self.phases.items():
+            if phase['cpu_time'] is None:
+                lines.append(tr('  {0}: {1:0.3f} seconds').format(name, phase['wall_time']))
+            else:
+                lines.append(tr('  {0}: {1:0.3f} seconds (CPU {2:0.3f} seconds)').format(
+                    name, phase['wall_time'], phase['cpu_time']))
+        if self.featuresRead is not None or self.featuresWritten is not None:
+            lines.append(tr('  {0} features read, {1} features written').format(
+                self.featuresRead or 0, self.featuresWritten or 0))
+        if self.throughput() is not None:
+            lines.append(tr('  {0:0.0f} features/s').format(self.throughput()))
+        if self.memory is not None:
+            lines.append(tr('  Peak Python memory: {0:0.1f} MB').format(self.memory['peak'] / 1048576.0))
+        lines.append(tr('  Report written to {0}').format(self.reportPath))
+        return lines
+
+
+def isProfilingEnabled():
+    return bool(ProcessingConfig.getSetting(ProcessingConfig.PROFILE_ALGORITHMS))
+
+
+def startProfile(alg, parameters, context):
+    """Returns a new profile for an execution of alg, or None if profiling is
+    disabled. The profile is associated to the context, so later phases like
+    the loading of the results can be added to it.
+    """
+
+    if not isProfilingEnabled():
+        return None
+    profile = AlgorithmProfile(alg, parameters)
+    with _lock:
+        _profiles[context] = profile
+    return profile
+
+
+def profileForContext(context):
+    """Returns the last profile started with context, or None."""
+
+    with _lock:
+        return _profiles.get(context)
+
+
+def runningProfile(context):
+    """Returns the profile started with context if it is not finished yet,
+    or None.
+    """
+
+    profile = profileForContext(context)
+    if profile is None or profile.finished:
+        return None
+    return profile
+
+
+@contextmanager
+def phase(profile, name):
+    """Records a phase in profile, which can be None."""
+
+    if profile is None:
+        yield
+    else:
+        with profile.phase(name):
+            yield
+
+
+def tr(string, context=''):
+    if context == '':
+        context = 'ProcessingProfiler'
+    return QCoreApplication.translate(context, string)
@@ -52,6 +52,7 @@ from qgis.utils import iface
 
 from processing.core.ProcessingLog import ProcessingLog
 from processing.core.ProcessingConfig import ProcessingConfig
+from processing.core import ProcessingProfiler
 from processing.core.ProcessingResults import resultsList
 from processing.gui.ParametersPanel import ParametersPanel
 from processing.gui.BatchAlgorithmDialog import BatchAlgorithmDialog
@@ -240,11 +241,27 @@ class AlgorithmDialog(AlgorithmDialogBase):
                     self.resetGUI()
             else:
                 command = self.alg.asPythonCommand(parameters, context)
+                logEntry = None
                 if command:
-                    ProcessingLog.addToLog(command)
+                    logEntry = ProcessingLog.addToLog(command, self.alg.id(), parameters)
                 self.buttonCancel.setEnabled(self.alg.flags() & QgsProcessingAlgorithm.FlagCanCancel)
+                start_cpu_time = time.process_time()
+                start_peak = ProcessingLog.peakResidentSize()
+                # the task runs all the steps of the algorithm at once, so
+                # only the whole execution can be timed
+                profile = ProcessingProfiler.startProfile(self.alg, parameters, context)
 
                 def on_complete(ok, results):
+                    peak = ProcessingLog.peakResidentSize()
+                    if profile is not None:
+                        profile.addPhase('run', time.time() - start_time, time.process_time() - start_cpu_time)
+                        if ok:
+                            profile.countFeatures(self.alg, parameters, results, context)
+                        profile.finish(feedback)
+                    ProcessingLog.finishLogEntry(logEntry, ok, time.time() - start_time,
+                                                 time.process_time() - start_cpu_time,
+                                                 self.outputFeatureCount(results, context) if ok else None,
+                                                 peak - start_peak if peak is not None else None)
                     if ok:
                         feedback.pushInfo(self.tr('Execution completed in {0:0.2f} seconds'.format(time.time() - start_time)))
                         feedback.pushInfo(self.tr('Results:'))
@@ -274,6 +291,18 @@ class AlgorithmDialog(AlgorithmDialogBase):
             self.bar.pushMessage("", self.tr("Wrong or missing parameter value: {0}").format(e.parameter.description()),
                                  level=QgsMessageBar.WARNING, duration=5)
 
+    def outputFeatureCount(self, results, context):
+        """Returns the total number of features of the vector outputs, or
+        None if the algorithm has no vector output.
+        """
+        count = None
+        for out in self.alg.outputDefinitions():
+            if isinstance(out, QgsProcessingOutputVectorLayer) and results.get(out.name()):
+                layer = QgsProcessingUtils.mapLayerFromString(results[out.name()], context)
+                if layer is not None:
+                    count = (count or 0) + layer.featureCount()
+        return count
+
     def finish(self, result, context, feedback):
         keepOpen = ProcessingConfig.getSetting(ProcessingConfig.KEEP_DIALOG_OPEN)
 
@@ -28,18 +28,23 @@ __copyright__ = '(C) 2012, Victor Olaya'
 __revision__ = '$Format:%H$'
 
 import sys
+import traceback
 from copy import deepcopy
 from qgis.PyQt.QtCore import QCoreApplication
 from qgis.core import (QgsFeature,
                        QgsVectorFileWriter,
                        QgsProcessingFeedback,
-                       QgsSettings,
                        QgsProcessingUtils,
                        QgsMessageLog,
                        QgsProperty,
                        QgsProcessingException,
                        QgsProcessingParameters,
-                       QgsProcessingOutputLayerDefinition)
+                       QgsProcessingParameterFeatureSink,
+                       QgsProcessingContext,
+                       QgsProcessingOutputLayerDefinition,
+                       QgsFeatureSink)
+from processing.core import ProcessingProfiler
+from processing.core.ProcessingConfig import ProcessingConfig
 from processing.gui.Postprocessing import handleAlgorithmResults
 from processing.tools import dataobjects
 from processing.tools.system import getTempFilename
@@ -58,61 +63,154 @@ def execute(alg, parameters, context=None, feedback=None):
     if context is None:
         context = dataobjects.createContext(feedback)
 
+    profile = ProcessingProfiler.startProfile(alg, parameters, context)
     try:
-        results, ok = alg.run(parameters, context, feedback)
-        return ok, results
+        if profile is None:
+            results, ok = alg.run(parameters, context, feedback)
+            return ok, results
+
+        # same steps as QgsProcessingAlgorithm.run(), timed separately
+        alg = alg.create()
+        profile.start()
+        try:
+            with profile.phase('prepare'):
+                ok = alg.prepare(parameters, context, feedback)
+            if not ok:
+                return False, {}
+            with profile.phase('processAlgorithm'):
+                results = alg.runPrepared(parameters, context, feedback)
+            with profile.phase('postProcess'):
+                results = alg.postProcess(context, feedback) or results
+            profile.countFeatures(alg, parameters, results, context)
+            return True, results
+        finally:
+            profile.finish(feedback)
     except QgsProcessingException as e:
         QgsMessageLog.logMessage(str(sys.exc_info()[0]), 'Processing', QgsMessageLog.CRITICAL)
         if feedback is not None:
             feedback.reportError(e.msg)
         return False, {}
+    except Exception as e:
+        # run() does not let errors raised by the algorithm through, so
+        # neither does the profiled execution
+        if profile is None:
+            raise
+        QgsMessageLog.logMessage(traceback.format_exc(), 'Processing', QgsMessageLog.CRITICAL)
+        if feedback is not None:
+            feedback.reportError(str(e))
+        return False, {}
+
+
+def executeIterating(alg, parameters, paramToIter, context, feedback, merge=None):
+    """Executes an algorithm once for each feature of the source parameter
+    paramToIter.
+
+    The single feature layer used as input of an iteration is only created
+    when the iteration starts and is released once it has finished, so the
+    number of layers alive is bounded by the number of iterations running
+    at once. Iterations are run as the rows of a batch, in parallel if set
+    so in the settings.
 
+    If merge is True, the features of the vector outputs of all iterations
+    are appended to a single layer written to the destination of each
+    output, instead of one layer per iteration. If merge is None the
+    setting is used.
 
-def executeIterating(alg, parameters, paramToIter, context, feedback):
-    # Generate all single-feature layers
-    settings = QgsSettings()
-    systemEncoding = settings.value('/UI/encoding', 'System')
+    Return true if every iteration was completed.
+    """
+    from processing.core.BatchExecutor import BatchExecutor
 
     parameter_definition = alg.parameterDefinition(paramToIter)
     if not parameter_definition:
         return False
 
     iter_source = QgsProcessingParameters.parameterAsSource(parameter_definition, parameters, context)
-    sink_list = []
-    if iter_source.featureCount() == 0:
+    if iter_source is None or iter_source.featureCount() == 0:
         return False
+    total = iter_source.featureCount()
 
-    total = 100.0 / iter_source.featureCount()
-    for current, feat in enumerate(iter_source.getFeatures()):
-        if feedback.isCanceled():
-            return False
-
-        sink, sink_id = QgsProcessingUtils.createFeatureSink('memory:', context, iter_source.fields(), iter_source.wkbType(), iter_source.sourceCrs())
-        sink_list.append(sink_id)
-        sink.addFeature(feat, QgsFeatureSink.FastInsert)
-        del sink
-
-        feedback.setProgress(int(current * total))
+    if merge is None:
+        merge = bool(ProcessingConfig.getSetting(ProcessingConfig.MERGE_ITERATION_OUTPUTS))
 
     # store output values to use them later as basenames for all outputs
     outputs = {}
+    merged = {}
     for out in alg.destinationParameterDefinitions():
         outputs[out.name()] = parameters[out.name()]
-
-    # now run all the algorithms
-    for i, f in enumerate(sink_list):
-        if feedback.isCanceled():
-            return False
-
-        parameters[paramToIter] = f
-        for out in alg.destinationParameterDefinitions():
-            o = outputs[out.name()]
-            parameters[out.name()] = QgsProcessingUtils.generateIteratingDestination(o, i, context)
-        feedback.setProgressText(tr('Executing iteration {0}/{1}...').format(i, len(sink_list)))
-        feedback.setProgress(i * 100 / len(sink_list))
-        ret, results = execute(alg, parameters, context, feedback)
-        if not ret:
-            return False
+        if merge and isinstance(out, QgsProcessingParameterFeatureSink):
+            merged[out.name()] = None
+
+    def iterations():
+        for i, feat in enumerate(iter_source.getFeatures()):
+            sink, sink_id = QgsProcessingUtils.createFeatureSink('memory:', context, iter_source.fields(),
+                                                                 iter_source.wkbType(), iter_source.sourceCrs())
+            sink.addFeature(feat, QgsFeatureSink.FastInsert)
+            del sink
+            # the layer is taken out of the context and only referenced by
+            # the parameters of the iteration, so it is deleted once they
+            # are released
+            store = context.temporaryLayerStore()
+            iterParameters = dict(parameters)
+            iterParameters[paramToIter] = store.takeMapLayer(store.mapLayer(sink_id))
+            for out in alg.destinationParameterDefinitions():
+                if out.name() in merged:
+                    iterParameters[out.name()] = 'memory:'
+                else:
+                    iterParameters[out.name()] = QgsProcessingUtils.generateIteratingDestination(
+                        outputs[out.name()], i, context)
+            yield iterParameters
+
+    def mergeResult(name, layerId):
+        layer = QgsProcessingUtils.mapLayerFromString(layerId, context)
+        if layer is None:
+            return
+        if merged[name] is None:
+            destination = outputs[name]
+            if isinstance(destination, QgsProcessingOutputLayerDefinition):
+                destination = destination.sink.staticValue()
+            merged[name] = QgsProcessingUtils.createFeatureSink(destination or 'memory:', context, layer.fields(),
+                                                                layer.wkbType(), layer.crs())
+        merged[name][0].addFeatures(layer.getFeatures(), QgsFeatureSink.FastInsert)
+        context.temporaryLayerStore().removeMapLayer(layer.id())
+
+    def rowStarted(row):
+        feedback.setProgressText(tr('Executing iteration {0}/{1}...').format(row.index + 1, total))
+
+    def rowFinished(row):
+        if row.ok:
+            for name in merged:
+                mergeResult(name, row.results.get(name))
+        if row.ok or row.attempts > executor.retries or feedback.isCanceled():
+            # the row will not run again
+            row.parameters = None
+
+    executor = BatchExecutor.fromSettings(alg, context, feedback)
+    if executor.mode == BatchExecutor.PROCESSES:
+        # the single feature layers only exist in this process
+        executor.mode = BatchExecutor.THREADS
+    rows = executor.execute(iterations(), rowStarted, rowFinished, total)
+
+    # close the merged layers: a sink is only flushed and closed once
+    # nothing references it anymore, so every reference is dropped before
+    # the layers are loaded
+    destinations = {}
+    for name in list(merged):
+        result = merged.pop(name)
+        if result is not None:
+            destinations[name] = result[1]
+        del result
+
+    # load them as the outputs of a single run
+    layersToLoad = context.layersToLoadOnCompletion()
+    for name, destination in destinations.items():
+        value = outputs[name]
+        if isinstance(value, QgsProcessingOutputLayerDefinition) and value.destinationProject:
+            layersToLoad[destination] = QgsProcessingContext.LayerDetails(
+                alg.parameterDefinition(name).description(), value.destinationProject)
+    context.setLayersToLoadOnCompletion(layersToLoad)
+
+    if feedback.isCanceled() or not all(row.ok for row in rows):
+        return False
 
     handleAlgorithmResults(alg, context, feedback, False)
     return True
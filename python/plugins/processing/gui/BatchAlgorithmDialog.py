@@ -46,7 +46,7 @@ from qgis.gui import QgsMessageBar
 
 from processing.gui.BatchPanel import BatchPanel
 from processing.gui.AlgorithmDialogBase import AlgorithmDialogBase
-from processing.gui.AlgorithmExecutor import execute
+from processing.core.BatchExecutor import BatchExecutor
 from processing.gui.Postprocessing import handleAlgorithmResults
 
 from processing.core.ProcessingResults import resultsList
@@ -55,6 +55,7 @@ from processing.tools.system import getTempFilename
 from processing.tools import dataobjects
 
 import codecs
+import html
 
 
 class BatchAlgorithmDialog(AlgorithmDialogBase):
@@ -132,43 +133,45 @@ class BatchAlgorithmDialog(AlgorithmDialogBase):
 
         start_time = time.time()
 
-        algorithm_results = []
-        for count, parameters in enumerate(alg_parameters):
-            if feedback.isCanceled():
-                break
-            self.setText(self.tr('\nProcessing algorithm {0}/{1}...').format(count + 1, len(alg_parameters)))
-            self.setInfo(self.tr('<b>Algorithm {0} starting...</b>').format(self.alg.displayName()), escape_html=False)
-
+        def rowStarted(row):
+            self.setText(self.tr('\nProcessing algorithm {0}/{1}...').format(row.index + 1, len(alg_parameters)))
+            self.setInfo(self.tr('<b>Algorithm {0} starting (row {1})...</b>').format(
+                self.alg.displayName(), row.index + 1), escape_html=False)
             feedback.pushInfo(self.tr('Input parameters:'))
-            feedback.pushCommandInfo(pformat(parameters))
+            feedback.pushCommandInfo(pformat(row.parameters))
             feedback.pushInfo('')
 
-            alg_start_time = time.time()
-            ret, results = execute(self.alg, parameters, context, feedback)
-            if ret:
-                self.setInfo(self.tr('Algorithm {0} correctly executed...').format(self.alg.displayName()), escape_html=False)
-                feedback.setProgress(100)
+        def rowFinished(row):
+            if row.ok:
+                self.setInfo(self.tr('Algorithm {0} correctly executed (row {1})...').format(
+                    self.alg.displayName(), row.index + 1), escape_html=False)
                 feedback.pushInfo(
-                    self.tr('Execution completed in {0:0.2f} seconds'.format(time.time() - alg_start_time)))
+                    self.tr('Execution completed in {0:0.2f} seconds'.format(row.elapsed)))
                 feedback.pushInfo(self.tr('Results:'))
-                feedback.pushCommandInfo(pformat(results))
+                feedback.pushCommandInfo(pformat(row.results))
                 feedback.pushInfo('')
-                algorithm_results.append(results)
             else:
-                break
+                feedback.reportError(self.tr('Row {0} failed after {1:0.2f} seconds (attempt {2})').format(
+                    row.index + 1, row.elapsed, row.attempts))
+
+        executor = BatchExecutor.fromSettings(self.alg, context, feedback)
+        rows = executor.execute(alg_parameters, rowStarted, rowFinished)
+        algorithm_results = [row.results for row in rows if row.ok]
 
         feedback.pushInfo(self.tr('Batch execution completed in {0:0.2f} seconds'.format(time.time() - start_time)))
 
         handleAlgorithmResults(self.alg, context, feedback, False)
 
-        self.finish(algorithm_results)
+        self.finish(algorithm_results, rows)
         self.buttonCancel.setEnabled(False)
 
-    def finish(self, algorithm_results):
+    def finish(self, algorithm_results, rows=None):
         for count, results in enumerate(algorithm_results):
             self.loadHTMLResults(results, count)
 
         self.createSummaryTable(algorithm_results)
+        if rows:
+            self.createRowsSummaryTable(rows)
         QApplication.restoreOverrideCursor()
 
         self.mainWidget.setEnabled(True)
@@ -203,3 +206,26 @@ class BatchAlgorithmDialog(AlgorithmDialogBase):
 
         resultsList.addResult(self.alg.icon(),
                               '{} [summary]'.format(self.alg.name()), outputFile)
+
+    def createRowsSummaryTable(self, rows):
+        outputFile = getTempFilename('html')
+        with codecs.open(outputFile, 'w', encoding='utf-8') as f:
+            f.write('<table border="1" cellpadding="3">\n')
+            f.write('<tr><th>{}</th><th>{}</th><th>{}</th><th>{}</th><th>{}</th></tr>\n'.format(
+                self.tr('Row'), self.tr('Status'), self.tr('Attempts'), self.tr('Time (s)'), self.tr('Error')))
+            for row in rows:
+                if row.ok:
+                    status = self.tr('OK')
+                elif row.attempts == 0:
+                    status = self.tr('Not run')
+                else:
+                    status = self.tr('Failed')
+                f.write('<tr><td>{}</td><td>{}</td><td>{}</td><td>{:0.2f}</td><td>{}</td></tr>\n'.format(
+                    row.index + 1, status, row.attempts, row.elapsed, html.escape(row.error or '')))
+            f.write('</table>\n')
+            succeeded = len([row for row in rows if row.ok])
+            f.write('<p>{}</p>\n'.format(self.tr('{0} of {1} rows succeeded, {2:0.2f} seconds of processing').format(
+                succeeded, len(rows), sum(row.elapsed for row in rows))))
+
+        resultsList.addResult(self.alg.icon(),
+                              '{} [rows]'.format(self.alg.name()), outputFile)
@@ -41,6 +41,9 @@ WIDGET, BASE = uic.loadUiType(
 
 class HistoryDialog(BASE, WIDGET):
 
+    # number of entries loaded at once, more are loaded when scrolling down
+    PAGE_SIZE = 200
+
     def __init__(self):
         super(HistoryDialog, self).__init__(None)
         self.setupUi(self)
@@ -69,6 +72,7 @@ class HistoryDialog(BASE, WIDGET):
 
         self.tree.setContextMenuPolicy(Qt.CustomContextMenu)
         self.tree.customContextMenuRequested.connect(self.showPopupMenu)
+        self.tree.verticalScrollBar().valueChanged.connect(self.scrolled)
 
         self.fillTree()
 
@@ -97,15 +101,25 @@ class HistoryDialog(BASE, WIDGET):
 
     def fillTree(self):
         self.tree.clear()
-        entries = ProcessingLog.getLogEntries()
-        groupItem = QTreeWidgetItem()
-        groupItem.setText(0, 'ALGORITHM')
-        groupItem.setIcon(0, self.groupIcon)
-        for entry in entries:
+        self.groupItem = QTreeWidgetItem()
+        self.groupItem.setText(0, 'ALGORITHM')
+        self.groupItem.setIcon(0, self.groupIcon)
+        self.tree.addTopLevelItem(self.groupItem)
+        self.entryCount = ProcessingLog.countLogEntries()
+        self.loadMore()
+
+    def loadMore(self):
+        loaded = self.groupItem.childCount()
+        if loaded >= self.entryCount:
+            return
+        for entry in ProcessingLog.getLogEntries(self.PAGE_SIZE, loaded):
             item = TreeLogEntryItem(entry, True)
             item.setIcon(0, self.keyIcon)
-            groupItem.insertChild(0, item)
-        self.tree.addTopLevelItem(groupItem)
+            self.groupItem.addChild(item)
+
+    def scrolled(self, value):
+        if value == self.tree.verticalScrollBar().maximum():
+            self.loadMore()
 
     def executeAlgorithm(self):
         item = self.tree.currentItem()
@@ -119,7 +133,21 @@ class HistoryDialog(BASE, WIDGET):
     def changeText(self):
         item = self.tree.currentItem()
         if isinstance(item, TreeLogEntryItem):
-            self.text.setText(item.entry.text.replace('|', '\n'))
+            entry = item.entry
+            text = entry.text.replace('|', '\n')
+            details = []
+            if entry.status:
+                details.append(self.tr('Status: {0}').format(entry.status))
+            if entry.wallTime is not None:
+                details.append(self.tr('Execution time: {0:0.2f} seconds (CPU {1:0.2f} seconds)').format(
+                    entry.wallTime, entry.cpuTime or 0))
+            if entry.peakMemory is not None:
+                details.append(self.tr('Peak memory increase: {0:0.1f} MB').format(entry.peakMemory / 1024.0))
+            if entry.featureCount is not None:
+                details.append(self.tr('Output features: {0}').format(entry.featureCount))
+            if details:
+                text += '\n\n' + '\n'.join(details)
+            self.text.setText(text)
 
     def createTest(self):
         item = self.tree.currentItem()
@@ -38,13 +38,28 @@ from qgis.core import (QgsProject,
                        QgsMessageLog)
 
 from processing.core.ProcessingConfig import ProcessingConfig
+from processing.core import ProcessingProfiler
 from processing.gui.RenderingStyles import RenderingStyles
 
 
 def handleAlgorithmResults(alg, context, feedback=None, showResults=True):
-    wrongLayers = []
     if feedback is None:
         feedback = QgsProcessingFeedback()
+    profile = ProcessingProfiler.profileForContext(context)
+    if profile is None:
+        return loadAlgorithmResults(alg, context, feedback)
+
+    with profile.phase('handleAlgorithmResults'):
+        ok = loadAlgorithmResults(alg, context, feedback)
+    profile.writeReport()
+    phase = profile.phases['handleAlgorithmResults']
+    feedback.pushInfo(QCoreApplication.translate('Postprocessing', 'Results loaded in {0:0.3f} seconds').format(
+        phase['wall_time']))
+    return ok
+
+
+def loadAlgorithmResults(alg, context, feedback):
+    wrongLayers = []
     feedback.setProgressText(QCoreApplication.translate('Postprocessing', 'Loading resulting layers'))
     i = 0
     for l, details in context.layersToLoadOnCompletion().items():
@@ -193,6 +193,10 @@ def removeAlgorithmEntry(alg, menuName, submenuName, actionText=None, delButton=
 
 
 def _executeAlgorithm(alg):
+    # the registered algorithm may only describe it, run a real instance
+    alg = QgsApplication.processingRegistry().createAlgorithmById(alg.id())
+    if not alg:
+        return
     ok, message = alg.canExecute()
     if not ok:
         dlg = MessageDialog()
@@ -27,6 +27,8 @@ __revision__ = ':%H$'
 
 import AlgorithmsTestBase
 from processing.algs.gdal.ogr2ogrtopostgis import Ogr2OgrToPostGis
+from processing.algs.gdal.GdalUtils import GdalUtils
+from processing.algs.gdal import GdalInProcess
 
 import nose2
 import shutil
@@ -104,5 +106,30 @@ class TestGdalOgr2OgrToPostgis(unittest.TestCase):
                          "password=pwd active_schema=public user=usr")
 
 
+class TestGdalInProcess(unittest.TestCase):
+
+    def test_splitArguments(self):
+        arguments = ['-of', 'GTiff', '/data/a b.tif', '/data/out "put".tif', '-co', 'COMPRESS=LZW']
+        self.assertEqual(GdalInProcess.splitArguments(GdalUtils.escapeAndJoin(arguments)), arguments)
+        with self.assertRaises(GdalInProcess.UnsupportedCommand):
+            GdalInProcess.splitArguments('a.tif > b.tif')
+
+    def test_parseCommand(self):
+        program, options, positionals, config = GdalInProcess.parseCommand(
+            ['gdalwarp', '-r near -te 0 0 10 10 --config GDALWARP_IGNORE_BAD_CUTLINE YES in.tif out.tif'])
+        self.assertEqual(program, 'gdalwarp')
+        self.assertEqual(options, ['-r', 'near', '-te', '0', '0', '10', '10'])
+        self.assertEqual(positionals, ['in.tif', 'out.tif'])
+        self.assertEqual(config, {'GDALWARP_IGNORE_BAD_CUTLINE': 'YES'})
+
+        program, options, positionals, config = GdalInProcess.parseCommand(
+            ['cmd.exe', '/C ', 'ogr2ogr.exe', '-f "ESRI Shapefile" out.shp in.gpkg layer'])
+        self.assertEqual(program, 'ogr2ogr')
+        self.assertEqual(positionals, ['out.shp', 'in.gpkg', 'layer'])
+
+        self.assertFalse(GdalInProcess.canRunInProcess(['gdalwarp', '-unknown in.tif out.tif']))
+        self.assertFalse(GdalInProcess.canRunInProcess(['gdalinfo', 'in.tif']))
+
+
 if __name__ == '__main__':
     nose2.main()
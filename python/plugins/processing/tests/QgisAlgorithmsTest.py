@@ -27,14 +27,29 @@ __revision__ = ':%H$'
 
 import AlgorithmsTestBase
 
+import os
 import nose2
 import shutil
-
-from qgis.core import (QgsProcessingAlgorithm,
+import tempfile
+from array import array
+
+from qgis.core import (QgsApplication,
+                       QgsPointXY,
+                       QgsProject,
+                       QgsVectorLayer,
+                       QgsProcessingAlgorithm,
                        QgsProcessingFeedback,
-                       QgsProcessingException)
+                       QgsProcessingException,
+                       QgsProcessingOutputLayerDefinition)
 from qgis.testing import start_app, unittest
 from processing.tools.dataobjects import createContext
+from processing.gui.AlgorithmExecutor import executeIterating
+from processing.algs.qgis.network import (NetworkGraph,
+                                          serviceArea,
+                                          nearestServiceAreas,
+                                          matrixTargets,
+                                          originCosts)
+from processing.algs.qgis.triangulation import PointSet, delaunayTriangles
 
 
 class TestAlg(QgsProcessingAlgorithm):
@@ -91,6 +106,136 @@ class TestQgisAlgorithms(unittest.TestCase, AlgorithmsTestBase.AlgorithmsTest):
         results, ok = alg.run({}, context, feedback)
         self.assertFalse(ok)
 
+    def testLazyAlgorithms(self):
+        """
+        Test that algorithms registered from the manifest describe the
+        algorithm, and create the real one
+        """
+
+        from processing.core.AlgorithmManifest import LazyAlgorithm
+        from processing.algs.qgis.Boundary import Boundary
+
+        registered = QgsApplication.processingRegistry().algorithmById('qgis:boundary')
+        self.assertIsInstance(registered, LazyAlgorithm)
+        alg = QgsApplication.processingRegistry().createAlgorithmById('qgis:boundary')
+        self.assertIsInstance(alg, Boundary)
+        self.assertEqual(registered.displayName(), alg.displayName())
+        self.assertEqual(registered.group(), alg.group())
+        self.assertEqual([p.name() for p in registered.parameterDefinitions()],
+                         [p.name() for p in alg.parameterDefinitions()])
+        self.assertEqual([o.name() for o in registered.outputDefinitions()],
+                         [o.name() for o in alg.outputDefinitions()])
+
+    def testMergedIterations(self):
+        """
+        Test that the merged output of an iterated run is complete as soon
+        as the run ends
+        """
+
+        source = os.path.join(os.path.dirname(__file__), 'testdata', 'polys.gml')
+        destination = os.path.join(tempfile.mkdtemp(), 'centroids.shp')
+        self.cleanup_paths.append(os.path.dirname(destination))
+        output = QgsProcessingOutputLayerDefinition(destination, QgsProject.instance())
+        alg = QgsApplication.processingRegistry().createAlgorithmById('native:centroids')
+        context = createContext()
+        self.assertTrue(executeIterating(alg, {'INPUT': source, 'OUTPUT': output}, 'INPUT',
+                                         context, QgsProcessingFeedback(), merge=True))
+        layer = QgsVectorLayer(destination, 'centroids', 'ogr')
+        self.assertTrue(layer.isValid())
+        self.assertEqual(layer.featureCount(), QgsVectorLayer(source, 'polys', 'ogr').featureCount())
+        QgsProject.instance().removeAllMapLayers()
+
+
+class TestTriangulation(unittest.TestCase):
+
+    def testDelaunayTriangles(self):
+        points = PointSet()
+        for x, y in [(0, 0), (10, 0), (0, 0), (10, 10), (0, 10)]:
+            points.add(x, y)
+        # duplicated points are kept once, at their first position
+        self.assertEqual(len(points), 4)
+        self.assertEqual(points.positions, [0, 1, 3, 4])
+        triangles = delaunayTriangles(points)
+        self.assertEqual(len(triangles), 2)
+        for triangle in triangles:
+            # clockwise, from the lowest index
+            self.assertEqual(triangle[0], min(triangle))
+            (ax, ay), (bx, by), (cx, cy) = [points.points[i] for i in triangle]
+            self.assertLess((bx - ax) * (cy - ay) - (by - ay) * (cx - ax), 0)
+        self.assertEqual(triangles, sorted(triangles))
+
+
+class TestNetworkGraph(unittest.TestCase):
+
+    def graph(self):
+        # a 10 x 10 square, with a single one way side from (10, 0) to
+        # (10, 10)
+        vertices = [(0, 0), (10, 0), (10, 10), (0, 10)]
+        edges = [(0, 1), (1, 0), (1, 2), (2, 3), (3, 2), (3, 0), (0, 3)]
+        return NetworkGraph(array('d', [v[0] for v in vertices]),
+                            array('d', [v[1] for v in vertices]),
+                            array('i', [e[0] for e in edges]),
+                            array('i', [e[1] for e in edges]),
+                            [array('d', [10.0] * len(edges))])
+
+    def testRoute(self):
+        graph = self.graph()
+        origin = graph.snap(QgsPointXY(5, -1))
+        destination = graph.snap(QgsPointXY(11, 5))
+        self.assertEqual(origin.snappedPoint, QgsPointXY(5, 0))
+        cost, route = graph.route(origin, destination, 0)
+        self.assertEqual(cost, 10)
+        self.assertEqual(route, [QgsPointXY(5, 0), QgsPointXY(10, 0), QgsPointXY(10, 5)])
+        # the one way side can not be taken back
+        cost, route = graph.route(destination, origin, 0)
+        self.assertEqual(cost, 30)
+        # same routes from a reverse search
+        costs, tree = graph.shortestPaths(destination.targets(graph, 0), 0, reverse=True)
+        self.assertEqual(graph.searchRoute(costs, tree, origin, destination, 0, reverse=True)[0], 10)
+
+    def testServiceArea(self):
+        graph = self.graph()
+        origin = graph.snap(QgsPointXY(5, -1))
+        # the search stops at the travel cost
+        costs, tree = graph.shortestPaths(origin.sources(graph, 0), 0, cutoff=12)
+        self.assertEqual(sorted(costs), [0, 1])
+        upperBoundary, lowerBoundary, segments = serviceArea(graph, origin, 0, 12)
+        self.assertEqual(sorted(upperBoundary), [(0, 10), (10, 10)])
+        self.assertEqual(sorted(lowerBoundary), [(0, 0), (10, 0)])
+        self.assertIn(((10, 0), (10, 7)), segments)
+
+    def testNearestServiceAreas(self):
+        graph = self.graph()
+        origins = [graph.snap(QgsPointXY(5, -1)), graph.snap(QgsPointXY(5, 11))]
+        areas = nearestServiceAreas(graph, origins, 0, 100)
+        # the sides between the start points are shared halfway
+        self.assertIn(((10, 0), (10, 5)), areas[0][2])
+        self.assertIn(((0, 10), (0, 5)), areas[1][2])
+        self.assertNotIn(((10, 0), (10, 10)), areas[0][2])
+
+    def testOriginCosts(self):
+        graph = self.graph()
+        origin = graph.snap(QgsPointXY(5, -1))
+        destinations = [graph.snap(QgsPointXY(11, 5)), graph.snap(QgsPointXY(5, 11)), graph.snap(QgsPointXY(7, -1))]
+        targets = matrixTargets(graph, destinations, 0)
+        costs = originCosts(graph, origin, targets, 0)
+        self.assertEqual([d for d, _, _ in costs], [2, 0, 1])
+        self.assertEqual([round(c) for _, c, _ in costs], [2, 10, 20])
+        self.assertEqual([round(l) for _, _, l in costs], [2, 10, 20])
+        # bounded by the cutoff or by the number of destinations
+        self.assertEqual([d for d, _, _ in originCosts(graph, origin, targets, 0, cutoff=15)], [2, 0])
+        self.assertEqual([d for d, _, _ in originCosts(graph, origin, targets, 0, nearest=1)], [2])
+
+    def testReadWrite(self):
+        graph = self.graph()
+        filename = os.path.join(tempfile.mkdtemp(), 'network.graph')
+        graph.write(filename)
+        copy = NetworkGraph.read(filename)
+        self.assertEqual(list(copy.xs), list(graph.xs))
+        self.assertEqual(list(copy.outEdges), list(graph.outEdges))
+        self.assertEqual(list(copy.costs[0]), list(graph.costs[0]))
+        self.assertIsNone(NetworkGraph.read(filename + '.missing'))
+
 
 if __name__ == '__main__':
     nose2.main()
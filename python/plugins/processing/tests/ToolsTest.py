@@ -26,15 +26,35 @@ __copyright__ = '(C) 2016, Nyall Dawson'
 __revision__ = '$Format:%H$'
 
 import os
+import glob
 import shutil
 import tempfile
 
+import numpy
+from osgeo import gdal
+
 from qgis.core import (QgsVectorLayer,
-                       QgsProcessingContext)
+                       QgsRasterLayer,
+                       QgsCoordinateReferenceSystem,
+                       QgsProcessingContext,
+                       QgsGeometry,
+                       QgsPointXY,
+                       QgsDistanceArea,
+                       QgsDataSourceUri,
+                       QgsFeatureRequest,
+                       NULL)
 from qgis.testing import start_app, unittest
 
 from processing.tests.TestData import points
 from processing.tools import vector
+from processing.tools import raster
+from processing.tools import aggregation
+from processing.tools import distance
+from processing.tools import spatialjoin
+from processing.tools import adjacency
+from processing.tools import postgis
+from processing.tools import exportcache
+from processing.tools import sampling
 
 testDataPath = os.path.join(os.path.dirname(__file__), 'testdata')
 
@@ -119,5 +139,408 @@ class VectorTest(unittest.TestCase):
         self.assertEqual(name, 'city_data.edge')
 
 
+class AggregationTest(unittest.TestCase):
+
+    def testNumericAggregate(self):
+        values = numpy.array([4.0, -1.5, 3.0, 3.0, 10.0, 0.25, 7.0])
+
+        stat = aggregation.NumericAggregate(True, True)
+        stat.addArray(values, 2)
+        self.assertEqual(stat.count(), 7)
+        self.assertEqual(stat.countMissing(), 2)
+        self.assertAlmostEqual(stat.sum(), values.sum())
+        self.assertAlmostEqual(stat.mean(), values.mean())
+        self.assertAlmostEqual(stat.stDev(), values.std())
+        self.assertAlmostEqual(stat.sampleStDev(), values.std(ddof=1))
+        self.assertEqual(stat.min(), -1.5)
+        self.assertEqual(stat.max(), 10.0)
+        self.assertEqual(stat.median(), 3.0)
+        self.assertEqual(stat.firstQuartile(), 0.25 + (3.0 - 0.25) / 2)
+        self.assertEqual(stat.thirdQuartile(), 5.5)
+        self.assertEqual(stat.variety(), 6)
+        self.assertEqual(stat.majority(), 3.0)
+        self.assertEqual(stat.minority(), -1.5)
+
+        # merging partial aggregates gives the same results
+        merged = aggregation.NumericAggregate(True, True)
+        for part in (values[:2], values[2:5], values[5:]):
+            partial = aggregation.NumericAggregate(True, True)
+            partial.addArray(part, 1)
+            merged.merge(partial)
+        self.assertEqual(merged.count(), 7)
+        self.assertEqual(merged.countMissing(), 3)
+        self.assertAlmostEqual(merged.mean(), stat.mean())
+        self.assertAlmostEqual(merged.sampleStDev(), stat.sampleStDev())
+        self.assertEqual(merged.median(), stat.median())
+        self.assertEqual(merged.firstQuartile(), stat.firstQuartile())
+        self.assertEqual(merged.thirdQuartile(), stat.thirdQuartile())
+        self.assertEqual(merged.variety(), stat.variety())
+
+    def testAggregate(self):
+        test_layer = QgsVectorLayer(points(), 'test', 'ogr')
+        index = test_layer.fields().lookupField('id')
+        group = test_layer.fields().lookupField('id2')
+
+        for threads in (1, 3):
+            res = aggregation.aggregate(test_layer, [index], threads=threads, chunkSize=2)
+            self.assertEqual(res[index].count(), 9)
+            self.assertEqual(res[index].sum(), 45)
+            self.assertEqual(res[index].min(), 1)
+            self.assertEqual(res[index].max(), 9)
+
+            res = aggregation.aggregate(test_layer, [index], groupBy=group, threads=threads, chunkSize=4)
+            self.assertEqual(sorted(res.keys()), ['0', '1', '2'])
+            self.assertEqual(res['0'][index].count(), 5)
+            self.assertEqual(res['0'][index].sum(), 3 + 6 + 7 + 8 + 9)
+            self.assertEqual(res['1'][index].sum(), 2 + 5)
+            self.assertEqual(res['2'][index].sum(), 1 + 4)
+
+            # the filter of the request is kept by the parts
+            request = QgsFeatureRequest().setFilterExpression('id > 4')
+            res = aggregation.aggregate(test_layer, [index], request=request, threads=threads, chunkSize=2)
+            self.assertEqual(res[index].count(), 5)
+            self.assertEqual(res[index].sum(), 5 + 6 + 7 + 8 + 9)
+
+
+class DistanceTest(unittest.TestCase):
+
+    def testNearestNeighbors(self):
+        xy = numpy.array([[0, 0], [10, 0], [0, 10], [10, 10], [5, 5]], dtype=numpy.float64)
+        neighbors = distance.NearestNeighbors(xy)
+        rows = neighbors.query(numpy.array([[1, 1], [9, 9.5]]), 2)
+        self.assertEqual(sorted(rows[0].tolist()), [0, 4])
+        self.assertEqual(sorted(rows[1].tolist()), [3, 4])
+        # k larger than the number of points
+        rows = neighbors.query(numpy.array([[1, 1]]), 10)
+        self.assertEqual(sorted(rows[0].tolist()), [0, 1, 2, 3, 4])
+
+    def testDistanceCalculator(self):
+        crs = QgsCoordinateReferenceSystem('EPSG:4326')
+        planar = distance.DistanceCalculator(crs, 'NONE')
+        self.assertFalse(planar.willUseEllipsoid())
+        xy = numpy.array([[0, 0], [3, 4]], dtype=numpy.float64)
+        self.assertEqual(planar.distances(planar.prepare(xy)[0], planar.prepare(xy)).tolist(), [0, 5])
+
+        ellipsoidal = distance.DistanceCalculator(crs, 'WGS84')
+        self.assertTrue(ellipsoidal.willUseEllipsoid())
+        xy = ellipsoidal.prepare(numpy.array([[0, 0], [1, 0], [0, 1]], dtype=numpy.float64))
+        res = ellipsoidal.distances(xy[0], xy)
+        self.assertAlmostEqual(res[0], 0, 3)
+        self.assertAlmostEqual(res[1], 111319.491, 2)
+        self.assertAlmostEqual(res[2], 110574.389, 2)
+
+
+class SamplingTest(unittest.TestCase):
+
+    def testPolygonSampler(self):
+        # an L shaped polygon with a hole
+        geom = QgsGeometry.fromWkt('Polygon((0 0, 10 0, 10 2, 2 2, 2 10, 0 10, 0 0), (0.5 0.5, 1 0.5, 1 1, 0.5 0.5))')
+        sampler = sampling.PolygonSampler([geom], sampling.randomGenerator(1))
+        self.assertAlmostEqual(sampler.area(), geom.area())
+        xy = sampler.sample(1000)
+        self.assertEqual(len(xy), 1000)
+        for x, y in xy.tolist():
+            self.assertTrue(geom.contains(QgsGeometry.fromWkt('Point({} {})'.format(x, y))))
+
+    def testPolygonSamplerBorder(self):
+        # a concave polygon, most of its Delaunay triangles cross its border
+        geom = QgsGeometry.fromWkt('Polygon((0 0, 10 0, 10 10, 9 10, 9 1, 1 1, 1 10, 0 10, 0 0))')
+        sampler = sampling.PolygonSampler([geom], sampling.randomGenerator(1))
+        self.assertAlmostEqual(sampler.area(), geom.area())
+        xy = sampler.sample(1000)
+        self.assertEqual(len(xy), 1000)
+        for x, y in xy.tolist():
+            self.assertTrue(geom.intersects(QgsGeometry.fromWkt('Point({} {})'.format(x, y))))
+
+    def testLineSampler(self):
+        da = QgsDistanceArea()
+        da.setSourceCrs(QgsCoordinateReferenceSystem('EPSG:4326'))
+        da.setEllipsoid('WGS84')
+        # a degree of longitude is much shorter at 60 degrees of latitude
+        # than at the equator, the planar lengths are the same
+        lines = [QgsGeometry.fromWkt('LineString(0 0, 1 0)'), QgsGeometry.fromWkt('LineString(0 60, 1 60)')]
+        sampler = sampling.LineSampler(lines, sampling.randomGenerator(1), da)
+        self.assertAlmostEqual(sampler.length(), da.measureLine(QgsPointXY(0, 0), QgsPointXY(1, 0)) +
+                               da.measureLine(QgsPointXY(0, 60), QgsPointXY(1, 60)), 3)
+        xy = sampler.sample(1000)
+        self.assertGreater((xy[:, 1] == 0).sum(), (xy[:, 1] == 60).sum())
+        planar = sampling.LineSampler(lines)
+        self.assertAlmostEqual(planar.length(), 2)
+
+    def testMinDistance(self):
+        grid = sampling.PoissonDiskGrid(1)
+        self.assertTrue(grid.add(0, 0))
+        self.assertFalse(grid.add(0.5, 0.5))
+        self.assertTrue(grid.add(1.5, 0))
+        sampler = sampling.PolygonSampler([QgsGeometry.fromWkt('Polygon((0 0, 10 0, 10 10, 0 10, 0 0))')],
+                                          sampling.randomGenerator(1))
+        xy = numpy.array(list(sampling.samplePoints(sampler, 20, 1)))
+        self.assertEqual(len(xy), 20)
+        d = numpy.hypot(xy[:, None, 0] - xy[None, :, 0], xy[:, None, 1] - xy[None, :, 1])
+        self.assertGreaterEqual(d[numpy.triu_indices(20, 1)].min(), 1)
+
+
+class SpatialJoinTest(unittest.TestCase):
+
+    def bruteForce(self, source, other, predicates):
+        result = {}
+        others = [(f.id(), f.geometry()) for f in other.getFeatures() if f.hasGeometry()]
+        for f in source.getFeatures():
+            if not f.hasGeometry():
+                continue
+            for fid, geom in others:
+                if any(getattr(f.geometry(), p)(geom) for p in predicates):
+                    result.setdefault(f.id(), []).append(fid)
+        return result
+
+    def testMatches(self):
+        polys = QgsVectorLayer(os.path.join(testDataPath, 'polys.gml'), 'polys', 'ogr')
+        pts = QgsVectorLayer(points(), 'points', 'ogr')
+        self.assertTrue(polys.isValid())
+
+        for predicates in (['intersects'], ['contains'], ['within', 'touches']):
+            # both the smaller and the larger side as source, with and
+            # without worker threads
+            for source, other in ((polys, pts), (pts, polys)):
+                expected = self.bruteForce(source, other, predicates)
+                for threads in (1, 3):
+                    engine = spatialjoin.SpatialJoinEngine(source, other, threads=threads)
+                    self.assertEqual(engine.matches(predicates), expected)
+
+    def testSourceIdsDisjoint(self):
+        polys = QgsVectorLayer(os.path.join(testDataPath, 'polys.gml'), 'polys', 'ogr')
+        pts = QgsVectorLayer(points(), 'points', 'ogr')
+
+        engine = spatialjoin.SpatialJoinEngine(pts, polys)
+        intersecting = engine.sourceIds(['intersects'])
+        disjoint = engine.sourceIds(['disjoint'])
+        all_ids = set(f.id() for f in pts.getFeatures())
+        self.assertEqual(disjoint, all_ids - intersecting)
+        self.assertEqual(engine.sourceIds(['intersects', 'disjoint']), all_ids)
+
+
+class AdjacencyTest(unittest.TestCase):
+
+    def bruteForce(self, layer):
+        features = [(f.id(), f.geometry()) for f in layer.getFeatures() if f.hasGeometry()]
+        result = {}
+        for fid, geom in features:
+            result[fid] = sorted(other for other, otherGeom in features
+                                 if other != fid and geom.intersects(otherGeom))
+        return result
+
+    def testBuildAdjacencyGraph(self):
+        layer = QgsVectorLayer(os.path.join(testDataPath, 'custom', 'adjacent_polys.gml'), 'polys', 'ogr')
+        self.assertTrue(layer.isValid())
+        expected = self.bruteForce(layer)
+
+        partitionSize = adjacency.PARTITION_SIZE
+        try:
+            # several partitions, processed with and without worker threads
+            adjacency.PARTITION_SIZE = 3
+            for threads in (1, 3):
+                graph = adjacency.buildAdjacencyGraph(layer, threads=threads)
+                self.assertEqual(graph.nodeCount(), len(expected))
+                self.assertEqual(dict((fid, graph.featureNeighbours(fid)) for fid in expected), expected)
+                self.assertEqual(graph.edgeCount(), sum(len(n) for n in expected.values()) // 2)
+        finally:
+            adjacency.PARTITION_SIZE = partitionSize
+
+    def testMinDistance(self):
+        layer = QgsVectorLayer(os.path.join(testDataPath, 'custom', 'adjacent_polys.gml'), 'polys', 'ogr')
+        graph = adjacency.buildAdjacencyGraph(layer)
+        distantGraph = adjacency.buildAdjacencyGraph(layer, 4.0)
+        for fid in graph.ids.tolist():
+            self.assertTrue(set(graph.featureNeighbours(fid)) <= set(distantGraph.featureNeighbours(fid)))
+        self.assertEqual(graph.node(-12345), -1)
+
+
+class PostGISTest(unittest.TestCase):
+
+    def testEwkbHex(self):
+        geom = QgsGeometry.fromWkt('PointZ (1 2 3)')
+        self.assertEqual(postgis.ewkb_hex(geom.exportToWkb(), 4326),
+                         '01010000a0e6100000000000000000f03f00000000000000400000000000000840')
+        geom = QgsGeometry.fromWkt('Point (1 2)')
+        self.assertEqual(postgis.ewkb_hex(geom.exportToWkb()),
+                         '0101000000000000000000f03f0000000000000040')
+
+    def testCopyValue(self):
+        self.assertEqual(postgis._copy_value(None), '\\N')
+        self.assertEqual(postgis._copy_value(NULL), '\\N')
+        self.assertEqual(postgis._copy_value(True), 't')
+        self.assertEqual(postgis._copy_value(12), '12')
+        self.assertEqual(postgis._copy_value('a\tb\\c\n'), 'a\\tb\\\\c\\n')
+        self.assertEqual(postgis._copy_value(b'\x01\xff'), '\\\\x01ff')
+
+    def testPoolKey(self):
+        uri = QgsDataSourceUri()
+        uri.setConnection('localhost', '5432', 'gis', 'alice', 'secret')
+        key = postgis.pool_key(uri)
+        self.assertNotIn('alice', key)
+        self.assertNotIn('secret', key)
+        uri.setConnection('localhost', '5432', 'gis', 'bob', 'secret')
+        self.assertNotEqual(postgis.pool_key(uri), key)
+
+
+class ExportCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def export(self, name, size):
+        filename = os.path.join(self.folder, name + '.shp')
+        for ext in ('.shp', '.dbf'):
+            with open(os.path.splitext(filename)[0] + ext, 'wb') as f:
+                f.write(b'0' * (size // 2))
+        return filename
+
+    def testLeastRecentlyUsedEviction(self):
+        cache = exportcache.ExportCache(maxSize=250)
+        first = self.export('first', 100)
+        second = self.export('second', 100)
+        cache.add('first', first)
+        cache.add('second', second)
+        self.assertEqual(cache.get('first'), first)
+        self.assertIsNone(cache.get('unknown'))
+        self.assertEqual(cache.size(), 200)
+
+        # second is now the least recently used export
+        third = self.export('third', 100)
+        cache.add('third', third)
+        self.assertIsNone(cache.get('second'))
+        self.assertFalse(os.path.exists(second))
+        self.assertFalse(os.path.exists(os.path.join(self.folder, 'second.dbf')))
+        self.assertEqual(cache.get('first'), first)
+        self.assertEqual(cache.get('third'), third)
+
+        # removed files are not returned
+        os.remove(first)
+        self.assertIsNone(cache.get('first'))
+
+        cache.clear()
+        self.assertFalse(os.path.exists(third))
+        self.assertEqual(cache.size(), 0)
+
+    def testCacheKey(self):
+        layer = QgsVectorLayer(points(), 'test', 'ogr')
+        key = exportcache.cacheKey(layer, 'shp')
+        self.assertEqual(exportcache.cacheKey(layer, 'shp'), key)
+        self.assertNotEqual(exportcache.cacheKey(layer, 'gpkg'), key)
+        self.assertNotEqual(exportcache.cacheKey(layer, 'shp', True), key)
+        layer.setSubsetString('id > 2')
+        self.assertNotEqual(exportcache.cacheKey(layer, 'shp'), key)
+
+        memory = QgsVectorLayer('Point', 'test', 'memory')
+        self.assertIsNone(exportcache.cacheKey(memory, 'shp'))
+
+    def testCacheKeySidecarFiles(self):
+        folder = tempfile.mkdtemp()
+        try:
+            for f in glob.glob(os.path.join(testDataPath, 'custom', 'points.*')):
+                shutil.copy(f, folder)
+            layer = QgsVectorLayer(os.path.join(folder, 'points.shp'), 'test', 'ogr')
+            self.assertIn(os.path.join(folder, 'points.dbf'), exportcache.dataFiles(layer))
+            key = exportcache.cacheKey(layer, 'gpkg')
+
+            # attribute edits only change the .dbf file
+            dbf = os.path.join(folder, 'points.dbf')
+            mtime = os.path.getmtime(dbf) + 10
+            os.utime(dbf, (mtime, mtime))
+            self.assertNotEqual(exportcache.cacheKey(layer, 'gpkg'), key)
+            key = exportcache.cacheKey(layer, 'gpkg')
+
+            # changes committed through the layer are taken into account
+            layer.dataChanged.emit()
+            self.assertNotEqual(exportcache.cacheKey(layer, 'gpkg'), key)
+        finally:
+            shutil.rmtree(folder)
+
+    def testCacheKeyWithoutModificationTime(self):
+        source = '?query=SELECT 1 AS id'
+        layer = QgsVectorLayer(source, 'test', 'virtual')
+        self.assertIsNone(exportcache.modificationTime(layer))
+        key = exportcache.cacheKey(layer, 'shp')
+        self.assertEqual(exportcache.cacheKey(layer, 'shp'), key)
+        layer.dataChanged.emit()
+        self.assertNotEqual(exportcache.cacheKey(layer, 'shp'), key)
+
+        # another layer object on the same source doesn't reuse the exports
+        # of the first one, its changes are not known
+        key = exportcache.cacheKey(layer, 'shp')
+        other = QgsVectorLayer(source, 'test', 'virtual')
+        self.assertNotEqual(exportcache.cacheKey(other, 'shp'), key)
+
+
+class RasterTest(unittest.TestCase):
+
+    def testScanBlocks(self):
+        source = os.path.join(testDataPath, 'dem.tif')
+        test_layer = QgsRasterLayer(source, 'test')
+        ds = gdal.Open(source)
+        expected = ds.GetRasterBand(1).ReadAsArray()
+        nodata = ds.GetRasterBand(1).GetNoDataValue()
+        ds = None
+
+        # small window size to force several blocks
+        result = numpy.zeros(expected.shape, dtype=expected.dtype)
+        blocks_count = 0
+        for xoff, yoff, blocks in raster.scanblocks(test_layer, maxCells=100):
+            self.assertEqual(len(blocks), 1)
+            block = blocks[0]
+            height, width = block.shape
+            result[yoff:yoff + height, xoff:xoff + width] = block.data
+            if nodata is not None:
+                self.assertTrue(
+                    (numpy.ma.getmaskarray(block) == (block.data == nodata)).all())
+            blocks_count += 1
+        self.assertGreater(blocks_count, 1)
+        self.assertTrue((result == expected).all())
+
+        # compatibility generator
+        values = list(raster.scanraster(test_layer, None))
+        self.assertEqual(len(values), expected.size)
+        valid = expected.size
+        if nodata is not None:
+            valid -= int((expected == nodata).sum())
+        self.assertEqual(len([v for v in values if v is not None]), valid)
+
+    def testRasterWriter(self):
+        outdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, outdir)
+        fileName = os.path.join(outdir, 'out.tif')
+
+        crs = QgsRasterLayer(os.path.join(testDataPath, 'dem.tif'), 'test').crs()
+        # tiny cache to force tile evictions
+        w = raster.RasterWriter(fileName, 0, 0, 600, 500, 1, 2, crs,
+                                options=['COMPRESS=DEFLATE'],
+                                cacheSize=raster.RasterWriter.TILE_SIZE ** 2 * 4)
+        w.setValue(5, 10, 20)
+        w.setValue(7, 599, 499)
+        w.setValue(8, 1000, 1000)
+        self.assertEqual(w.getValue(10, 20), 5)
+        self.assertEqual(w.getValue(1000, 1000), raster.RasterWriter.NODATA)
+        w.setBlock(numpy.ones((10, 10)), 300, 300, 1)
+        w.fill(3, 0)
+        w.setValue(4, 0, 0, 0)
+        w.close()
+
+        ds = gdal.Open(fileName)
+        self.assertEqual((ds.RasterXSize, ds.RasterYSize, ds.RasterCount), (600, 500, 2))
+        self.assertEqual(ds.GetMetadata('IMAGE_STRUCTURE').get('COMPRESSION'), 'DEFLATE')
+        self.assertEqual(ds.GetGeoTransform(), (0, 1, 0, 500, 0, -1))
+        first = ds.GetRasterBand(1).ReadAsArray()
+        second = ds.GetRasterBand(2).ReadAsArray()
+        self.assertEqual(first[0, 0], 4)
+        self.assertEqual(first[20, 10], 3)
+        self.assertEqual(first[499, 599], 3)
+        self.assertTrue((second[300:310, 300:310] == 1).all())
+        self.assertEqual(second[0, 0], raster.RasterWriter.NODATA)
+        ds = None
+
+
 if __name__ == '__main__':
     unittest.main()
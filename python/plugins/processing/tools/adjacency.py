@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    adjacency.py
+    ---------------------
+    Date                 : October 2026
+    Copyright            : (C) 2026 by QGIS Development Team
+    Email                : qgis-developer at lists dot osgeo dot org
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'QGIS Development Team'
+__date__ = 'October 2026'
+__copyright__ = '(C) 2026, QGIS Development Team'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy
+
+from qgis.core import (QgsFeatureRequest,
+                       QgsGeometry,
+                       QgsRectangle,
+                       QgsSpatialIndex)
+
+# Number of features tested together, each partition is a spatially compact
+# group of features whose geometries are fetched in a single request
+PARTITION_SIZE = 2048
+
+
+class AdjacencyGraph(object):
+    """Undirected graph between features stored in compressed sparse row
+    (CSR) arrays.
+
+    Nodes are numbered from 0 in increasing feature id order, ids holds the
+    feature id of each node. The neighbours of node i are the nodes
+    neighbours[offsets[i]:offsets[i + 1]], in increasing order.
+    """
+
+    def __init__(self, ids, offsets, neighbours):
+        self.ids = ids
+        self.offsets = offsets
+        self.neighbours = neighbours
+
+    @staticmethod
+    def fromEdges(ids, first, second):
+        """Creates a graph from the ids of the nodes, sorted in increasing
+        order, and two arrays with the nodes of each edge.
+        """
+        n = len(ids)
+        sources = numpy.concatenate((first, second))
+        targets = numpy.concatenate((second, first))
+        order = numpy.lexsort((targets, sources))
+        dtype = numpy.int32 if n < 2 ** 31 else numpy.int64
+        neighbours = targets[order].astype(dtype)
+        offsets = numpy.zeros(n + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(sources, minlength=n), out=offsets[1:])
+        return AdjacencyGraph(ids, offsets, neighbours)
+
+    def nodeCount(self):
+        return len(self.ids)
+
+    def edgeCount(self):
+        return len(self.neighbours) // 2
+
+    def degrees(self):
+        return numpy.diff(self.offsets)
+
+    def node(self, featureId):
+        """Returns the node of a feature, or -1 if it is not in the graph."""
+        node = int(numpy.searchsorted(self.ids, featureId))
+        if node < len(self.ids) and self.ids[node] == featureId:
+            return node
+        return -1
+
+    def nodeNeighbours(self, node):
+        return self.neighbours[self.offsets[node]:self.offsets[node + 1]]
+
+    def featureNeighbours(self, featureId):
+        """Returns the ids of the features adjacent to a feature."""
+        node = self.node(featureId)
+        if node < 0:
+            return []
+        return self.ids[self.nodeNeighbours(node)].tolist()
+
+
+def readBounds(source, request=None, feedback=None):
+    """Reads the feature ids and bounding boxes of a source, skipping
+    features without geometry.
+
+    Returns the ids, sorted in increasing order, and a (n, 4) array with the
+    xmin, ymin, xmax, ymax of the bounding box of each feature.
+    """
+    request = QgsFeatureRequest(request) if request is not None else QgsFeatureRequest()
+    request.setSubsetOfAttributes([])
+
+    ids = []
+    boxes = []
+    for f in source.getFeatures(request):
+        if feedback is not None and feedback.isCanceled():
+            break
+        if not f.hasGeometry():
+            continue
+        bbox = f.geometry().boundingBox()
+        ids.append(f.id())
+        boxes.append((bbox.xMinimum(), bbox.yMinimum(), bbox.xMaximum(), bbox.yMaximum()))
+
+    ids = numpy.array(ids, dtype=numpy.int64)
+    boxes = numpy.array(boxes, dtype=numpy.float64).reshape((len(ids), 4))
+    order = numpy.argsort(ids, kind='mergesort')
+    return ids[order], boxes[order]
+
+
+def spatialPartitions(boxes, size=PARTITION_SIZE):
+    """Splits the rows of an array of bounding boxes in groups of about
+    size rows which are close to each other, by sorting them along a grid of
+    cells in a serpentine order.
+    """
+    n = len(boxes)
+    if n <= size:
+        return [numpy.arange(n)]
+
+    centers = (boxes[:, :2] + boxes[:, 2:]) / 2.0
+    side = int(math.ceil(math.sqrt(n / float(size))))
+    low = centers.min(axis=0)
+    extent = numpy.maximum(centers.max(axis=0) - low, 1e-12)
+    cells = numpy.minimum((side * (centers - low) / extent).astype(numpy.int64), side - 1)
+    # reverse every other row of cells so consecutive cells stay adjacent
+    columns = numpy.where(cells[:, 1] % 2 == 0, cells[:, 0], side - 1 - cells[:, 0])
+    order = numpy.lexsort((centers[:, 0], columns, cells[:, 1]))
+    return [order[i:i + size] for i in range(0, n, size)]
+
+
+def buildAdjacencyGraph(source, minDistance=0.0, request=None, threads=1,
+                        feedback=None):
+    """Computes the graph of the features of a source which touch or
+    intersect each other, or are within minDistance of each other.
+
+    Only the ids and bounding boxes of the features are kept in memory. The
+    bounding boxes are indexed once, then the features are tested by
+    spatially compact partitions: the geometries needed by a partition are
+    fetched in a single request and each feature geometry is prepared once
+    and tested against its candidates with a higher node number, so every
+    pair is tested once. Partitions can be processed in parallel by a pool
+    of threads, which requires a source supporting concurrent iteration.
+    """
+    ids, boxes = readBounds(source, request, feedback)
+    n = len(ids)
+    if n == 0 or (feedback is not None and feedback.isCanceled()):
+        return AdjacencyGraph.fromEdges(ids, numpy.empty(0, dtype=numpy.int64),
+                                        numpy.empty(0, dtype=numpy.int64))
+
+    # the nodes are the row numbers of the arrays, they are also the ids of
+    # the entries of the index
+    index = QgsSpatialIndex()
+    for row, (xmin, ymin, xmax, ymax) in enumerate(boxes.tolist()):
+        index.insertFeature(row, QgsRectangle(xmin, ymin, xmax, ymax))
+
+    geometryRequest = QgsFeatureRequest(request) if request is not None else QgsFeatureRequest()
+    geometryRequest.setSubsetOfAttributes([])
+
+    def candidates(rows):
+        pairs = []
+        for row in rows.tolist():
+            xmin, ymin, xmax, ymax = boxes[row].tolist()
+            bbox = QgsRectangle(xmin - minDistance, ymin - minDistance,
+                                xmax + minDistance, ymax + minDistance)
+            others = [c for c in index.intersects(bbox) if c > row]
+            if others:
+                pairs.append((row, sorted(others)))
+        return pairs
+
+    def test(pairs):
+        if not pairs:
+            return numpy.empty(0, dtype=numpy.int64), numpy.empty(0, dtype=numpy.int64)
+
+        needed = set()
+        for row, others in pairs:
+            needed.add(row)
+            needed.update(others)
+        partRequest = QgsFeatureRequest(geometryRequest).setFilterFids(ids[sorted(needed)].tolist())
+        geometries = {}
+        for f in source.getFeatures(partRequest):
+            geometries[int(numpy.searchsorted(ids, f.id()))] = f.geometry()
+
+        first = []
+        second = []
+        for row, others in pairs:
+            if row not in geometries:
+                continue
+            engine = QgsGeometry.createGeometryEngine(geometries[row].geometry())
+            engine.prepareGeometry()
+            for other in others:
+                if other not in geometries:
+                    continue
+                geom = geometries[other].geometry()
+                if minDistance > 0:
+                    adjacent = engine.distance(geom) <= minDistance
+                else:
+                    adjacent = engine.intersects(geom)
+                if adjacent:
+                    first.append(row)
+                    second.append(other)
+        return numpy.array(first, dtype=numpy.int64), numpy.array(second, dtype=numpy.int64)
+
+    partitions = spatialPartitions(boxes, PARTITION_SIZE)
+    total = 100.0 / len(partitions)
+    first = [numpy.empty(0, dtype=numpy.int64)]
+    second = [numpy.empty(0, dtype=numpy.int64)]
+
+    def collect(result, current):
+        first.append(result[0])
+        second.append(result[1])
+        if feedback is not None:
+            feedback.setProgress(int(current * total))
+
+    if threads <= 1:
+        for current, rows in enumerate(partitions):
+            if feedback is not None and feedback.isCanceled():
+                break
+            collect(test(candidates(rows)), current + 1)
+    else:
+        # index lookups stay in this thread, only the fetching and testing
+        # of the geometries is done by the workers. A few partitions per
+        # worker are queued at most, to bound the memory used by candidates
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            pending = deque()
+            current = 0
+            for rows in partitions:
+                if feedback is not None and feedback.isCanceled():
+                    break
+                pending.append(pool.submit(test, candidates(rows)))
+                if len(pending) > 2 * threads:
+                    current += 1
+                    collect(pending.popleft().result(), current)
+            while pending:
+                current += 1
+                collect(pending.popleft().result(), current)
+
+    return AdjacencyGraph.fromEdges(ids, numpy.concatenate(first), numpy.concatenate(second))
@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    aggregation.py
+    ---------------------
+    Date                 : October 2026
+    Copyright            : (C) 2026 by QGIS Development Team
+    Email                : qgis-developer at lists dot osgeo dot org
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'QGIS Development Team'
+__date__ = 'October 2026'
+__copyright__ = '(C) 2026, QGIS Development Team'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+import math
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy
+
+from qgis.core import QgsFeatureRequest
+
+# Number of features read before the values are converted to numpy arrays
+# and folded into the running aggregates.
+CHUNK_SIZE = 65536
+
+
+def toFloat(value):
+    """Converts an attribute value to float, returning NaN if it cannot
+    be interpreted as a number (NULL, empty strings, etc.).
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+class NumericAggregate(object):
+    """Partial aggregate of a numeric column, with the same accessors as
+    QgsStatisticalSummary.
+
+    Count, sum, mean, variance, minimum and maximum are updated in a single
+    pass and two aggregates computed on different parts of the data can be
+    combined with merge(). Exact median and quartiles need the values to be
+    kept (keepValues), and unique values, minority and majority need the
+    value counts (countValues), so both are optional.
+    """
+
+    def __init__(self, keepValues=False, countValues=False):
+        self.keepValues = keepValues
+        self.countValues = countValues
+        self._count = 0
+        self._missing = 0
+        self._sum = 0.0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._min = None
+        self._max = None
+        self._chunks = []
+        self._valueCounts = Counter()
+        self._sorted = None
+
+    def addArray(self, values, missing=0):
+        """Adds a numpy array of valid (non missing) values, plus a count of
+        missing ones.
+        """
+        self._missing += missing
+        if values.size == 0:
+            return
+
+        other = NumericAggregate()
+        other._count = values.size
+        other._sum = float(values.sum())
+        other._mean = other._sum / other._count
+        other._m2 = float(((values - other._mean) ** 2).sum())
+        other._min = float(values.min())
+        other._max = float(values.max())
+        self._mergeMoments(other)
+
+        if self.keepValues:
+            self._chunks.append(values.astype(numpy.float64))
+            self._sorted = None
+        if self.countValues:
+            unique, counts = numpy.unique(values, return_counts=True)
+            self._valueCounts.update(dict(zip(unique.tolist(), counts.tolist())))
+
+    def _mergeMoments(self, other):
+        if other._count == 0:
+            return
+        total = self._count + other._count
+        delta = other._mean - self._mean
+        self._mean += delta * other._count / total
+        self._m2 += other._m2 + delta * delta * self._count * other._count / total
+        self._count = total
+        self._sum += other._sum
+        self._min = other._min if self._min is None else min(self._min, other._min)
+        self._max = other._max if self._max is None else max(self._max, other._max)
+
+    def merge(self, other):
+        """Folds another partial aggregate into this one."""
+        self._missing += other._missing
+        self._mergeMoments(other)
+        if self.keepValues:
+            self._chunks.extend(other._chunks)
+            self._sorted = None
+        if self.countValues:
+            self._valueCounts.update(other._valueCounts)
+        return self
+
+    def count(self):
+        return self._count
+
+    def countMissing(self):
+        return self._missing
+
+    def sum(self):
+        return self._sum
+
+    def mean(self):
+        if self._count == 0:
+            return float('nan')
+        return self._sum / self._count
+
+    def min(self):
+        return float('nan') if self._min is None else self._min
+
+    def max(self):
+        return float('nan') if self._max is None else self._max
+
+    def range(self):
+        return self.max() - self.min()
+
+    def stDev(self):
+        """Population standard deviation."""
+        if self._count == 0:
+            return float('nan')
+        return math.sqrt(self._m2 / self._count)
+
+    def sampleStDev(self):
+        if self._count < 2:
+            return float('nan')
+        return math.sqrt(self._m2 / (self._count - 1))
+
+    def variety(self):
+        return len(self._valueCounts)
+
+    def minority(self):
+        if not self._valueCounts:
+            return float('nan')
+        # ties are resolved to the smallest value, as QgsStatisticalSummary does
+        return min(self._valueCounts.items(), key=lambda i: (i[1], i[0]))[0]
+
+    def majority(self):
+        if not self._valueCounts:
+            return float('nan')
+        return min(self._valueCounts.items(), key=lambda i: (-i[1], i[0]))[0]
+
+    def _values(self):
+        if self._sorted is None:
+            if self._chunks:
+                self._sorted = numpy.sort(numpy.concatenate(self._chunks))
+                self._chunks = [self._sorted]
+            else:
+                self._sorted = numpy.empty(0)
+        return self._sorted
+
+    @staticmethod
+    def _middle(values, start, count):
+        if count % 2 == 0:
+            return (values[start + count // 2 - 1] + values[start + count // 2]) / 2.0
+        return values[start + (count + 1) // 2 - 1]
+
+    def median(self):
+        if self._count == 0:
+            return float('nan')
+        return float(self._middle(self._values(), 0, self._count))
+
+    def firstQuartile(self):
+        if self._count == 0:
+            return float('nan')
+        half = self._count // 2 if self._count % 2 == 0 else self._count // 2 + 1
+        return float(self._middle(self._values(), 0, half))
+
+    def thirdQuartile(self):
+        if self._count == 0:
+            return float('nan')
+        half = self._count // 2 if self._count % 2 == 0 else self._count // 2 + 1
+        return float(self._middle(self._values(), self._count - half, half))
+
+    def interQuartileRange(self):
+        return self.thirdQuartile() - self.firstQuartile()
+
+
+def fidRangeRequests(source, parts, request=None):
+    """Splits a feature request over a source into parts requests, each
+    one fetching a contiguous range of the features returned by request.
+
+    The ids of the features are read first (without attributes and, if
+    possible, geometries), so any filter of request is evaluated once and
+    the parts only filter feature ids, which providers fetch directly
+    instead of scanning the whole source.
+    """
+    request = request if request is not None else QgsFeatureRequest()
+    if parts <= 1 or 0 <= source.featureCount() < parts:
+        return [QgsFeatureRequest(request)]
+
+    idRequest = QgsFeatureRequest(request)
+    idRequest.setSubsetOfAttributes([])
+    if idRequest.filterRect().isNull():
+        idRequest.setFlags(idRequest.flags() | QgsFeatureRequest.NoGeometry)
+    fids = sorted(f.id() for f in source.getFeatures(idRequest))
+    if len(fids) < parts:
+        return [QgsFeatureRequest(request)]
+
+    step = int(math.ceil(len(fids) / float(parts)))
+    requests = []
+    for start in range(0, len(fids), step):
+        partRequest = QgsFeatureRequest(request)
+        partRequest.setFilterFids(fids[start:start + step])
+        requests.append(partRequest)
+    return requests
+
+
+def columns(source, indices, request=None, groupBy=None,
+            chunkSize=CHUNK_SIZE, feedback=None):
+    """Reads attributes of a source in chunks.
+
+    Yields a (size, values, categories) tuple per chunk of features, where
+    size is the number of features in the chunk, values is a dict with a float64 numpy array per field index (NaN for
+    values which are not numbers) and categories is a numpy array with the
+    string representation of the groupBy field, or None.
+    """
+    attributes = list(indices)
+    if groupBy is not None and groupBy not in attributes:
+        attributes.append(groupBy)
+    if request is None:
+        request = QgsFeatureRequest()
+    request = QgsFeatureRequest(request)
+    request.setSubsetOfAttributes(attributes).setFlags(QgsFeatureRequest.NoGeometry)
+
+    rows = []
+    for feature in source.getFeatures(request):
+        if feedback is not None and feedback.isCanceled():
+            break
+        rows.append(feature.attributes())
+        if len(rows) >= chunkSize:
+            yield _toColumns(rows, indices, groupBy)
+            rows = []
+    if rows:
+        yield _toColumns(rows, indices, groupBy)
+
+
+def _toColumns(rows, indices, groupBy):
+    values = {}
+    for i in indices:
+        values[i] = numpy.fromiter((toFloat(r[i]) for r in rows),
+                                   dtype=numpy.float64, count=len(rows))
+    categories = None
+    if groupBy is not None:
+        categories = numpy.array([str(r[groupBy]) for r in rows])
+    return len(rows), values, categories
+
+
+def _aggregateRequest(source, indices, request, groupBy, keepValues,
+                      countValues, chunkSize, feedback):
+    totals = {}
+    for size, values, categories in columns(source, indices, request, groupBy,
+                                            chunkSize, feedback):
+        if feedback is not None:
+            feedback.advance(size)
+
+        if groupBy is None:
+            for i in indices:
+                column = values[i]
+                valid = ~numpy.isnan(column)
+                agg = totals.setdefault(i, NumericAggregate(keepValues, countValues))
+                agg.addArray(column[valid], int(column.size - valid.sum()))
+            continue
+
+        groups, inverse = numpy.unique(categories, return_inverse=True)
+        order = numpy.argsort(inverse, kind='mergesort')
+        bounds = numpy.searchsorted(inverse[order], numpy.arange(len(groups) + 1))
+        for i in indices:
+            column = values[i][order]
+            for g, category in enumerate(groups.tolist()):
+                part = column[bounds[g]:bounds[g + 1]]
+                valid = ~numpy.isnan(part)
+                categoryTotals = totals.setdefault(category, {})
+                agg = categoryTotals.setdefault(i, NumericAggregate(keepValues, countValues))
+                agg.addArray(part[valid], int(part.size - valid.sum()))
+    return totals
+
+
+def _merge(target, partial, grouped):
+    for key, value in partial.items():
+        if not grouped:
+            if key in target:
+                target[key].merge(value)
+            else:
+                target[key] = value
+        else:
+            _merge(target.setdefault(key, {}), value, False)
+
+
+class _Progress(object):
+    """Thread safe progress reporting on top of a QgsFeedback."""
+
+    def __init__(self, feedback, total):
+        self.feedback = feedback
+        self.step = 100.0 / total if total > 0 else 0
+        self.current = 0
+
+    def isCanceled(self):
+        return self.feedback.isCanceled()
+
+    def advance(self, count):
+        # the GIL makes this increment safe enough for progress reporting
+        self.current += count
+        self.feedback.setProgress(int(self.current * self.step))
+
+
+def aggregate(source, indices, groupBy=None, request=None, keepValues=False,
+              countValues=False, threads=1, chunkSize=CHUNK_SIZE,
+              feedback=None):
+    """Computes NumericAggregate objects for the given field indices of a
+    feature source in a single pass.
+
+    Returns a dict with field indices as keys, or if a groupBy field index
+    is passed, a dict with the string value of that field as keys and dicts
+    of field indices to aggregates as values.
+
+    If threads is greater than 1 the source is split by feature id ranges
+    and each range is read by a different worker, so it should only be
+    used with sources supporting concurrent iteration.
+    """
+    progress = _Progress(feedback, source.featureCount()) if feedback is not None else None
+    requests = fidRangeRequests(source, threads, request)
+
+    def run(partRequest):
+        return _aggregateRequest(source, indices, partRequest, groupBy,
+                                 keepValues, countValues, chunkSize, progress)
+
+    if len(requests) == 1:
+        partials = [run(requests[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=len(requests)) as pool:
+            partials = list(pool.map(run, requests))
+
+    result = {}
+    for partial in partials:
+        _merge(result, partial, groupBy is not None)
+    return result
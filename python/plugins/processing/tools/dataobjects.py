@@ -41,6 +41,7 @@ from qgis.core import (QgsVectorFileWriter,
                        QgsProcessingUtils,
                        QgsProcessingContext,
                        QgsFeatureRequest,
+                       QgsFeatureSink,
                        QgsExpressionContext,
                        QgsExpressionContextUtils,
                        QgsExpressionContextScope)
@@ -50,6 +51,7 @@ from qgis.utils import iface
 
 from processing.core.ProcessingConfig import ProcessingConfig
 from processing.algs.gdal.GdalUtils import GdalUtils
+from processing.tools import exportcache
 from processing.tools.system import (getTempFilename,
                                      removeInvalidChars)
 
@@ -171,50 +173,48 @@ def exportVectorLayer(layer, supported=None):
     which allows external apps which support only file-based layers to
     use it. It performs the necessary export in case the input layer
     is not in a standard format suitable for most applications, it is
-    a remote one or db-based (non-file based) one, or if there is a
-    selection and it should be used, exporting just the selected
-    features.
+    a remote one or db-based (non-file based) one, it has a subset
+    string, or if there is a selection and it should be used, exporting
+    just the selected features.
 
-    Currently, the output is restricted to shapefiles, so anything
-    that is not in a shapefile will get exported. It also export to
-    a new file if the original one contains non-ascii characters.
+    supported is the list of file extensions the external app can read,
+    shapefiles by default. Layers are exported to shapefiles, or to
+    GeoPackage if it is supported and set so in the settings.
+
+    Exports are kept in a cache for the session, so a layer which has not
+    changed is only exported once.
     """
 
-    supported = supported or ["shp"]
+    supported = [ext.lower().lstrip('.') for ext in (supported or ["shp"])]
     settings = QgsSettings()
     systemEncoding = settings.value('/UI/encoding', 'System')
 
-    output = getTempFilename('shp')
-    basename = removeInvalidChars(os.path.basename(layer.source()))
-    if basename:
-        if not basename.endswith("shp"):
-            basename = os.path.splitext(basename)[0] + ".shp"
-        output = QgsProcessingUtils.generateTempFilename(basename)
-    else:
-        output = getTempFilename("shp")
     useSelection = False # TODO ProcessingConfig.getSetting(ProcessingConfig.USE_SELECTED)
-    if useSelection and layer.selectedFeatureCount() != 0:
-        writer = QgsVectorFileWriter(output, systemEncoding,
-                                     layer.fields(),
-                                     layer.wkbType(), layer.crs())
-        selection = layer.selectedFeatures()
-        for feat in selection:
-            writer.addFeature(feat, QgsFeatureSink.FastInsert)
-        del writer
+    useSelection = useSelection and layer.selectedFeatureCount() != 0
+    if not useSelection and not layer.subsetString() and os.path.isfile(layer.source()) \
+            and os.path.splitext(layer.source())[1].lower().lstrip('.') in supported:
+        return layer.source()
+
+    extension, driver = exportcache.exportFormat(supported)
+    key = exportcache.cacheKey(layer, extension, useSelection)
+    output = exportcache.exportCache().get(key)
+    if output is not None:
         return output
+
+    basename = removeInvalidChars(os.path.basename(layer.source()))
+    if basename:
+        output = QgsProcessingUtils.generateTempFilename(os.path.splitext(basename)[0] + '.' + extension)
     else:
-        if not os.path.splitext(layer.source())[1].lower() in supported:
-            writer = QgsVectorFileWriter(
-                output, systemEncoding,
-                layer.fields(), layer.wkbType(),
-                layer.crs()
-            )
-            for feat in layer.getFeatures():
-                writer.addFeature(feat, QgsFeatureSink.FastInsert)
-            del writer
-            return output
-        else:
-            return layer.source()
+        output = getTempFilename(extension)
+    writer = QgsVectorFileWriter(output, systemEncoding,
+                                 layer.fields(), layer.wkbType(),
+                                 layer.crs(), driver)
+    features = layer.selectedFeatures() if useSelection else layer.getFeatures()
+    for feat in features:
+        writer.addFeature(feat, QgsFeatureSink.FastInsert)
+    del writer
+    exportcache.exportCache().add(key, output)
+    return output
 
 
 def exportRasterLayer(layer):
@@ -249,21 +249,27 @@ def exportTable(table):
 
     settings = QgsSettings()
     systemEncoding = settings.value('/UI/encoding', 'System')
-    output = getTempFilename()
     isASCII = True
     try:
-        str(table.source()).decode('ascii')
+        str(table.source()).encode('ascii')
     except UnicodeEncodeError:
         isASCII = False
     isDbf = str(table.source()).endswith('dbf') \
         or str(table.source()).endswith('shp')
-    if not isDbf or not isASCII:
+    if not isDbf or not isASCII or table.subsetString():
+        key = exportcache.cacheKey(table, 'dbf')
+        output = exportcache.exportCache().get(key)
+        if output is not None:
+            return output
+
+        output = getTempFilename()
         writer = QgsVectorFileWriter(output, systemEncoding,
                                      table.fields(), QgsWkbTypes.NullGeometry,
                                      QgsCoordinateReferenceSystem('4326'))
         for feat in table.getFeatures():
             writer.addFeature(feat, QgsFeatureSink.FastInsert)
         del writer
+        exportcache.exportCache().add(key, output + '.dbf')
         return output + '.dbf'
     else:
         filename = str(table.source())
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    distance.py
+    ---------------------
+    Date                 : October 2026
+    Copyright            : (C) 2026 by QGIS Development Team
+    Email                : qgis-developer at lists dot osgeo dot org
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'QGIS Development Team'
+__date__ = 'October 2026'
+__copyright__ = '(C) 2026, QGIS Development Team'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+import numpy
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+from qgis.core import (QgsFeatureRequest,
+                       QgsCoordinateTransform,
+                       QgsEllipsoidUtils,
+                       QgsPointXY,
+                       QgsRectangle,
+                       QgsSpatialIndex)
+
+
+def readPoints(source, fieldIndex=None, crs=None, feedback=None, request=None):
+    """Reads the points of a feature source into memory in a single pass.
+
+    Returns an (ids, xy) tuple, where xy is a (n, 2) float64 array of
+    coordinates and ids a list with the value of fieldIndex for each point
+    (the feature id if fieldIndex is None). Points are reprojected to crs
+    if it is set. Features without a point geometry are skipped.
+    """
+    request = QgsFeatureRequest(request) if request is not None else QgsFeatureRequest()
+    request.setSubsetOfAttributes([fieldIndex] if fieldIndex is not None else [])
+    if crs is not None:
+        request.setDestinationCrs(crs)
+
+    ids = []
+    coords = []
+    for f in source.getFeatures(request):
+        if feedback is not None and feedback.isCanceled():
+            break
+        geom = f.geometry()
+        if geom.isNull():
+            continue
+        point = geom.asPoint()
+        coords.append((point.x(), point.y()))
+        ids.append(f.attributes()[fieldIndex] if fieldIndex is not None else f.id())
+
+    xy = numpy.array(coords, dtype=numpy.float64).reshape((len(coords), 2))
+    return ids, xy
+
+
+class NearestNeighbors(object):
+    """k-nearest neighbour queries over a fixed array of points.
+
+    Uses a KD-tree from scipy when it is available, and falls back to a
+    QgsSpatialIndex whose ids are the rows of the array otherwise. Results
+    are always rows of the array, so no feature needs to be fetched back.
+    """
+
+    def __init__(self, xy):
+        self.xy = xy
+        self.tree = None
+        self.index = None
+        if cKDTree is not None:
+            self.tree = cKDTree(xy)
+        else:
+            self.index = QgsSpatialIndex()
+            for row, (x, y) in enumerate(xy.tolist()):
+                self.index.insertFeature(row, QgsRectangle(x, y, x, y))
+
+    def query(self, points, k):
+        """Returns a list with an array of the rows of the k nearest
+        neighbours of each of the given (m, 2) points. When k is not less
+        than the number of points of the array, all the points are
+        neighbours and the same array of all the rows, in increasing order,
+        is returned for every point.
+        """
+        k = min(k, len(self.xy))
+        if k == 0:
+            return [numpy.empty(0, dtype=numpy.int64) for p in points]
+        if k == len(self.xy):
+            rows = numpy.arange(k, dtype=numpy.int64)
+            return [rows] * len(points)
+        if self.tree is not None:
+            distances, rows = self.tree.query(points, k)
+            rows = numpy.asarray(rows).reshape((len(points), k))
+            return list(rows)
+        return [numpy.array(self.index.nearestNeighbor(QgsPointXY(x, y), k)[:k], dtype=numpy.int64)
+                for x, y in points.tolist()]
+
+
+class DistanceCalculator(object):
+    """Vectorized equivalent of QgsDistanceArea.measureLine between
+    pairs of points.
+
+    Distances are cartesian, in the units of crs, if ellipsoid is None or
+    'NONE', and computed on the ellipsoid with Vincenty's inverse formula,
+    in meters, otherwise.
+    """
+
+    MAX_ITERATIONS = 20
+
+    def __init__(self, crs, ellipsoid=None):
+        self.transform = None
+        if ellipsoid and ellipsoid != 'NONE':
+            params = QgsEllipsoidUtils.ellipsoidParameters(ellipsoid)
+            if params.valid:
+                self.a = params.semiMajor
+                self.b = params.semiMinor
+                self.f = (self.a - self.b) / self.a
+                self.transform = QgsCoordinateTransform(crs, params.crs)
+
+    def willUseEllipsoid(self):
+        return self.transform is not None
+
+    def prepare(self, xy):
+        """Converts coordinates in crs to the ones used by distances(),
+        so points can be converted once and measured many times.
+        """
+        if self.transform is None or len(xy) == 0:
+            return xy
+        lonlat = numpy.empty(xy.shape, dtype=numpy.float64)
+        for i, (x, y) in enumerate(xy.tolist()):
+            p = self.transform.transform(QgsPointXY(x, y))
+            lonlat[i] = (p.x(), p.y())
+        return numpy.radians(lonlat)
+
+    def distances(self, p1, p2):
+        """Returns the distances between the rows of two arrays of points
+        returned by prepare(). Either array can be a single point.
+        """
+        p1 = numpy.atleast_2d(p1)
+        p2 = numpy.atleast_2d(p2)
+        if self.transform is None:
+            return numpy.hypot(p2[:, 0] - p1[:, 0], p2[:, 1] - p1[:, 1])
+        return self.vincenty(p1[:, 0], p1[:, 1], p2[:, 0], p2[:, 1])
+
+    def vincenty(self, lon1, lat1, lon2, lat2):
+        a, b, f = self.a, self.b, self.f
+        L = lon2 - lon1
+        U1 = numpy.arctan((1 - f) * numpy.tan(lat1))
+        U2 = numpy.arctan((1 - f) * numpy.tan(lat2))
+        sinU1, cosU1 = numpy.sin(U1), numpy.cos(U1)
+        sinU2, cosU2 = numpy.sin(U2), numpy.cos(U2)
+
+        L, sinU1, cosU1, sinU2, cosU2 = numpy.broadcast_arrays(L, sinU1, cosU1, sinU2, cosU2)
+        lam = L.copy()
+        sinSigma = cosSigma = sigma = cosSqAlpha = cos2SigmaM = numpy.zeros(L.shape)
+        for i in range(self.MAX_ITERATIONS):
+            sinLam, cosLam = numpy.sin(lam), numpy.cos(lam)
+            sinSigma = numpy.sqrt((cosU2 * sinLam) ** 2 +
+                                  (cosU1 * sinU2 - sinU1 * cosU2 * cosLam) ** 2)
+            cosSigma = sinU1 * sinU2 + cosU1 * cosU2 * cosLam
+            sigma = numpy.arctan2(sinSigma, cosSigma)
+            with numpy.errstate(invalid='ignore', divide='ignore'):
+                sinAlpha = numpy.where(sinSigma == 0, 0.0,
+                                       cosU1 * cosU2 * sinLam / sinSigma)
+                cosSqAlpha = 1 - sinAlpha ** 2
+                cos2SigmaM = numpy.where(cosSqAlpha == 0, 0.0,
+                                         cosSigma - 2 * sinU1 * sinU2 / cosSqAlpha)
+            C = f / 16 * cosSqAlpha * (4 + f * (4 - 3 * cosSqAlpha))
+            previous = lam
+            lam = L + (1 - C) * f * sinAlpha * (
+                sigma + C * sinSigma * (cos2SigmaM + C * cosSigma * (-1 + 2 * cos2SigmaM ** 2)))
+            if numpy.all(numpy.abs(lam - previous) < 1e-12):
+                break
+
+        uSq = cosSqAlpha * (a ** 2 - b ** 2) / b ** 2
+        A = 1 + uSq / 16384 * (4096 + uSq * (-768 + uSq * (320 - 175 * uSq)))
+        B = uSq / 1024 * (256 + uSq * (-128 + uSq * (74 - 47 * uSq)))
+        deltaSigma = B * sinSigma * (cos2SigmaM + B / 4 * (
+            cosSigma * (-1 + 2 * cos2SigmaM ** 2) -
+            B / 6 * cos2SigmaM * (-3 + 4 * sinSigma ** 2) * (-3 + 4 * cos2SigmaM ** 2)))
+        return b * A * (sigma - deltaSigma)
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    exportcache.py
+    ---------------------
+    Date                 : October 2026
+    Copyright            : (C) 2026 by QGIS Development Team
+    Email                : qgis-developer at lists dot osgeo dot org
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'QGIS Development Team'
+__date__ = 'October 2026'
+__copyright__ = '(C) 2026, QGIS Development Team'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+import os
+import glob
+import hashlib
+import threading
+import itertools
+from collections import OrderedDict
+
+from qgis.core import QgsProject
+
+from processing.core.ProcessingConfig import ProcessingConfig
+
+# Providers whose layers can change without the layer knowing it, their
+# exports are never cached
+UNCACHED_PROVIDERS = ['memory']
+
+# Files written along the file of a source when its data is changed: the
+# suffixes are appended to its name (SQLite write-ahead logs and journals)
+# and the extensions replace its extension (shapefile components)
+SIDECAR_SUFFIXES = ['-wal', '-journal']
+SIDECAR_EXTENSIONS = ['.dbf', '.shx', '.prj', '.cpg', '.qix']
+
+# Formats of the exports, as (extension, OGR driver name), in the order of
+# the options of the EXPORT_FORMAT setting
+EXPORT_FORMATS = [('shp', 'ESRI Shapefile'),
+                  ('gpkg', 'GPKG')]
+
+
+class ExportCache(object):
+    """Files written when exporting layers for external tools.
+
+    Entries are looked up by a key describing the layer (see cacheKey) and
+    are kept until the total size of the files exceeds the size set in the
+    settings, the least recently used ones being removed first. maxSize,
+    if given, is the size in bytes to use instead of the setting.
+    """
+
+    def __init__(self, maxSize=None):
+        self.maxSize = maxSize
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key):
+        """Returns the file exported with key, or None."""
+
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if not os.path.exists(entry[0]):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def add(self, key, filename):
+        """Adds a file exported with key, and removes the least recently used
+        files if the cache is full.
+        """
+
+        maxSize = self.maxSize if self.maxSize is not None else cacheSize()
+        if key is None or maxSize <= 0:
+            return
+        size = sum(os.path.getsize(f) for f in exportFiles(filename))
+        with self._lock:
+            self._entries[key] = (filename, size)
+            self._entries.move_to_end(key)
+            total = sum(s for _, s in self._entries.values())
+            # the file just added is kept, as it is about to be used
+            while total > maxSize and len(self._entries) > 1:
+                _, (oldFilename, oldSize) = self._entries.popitem(last=False)
+                removeExport(oldFilename)
+                total -= oldSize
+
+    def size(self):
+        with self._lock:
+            return sum(s for _, s in self._entries.values())
+
+    def clear(self):
+        with self._lock:
+            for filename, _ in self._entries.values():
+                removeExport(filename)
+            self._entries.clear()
+
+
+_cache = None
+_revisions = {}
+_revisionsLock = threading.RLock()
+_instances = itertools.count()
+
+
+def exportCache():
+    """Returns the export cache of the session."""
+
+    global _cache
+    if _cache is None:
+        _cache = ExportCache()
+    return _cache
+
+
+def cacheSize():
+    """Maximum size of the cache in bytes."""
+
+    try:
+        return float(ProcessingConfig.getSetting(ProcessingConfig.EXPORT_CACHE_SIZE) or 0) * 1024 * 1024
+    except ValueError:
+        return 0
+
+
+def exportFormat(supported):
+    """Returns the extension and the OGR driver to export to, given the
+    extensions supported by the tool.
+    """
+
+    extension, driver = EXPORT_FORMATS[ProcessingConfig.getSetting(ProcessingConfig.EXPORT_FORMAT) or 0]
+    if extension not in supported:
+        extension, driver = EXPORT_FORMATS[0]
+    return extension, driver
+
+
+def exportFiles(filename):
+    """Returns the files written by an export, the main one and its side
+    files (.dbf, .prj, -wal...).
+    """
+
+    base = os.path.splitext(filename)[0]
+    return [f for f in glob.glob(glob.escape(base) + '*')
+            if f == filename or os.path.splitext(f)[0] == base or f.startswith(filename + '-')]
+
+
+def removeExport(filename):
+    for f in exportFiles(filename):
+        try:
+            os.remove(f)
+        except OSError:
+            pass
+
+
+def layerRevision(layer):
+    """Returns a string identifying the state of the data of layer as long
+    as this layer object is in use: a number unique to the layer object and
+    a counter increased each time its data is changed from QGIS.
+
+    The revision is forgotten when the layer is removed from the project or
+    deleted, so another layer object with the same id gets a new one.
+    """
+
+    return '{}.{}'.format(*_revision(layer))
+
+
+def _revision(layer):
+    with _revisionsLock:
+        if layer.id() not in _revisions:
+            if not _revisions:
+                QgsProject.instance().layersWillBeRemoved.connect(_removeRevisions)
+            layerId = layer.id()
+
+            def increaseRevision():
+                with _revisionsLock:
+                    if layerId in _revisions:
+                        _revisions[layerId][1] += 1
+
+            _revisions[layerId] = [next(_instances), 0, increaseRevision]
+            layer.dataChanged.connect(increaseRevision)
+            layer.destroyed.connect(lambda: _removeRevisions([layerId], False))
+        instance, revision, _ = _revisions[layer.id()]
+        return instance, revision
+
+
+def _removeRevisions(layerIds, disconnect=True):
+    with _revisionsLock:
+        for layerId in layerIds:
+            entry = _revisions.pop(layerId, None)
+            layer = QgsProject.instance().mapLayer(layerId) if disconnect else None
+            if entry is not None and layer is not None:
+                try:
+                    layer.dataChanged.disconnect(entry[2])
+                except TypeError:
+                    pass
+        if not _revisions:
+            try:
+                QgsProject.instance().layersWillBeRemoved.disconnect(_removeRevisions)
+            except TypeError:
+                pass
+
+
+def dataFiles(layer):
+    """Returns the existing files holding the data of layer: the file of
+    its source and the files written along it, or an empty list if it is
+    not stored in a file.
+    """
+
+    path = layer.source().split('|')[0]
+    if not os.path.isfile(path):
+        return []
+    base = os.path.splitext(path)[0]
+    candidates = [path + suffix for suffix in SIDECAR_SUFFIXES]
+    candidates += [base + ext for ext in SIDECAR_EXTENSIONS if os.path.normcase(base + ext) != os.path.normcase(path)]
+    return [path] + [f for f in candidates if os.path.isfile(f)]
+
+
+def modificationTime(layer):
+    """Returns the time of the last modification of the data of layer, or
+    None if it is not known.
+    """
+
+    files = dataFiles(layer)
+    if files:
+        return max(os.path.getmtime(f) for f in files)
+    timestamp = layer.dataProvider().dataTimestamp()
+    if timestamp.isValid():
+        return timestamp.toMSecsSinceEpoch()
+    return None
+
+
+def cacheKey(layer, extension, useSelection=False):
+    """Returns the key of the export of layer to a file with extension, or
+    None if it must not be cached.
+
+    The key is a digest of everything the exported features depend on: the
+    provider and source of the layer, its subset string, the selected
+    features if only those are exported, its CRS, the modification time and
+    size of the files of its data (including the write-ahead log of a
+    GeoPackage or the components of a shapefile) and the number of changes
+    made to it through this layer object. Sources without a modification
+    time, like databases, use the whole revision of the layer object
+    instead, so their exports are only reused by that layer object while it
+    is not changed from QGIS.
+    """
+
+    if layer.providerType() in UNCACHED_PROVIDERS or layer.isModified():
+        return None
+    files = dataFiles(layer)
+    if files:
+        modified = [(os.path.basename(f), os.path.getmtime(f), os.path.getsize(f)) for f in files]
+    else:
+        modified = modificationTime(layer)
+    instance, changes = _revision(layer)
+    revision = changes if modified is not None else '{}.{}'.format(instance, changes)
+    digest = hashlib.sha1()
+    for value in (extension, layer.providerType(), layer.source(), layer.subsetString(), useSelection,
+                  layer.crs().authid() or layer.crs().toWkt(), modified, revision):
+        digest.update(str(value).encode('utf-8'))
+        digest.update(b'\0')
+    if useSelection:
+        for fid in sorted(layer.selectedFeatureIds()):
+            digest.update(str(fid).encode('ascii'))
+            digest.update(b',')
+    return digest.hexdigest()
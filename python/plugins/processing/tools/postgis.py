@@ -32,17 +32,37 @@ __revision__ = '$Format:%H$'
 
 import psycopg2
 import psycopg2.extensions  # For isolation levels
+import psycopg2.errorcodes
+import io
 import re
 import os
+import struct
+import hashlib
+import threading
+import time
 
 from qgis.core import QgsDataSourceUri, QgsCredentials, QgsSettings
 
-from qgis.PyQt.QtCore import QCoreApplication
+from qgis.PyQt.QtCore import (QCoreApplication,
+                              QVariant,
+                              QByteArray,
+                              QDate,
+                              QDateTime,
+                              QTime,
+                              Qt)
 
 
 # Use unicode!
 psycopg2.extensions.register_type(psycopg2.extensions.UNICODE)
 
+# Default number of rows sent by each COPY statement of GeoDB.copy_rows
+COPY_BATCH_SIZE = 10000
+
+# EWKB flags set on the geometry type
+EWKB_Z_FLAG = 0x80000000
+EWKB_M_FLAG = 0x40000000
+EWKB_SRID_FLAG = 0x20000000
+
 
 def uri_from_name(conn_name):
     settings = QgsSettings()
@@ -74,6 +94,208 @@ def uri_from_name(conn_name):
     return uri
 
 
+def ewkb_hex(wkb, srid=None):
+    """Converts an ISO WKB geometry (as returned by
+    QgsGeometry.exportToWkb()) to hex encoded EWKB, embedding the SRID if
+    given, ready to be loaded in a geometry column with GeoDB.copy_rows.
+    """
+
+    wkb = bytes(wkb)
+    if not wkb:
+        return None
+    endian = '<' if wkb[0] == 1 else '>'
+    (wkbType,) = struct.unpack(endian + 'I', wkb[1:5])
+    if wkbType & (EWKB_Z_FLAG | EWKB_M_FLAG | EWKB_SRID_FLAG):
+        # already extended
+        ewkbType = wkbType
+    else:
+        ewkbType = wkbType % 1000
+        dims = wkbType // 1000
+        if dims in (1, 3):
+            ewkbType |= EWKB_Z_FLAG
+        if dims in (2, 3):
+            ewkbType |= EWKB_M_FLAG
+    header = wkb[:1] + struct.pack(endian + 'I', ewkbType | (EWKB_SRID_FLAG if srid else 0))
+    if srid and not wkbType & EWKB_SRID_FLAG:
+        header += struct.pack(endian + 'i', srid)
+    return (header + wkb[5:]).hex()
+
+
+def _copy_value(value):
+    """Formats a value for the text format of COPY."""
+
+    if value is None or (isinstance(value, QVariant) and value.isNull()):
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, QByteArray):
+        value = bytes(value)
+    if isinstance(value, (bytes, bytearray)):
+        return '\\\\x' + bytes(value).hex()
+    if isinstance(value, (QDate, QDateTime, QTime)):
+        if not value.isValid():
+            return '\\N'
+        value = value.toString(Qt.ISODate)
+    text = str(value)
+    return text.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    """psycopg2 connection which can be kept in a ConnectionPool.
+
+    It remembers the credentials used to open it, when it was last used and
+    the names of the statements prepared on it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.credentials = None
+        self.last_used = time.time()
+        self.prepared = set()
+
+
+def pool_key(uri):
+    """Returns the key of the connections of uri in a ConnectionPool: its
+    connection info without the credentials, which are only kept as a
+    digest so connections of different users are not mixed.
+    """
+
+    uri = QgsDataSourceUri(uri.uri(False))
+    credentials = '{}\0{}'.format(uri.username(), uri.password())
+    uri.setUsername('')
+    uri.setPassword('')
+    return '{} credentials={}'.format(uri.connectionInfo(False),
+                                      hashlib.sha256(credentials.encode('utf-8')).hexdigest())
+
+
+class ConnectionPool(object):
+    """Process wide pool of idle PostgreSQL connections.
+
+    Connections are keyed by pool_key(). They are reset when they are
+    released, checked before being handed out again if they have been idle
+    for a while and closed once they have been idle for too long.
+    """
+
+    # maximum number of idle connections kept for a key
+    MAX_IDLE = 4
+    # idle connections are closed after this number of seconds
+    IDLE_TIMEOUT = 300
+    # idle connections are checked with a query after this number of seconds
+    CHECK_INTERVAL = 30
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._idle = {}
+
+    def connect(self, conninfo):
+        """Opens a new connection, which can be released to the pool."""
+
+        return psycopg2.connect(conninfo, connection_factory=PooledConnection)
+
+    def acquire(self, key):
+        """Returns a healthy idle connection for key, or None if there is
+        none.
+        """
+
+        while True:
+            with self._lock:
+                self._evict(time.time())
+                connections = self._idle.get(key)
+                if not connections:
+                    return None
+                con = connections.pop()
+            if self._check(con):
+                return con
+            self._close(con)
+
+    def release(self, key, con):
+        """Gives a connection back to the pool, any pending transaction is
+        rolled back and the session is reset: its cursors, temporary tables,
+        settings, listeners and advisory locks are discarded. Its prepared
+        statements are kept, so they can be executed again by the next user
+        of the connection.
+        """
+
+        if not isinstance(con, PooledConnection) or con.closed:
+            return
+        try:
+            con.reset()
+            con.autocommit = True
+            c = con.cursor()
+            # what DISCARD ALL does, except DEALLOCATE ALL and DISCARD PLANS
+            c.execute('CLOSE ALL; SET SESSION AUTHORIZATION DEFAULT; RESET ALL; UNLISTEN *; '
+                      'SELECT pg_advisory_unlock_all(); DISCARD TEMP; DISCARD SEQUENCES')
+            c.close()
+            con.autocommit = False
+        except psycopg2.Error:
+            self._close(con)
+            return
+
+        con.last_used = time.time()
+        with self._lock:
+            self._evict(con.last_used)
+            connections = self._idle.setdefault(key, [])
+            if len(connections) < self.MAX_IDLE:
+                connections.append(con)
+                return
+        self._close(con)
+
+    def clear(self):
+        """Closes all the idle connections."""
+
+        with self._lock:
+            idle = self._idle
+            self._idle = {}
+        for connections in idle.values():
+            for con in connections:
+                self._close(con)
+
+    def _evict(self, now):
+        for key, connections in list(self._idle.items()):
+            alive = [con for con in connections if now - con.last_used < self.IDLE_TIMEOUT]
+            for con in connections:
+                if con not in alive:
+                    self._close(con)
+            if alive:
+                self._idle[key] = alive
+            else:
+                del self._idle[key]
+
+    def _check(self, con):
+        if con.closed:
+            return False
+        if time.time() - con.last_used < self.CHECK_INTERVAL:
+            return True
+        try:
+            c = con.cursor()
+            c.execute('SELECT 1')
+            c.close()
+            con.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def _close(self, con):
+        try:
+            con.close()
+        except psycopg2.Error:
+            pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def connectionPool():
+    """Returns the connection pool shared by the whole process."""
+
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool()
+        return _pool
+
+
 class TableAttribute(object):
 
     def __init__(self, row):
@@ -188,6 +410,7 @@ class GeoDB(object):
                  passwd=None, service=None, uri=None):
         # Regular expression for identifiers without need to quote them
         self.re_ident_ok = re.compile(r"^\w+$")
+        self.con = None
         port = str(port)
 
         if uri:
@@ -199,12 +422,29 @@ class GeoDB(object):
             else:
                 self.uri.setConnection(host, port, dbname, user, passwd)
 
+        # connections are shared with the other instances using the same
+        # connection info, new ones are only opened if none is idle
         conninfo = self.uri.connectionInfo(False)
+        self._pool_key = pool_key(self.uri)
+        self.con = connectionPool().acquire(self._pool_key)
+        if self.con is not None:
+            user, password = self.con.credentials
+            if user:
+                self.uri.setUsername(user)
+            if password:
+                self.uri.setPassword(password)
+        else:
+            self._connect(conninfo)
+
+        self.has_postgis = self.check_postgis()
+
+    def _connect(self, conninfo):
         err = None
         for i in range(4):
             expandedConnInfo = self.uri.connectionInfo(True)
             try:
-                self.con = psycopg2.connect(expandedConnInfo)
+                self.con = connectionPool().connect(expandedConnInfo)
+                self.con.credentials = (self.uri.username(), self.uri.password())
                 if err is not None:
                     QgsCredentials.instance().put(conninfo,
                                                   self.uri.username(),
@@ -246,7 +486,17 @@ class GeoDB(object):
                     sslCAFile = sslCAFile.replace("'", "")
                     os.remove(sslCAFile)
 
-        self.has_postgis = self.check_postgis()
+    def close(self):
+        """Gives the connection back to the shared pool, the object can not
+        be used afterwards.
+        """
+
+        if self.con is not None:
+            connectionPool().release(self._pool_key, self.con)
+            self.con = None
+
+    def __del__(self):
+        self.close()
 
     def get_info(self):
         c = self.con.cursor()
@@ -258,8 +508,8 @@ class GeoDB(object):
         """
 
         c = self.con.cursor()
-        self._exec_sql(c,
-                       "SELECT COUNT(*) FROM pg_proc WHERE proname = 'postgis_version'")
+        self._exec_prepared(c, 'check_postgis',
+                            "SELECT COUNT(*) FROM pg_proc WHERE proname = 'postgis_version'")
         return c.fetchone()[0] > 0
 
     def get_postgis_info(self):
@@ -287,7 +537,7 @@ class GeoDB(object):
         sql = "SELECT oid, nspname, pg_get_userbyid(nspowner), nspacl \
                FROM pg_namespace \
                WHERE nspname !~ '^pg_' AND nspname != 'information_schema'"
-        self._exec_sql(c, sql)
+        self._exec_prepared(c, 'list_schemas', sql)
         return c.fetchall()
 
     def list_geotables(self, schema=None):
@@ -305,11 +555,9 @@ class GeoDB(object):
 
         c = self.con.cursor()
 
-        if schema:
-            schema_where = " AND nspname = '%s' " % self._quote_unicode(schema)
-        else:
-            schema_where = \
-                " AND (nspname != 'information_schema' AND nspname !~ 'pg_') "
+        schema_where = """ AND (nspname = $1 OR ($1 IS NULL AND
+                          nspname != 'information_schema' AND nspname !~ 'pg_')) """
+        params = (schema or None, )
 
         # LEFT OUTER JOIN: like LEFT JOIN but if there are more matches,
         # for join, all are used (not only one)
@@ -324,6 +572,7 @@ class GeoDB(object):
                   JOIN pg_namespace ON pg_namespace.oid = pg_class.relnamespace
                   WHERE pg_class.relkind IN ('v', 'r')""" \
                   + schema_where + 'ORDER BY nspname, relname'
+            name = 'list_tables'
         else:
             # Discovery of all tables and whether they contain a
             # geometry column
@@ -341,8 +590,9 @@ class GeoDB(object):
                            WHERE typbasetype='geometry'::regtype))
                   WHERE pg_class.relkind IN ('v', 'r') """ \
                   + schema_where + 'ORDER BY nspname, relname, attname'
+            name = 'list_geotables'
 
-        self._exec_sql(c, sql)
+        self._exec_prepared(c, name, sql, params)
         items = c.fetchall()
 
         # Get geometry info from geometry_columns if exists
@@ -360,7 +610,7 @@ class GeoDB(object):
                   WHERE (relkind = 'r' or relkind='v') """ \
                   + schema_where + 'ORDER BY nspname, relname, \
                   f_geometry_column'
-            self._exec_sql(c, sql)
+            self._exec_prepared(c, 'list_geometry_columns', sql, params)
 
             # Merge geometry info to "items"
             for (i, geo_item) in enumerate(c.fetchall()):
@@ -379,9 +629,6 @@ class GeoDB(object):
         """Return list of columns in table"""
 
         c = self.con.cursor()
-        schema_where = (" AND nspname='%s' "
-                        % self._quote_unicode(schema) if schema is not None else ''
-                        )
         sql = """SELECT a.attnum AS ordinal_position,
                         a.attname AS column_name,
                         t.typname AS data_type,
@@ -397,12 +644,11 @@ class GeoDB(object):
               LEFT JOIN pg_attrdef adef ON adef.adrelid = a.attrelid
                   AND adef.adnum = a.attnum
               WHERE
-                  c.relname = '%s' %s AND
+                  c.relname = $1 AND ($2 IS NULL OR nspname = $2) AND
                   a.attnum > 0
-              ORDER BY a.attnum""" \
-              % (self._quote_unicode(table), schema_where)
+              ORDER BY a.attnum"""
 
-        self._exec_sql(c, sql)
+        self._exec_prepared(c, 'get_table_fields', sql, (table, schema))
         attrs = []
         for row in c.fetchall():
             attrs.append(TableAttribute(row))
@@ -415,20 +661,16 @@ class GeoDB(object):
 
         c = self.con.cursor()
 
-        schema_where = (" AND nspname='%s' "
-                        % self._quote_unicode(schema) if schema is not None else ''
-                        )
         sql = """SELECT relname, indkey
               FROM pg_class, pg_index
               WHERE pg_class.oid = pg_index.indexrelid AND pg_class.oid IN (
                      SELECT indexrelid
                      FROM pg_index, pg_class
                      JOIN pg_namespace nsp ON pg_class.relnamespace = nsp.oid
-                     WHERE pg_class.relname='%s' %s AND
+                     WHERE pg_class.relname = $1 AND ($2 IS NULL OR nspname = $2) AND
                          pg_class.oid=pg_index.indrelid
-                         AND indisunique != 't' AND indisprimary != 't' )""" \
-              % (self._quote_unicode(table), schema_where)
-        self._exec_sql(c, sql)
+                         AND indisunique != 't' AND indisprimary != 't' )"""
+        self._exec_prepared(c, 'get_table_indexes', sql, (table, schema))
         indexes = []
         for row in c.fetchall():
             indexes.append(TableIndex(row))
@@ -437,9 +679,6 @@ class GeoDB(object):
     def get_table_constraints(self, table, schema=None):
         c = self.con.cursor()
 
-        schema_where = (" AND nspname='%s' "
-                        % self._quote_unicode(schema) if schema is not None else ''
-                        )
         sql = """SELECT c.conname, c.contype, c.condeferrable, c.condeferred,
                         array_to_string(c.conkey, ' '), c.consrc, t2.relname,
                         c.confupdtype, c.confdeltype, c.confmatchtype,
@@ -448,10 +687,9 @@ class GeoDB(object):
               LEFT JOIN pg_class t ON c.conrelid = t.oid
               LEFT JOIN pg_class t2 ON c.confrelid = t2.oid
               JOIN pg_namespace nsp ON t.relnamespace = nsp.oid
-              WHERE t.relname = '%s' %s """ \
-              % (self._quote_unicode(table), schema_where)
+              WHERE t.relname = $1 AND ($2 IS NULL OR nspname = $2)"""
 
-        self._exec_sql(c, sql)
+        self._exec_prepared(c, 'get_table_constraints', sql, (table, schema))
 
         constrs = []
         for row in c.fetchall():
@@ -461,16 +699,12 @@ class GeoDB(object):
     def get_view_definition(self, view, schema=None):
         """Returns definition of the view."""
 
-        schema_where = (" AND nspname='%s' "
-                        % self._quote_unicode(schema) if schema is not None else ''
-                        )
         sql = """SELECT pg_get_viewdef(c.oid)
               FROM pg_class c
               JOIN pg_namespace nsp ON c.relnamespace = nsp.oid
-              WHERE relname='%s' %s AND relkind='v'""" \
-              % (self._quote_unicode(view), schema_where)
+              WHERE relname = $1 AND ($2 IS NULL OR nspname = $2) AND relkind='v'"""
         c = self.con.cursor()
-        self._exec_sql(c, sql)
+        self._exec_prepared(c, 'get_view_definition', sql, (view, schema))
         return c.fetchone()[0]
 
     def add_geometry_column(self, table, geom_type, schema=None,
@@ -824,6 +1058,112 @@ class GeoDB(object):
         else:
             self._exec_sql_and_commit(sql)
 
+    def copy_rows(self, table, columns, rows, schema=None,
+                  batch_size=COPY_BATCH_SIZE, callback=None, error_callback=None):
+        """Bulk load rows into a table with COPY.
+
+        rows is an iterable of sequences of values in the order of columns,
+        geometries are expected as hex EWKB (see ewkb_hex). Rows are sent
+        and committed by batches of batch_size rows. After each batch
+        callback, if given, is called with the number of rows read so far
+        and the load stops if it returns False.
+
+        A batch rejected by the server (e.g. because of a malformed value) is
+        copied again row by row. error_callback, if given, is then called
+        with the number of each failing row (counting from 1) and the
+        DbError, and the other rows are loaded. Without it the first failing
+        row raises the DbError.
+
+        Returns the number of loaded rows.
+        """
+
+        sql = 'COPY %s (%s) FROM STDIN' % (
+            self._table_name(schema, table),
+            ', '.join(self._quote(c) for c in columns))
+
+        count = 0
+        loaded = 0
+        batch = []
+        for row in rows:
+            batch.append('\t'.join(_copy_value(v) for v in row) + '\n')
+            if len(batch) >= batch_size:
+                loaded += self._copy_batch(sql, batch, count, error_callback)
+                count += len(batch)
+                batch = []
+                if callback is not None and callback(count) is False:
+                    return loaded
+
+        if batch:
+            loaded += self._copy_batch(sql, batch, count, error_callback)
+            count += len(batch)
+            if callback is not None:
+                callback(count)
+        return loaded
+
+    def set_table_logged(self, table, logged, schema=None):
+        """Switch a table between logged and unlogged (PostgreSQL 9.5+).
+
+        Writes to unlogged tables skip the write-ahead log, which makes them
+        much faster but their content is lost after a crash.
+        """
+
+        t = self._table_name(schema, table)
+        sql = 'ALTER TABLE %s SET %s' % (t, 'LOGGED' if logged else 'UNLOGGED')
+        self._exec_sql_and_commit(sql)
+
+    def get_geometry_column_info(self, table, geom_column, schema=None):
+        """Geometry column details: (srid, type), or None if the column is
+        not registered in geometry_columns.
+        """
+
+        sql = "SELECT srid, type FROM geometry_columns \
+               WHERE f_table_name = $1 AND f_geometry_column = $2 \
+               AND ($3 IS NULL OR f_table_schema = $3)"
+        c = self.con.cursor()
+        self._exec_prepared(c, 'get_geometry_column_info', sql,
+                            (table, geom_column, schema or None))
+        return c.fetchone()
+
+    def _copy_batch(self, sql, lines, first, error_callback):
+        """Copies a batch of COPY lines and commits it, first being the
+        number of rows before the batch. Returns the number of loaded rows.
+        """
+
+        try:
+            c = self.con.cursor()
+            c.copy_expert(sql, io.StringIO(''.join(lines)))
+            self.con.commit()
+            return len(lines)
+        except psycopg2.Error:
+            self.con.rollback()
+
+        # find the failing rows, each row is copied inside a savepoint so
+        # that an error only discards that row
+        loaded = 0
+        try:
+            c = self.con.cursor()
+            for i, line in enumerate(lines):
+                c.execute('SAVEPOINT copy_row')
+                try:
+                    c.copy_expert(sql, io.StringIO(line))
+                except psycopg2.Error as e:
+                    c.execute('ROLLBACK TO SAVEPOINT copy_row')
+                    error = DbError('row {}: {}'.format(first + i + 1, e), sql)
+                    if error_callback is None:
+                        raise error
+                    error_callback(first + i + 1, error)
+                else:
+                    c.execute('RELEASE SAVEPOINT copy_row')
+                    loaded += 1
+            self.con.commit()
+        except psycopg2.Error as e:
+            self.con.rollback()
+            raise DbError(str(e), sql)
+        except DbError:
+            self.con.rollback()
+            raise
+        return loaded
+
     def _exec_sql(self, cursor, sql):
         try:
             cursor.execute(sql)
@@ -831,6 +1171,48 @@ class GeoDB(object):
             raise DbError(str(e),
                           e.cursor.query.decode(e.cursor.connection.encoding))
 
+    def _exec_prepared(self, cursor, name, sql, params=()):
+        """Executes a query with $n placeholders as a prepared statement.
+
+        The statement is prepared the first time it is used on the
+        connection, later executions only send the parameters.
+        """
+
+        name = 'processing_' + name
+        prepared = name in self.con.prepared
+        if not prepared:
+            types = ', '.join(['text'] * len(params))
+            self._exec_sql(cursor, 'PREPARE %s%s AS %s' % (name, ' (%s)' % types if types else '', sql))
+            self.con.prepared.add(name)
+
+        execute = 'EXECUTE %s' % name
+        if params:
+            execute += ' (%s)' % ', '.join(['%s'] * len(params))
+        # a statement prepared earlier may have been deallocated meanwhile
+        # (DISCARD or DEALLOCATE run through this connection), the error
+        # must then not abort the work of the caller in the current
+        # transaction (the savepoint uses another cursor to keep the result)
+        savepoint = None
+        if prepared and self.con.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_INTRANS:
+            savepoint = self.con.cursor()
+            self._exec_sql(savepoint, 'SAVEPOINT processing_execute')
+        try:
+            cursor.execute(execute, params)
+        except psycopg2.Error as e:
+            if not prepared or e.pgcode != psycopg2.errorcodes.INVALID_SQL_STATEMENT_NAME:
+                raise DbError(str(e), execute)
+            if savepoint is not None:
+                self._exec_sql(savepoint, 'ROLLBACK TO SAVEPOINT processing_execute')
+                self._exec_sql(savepoint, 'RELEASE SAVEPOINT processing_execute')
+            else:
+                self.con.rollback()
+            # prepare it again
+            self.con.prepared.discard(name)
+            self._exec_prepared(cursor, name[len('processing_'):], sql, params)
+            return
+        if savepoint is not None:
+            self._exec_sql(savepoint, 'RELEASE SAVEPOINT processing_execute')
+
     def _exec_sql_and_commit(self, sql):
         """Tries to execute and commit some action, on error it rolls
         back the change.
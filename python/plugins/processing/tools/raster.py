@@ -30,7 +30,7 @@ from builtins import range
 from builtins import object
 
 import os
-import struct
+from collections import OrderedDict
 
 import numpy
 from osgeo import gdal
@@ -72,35 +72,113 @@ def formatShortNameFromFileName(fileName):
 
 
 def scanraster(layer, feedback):
+    """Yields every pixel of the first band of the layer as a Python
+    value, or None for no-data cells. Kept for backwards compatibility,
+    prefer scanblocks() which is much faster on large rasters.
+    """
+    for xoff, yoff, blocks in scanblocks(layer, feedback):
+        block = blocks[0]
+        values = block.filled(0).ravel().tolist()
+        mask = numpy.ma.getmaskarray(block).ravel().tolist()
+        for value, masked in zip(values, mask):
+            yield None if masked else value
+
+
+# Upper bound for the number of cells read at once by scanblocks(). Used
+# to group narrow blocks (e.g. one-row strips) into larger windows while
+# keeping memory usage bounded regardless of the raster size.
+MAX_BLOCK_CELLS = 4 * 1024 * 1024
+
+
+def nodataMask(array, nodata):
+    """Returns a boolean mask of the cells in array equal to nodata,
+    taking care of NaN no-data values.
+    """
+    if nodata is None:
+        if array.dtype.kind == 'f':
+            return numpy.isnan(array)
+        return numpy.zeros(array.shape, dtype=bool)
+    if numpy.isnan(nodata):
+        return numpy.isnan(array)
+    mask = array == nodata
+    if array.dtype.kind == 'f':
+        mask |= numpy.isnan(array)
+    return mask
+
+
+def blockWindows(dataset, bands=None, maxCells=MAX_BLOCK_CELLS):
+    """Returns a list of (xoff, yoff, xsize, ysize) windows covering the
+    dataset, aligned to the natural block size of the first requested band.
+    """
+    band = dataset.GetRasterBand(bands[0] if bands else 1)
+    blockX, blockY = band.GetBlockSize()
+    xsize = dataset.RasterXSize
+    ysize = dataset.RasterYSize
+    blockX = max(1, min(blockX, xsize))
+    blockY = max(1, min(blockY, ysize))
+
+    # strips are extended vertically, tiles are read one by one unless they
+    # are smaller than the cells limit in which case a whole row of tiles
+    # is read in a single request
+    if blockX * blockY < maxCells:
+        if blockX < xsize and xsize * blockY <= maxCells:
+            blockX = xsize
+        if blockX == xsize:
+            blockY = max(blockY, (maxCells // xsize) // blockY * blockY)
+            blockY = min(blockY, ysize)
+
+    windows = []
+    for yoff in range(0, ysize, blockY):
+        height = min(blockY, ysize - yoff)
+        for xoff in range(0, xsize, blockX):
+            width = min(blockX, xsize - xoff)
+            windows.append((xoff, yoff, width, height))
+    return windows
+
+
+def scanblocks(layer, feedback=None, bands=None, maxCells=MAX_BLOCK_CELLS):
+    """Iterates over a raster layer block by block following the natural
+    block size of the underlying GDAL dataset.
+
+    Yields (xoff, yoff, blocks) tuples, where blocks is a list with a
+    numpy masked array per requested band (1-based band numbers, all
+    bands if None). Masked cells are no-data. Only one window per band is
+    held in memory at any time.
+    """
     filename = str(layer.source())
     dataset = gdal.Open(filename, gdal.GA_ReadOnly)
-    band = dataset.GetRasterBand(1)
-    nodata = band.GetNoDataValue()
-    bandtype = gdal.GetDataTypeName(band.DataType)
-    for y in range(band.YSize):
-        feedback.setProgress(y / float(band.YSize) * 100)
-        scanline = band.ReadRaster(0, y, band.XSize, 1, band.XSize, 1,
-                                   band.DataType)
-        if bandtype == 'Byte':
-            values = struct.unpack('B' * band.XSize, scanline)
-        elif bandtype == 'Int16':
-            values = struct.unpack('h' * band.XSize, scanline)
-        elif bandtype == 'UInt16':
-            values = struct.unpack('H' * band.XSize, scanline)
-        elif bandtype == 'Int32':
-            values = struct.unpack('i' * band.XSize, scanline)
-        elif bandtype == 'UInt32':
-            values = struct.unpack('I' * band.XSize, scanline)
-        elif bandtype == 'Float32':
-            values = struct.unpack('f' * band.XSize, scanline)
-        elif bandtype == 'Float64':
-            values = struct.unpack('d' * band.XSize, scanline)
-        else:
-            raise QgsProcessingException('Raster format not supported')
-        for value in values:
-            if value == nodata:
-                value = None
-            yield value
+    if dataset is None:
+        raise QgsProcessingException(
+            'Could not open raster {}'.format(filename))
+
+    if bands is None:
+        bands = list(range(1, dataset.RasterCount + 1))
+    gdalBands = []
+    for b in bands:
+        band = dataset.GetRasterBand(b)
+        if band is None:
+            raise QgsProcessingException(
+                'Raster does not have band {}'.format(b))
+        gdalBands.append((band, band.GetNoDataValue()))
+
+    windows = blockWindows(dataset, bands, maxCells)
+    total = 100.0 / len(windows) if windows else 0
+    for current, (xoff, yoff, width, height) in enumerate(windows):
+        if feedback is not None:
+            if feedback.isCanceled():
+                break
+            feedback.setProgress(int(current * total))
+        blocks = []
+        for band, nodata in gdalBands:
+            array = band.ReadAsArray(xoff, yoff, width, height)
+            if array is None:
+                raise QgsProcessingException(
+                    'Raster format not supported')
+            blocks.append(numpy.ma.masked_array(
+                array, mask=nodataMask(array, nodata)))
+        yield xoff, yoff, blocks
+
+    dataset = None
 
 
 def mapToPixel(mX, mY, geoTransform):
@@ -114,45 +192,165 @@ def pixelToMap(pX, pY, geoTransform):
 
 
 class RasterWriter(object):
+    """Writes a tiled GeoTIFF without holding the whole grid in memory.
+
+    The file is created when the writer is constructed. Values can be set
+    cell by cell with setValue(), which goes through an LRU cache of tiles
+    bounded by cacheSize bytes, or as whole windows with setBlock(). Dirty
+    tiles are written to disk when evicted from the cache and in close().
+    Bands are 0-based.
+    """
 
     NODATA = -99999.0
 
+    TILE_SIZE = 256
+    CACHE_SIZE = 256 * 1024 * 1024
+
+    DEFAULT_OPTIONS = {'TILED': 'YES',
+                       'BIGTIFF': 'IF_SAFER'}
+
     def __init__(self, fileName, minx, miny, maxx, maxy, cellsize,
-                 nbands, crs, geotransform=None):
+                 nbands, crs, geotransform=None, options=None,
+                 cacheSize=CACHE_SIZE):
         self.fileName = fileName
         self.nx = int((maxx - minx) / float(cellsize))
         self.ny = int((maxy - miny) / float(cellsize))
         self.nbands = nbands
-        self.matrix = numpy.empty(shape=(self.ny, self.nx), dtype=numpy.float32)
-        self.matrix.fill(self.NODATA)
         self.cellsize = cellsize
         self.crs = crs
         self.minx = minx
         self.maxy = maxy
         self.geotransform = geotransform
 
+        creationOptions = dict(self.DEFAULT_OPTIONS)
+        creationOptions['BLOCKXSIZE'] = str(self.TILE_SIZE)
+        creationOptions['BLOCKYSIZE'] = str(self.TILE_SIZE)
+        for option in options or []:
+            key, value = option.split('=', 1)
+            creationOptions[key.upper()] = value
+
+        driver = gdal.GetDriverByName('GTiff')
+        self.dataset = driver.Create(self.fileName, self.nx, self.ny,
+                                     self.nbands, gdal.GDT_Float32,
+                                     ['{}={}'.format(k, v) for k, v in creationOptions.items()])
+        if self.dataset is None:
+            raise QgsProcessingException(
+                'Could not create raster {}'.format(self.fileName))
+        self.dataset.SetProjection(str(self.crs.toWkt()))
+        if self.geotransform is None:
+            self.dataset.SetGeoTransform([self.minx, self.cellsize, 0,
+                                          self.maxy, 0, -self.cellsize])
+        else:
+            self.dataset.SetGeoTransform(self.geotransform)
+        for b in range(self.nbands):
+            self.dataset.GetRasterBand(b + 1).SetNoDataValue(self.NODATA)
+
+        self.tileX, self.tileY = self.dataset.GetRasterBand(1).GetBlockSize()
+        tileBytes = self.tileX * self.tileY * numpy.dtype(numpy.float32).itemsize
+        self.maxTiles = max(1, int(cacheSize // tileBytes))
+        # (band, column, row) -> [array, dirty]
+        self.tiles = OrderedDict()
+
+    def _tileWindow(self, col, row):
+        xoff = col * self.tileX
+        yoff = row * self.tileY
+        return (xoff, yoff,
+                min(self.tileX, self.nx - xoff),
+                min(self.tileY, self.ny - yoff))
+
+    def _writeTile(self, key, array):
+        band, col, row = key
+        xoff, yoff, width, height = self._tileWindow(col, row)
+        self.dataset.GetRasterBand(band + 1).WriteArray(
+            array[:height, :width], xoff, yoff)
+
+    def _tile(self, band, x, y):
+        key = (band, x // self.tileX, y // self.tileY)
+        tile = self.tiles.get(key)
+        if tile is not None:
+            self.tiles.move_to_end(key)
+            return tile
+
+        xoff, yoff, width, height = self._tileWindow(key[1], key[2])
+        array = numpy.empty((self.tileY, self.tileX), dtype=numpy.float32)
+        array[:height, :width] = self.dataset.GetRasterBand(band + 1).ReadAsArray(
+            xoff, yoff, width, height)
+        tile = [array, False]
+        self.tiles[key] = tile
+
+        while len(self.tiles) > self.maxTiles:
+            oldKey, (oldArray, dirty) = self.tiles.popitem(last=False)
+            if dirty:
+                self._writeTile(oldKey, oldArray)
+        return tile
+
+    def _contains(self, x, y, band):
+        return 0 <= x < self.nx and 0 <= y < self.ny and 0 <= band < self.nbands
+
     def setValue(self, value, x, y, band=0):
-        try:
-            self.matrix[y, x] = value
-        except IndexError:
-            pass
+        if not self._contains(x, y, band):
+            return
+        tile = self._tile(band, x, y)
+        tile[0][y % self.tileY, x % self.tileX] = value
+        tile[1] = True
 
     def getValue(self, x, y, band=0):
-        try:
-            return self.matrix[y, x]
-        except IndexError:
+        if not self._contains(x, y, band):
             return self.NODATA
+        return self._tile(band, x, y)[0][y % self.tileY, x % self.tileX]
+
+    def _evict(self, xoff, yoff, width, height, band):
+        """Writes and drops cached tiles overlapping the given window, so
+        that a direct write to the dataset is not overwritten later.
+        """
+        for key in list(self.tiles.keys()):
+            b, col, row = key
+            if b != band:
+                continue
+            tx, ty, tw, th = self._tileWindow(col, row)
+            if tx < xoff + width and xoff < tx + tw and ty < yoff + height and yoff < ty + th:
+                array, dirty = self.tiles.pop(key)
+                if dirty:
+                    self._writeTile(key, array)
+
+    def setBlock(self, array, xoff, yoff, band=0):
+        """Writes a 2D array with its upper left corner at (xoff, yoff).
+        Parts of the array falling outside the raster are ignored.
+        """
+        array = numpy.asarray(array, dtype=numpy.float32)
+        height, width = array.shape
+        x0 = max(0, xoff)
+        y0 = max(0, yoff)
+        x1 = min(self.nx, xoff + width)
+        y1 = min(self.ny, yoff + height)
+        if x0 >= x1 or y0 >= y1 or not 0 <= band < self.nbands:
+            return
+        self._evict(x0, y0, x1 - x0, y1 - y0, band)
+        self.dataset.GetRasterBand(band + 1).WriteArray(
+            array[y0 - yoff:y1 - yoff, x0 - xoff:x1 - xoff], x0, y0)
+
+    def fill(self, value, band=None):
+        """Sets every cell of a band (all bands if None) to value, one
+        tile at a time.
+        """
+        bands = range(self.nbands) if band is None else [band]
+        tile = numpy.empty((self.tileY, self.tileX), dtype=numpy.float32)
+        tile.fill(value)
+        for b in bands:
+            self.tiles = OrderedDict((k, v) for k, v in self.tiles.items() if k[0] != b)
+            gdalBand = self.dataset.GetRasterBand(b + 1)
+            for yoff in range(0, self.ny, self.tileY):
+                height = min(self.tileY, self.ny - yoff)
+                for xoff in range(0, self.nx, self.tileX):
+                    width = min(self.tileX, self.nx - xoff)
+                    gdalBand.WriteArray(tile[:height, :width], xoff, yoff)
 
     def close(self):
-        fmt = 'GTiff'
-        driver = gdal.GetDriverByName(fmt)
-        dst_ds = driver.Create(self.fileName, self.nx, self.ny, 1,
-                               gdal.GDT_Float32)
-        dst_ds.SetProjection(str(self.crs.toWkt()))
-        if self.geotransform is None:
-            dst_ds.SetGeoTransform([self.minx, self.cellsize, 0,
-                                    self.maxy, self.cellsize, 0])
-        else:
-            dst_ds.SetGeoTransform(self.geotransform)
-        dst_ds.GetRasterBand(1).WriteArray(self.matrix)
-        dst_ds = None
+        if self.dataset is None:
+            return
+        for key, (array, dirty) in self.tiles.items():
+            if dirty:
+                self._writeTile(key, array)
+        self.tiles.clear()
+        self.dataset.FlushCache()
+        self.dataset = None
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    sampling.py
+    ---------------------
+    Date                 : October 2026
+    Copyright            : (C) 2026 by QGIS Development Team
+    Email                : qgis-developer at lists dot osgeo dot org
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'QGIS Development Team'
+__date__ = 'October 2026'
+__copyright__ = '(C) 2026, QGIS Development Team'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+from math import floor, sqrt
+
+import numpy
+
+from qgis.core import (QgsGeometry,
+                       QgsWkbTypes)
+
+# Largest number of candidate points drawn at once
+BATCH_SIZE = 65536
+
+
+def randomGenerator(seed=None):
+    """Returns the numpy random generator used by the samplers, seeded
+    randomly unless seed is given.
+    """
+
+    return numpy.random.RandomState(seed)
+
+
+class ExtentSampler(object):
+    """Uniform random points in a rectangle."""
+
+    def __init__(self, rect, generator=None):
+        self.rect = rect
+        self.generator = generator or randomGenerator()
+
+    def sample(self, count):
+        xy = self.generator.random_sample((count, 2))
+        xy[:, 0] = self.rect.xMinimum() + xy[:, 0] * self.rect.width()
+        xy[:, 1] = self.rect.yMinimum() + xy[:, 1] * self.rect.height()
+        return xy
+
+
+class PolygonSampler(object):
+    """Uniform random points inside polygons.
+
+    The polygons are split once in triangles covering them exactly, and
+    points are drawn in the triangles, each one being picked with a
+    probability proportional to its area. No point has to be tested
+    against the polygons.
+    """
+
+    def __init__(self, geometries, generator=None):
+        self.generator = generator or randomGenerator()
+        triangles = []
+        weights = []
+        for geometry in geometries:
+            if geometry is None or geometry.isNull() or geometry.type() != QgsWkbTypes.PolygonGeometry:
+                continue
+            engine = QgsGeometry.createGeometryEngine(geometry.geometry())
+            engine.prepareGeometry()
+            for triangle in geometry.delaunayTriangulation().asGeometryCollection():
+                if engine.contains(triangle.geometry()):
+                    pieces = [triangle]
+                elif engine.intersects(triangle.geometry()):
+                    pieces = self._clip(engine, triangle)
+                else:
+                    continue
+                for piece in pieces:
+                    area = piece.area()
+                    if area <= 0:
+                        continue
+                    triangles.append([(p.x(), p.y()) for p in piece.asPolygon()[0][:3]])
+                    weights.append(area)
+
+        self.triangles = numpy.array(triangles, dtype=numpy.float64).reshape((len(triangles), 3, 2))
+        self.cumulativeWeights = numpy.cumsum(numpy.array(weights, dtype=numpy.float64))
+
+    def _clip(self, engine, triangle):
+        """Returns the triangles covering the part of triangle inside the
+        polygon of engine.
+        """
+
+        # the triangle has no vertex of the polygon inside it, so the edges
+        # of the polygon crossing it cut it in convex pieces, and the
+        # triangulation of a convex piece covers it exactly
+        pieces = []
+        clipped = QgsGeometry(engine.intersection(triangle.geometry()))
+        for part in clipped.asGeometryCollection():
+            if part.type() == QgsWkbTypes.PolygonGeometry and part.area() > 0:
+                pieces.extend(part.delaunayTriangulation().asGeometryCollection())
+        return pieces
+
+    def area(self):
+        """Area of the polygons which can be sampled."""
+
+        return float(self.cumulativeWeights[-1]) if len(self.cumulativeWeights) else 0.0
+
+    def sample(self, count):
+        """Returns an (n, 2) array of count random points, or no point if
+        the polygons have no area.
+        """
+
+        if count <= 0 or len(self.cumulativeWeights) == 0:
+            return numpy.empty((0, 2))
+        # pick triangles by area, then a uniform point in each of them
+        picked = numpy.searchsorted(self.cumulativeWeights,
+                                    self.generator.random_sample(count) * self.cumulativeWeights[-1],
+                                    side='right')
+        picked = numpy.minimum(picked, len(self.cumulativeWeights) - 1)
+        r = self.generator.random_sample((count, 2))
+        flipped = r.sum(axis=1) > 1
+        r[flipped] = 1 - r[flipped]
+        a = self.triangles[picked, 0]
+        return a + r[:, :1] * (self.triangles[picked, 1] - a) + r[:, 1:] * (self.triangles[picked, 2] - a)
+
+
+class LineSampler(object):
+    """Uniform random points along lines, each segment being picked with a
+    probability proportional to its length. Lengths are measured with
+    distanceArea, a QgsDistanceArea, if given, and are planar otherwise.
+    """
+
+    def __init__(self, geometries, generator=None, distanceArea=None):
+        self.generator = generator or randomGenerator()
+        segments = []
+        lengths = []
+        for geometry in geometries:
+            if geometry is None or geometry.isNull() or geometry.type() != QgsWkbTypes.LineGeometry:
+                continue
+            lines = geometry.asMultiPolyline() if geometry.isMultipart() else [geometry.asPolyline()]
+            for line in lines:
+                for a, b in zip(line, line[1:]):
+                    segments.append(((a.x(), a.y()), (b.x(), b.y())))
+                    if distanceArea is not None:
+                        lengths.append(distanceArea.measureLine(a, b))
+        self.segments = numpy.array(segments, dtype=numpy.float64).reshape((len(segments), 2, 2))
+        if distanceArea is None:
+            lengths = numpy.hypot(*(self.segments[:, 1] - self.segments[:, 0]).T)
+        self.cumulativeLengths = numpy.cumsum(numpy.array(lengths, dtype=numpy.float64))
+
+    def length(self):
+        return float(self.cumulativeLengths[-1]) if len(self.cumulativeLengths) else 0.0
+
+    def sample(self, count):
+        if count <= 0 or self.length() <= 0:
+            return numpy.empty((0, 2))
+        picked = numpy.searchsorted(self.cumulativeLengths,
+                                    self.generator.random_sample(count) * self.cumulativeLengths[-1],
+                                    side='right')
+        picked = numpy.minimum(picked, len(self.cumulativeLengths) - 1)
+        t = self.generator.random_sample((count, 1))
+        a = self.segments[picked, 0]
+        return a + t * (self.segments[picked, 1] - a)
+
+
+class PoissonDiskGrid(object):
+    """Points at least distance apart, hashed in a grid of cells small
+    enough to hold one point each, so a new point is only compared with
+    the points of the 5 x 5 cells around it.
+    """
+
+    def __init__(self, distance):
+        self.sqrDistance = distance * distance
+        self.cellSize = distance / sqrt(2)
+        self.cells = {}
+
+    def add(self, x, y):
+        """Adds a point if it is far enough from the others, and returns
+        whether it was added.
+        """
+
+        i = int(floor(x / self.cellSize))
+        j = int(floor(y / self.cellSize))
+        cells = self.cells
+        for di in range(-2, 3):
+            for dj in range(-2, 3):
+                other = cells.get((i + di, j + dj))
+                if other is not None and (other[0] - x) ** 2 + (other[1] - y) ** 2 < self.sqrDistance:
+                    return False
+        cells[(i, j)] = (x, y)
+        return True
+
+
+def samplePoints(sampler, pointCount, minDistance=0, maxAttempts=None, grid=None):
+    """Yields up to pointCount random (x, y) points drawn by sampler.
+
+    With minDistance, candidates closer than it to a previous point (of
+    grid, a PoissonDiskGrid, if given) are rejected, and at most
+    maxAttempts candidates are drawn.
+    """
+
+    if grid is None and minDistance > 0:
+        grid = PoissonDiskGrid(minDistance)
+    if maxAttempts is None:
+        maxAttempts = pointCount * 200
+    count = 0
+    attempts = 0
+    while count < pointCount and attempts < maxAttempts:
+        batch = min(pointCount - count, BATCH_SIZE, maxAttempts - attempts)
+        candidates = sampler.sample(batch)
+        attempts += batch
+        if len(candidates) == 0:
+            return
+        for x, y in candidates.tolist():
+            if grid is None or grid.add(x, y):
+                yield x, y
+                count += 1
+                if count == pointCount:
+                    return
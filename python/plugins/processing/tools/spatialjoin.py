@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    spatialjoin.py
+    ---------------------
+    Date                 : October 2026
+    Copyright            : (C) 2026 by QGIS Development Team
+    Email                : qgis-developer at lists dot osgeo dot org
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'QGIS Development Team'
+__date__ = 'October 2026'
+__copyright__ = '(C) 2026, QGIS Development Team'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from qgis.core import (QgsFeatureRequest,
+                       QgsGeometry,
+                       QgsRectangle,
+                       QgsSpatialIndex)
+
+from processing.tools import vector
+
+# Predicate to use when the arguments are swapped, i.e. a.p(b) == b.reversed(a)
+REVERSED_PREDICATES = {'intersects': 'intersects',
+                       'contains': 'within',
+                       'within': 'contains',
+                       'equals': 'equals',
+                       'touches': 'touches',
+                       'overlaps': 'overlaps',
+                       'crosses': 'crosses',
+                       'disjoint': 'disjoint'}
+
+# Name of the QgsGeometryEngine method for each predicate
+ENGINE_METHODS = {'equals': 'isEqual'}
+
+# Number of probing features read before they are dispatched to workers
+BATCH_SIZE = 4096
+
+
+def _readGeometries(source, request, precision):
+    for f in source.getFeatures(request):
+        if not f.hasGeometry():
+            continue
+        geom = f.geometry()
+        if precision:
+            geom = vector.snapToPrecision(geom, precision)
+        yield f, geom
+
+
+class SpatialJoinEngine(object):
+    """Finds the pairs of features from two sources satisfying one or more
+    geometric predicates.
+
+    The smaller source (by feature count) is loaded into a spatial index,
+    keeping only the feature ids and geometries in memory, and the other
+    one is streamed. The geometry of each probing feature is prepared once
+    and tested against every candidate returned by the index. Predicates
+    are always expressed as source.predicate(other), whatever side is
+    indexed.
+
+    Batches of probing features are split in spatial tiles which can be
+    processed in parallel by a pool of threads.
+    """
+
+    def __init__(self, source, other, precision=0.0, sourceRequest=None,
+                 otherRequest=None, threads=1):
+        self.source = source
+        self.other = other
+        self.precision = precision or 0.0
+        self.sourceRequest = sourceRequest or QgsFeatureRequest()
+        self.otherRequest = otherRequest or QgsFeatureRequest()
+        self.threads = max(1, threads)
+
+        # index the smaller side
+        self.indexSource = source.featureCount() <= other.featureCount()
+
+    def evaluate(self, predicates, feedback=None):
+        """Yields (sourceId, otherId, results) tuples for each pair of
+        features with intersecting bounding boxes for which at least one of
+        the predicates is true. results is a tuple with a boolean for
+        each predicate, in the same order. 'disjoint' is not supported as
+        it is never true for candidates of a spatial index, use the
+        complement of 'intersects' instead.
+        """
+        if self.indexSource:
+            indexed, probing = self.source, self.other
+            indexedRequest, probingRequest = self.sourceRequest, self.otherRequest
+            probePredicates = [REVERSED_PREDICATES[p] for p in predicates]
+        else:
+            indexed, probing = self.other, self.source
+            indexedRequest, probingRequest = self.otherRequest, self.sourceRequest
+            probePredicates = list(predicates)
+        methods = [ENGINE_METHODS.get(p, p) for p in probePredicates]
+
+        index, geometries = self._buildIndex(indexed, indexedRequest, feedback)
+        if not geometries:
+            return
+
+        total = 100.0 / probing.featureCount() if probing.featureCount() else 0
+        grow = 0.51 * self.precision
+        request = QgsFeatureRequest(probingRequest).setSubsetOfAttributes([])
+
+        def probe(batch):
+            results = []
+            for fid, geom in batch:
+                bbox = geom.boundingBox()
+                bbox.grow(grow)
+                candidates = index.intersects(bbox)
+                if not candidates:
+                    continue
+                engine = QgsGeometry.createGeometryEngine(geom.geometry())
+                engine.prepareGeometry()
+                for candidate in candidates:
+                    other = geometries[candidate].geometry()
+                    # every supported predicate implies intersection
+                    if not engine.intersects(other):
+                        continue
+                    matched = tuple(getattr(engine, m)(other) for m in methods)
+                    if any(matched):
+                        if self.indexSource:
+                            results.append((candidate, fid, matched))
+                        else:
+                            results.append((fid, candidate, matched))
+            return results
+
+        pool = ThreadPoolExecutor(max_workers=self.threads) if self.threads > 1 else None
+        try:
+            batch = []
+            current = 0
+            for f, geom in _readGeometries(probing, request, self.precision):
+                if feedback is not None and feedback.isCanceled():
+                    break
+                batch.append((f.id(), geom))
+                current += 1
+                if len(batch) == BATCH_SIZE:
+                    for r in self._run(pool, probe, batch):
+                        yield r
+                    batch = []
+                    if feedback is not None:
+                        feedback.setProgress(int(current * total))
+            if batch:
+                for r in self._run(pool, probe, batch):
+                    yield r
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    def matches(self, predicates, feedback=None):
+        """Returns a dict with the ids of source features matching at least
+        one predicate as keys, and the sorted list of ids of the matching
+        other features as values.
+        """
+        result = {}
+        for sourceId, otherId, matched in self.evaluate(predicates, feedback):
+            result.setdefault(sourceId, []).append(otherId)
+        for ids in result.values():
+            ids.sort()
+        return result
+
+    def sourceIds(self, predicates, feedback=None):
+        """Returns the set of ids of source features for which at least one
+        of the predicates is true. 'disjoint' is true for source features
+        not intersecting any feature of the other source, and is resolved
+        in the same pass as the other predicates.
+        """
+        disjoint = 'disjoint' in predicates
+        tested = [p for p in predicates if p != 'disjoint']
+        requested = len(tested)
+        if disjoint and 'intersects' not in tested:
+            tested.append('intersects')
+
+        selected = set()
+        intersecting = set()
+        for sourceId, otherId, matched in self.evaluate(tested, feedback):
+            if any(matched[:requested]):
+                selected.add(sourceId)
+            # evaluate() only returns intersecting pairs
+            intersecting.add(sourceId)
+
+        if disjoint:
+            request = QgsFeatureRequest(self.sourceRequest).setSubsetOfAttributes([])
+            request.setFlags(QgsFeatureRequest.NoGeometry)
+            for f in self.source.getFeatures(request):
+                if f.id() not in intersecting:
+                    selected.add(f.id())
+        return selected
+
+    def _buildIndex(self, source, request, feedback):
+        request = QgsFeatureRequest(request).setSubsetOfAttributes([])
+        geometries = {}
+        features = []
+        for f, geom in _readGeometries(source, request, self.precision):
+            if feedback is not None and feedback.isCanceled():
+                break
+            geometries[f.id()] = geom
+            features.append((f.id(), geom.boundingBox()))
+
+        index = QgsSpatialIndex()
+        for fid, bbox in features:
+            index.insertFeature(fid, bbox)
+        return index, geometries
+
+    def _run(self, pool, probe, batch):
+        if pool is None:
+            return probe(batch)
+
+        # group features in tiles so each worker deals with spatially
+        # close geometries, then restore the original order of the batch
+        order = dict((fid, i) for i, (fid, geom) in enumerate(batch))
+        extent = QgsRectangle()
+        extent.setMinimal()
+        centers = []
+        for fid, geom in batch:
+            bbox = geom.boundingBox()
+            extent.combineExtentWith(bbox)
+            centers.append(bbox.center())
+        side = int(math.ceil(math.sqrt(self.threads * 4)))
+        width = extent.width() / side or 1
+        height = extent.height() / side or 1
+        tiles = {}
+        for (fid, geom), center in zip(batch, centers):
+            key = (min(int((center.x() - extent.xMinimum()) / width), side - 1),
+                   min(int((center.y() - extent.yMinimum()) / height), side - 1))
+            tiles.setdefault(key, []).append((fid, geom))
+
+        results = []
+        for tileResults in pool.map(probe, list(tiles.values())):
+            results.extend(tileResults)
+        probeColumn = 1 if self.indexSource else 0
+        results.sort(key=lambda r: order[r[probeColumn]])
+        return results
@@ -37,7 +37,7 @@ import os
 import csv
 import uuid
 
-import psycopg2
+import numpy
 from osgeo import ogr
 
 from qgis.PyQt.QtCore import QVariant
@@ -49,13 +49,13 @@ from qgis.core import (QgsFields,
                        QgsVectorFileWriter,
                        QgsDistanceArea,
                        QgsDataSourceUri,
-                       QgsCredentials,
-                       QgsFeatureRequest,
                        QgsSettings,
                        QgsProcessingContext,
                        QgsProcessingUtils)
 
 from processing.tools import dataobjects
+from processing.tools import aggregation
+from processing.tools import postgis
 
 
 def resolveFieldIndex(source, attr):
@@ -96,25 +96,14 @@ def values(source, *attributes):
         index = resolveFieldIndex(source, attr)
         indices.append(index)
         attr_keys[index] = attr
+        ret[attr] = []
 
-    # use an optimised feature request
-    request = QgsFeatureRequest().setSubsetOfAttributes(indices).setFlags(QgsFeatureRequest.NoGeometry)
-
-    for feature in source.getFeatures(request):
+    for size, columns, categories in aggregation.columns(source, indices):
         for i in indices:
-
-            # convert attribute value to number
-            try:
-                v = float(feature.attributes()[i])
-            except:
-                v = None
-
-            k = attr_keys[i]
-            if k in ret:
-                ret[k].append(v)
-            else:
-                ret[k] = [v]
-    return ret
+            column = columns[i].astype(object)
+            column[numpy.isnan(columns[i])] = None
+            ret[attr_keys[i]].extend(column.tolist())
+    return {k: v for k, v in ret.items() if v}
 
 
 def testForUniqueness(fieldList1, fieldList2):
@@ -307,27 +296,14 @@ def ogrConnectionString(uri):
         # key='gid' estimatedmetadata=true srid=4326 type=MULTIPOLYGON
         # table="t4" (geom) sql=
         dsUri = QgsDataSourceUri(layer.dataProvider().dataSourceUri())
-        conninfo = dsUri.connectionInfo()
-        conn = None
-        ok = False
-        while not conn:
-            try:
-                conn = psycopg2.connect(dsUri.connectionInfo())
-            except psycopg2.OperationalError:
-                (ok, user, passwd) = QgsCredentials.instance().get(conninfo, dsUri.username(), dsUri.password())
-                if not ok:
-                    break
-
-                dsUri.setUsername(user)
-                dsUri.setPassword(passwd)
-
-        if not conn:
+        # validates the credentials, the connection goes back to the pool
+        # shared with the other PostgreSQL tools afterwards
+        try:
+            db = postgis.GeoDB(uri=dsUri)
+        except postgis.DbError:
             raise RuntimeError('Could not connect to PostgreSQL database - check connection info')
-
-        if ok:
-            QgsCredentials.instance().put(conninfo, user, passwd)
-
-        ogrstr = "PG:%s" % dsUri.connectionInfo()
+        ogrstr = "PG:%s" % db.uri.connectionInfo()
+        db.close()
     elif provider == "oracle":
         # OCI:user/password@host:port/service:table
         dsUri = QgsDataSourceUri(layer.dataProvider().dataSourceUri())